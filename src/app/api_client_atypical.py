@@ -8,6 +8,10 @@ import json
 from typing import Optional, Dict, Any, Tuple
 
 from config_manager import ConfigManager
+from http_session import SharedHttpSession
+from rate_limiter import RateLimiterRegistry, DEFAULT_RATE_LIMIT_REQUESTS_PER_MINUTE, DEFAULT_MAX_CONCURRENT_JOBS
+from retry_policy import RetryPolicy, RetryBudget, REQUEST_KIND_READ, REQUEST_KIND_WRITE, DEFAULT_RETRY_MAX_ATTEMPTS, DEFAULT_RETRY_BUDGET_PER_RUN
+from multipart_upload import StreamingMultipartEncoder, ProgressCallback, build_headers
 
 
 class OCRApiClientAtypical:
@@ -50,6 +54,16 @@ class OCRApiClientAtypical:
 
         self.api_execution_mode = self.config.get("api_execution_mode", "demo")
         self.api_key = self.active_options_values.get("api_key", "")
+        # Keep-Alive 付きの共有セッション (ホストあたりの接続上限はワーカーの同時処理数に合わせる)
+        self.http_session = SharedHttpSession.configure_for_concurrency(self.active_options_values.get("max_concurrent_files", 1), self.log_manager,
+                                                                       max_concurrent_parts=self.active_options_values.get("max_concurrent_parts", 1))
+        # 組織 (ベースURIのホスト) ごとの送信レート・同時ジョブ数の制限。同じ組織へのリクエストは全ワーカー・SortWorker で共有する
+        self.rate_limiter = RateLimiterRegistry.configure(self.active_options_values.get("base_uri") or self.active_api_profile_schema.get("base_uri"),
+                                                          self.active_options_values.get("rate_limit_requests_per_minute", DEFAULT_RATE_LIMIT_REQUESTS_PER_MINUTE),
+                                                          self.active_options_values.get("max_concurrent_jobs", DEFAULT_MAX_CONCURRENT_JOBS))
+        # 一時的な通信エラー・5xx・429 の再試行 (状態確認・結果取得は常に、登録・削除は接続確立前の失敗と 429・Retry-After 付きの 503 のみ)。再試行の合計回数は実行ごとに制限する
+        self.retry_policy = RetryPolicy(self.log_manager, self.active_options_values.get("retry_max_attempts", DEFAULT_RETRY_MAX_ATTEMPTS))
+        RetryBudget.configure(self.active_options_values.get("retry_budget_per_run", DEFAULT_RETRY_BUDGET_PER_RUN))
 
         profile_name_for_log = self.active_api_profile_schema.get('name', 'N/A')
         key_status_log = "設定あり" if self.api_key else "未設定"
@@ -89,7 +103,8 @@ class OCRApiClientAtypical:
             return {}
         return {header_key: self.api_key}
 
-    def read_document(self, file_path: str, specific_options: Optional[Dict[str, Any]] = None) -> Tuple[Optional[Any], Optional[Dict[str, Any]]]:
+    def read_document(self, file_path: str, specific_options: Optional[Dict[str, Any]] = None,
+                      progress_callback: Optional[ProgressCallback] = None) -> Tuple[Optional[Any], Optional[Dict[str, Any]]]:
         file_name = os.path.basename(file_path)
         base_options = self.active_options_values if self.active_options_values is not None else {}
         effective_options = {**base_options, **(specific_options or {})}
@@ -118,10 +133,10 @@ class OCRApiClientAtypical:
             data_payload['model'] = model_to_send
             if effective_options.get("classes"): data_payload['classes'] = effective_options.get("classes")
             if effective_options.get("departmentId"): data_payload['departmentId'] = effective_options.get("departmentId")
-            file_obj = None
+            encoder = None
             try:
-                file_obj = open(file_path, 'rb'); files_payload = {'files': (os.path.basename(file_path), file_obj)}
-                self.log_manager.debug(f"  POST to {url} with headers: {list(headers.keys())}, form-data: {data_payload}, file: {file_name}", context=f"{log_ctx_prefix}_LIVE_READ"); response = requests.post(url, headers=headers, data=data_payload, files=files_payload, timeout=self.timeout_seconds); response.raise_for_status(); response_json = response.json(); self.log_manager.info(f"  DX Suite Atypical Read API success. Response: {response_json}", context=f"{log_ctx_prefix}_LIVE_READ")
+                encoder = StreamingMultipartEncoder(list(data_payload.items()), [('files', os.path.basename(file_path), file_path, 'application/octet-stream')], progress_callback=progress_callback)
+                self.log_manager.debug(f"  POST to {url} with headers: {list(headers.keys())}, form-data: {data_payload}, file: {file_name}", context=f"{log_ctx_prefix}_LIVE_READ"); response = self.retry_policy.send(lambda: self.http_session.post(url, headers=build_headers(headers, encoder), data=encoder, timeout=self.timeout_seconds), REQUEST_KIND_WRITE, log_ctx_prefix, rewind=encoder.rewind); response.raise_for_status(); response_json = response.json(); self.log_manager.info(f"  DX Suite Atypical Read API success. Response: {response_json}", context=f"{log_ctx_prefix}_LIVE_READ")
                 reception_id = response_json.get("receptionId")
                 if not reception_id: return None, {"message": "DX Suite 非定型 読取登録APIレスポンスにreceptionIdが含まれていません。", "code": "DXSUITE_ATYPICAL_NO_RECEPTIONID", "detail": response_json}
                 
@@ -135,9 +150,7 @@ class OCRApiClientAtypical:
             except requests.exceptions.RequestException as e_req: return None, {"message": "DX Suite 非定型APIリクエスト失敗。", "code": "DXSUITE_ATYPICAL_REQUEST_FAIL", "detail": str(e_req)}
             except Exception as e_generic: return None, {"message": "DX Suite 非定型読取登録処理中に予期せぬエラー。", "code": "DXSUITE_ATYPICAL_UNEXPECTED_ERROR", "detail": str(e_generic)}
             finally:
-                if file_obj and not file_obj.closed:
-                    try: file_obj.close()
-                    except Exception as e_close: self.log_manager.warning(f"非定型API用一時ファイルのクローズに失敗: {e_close}", context=log_ctx_prefix)
+                if encoder: encoder.close()
 
     def get_ocr_result(self, reception_id: str) -> Tuple[Optional[Any], Optional[Dict[str, Any]]]:
         """DX Suite 非定型APIの読取結果を取得する。"""
@@ -158,7 +171,7 @@ class OCRApiClientAtypical:
         
         try:
             self.log_manager.debug(f"  GET from {url} with headers: {list(headers.keys())}, params: {params}", context=f"{log_ctx_prefix}_LIVE_GETRESULT")
-            response = requests.get(url, headers=headers, params=params, timeout=self.timeout_seconds)
+            response = self.retry_policy.send(lambda: self.http_session.get(url, headers=headers, params=params, timeout=self.timeout_seconds), REQUEST_KIND_READ, log_ctx_prefix)
             response.raise_for_status()
             response_json = response.json()
             self.log_manager.info(f"  DX Suite Atypical GetResult API success. Status: {response_json.get('status')}", context=f"{log_ctx_prefix}_LIVE_GETRESULT")
@@ -196,7 +209,7 @@ class OCRApiClientAtypical:
 
         try:
             self.log_manager.debug(f"  POST to {url} with headers: {list(headers.keys())}, body: {request_body}", context=log_ctx_prefix)
-            response = requests.post(url, headers=headers, json=request_body, timeout=self.timeout_seconds)
+            response = self.retry_policy.send(lambda: self.http_session.post(url, headers=headers, json=request_body, timeout=self.timeout_seconds), REQUEST_KIND_WRITE, log_ctx_prefix)
             response.raise_for_status()
             self.log_manager.info(f"  DX Suite Atypical Delete API success. Status Code: {response.status_code}", context=log_ctx_prefix)
             return {"receptionId": reception_id, "status": "deleted_successfully"}, None
@@ -10,6 +10,10 @@ import json
 from typing import Optional, Dict, Any, Tuple
 
 from config_manager import ConfigManager
+from http_session import SharedHttpSession
+from rate_limiter import RateLimiterRegistry, DEFAULT_RATE_LIMIT_REQUESTS_PER_MINUTE, DEFAULT_MAX_CONCURRENT_JOBS
+from retry_policy import RetryPolicy, RetryBudget, REQUEST_KIND_READ, REQUEST_KIND_WRITE, DEFAULT_RETRY_MAX_ATTEMPTS, DEFAULT_RETRY_BUDGET_PER_RUN
+from multipart_upload import StreamingMultipartEncoder, ProgressCallback, build_headers
 
 
 class OCRApiClientFulltext:
@@ -52,6 +56,16 @@ class OCRApiClientFulltext:
 
         self.api_execution_mode = self.config.get("api_execution_mode", "demo")
         self.api_key = self.active_options_values.get("api_key", "")
+        # Keep-Alive 付きの共有セッション (ホストあたりの接続上限はワーカーの同時処理数に合わせる)
+        self.http_session = SharedHttpSession.configure_for_concurrency(self.active_options_values.get("max_concurrent_files", 1), self.log_manager,
+                                                                       max_concurrent_parts=self.active_options_values.get("max_concurrent_parts", 1))
+        # 組織 (ベースURIのホスト) ごとの送信レート・同時ジョブ数の制限。同じ組織へのリクエストは全ワーカー・SortWorker で共有する
+        self.rate_limiter = RateLimiterRegistry.configure(self.active_options_values.get("base_uri") or self.active_api_profile_schema.get("base_uri"),
+                                                          self.active_options_values.get("rate_limit_requests_per_minute", DEFAULT_RATE_LIMIT_REQUESTS_PER_MINUTE),
+                                                          self.active_options_values.get("max_concurrent_jobs", DEFAULT_MAX_CONCURRENT_JOBS))
+        # 一時的な通信エラー・5xx・429 の再試行 (状態確認・結果取得は常に、登録・削除は接続確立前の失敗と 429・Retry-After 付きの 503 のみ)。再試行の合計回数は実行ごとに制限する
+        self.retry_policy = RetryPolicy(self.log_manager, self.active_options_values.get("retry_max_attempts", DEFAULT_RETRY_MAX_ATTEMPTS))
+        RetryBudget.configure(self.active_options_values.get("retry_budget_per_run", DEFAULT_RETRY_BUDGET_PER_RUN))
 
         profile_name_for_log = self.active_api_profile_schema.get('name', 'N/A')
         key_status_log = "設定あり" if self.api_key else "未設定"
@@ -91,7 +105,8 @@ class OCRApiClientFulltext:
             return {}
         return {header_key: self.api_key}
 
-    def read_document(self, file_path: str, specific_options: Optional[Dict[str, Any]] = None) -> Tuple[Optional[Any], Optional[Dict[str, Any]]]:
+    def read_document(self, file_path: str, specific_options: Optional[Dict[str, Any]] = None,
+                      progress_callback: Optional[ProgressCallback] = None) -> Tuple[Optional[Any], Optional[Dict[str, Any]]]:
         file_name = os.path.basename(file_path)
         base_options = self.active_options_values if self.active_options_values is not None else {}
         effective_options = {**base_options, **(specific_options or {})}
@@ -113,9 +128,9 @@ class OCRApiClientFulltext:
             if not url: return None, {"message": "エンドポイントURL取得失敗 (DX Suite Register OCR)", "code": "CONFIG_ENDPOINT_URL_FAIL"}
             if "{組織固有}" in url or "{organization_specific_domain}" in url: self.log_manager.error(f"DX Suite のベースURIに組織固有ドメインのプレースホルダーが含まれています。設定を確認してください: {url}", context="API_CLIENT_CONFIG_ERROR"); return None, {"message": "DX Suite ベースURI未設定エラー。", "code": "DXSUITE_BASE_URI_NOT_CONFIGURED"}
             if not self.api_key: err_msg = f"APIキーがプロファイル '{profile_name}' に設定されていません (Liveモード)。"; self.log_manager.error(err_msg, context=f"{log_ctx_prefix}_LIVE_REGISTER", error_code="API_KEY_MISSING_LIVE"); return None, {"message": err_msg, "code": "API_KEY_MISSING_LIVE"}
-            headers = self._get_request_headers(); payload_data = {"concatenate": str(effective_options.get("concatenate", 0)), "characterExtraction": str(effective_options.get("characterExtraction", 0)), "tableExtraction": str(effective_options.get("tableExtraction", 1))}; file_obj = None
+            headers = self._get_request_headers(); payload_data = {"concatenate": str(effective_options.get("concatenate", 0)), "characterExtraction": str(effective_options.get("characterExtraction", 0)), "tableExtraction": str(effective_options.get("tableExtraction", 1))}; encoder = None
             try:
-                file_obj = open(file_path, 'rb'); files_data = {'file': (os.path.basename(file_path), file_obj)}; self.log_manager.debug(f"  POST to {url} with headers: {list(headers.keys())}, form-data: {payload_data}, file: {file_name}", context=f"{log_ctx_prefix}_LIVE_REGISTER"); response = requests.post(url, headers=headers, data=payload_data, files=files_data, timeout=self.timeout_seconds); response.raise_for_status(); response_json = response.json(); self.log_manager.info(f"  DX Suite Register API success. Response: {response_json}", context=f"{log_ctx_prefix}_LIVE_REGISTER"); job_id = response_json.get("id")
+                encoder = StreamingMultipartEncoder(list(payload_data.items()), [('file', os.path.basename(file_path), file_path, 'application/octet-stream')], progress_callback=progress_callback); self.log_manager.debug(f"  POST to {url} with headers: {list(headers.keys())}, form-data: {payload_data}, file: {file_name}", context=f"{log_ctx_prefix}_LIVE_REGISTER"); response = self.retry_policy.send(lambda: self.http_session.post(url, headers=build_headers(headers, encoder), data=encoder, timeout=self.timeout_seconds), REQUEST_KIND_WRITE, log_ctx_prefix, rewind=encoder.rewind); response.raise_for_status(); response_json = response.json(); self.log_manager.info(f"  DX Suite Register API success. Response: {response_json}", context=f"{log_ctx_prefix}_LIVE_REGISTER"); job_id = response_json.get("id")
                 if not job_id: self.log_manager.error(f"  DX Suite Register API response missing 'id'. Response: {response_json}", context=f"{log_ctx_prefix}_LIVE_REGISTER_ERROR"); return None, {"message": "DX Suite 登録APIレスポンスにIDが含まれていません。", "code": "DXSUITE_REGISTER_NO_ID", "detail": response_json}
                 
                 # OcrWorkerに渡す情報
@@ -128,9 +143,7 @@ class OCRApiClientFulltext:
             except requests.exceptions.RequestException as e_req: err_msg = f"DX Suite 登録APIリクエストエラー: {e_req}"; self.log_manager.error(err_msg, context=f"{log_ctx_prefix}_LIVE_REGISTER_REQUEST_ERROR", exc_info=True); return None, {"message": "DX Suite 登録APIリクエスト失敗。", "code": "DXSUITE_REGISTER_REQUEST_FAIL", "detail": str(e_req)}
             except Exception as e_generic: err_msg = f"DX Suite 登録API処理中に予期せぬエラー: {e_generic}"; self.log_manager.error(err_msg, context=f"{log_ctx_prefix}_LIVE_REGISTER_UNEXPECTED_ERROR", exc_info=True); return None, {"message": "DX Suite 登録処理中に予期せぬエラー。", "code": "DXSUITE_REGISTER_UNEXPECTED_ERROR", "detail": str(e_generic)}
             finally:
-                if file_obj and not file_obj.closed:
-                    try: file_obj.close()
-                    except Exception as e_close: self.log_manager.warning(f"DX Suite Register用一時ファイルのクローズに失敗: {e_close}", context=f"{log_ctx_prefix}_LIVE_REGISTER")
+                if encoder: encoder.close()
 
     def get_ocr_result(self, job_id: str) -> Tuple[Optional[Any], Optional[Dict[str, Any]]]:
         log_ctx_prefix = "API_DX_FULLTEXT_V2"; profile_name = self.active_api_profile_schema.get('name', 'N/A') if self.active_api_profile_schema else "UnknownProfile"; self.log_manager.info(f"'{profile_name}' LiveモードAPI呼び出し開始 (DX Suite Fulltext V2 - GetResult): job_id={job_id}", context=f"{log_ctx_prefix}_LIVE_GETRESULT"); url = self._get_full_url("get_ocr_result")
@@ -139,7 +152,7 @@ class OCRApiClientFulltext:
         if not self.api_key: err_msg = f"APIキーがプロファイル '{profile_name}' に設定されていません (Liveモード)。"; self.log_manager.error(err_msg, context=f"{log_ctx_prefix}_LIVE_GETRESULT", error_code="API_KEY_MISSING_LIVE"); return None, {"message": err_msg, "code": "API_KEY_MISSING_LIVE"}
         headers = self._get_request_headers(); params = {"id": job_id}
         try:
-            self.log_manager.debug(f"  GET from {url} with headers: {list(headers.keys())}, params: {params}", context=f"{log_ctx_prefix}_LIVE_GETRESULT"); response = requests.get(url, headers=headers, params=params, timeout=self.timeout_seconds); response.raise_for_status(); response_json = response.json(); self.log_manager.info(f"  DX Suite GetResult API success. Status: {response_json.get('status')}", context=f"{log_ctx_prefix}_LIVE_GETRESULT"); return response_json, None
+            self.log_manager.debug(f"  GET from {url} with headers: {list(headers.keys())}, params: {params}", context=f"{log_ctx_prefix}_LIVE_GETRESULT"); response = self.retry_policy.send(lambda: self.http_session.get(url, headers=headers, params=params, timeout=self.timeout_seconds), REQUEST_KIND_READ, log_ctx_prefix); response.raise_for_status(); response_json = response.json(); self.log_manager.info(f"  DX Suite GetResult API success. Status: {response_json.get('status')}", context=f"{log_ctx_prefix}_LIVE_GETRESULT"); return response_json, None
         except requests.exceptions.HTTPError as e_http:
             err_msg = f"DX Suite 結果取得API HTTPエラー: {e_http.response.status_code}"; detail_text = e_http.response.text; self.log_manager.error(f"{err_msg} - {detail_text}", context=f"{log_ctx_prefix}_LIVE_GETRESULT_HTTP_ERROR", exc_info=True)
             try: err_json = e_http.response.json(); api_err_detail = err_json.get("errors", [{}])[0]; api_err_code = api_err_detail.get("errorCode", "UNKNOWN_API_ERROR"); api_err_msg_from_json = api_err_detail.get("message", detail_text); return None, {"message": f"DX Suite APIエラー: {api_err_msg_from_json}", "code": f"DXSUITE_API_{api_err_code}", "detail": err_json}
@@ -164,7 +177,7 @@ class OCRApiClientFulltext:
         headers = {**self._get_request_headers(), "Content-Type": "application/json"}; request_body = {"fullOcrJobId": full_ocr_job_id}
         
         try:
-            self.log_manager.debug(f"  POST to {url} with headers: {list(headers.keys())}, body: {request_body}", context=log_ctx_prefix); response = requests.post(url, headers=headers, json=request_body, timeout=self.timeout_seconds); response.raise_for_status(); response_json = response.json(); self.log_manager.info(f"  DX Suite Delete OCR API success. Response: {response_json}", context=log_ctx_prefix); return response_json, None
+            self.log_manager.debug(f"  POST to {url} with headers: {list(headers.keys())}, body: {request_body}", context=log_ctx_prefix); response = self.retry_policy.send(lambda: self.http_session.post(url, headers=headers, json=request_body, timeout=self.timeout_seconds), REQUEST_KIND_WRITE, log_ctx_prefix); response.raise_for_status(); response_json = response.json(); self.log_manager.info(f"  DX Suite Delete OCR API success. Response: {response_json}", context=log_ctx_prefix); return response_json, None
         except requests.exceptions.HTTPError as e_http:
             err_msg = f"DX Suite 削除API HTTPエラー: {e_http.response.status_code}"; detail_text = e_http.response.text; self.log_manager.error(f"{err_msg} - {detail_text}", context=f"{log_ctx_prefix}_HTTP_ERROR", exc_info=True)
             try: err_json = e_http.response.json(); api_err_detail = err_json.get("errors", [{}])[0]; return None, {"message": f"DX Suite APIエラー: {api_err_detail.get('message', detail_text)}", "code": f"DXSUITE_API_{api_err_detail.get('errorCode', 'UNKNOWN_DELETE_ERROR')}", "detail": err_json}
@@ -214,7 +227,7 @@ class OCRApiClientFulltext:
         if not self.api_key: return None, {"message": f"APIキーがプロファイル '{profile_name}' に設定されていません (Liveモード)。", "code": "API_KEY_MISSING_LIVE_DX_SPDF_REG"}
         headers = {**self._get_request_headers(), "Content-Type": "application/json"}; request_body = {"fullOcrJobId": full_ocr_job_id, "highResolutionMode": high_resolution_mode}
         try:
-            self.log_manager.debug(f"  POST to {url} with headers: {list(headers.keys())}, body: {request_body}", context=log_ctx_prefix); response = requests.post(url, headers=headers, json=request_body, timeout=self.timeout_seconds); response.raise_for_status(); response_json = response.json(); self.log_manager.info(f"  DX Suite Searchable PDF Register API success. Response: {response_json}", context=log_ctx_prefix); searchable_pdf_job_id = response_json.get("id")
+            self.log_manager.debug(f"  POST to {url} with headers: {list(headers.keys())}, body: {request_body}", context=log_ctx_prefix); response = self.retry_policy.send(lambda: self.http_session.post(url, headers=headers, json=request_body, timeout=self.timeout_seconds), REQUEST_KIND_WRITE, log_ctx_prefix); response.raise_for_status(); response_json = response.json(); self.log_manager.info(f"  DX Suite Searchable PDF Register API success. Response: {response_json}", context=log_ctx_prefix); searchable_pdf_job_id = response_json.get("id")
             if not searchable_pdf_job_id: return None, {"message": "DX Suite サーチャブルPDF登録APIレスポンスにIDが含まれていません。", "code": "DXSUITE_SPDF_REGISTER_NO_ID", "detail": response_json}
             return searchable_pdf_job_id, None
         except requests.exceptions.HTTPError as e_http:
@@ -231,7 +244,7 @@ class OCRApiClientFulltext:
         if not self.api_key: return None, {"message": f"APIキーがプロファイル '{profile_name}' に設定されていません (Liveモード)。", "code": "API_KEY_MISSING_LIVE_DX_SPDF_GET"}
         headers = self._get_request_headers(); params = {"id": searchable_pdf_job_id}
         try:
-            self.log_manager.debug(f"  GET from {url} with headers: {list(headers.keys())}, params: {params}", context=log_ctx_prefix); response = requests.get(url, headers=headers, params=params, timeout=self.timeout_seconds); response.raise_for_status(); content_type = response.headers.get("Content-Type", "").lower()
+            self.log_manager.debug(f"  GET from {url} with headers: {list(headers.keys())}, params: {params}", context=log_ctx_prefix); response = self.retry_policy.send(lambda: self.http_session.get(url, headers=headers, params=params, timeout=self.timeout_seconds), REQUEST_KIND_READ, log_ctx_prefix); response.raise_for_status(); content_type = response.headers.get("Content-Type", "").lower()
             if "application/pdf" in content_type: self.log_manager.info(f"  DX Suite Get Searchable PDF API success. Received PDF binary.", context=log_ctx_prefix); return response.content, None
             elif "application/json" in content_type:
                 response_json = response.json(); self.log_manager.info(f"  DX Suite Get Searchable PDF API returned JSON: {response_json}", context=log_ctx_prefix)
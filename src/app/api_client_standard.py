@@ -6,6 +6,10 @@ import requests
 from typing import Optional, Dict, Any, Tuple, List
 
 from config_manager import ConfigManager
+from http_session import SharedHttpSession
+from rate_limiter import RateLimiterRegistry, DEFAULT_RATE_LIMIT_REQUESTS_PER_MINUTE, DEFAULT_MAX_CONCURRENT_JOBS
+from retry_policy import RetryPolicy, RetryBudget, REQUEST_KIND_READ, REQUEST_KIND_WRITE, DEFAULT_RETRY_MAX_ATTEMPTS, DEFAULT_RETRY_BUDGET_PER_RUN
+from multipart_upload import StreamingMultipartEncoder, ProgressCallback, build_headers
 
 
 class OCRApiClientStandard:
@@ -48,6 +52,16 @@ class OCRApiClientStandard:
 
         self.api_execution_mode = self.config.get("api_execution_mode", "demo")
         self.api_key = self.active_options_values.get("api_key", "")
+        # Keep-Alive 付きの共有セッション (ホストあたりの接続上限はワーカーの同時処理数に合わせる)
+        self.http_session = SharedHttpSession.configure_for_concurrency(self.active_options_values.get("max_concurrent_files", 1), self.log_manager,
+                                                                       max_concurrent_parts=self.active_options_values.get("max_concurrent_parts", 1))
+        # 組織 (ベースURIのホスト) ごとの送信レート・同時ジョブ数の制限。同じ組織へのリクエストは全ワーカー・SortWorker で共有する
+        self.rate_limiter = RateLimiterRegistry.configure(self.active_options_values.get("base_uri") or self.active_api_profile_schema.get("base_uri"),
+                                                          self.active_options_values.get("rate_limit_requests_per_minute", DEFAULT_RATE_LIMIT_REQUESTS_PER_MINUTE),
+                                                          self.active_options_values.get("max_concurrent_jobs", DEFAULT_MAX_CONCURRENT_JOBS))
+        # 一時的な通信エラー・5xx・429 の再試行 (状態確認・結果取得は常に、登録・削除は接続確立前の失敗と 429・Retry-After 付きの 503 のみ)。再試行の合計回数は実行ごとに制限する
+        self.retry_policy = RetryPolicy(self.log_manager, self.active_options_values.get("retry_max_attempts", DEFAULT_RETRY_MAX_ATTEMPTS))
+        RetryBudget.configure(self.active_options_values.get("retry_budget_per_run", DEFAULT_RETRY_BUDGET_PER_RUN))
 
         profile_name_for_log = self.active_api_profile_schema.get('name', 'N/A')
         key_status_log = "設定あり" if self.api_key else "未設定"
@@ -87,7 +101,9 @@ class OCRApiClientStandard:
             return {}
         return {header_key: self.api_key}
 
-    def read_document(self, file_path: str, specific_options: Optional[Dict[str, Any]] = None) -> Tuple[Optional[Any], Optional[Dict[str, Any]]]:
+    def read_document(self, file_path: str, specific_options: Optional[Dict[str, Any]] = None,
+                      progress_callback: Optional[ProgressCallback] = None) -> Tuple[Optional[Any], Optional[Dict[str, Any]]]:
+        """ファイルを読取ユニットとして登録する。progress_callback にはアップロードの (送信済みバイト数, 合計バイト数) が通知される。"""
         file_name = os.path.basename(file_path)
         base_options = self.active_options_values if self.active_options_values is not None else {}
         effective_options = {**base_options, **(specific_options or {})}
@@ -135,13 +151,14 @@ class OCRApiClientStandard:
             if effective_options.get("unitName"):
                 data_payload['unitName'] = effective_options.get("unitName")
 
-            file_obj = None
+            encoder = None
             try:
-                file_obj = open(file_path, 'rb')
-                files_payload = {'files': (os.path.basename(file_path), file_obj, 'application/octet-stream')}
+                # ファイル全体をメモリに載せず、少しずつ読み出して送信する
+                encoder = StreamingMultipartEncoder(list(data_payload.items()), [('files', os.path.basename(file_path), file_path, 'application/octet-stream')],
+                                                    progress_callback=progress_callback)
                 
                 self.log_manager.debug(f"  POST to {register_url} with form-data: {data_payload}, file: {file_name}", context=f"{log_ctx_prefix}_LIVE_REGISTER")
-                response_register = requests.post(register_url, headers=headers, data=data_payload, files=files_payload, timeout=self.timeout_seconds)
+                response_register = self.retry_policy.send(lambda: self.http_session.post(register_url, headers=build_headers(headers, encoder), data=encoder, timeout=self.timeout_seconds), REQUEST_KIND_WRITE, log_ctx_prefix, rewind=encoder.rewind)
                 response_register.raise_for_status()
                 
                 register_json = response_register.json()
@@ -174,7 +191,7 @@ class OCRApiClientStandard:
                 self.log_manager.error(f"ユニット登録APIでエラー: {e}", context=f"{log_ctx_prefix}_LIVE_REGISTER_ERROR", exc_info=True)
                 return None, {"message": f"ユニット登録APIでエラー: {e}", "code": "DX_STANDARD_REGISTER_FAIL"}
             finally:
-                if file_obj and not file_obj.closed: file_obj.close()
+                if encoder: encoder.close()
 
     def get_status(self, unit_id: str) -> Tuple[Optional[Any], Optional[Dict[str, Any]]]:
         """DX Suite 標準APIのユニット状態を取得する。"""
@@ -197,7 +214,7 @@ class OCRApiClientStandard:
         params = {"unitId": unit_id}
         try:
             self.log_manager.debug(f"  GET from {url} with params: {params}", context=log_ctx_prefix)
-            response = requests.get(url, headers=headers, params=params, timeout=self.timeout_seconds)
+            response = self.retry_policy.send(lambda: self.http_session.get(url, headers=headers, params=params, timeout=self.timeout_seconds), REQUEST_KIND_READ, log_ctx_prefix)
             response.raise_for_status()
             response_json = response.json()
             if isinstance(response_json, list) and response_json:
@@ -236,7 +253,7 @@ class OCRApiClientStandard:
         
         try:
             self.log_manager.debug(f"  GET from {url} with params: {params}", context=log_ctx_prefix)
-            response = requests.get(url, headers=headers, params=params, timeout=self.timeout_seconds)
+            response = self.retry_policy.send(lambda: self.http_session.get(url, headers=headers, params=params, timeout=self.timeout_seconds), REQUEST_KIND_READ, log_ctx_prefix)
             response.raise_for_status()
             response_json = response.json()
             self.log_manager.info(f"  DX Suite Standard GetResult API success.", context=log_ctx_prefix)
@@ -270,7 +287,7 @@ class OCRApiClientStandard:
         
         try:
             self.log_manager.debug(f"  POST to {url}", context=log_ctx_prefix)
-            response = requests.post(url, headers=headers, timeout=self.timeout_seconds)
+            response = self.retry_policy.send(lambda: self.http_session.post(url, headers=headers, timeout=self.timeout_seconds), REQUEST_KIND_WRITE, log_ctx_prefix)
             response.raise_for_status()
             response_json = response.json()
             self.log_manager.info(f"  DX Suite Standard Delete API success. Response: {response_json}", context=log_ctx_prefix)
@@ -316,7 +333,7 @@ class OCRApiClientStandard:
         
         try:
             self.log_manager.debug(f"  GET from {url} with params: {params}", context=log_ctx_prefix)
-            response = requests.get(url, headers=headers, params=params, timeout=self.timeout_seconds)
+            response = self.retry_policy.send(lambda: self.http_session.get(url, headers=headers, params=params, timeout=self.timeout_seconds), REQUEST_KIND_READ, log_ctx_prefix)
             response.raise_for_status()
             response_json = response.json()
             self.log_manager.info(f"  DX Suite Workflow Search API success.", context=log_ctx_prefix)
@@ -351,7 +368,7 @@ class OCRApiClientStandard:
         
         try:
             self.log_manager.debug(f"  GET from {url}", context=log_ctx_prefix)
-            response = requests.get(url, headers=headers, timeout=self.timeout_seconds)
+            response = self.retry_policy.send(lambda: self.http_session.get(url, headers=headers, timeout=self.timeout_seconds), REQUEST_KIND_READ, log_ctx_prefix)
             response.raise_for_status()
 
             content_type = response.headers.get('Content-Type', '')
@@ -368,8 +385,13 @@ class OCRApiClientStandard:
         except Exception as e:
             return None, {"message": f"DX Suite CSVダウンロードで予期せぬエラー: {e}", "code": "DXSUITE_CSV_UNEXPECTED_ERROR", "detail": str(e)}
 
-    def add_sort_unit(self, file_paths: List[str], sort_config_id: str) -> Tuple[Optional[Any], Optional[Dict[str, Any]]]:
-        """DX Suite 標準APIで仕分けユニットを追加（作成）する"""
+    def add_sort_unit(self, file_paths: List[str], sort_config_id: str,
+                      progress_callback: Optional[ProgressCallback] = None) -> Tuple[Optional[Any], Optional[Dict[str, Any]]]:
+        """DX Suite 標準APIで仕分けユニットを追加（作成）する
+
+        ファイルは1つずつ開いてストリーミング送信するため、ファイル数が多くてもメモリ使用量は一定。
+        1リクエストで送る量を抑えたい場合は、呼び出し側で file_paths を分けて複数回呼び出すこと (SortWorker 参照)。
+        """
         log_ctx_prefix = "API_DX_SORTER_ADD"
         profile_name = self.active_api_profile_schema.get('name', 'N/A') if self.active_api_profile_schema else "UnknownProfile"
         self.log_manager.info(f"'{profile_name}' API呼び出し開始 (Add Sort Unit)", context=log_ctx_prefix)
@@ -389,22 +411,18 @@ class OCRApiClientStandard:
         headers = self._get_request_headers()
         data_payload = { "sortConfigId": sort_config_id, "runSorting": "true" }
         
-        files_payload = []
-        opened_files = []
+        encoder = None
         try:
-            for path in file_paths:
-                f_obj = open(path, 'rb')
-                opened_files.append(f_obj)
-                files_payload.append(('files', (os.path.basename(path), f_obj, 'application/octet-stream')))
-            
-            response = requests.post(url, headers=headers, data=data_payload, files=files_payload, timeout=self.timeout_seconds)
+            encoder = StreamingMultipartEncoder(list(data_payload.items()), [('files', os.path.basename(path), path, 'application/octet-stream') for path in file_paths],
+                                                progress_callback=progress_callback)
+            self.log_manager.debug(f"  POST to {url}: {len(file_paths)} files, {encoder.total_bytes / (1024 * 1024):.1f}MB", context=log_ctx_prefix)
+            response = self.retry_policy.send(lambda: self.http_session.post(url, headers=build_headers(headers, encoder), data=encoder, timeout=self.timeout_seconds), REQUEST_KIND_WRITE, log_ctx_prefix, rewind=encoder.rewind)
             response.raise_for_status()
             return response.json(), None
         except Exception as e:
             return None, {"message": f"仕分けユニット追加APIでエラー: {e}", "code": "SORTER_ADD_FAIL", "detail": str(e)}
         finally:
-            for f_obj in opened_files:
-                if f_obj: f_obj.close()
+            if encoder: encoder.close()
 
     def get_sort_unit_status(self, sort_unit_id: str) -> Tuple[Optional[Any], Optional[Dict[str, Any]]]:
         """DX Suite 標準APIで仕分けユニットの状態を取得する"""
@@ -453,7 +471,7 @@ class OCRApiClientStandard:
         data_payload = {"sortUnitId": sort_unit_id}
         
         try:
-            response = requests.post(url, headers=headers, data=data_payload, timeout=self.timeout_seconds)
+            response = self.retry_policy.send(lambda: self.http_session.post(url, headers=headers, data=data_payload, timeout=self.timeout_seconds), REQUEST_KIND_READ, log_ctx_prefix)
             response.raise_for_status()
             return response.json(), None
         except Exception as e:
@@ -481,7 +499,7 @@ class OCRApiClientStandard:
         data_payload = {"sortUnitId": sort_unit_id}
         
         try:
-            response = requests.post(url, headers=headers, data=data_payload, timeout=self.timeout_seconds)
+            response = self.retry_policy.send(lambda: self.http_session.post(url, headers=headers, data=data_payload, timeout=self.timeout_seconds), REQUEST_KIND_WRITE, log_ctx_prefix)
             response.raise_for_status()
             return response.json(), None
         except Exception as e:
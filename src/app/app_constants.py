@@ -33,4 +33,10 @@ OCR_STATUS_MERGING = "結合中"
 
 
 # --- UI更新関連の定数 ---
-LISTVIEW_UPDATE_INTERVAL_MS = 300
\ No newline at end of file
+LISTVIEW_UPDATE_INTERVAL_MS = 300
+# ログ表示欄へまとめて配送する間隔 (表示の更新は最大でも毎秒10回)
+UI_LOG_DELIVERY_INTERVAL_MS = 100
+# 配送待ちにできるログの行数。表示が追いつかない場合は古い行から捨てる (ログファイルには全て記録される)
+UI_LOG_MAX_PENDING_LINES = 2000
+# ログ表示欄に保持する行数。超えた分は先頭から削除する
+UI_LOG_MAX_DISPLAY_LINES = 5000
@@ -0,0 +1,452 @@
+# cli_runner.py
+
+import os
+import sys
+import json
+import time
+import signal
+import copy
+import queue
+import threading
+from collections import deque
+from typing import Optional, Dict, Any, List, Tuple
+
+from log_manager import LogManager
+from config_manager import ConfigManager
+from file_scanner import FileScanner
+from folder_watcher import FolderWatcher
+from job_journal import JobJournal
+from csv_exporter import export_atypical_to_csv
+from app_constants import OCR_STATUS_SKIPPED_SIZE_LIMIT, OCR_STATUS_NOT_PROCESSED
+
+# 終了コード
+EXIT_OK = 0
+EXIT_FAILED = 1          # 失敗したファイルがある、または致命的なエラーで停止した
+EXIT_USAGE_ERROR = 2     # 引数・設定の誤り (処理は開始していない)
+EXIT_INTERRUPTED = 130   # SIGINT / SIGTERM で中止した
+
+# --watch: 待ち行列を待つ間隔 (停止要求の確認のため)
+WATCH_QUEUE_WAIT_SLICE_SECONDS = 0.5
+# --watch: 1ファイルあたりの処理秒数の推定 (指数移動平均) で、直近の実行の結果を反映する割合
+WATCH_SECONDS_PER_FILE_SMOOTHING = 0.3
+# 処理エンジンの終了を待つ間隔 (停止要求の確認のため)
+ENGINE_JOIN_SLICE_SECONDS = 0.5
+
+# 処理の失敗として扱わないサーチャブルPDFの状態コード
+PDF_STATUS_CODES_NOT_FAILED = ("NOT_APPLICABLE", "PDF_NOT_REQUESTED", "PARTS_COPIED_SUCCESS")
+# ワーカーを停止させる致命的なエラーコード (OcrOrchestrator と同じ判定)
+FATAL_ERROR_CODES = ("NOT_IMPLEMENTED_API_CALL", "NOT_IMPLEMENTED_LIVE_API", "API_KEY_MISSING_LIVE", "DXSUITE_BASE_URI_NOT_CONFIGURED",
+                     "NOT_IMPLEMENTED_API_CALL_PDF", "NOT_IMPLEMENTED_LIVE_API_PDF")
+
+
+def resolve_component_classes(profile_id: Optional[str]) -> Tuple[Optional[type], Optional[type]]:
+    """プロファイルIDに対応する (ApiClientクラス, OcrEngineクラス) を返す。未対応の場合は (None, None)。"""
+    if profile_id == 'dx_atypical_v2':
+        from api_client_atypical import OCRApiClientAtypical
+        from ocr_engine_atypical import OcrEngineAtypical
+        return OCRApiClientAtypical, OcrEngineAtypical
+    if profile_id == 'dx_fulltext_v2':
+        from api_client_fulltext import OCRApiClientFulltext
+        from ocr_engine_fulltext import OcrEngineFulltext
+        return OCRApiClientFulltext, OcrEngineFulltext
+    if profile_id == 'dx_standard_v2':
+        from api_client_standard import OCRApiClientStandard
+        from ocr_engine_standard import OcrEngineStandard
+        return OCRApiClientStandard, OcrEngineStandard
+    return None, None
+
+
+class HeadlessOcrRunner:
+    """GUIを起動せずに、スキャン → OCRワーカー → (dx_atypical_v2 は) CSV集約 を実行する。
+
+    スケジューラーなどから無人で実行するためのもので、進捗は1行1イベントのJSON (JSON Lines) で標準出力へ書き出す。
+    Qt に依存しない処理エンジン (ocr_engine_*) を使うため、PyQt6 を読み込まない。
+    エンジンは専用のスレッドで実行し、エンジンのシグナルはエンジン内のファイル/部品の処理スレッドから並行して呼び出されるため、
+    イベントの書き出しと結果の集計はロックで直列化する。呼び出し元 (メイン) のスレッドはエンジンの終了を待ちながら、
+    SIGINT / SIGTERM による停止要求をイベントとして書き出す (シグナルハンドラーでは停止要求の記録とエンジンの停止のみ行う)。
+    標準出力をJSON Lines 専用とするため、実行中の print() などの出力は標準エラーへ回す。
+    """
+    def __init__(self, args, log_manager: LogManager, out_stream=None):
+        self.args = args
+        self.log_manager = log_manager
+        self.out_stream = out_stream or sys.stdout
+        self.engine = None
+        self.interrupted = False
+        self.stop_signal: Optional[int] = None
+        self._stop_reported = False
+        self.fatal_error_info: Optional[Dict[str, Any]] = None
+        self.file_results: Dict[str, Dict[str, Any]] = {}
+        # --watch: ファイルを検出した時刻 (time.time()) と、検出から処理完了までの秒数
+        self.arrival_times: Dict[str, float] = {}
+        self.latencies: List[float] = []
+        # --watch: 1回の実行にかかった秒数を処理したファイル数で割った値 (同時処理数を含めた実効値) の推定
+        self.watch_seconds_per_file: Optional[float] = None
+        self._emit_lock = threading.Lock()
+        # file_results / arrival_times / latencies / fatal_error_info の更新用
+        self._results_lock = threading.Lock()
+
+    def _emit(self, event: str, **fields):
+        line = json.dumps({"event": event, "ts": round(time.time(), 3), **fields}, ensure_ascii=False, default=str) + "\n"
+        with self._emit_lock:
+            self.out_stream.write(line)
+            self.out_stream.flush()
+
+    def _usage_error(self, message: str, code: str) -> int:
+        self.log_manager.error(message, context="CLI", error_code=code, emit_to_ui=False)
+        self._emit("error", message=message, code=code)
+        return EXIT_USAGE_ERROR
+
+    def _load_config(self) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], Optional[int]]:
+        # 設定ファイルは保存しない。引数による上書きはこの実行のみに適用する
+        config = copy.deepcopy(ConfigManager.load())
+        profile = ConfigManager.get_api_profile(config, self.args.profile)
+        if profile is None:
+            available = ", ".join(p.get("id") for p in config.get("api_profiles", []) if p.get("id"))
+            return None, None, self._usage_error(f"不明なAPIプロファイルIDです: {self.args.profile} (指定可能なID: {available})", "CLI_UNKNOWN_PROFILE")
+        config["current_api_profile_id"] = profile["id"]
+        if self.args.mode:
+            config["api_execution_mode"] = self.args.mode
+        options_values = config.setdefault("options_values_by_profile", {}).setdefault(profile["id"], {})
+        if self.args.concurrency is not None:
+            schema = profile.get("options_schema", {}).get("max_concurrent_files", {})
+            concurrency = max(schema.get("min", 1), min(schema.get("max", self.args.concurrency), self.args.concurrency))
+            if concurrency != self.args.concurrency:
+                self.log_manager.warning(f"同時処理ファイル数 {self.args.concurrency} は範囲外のため {concurrency} で実行します。", context="CLI", emit_to_ui=False)
+            options_values["max_concurrent_files"] = concurrency
+        if config.get("api_execution_mode") == "live" and not (ConfigManager.get_active_api_key(config) or "").strip():
+            return None, None, self._usage_error(f"LiveモードでOCRを実行するには、プロファイル「{profile.get('name', profile['id'])}」のAPIキーを設定してください。", "API_KEY_MISSING_LIVE")
+        return config, profile, None
+
+    def run(self) -> int:
+        input_folder = os.path.abspath(self.args.input)
+        if not os.path.isdir(input_folder):
+            return self._usage_error(f"入力フォルダが存在しません: {input_folder}", "CLI_INPUT_NOT_FOUND")
+        config, profile, exit_code = self._load_config()
+        if config is None:
+            return exit_code
+        api_client_class, engine_class = resolve_component_classes(profile["id"])
+        if engine_class is None:
+            return self._usage_error(f"プロファイル '{profile['id']}' はヘッドレス実行に対応していません。", "CLI_UNSUPPORTED_PROFILE")
+        if getattr(self.args, "watch", False):
+            return self._run_watch(input_folder, config, profile, api_client_class, engine_class)
+
+        scanner = FileScanner(self.log_manager, config)
+        file_paths, _, depth_limited_folders = scanner.scan_folder(input_folder)
+        files_info = scanner.create_initial_file_list(file_paths, OCR_STATUS_SKIPPED_SIZE_LIMIT, OCR_STATUS_NOT_PROCESSED)
+        scanner.save_folder_index()
+        for folder in depth_limited_folders:
+            self._emit("scan_warning", message="フォルダ階層の上限を超えたため、配下をスキャンしませんでした。", path=folder)
+        self._emit_skipped_files(files_info)
+
+        resume_jobs, resumed_from_run_id, completed_paths = None, None, set()
+        if self.args.resume:
+            interrupted_run = JobJournal.find_interrupted_run(profile["id"], config.get("api_execution_mode"), input_folder)
+            if interrupted_run:
+                resume_jobs, resumed_from_run_id = interrupted_run["jobs"], interrupted_run["run_id"]
+                completed_paths = set(interrupted_run["completed"])
+                self._emit("resume", run_id=resumed_from_run_id, completed=len(completed_paths), registered_jobs=len(resume_jobs))
+
+        files_to_process_tuples = [(item.path, idx) for idx, item in enumerate(files_info)
+                                   if item.ocr_engine_status != OCR_STATUS_SKIPPED_SIZE_LIMIT and item.path not in completed_paths]
+        self._emit("run_started", profile_id=profile["id"], api_execution_mode=config.get("api_execution_mode"), input=input_folder,
+                   files=len(files_to_process_tuples), skipped=len(files_info) - len(files_to_process_tuples),
+                   concurrency=config["options_values_by_profile"][profile["id"]].get("max_concurrent_files", 1))
+        if not files_to_process_tuples:
+            if resumed_from_run_id:
+                # 残りのファイルがない中断記録は、再び再開の対象にならないよう終了を記録する
+                JobJournal.begin_run(profile["id"], config.get("api_execution_mode"), input_folder, [], resumed_from=resumed_from_run_id)
+                JobJournal.end_run(interrupted=False)
+            self._emit("run_finished", succeeded=0, failed=0, interrupted=False, exit_code=EXIT_OK)
+            return EXIT_OK
+
+        previous_handlers = self._install_signal_handlers()
+        try:
+            self._process_files(input_folder, config, profile, api_client_class, engine_class, files_to_process_tuples,
+                                resume_jobs=resume_jobs, resumed_from_run_id=resumed_from_run_id)
+        finally:
+            self._restore_signal_handlers(previous_handlers)
+        self._report_stop_request()
+
+        if profile["id"] == "dx_atypical_v2" and not self.interrupted:
+            self._export_atypical_csv(config, files_info, input_folder)
+
+        with self._results_lock:
+            failed = sum(1 for result in self.file_results.values() if not result["success"])
+            succeeded = len(self.file_results) - failed
+            not_processed = len(files_to_process_tuples) - len(self.file_results)
+        if self.interrupted:
+            exit_code = EXIT_INTERRUPTED
+        elif failed or not_processed or self.fatal_error_info:
+            exit_code = EXIT_FAILED
+        else:
+            exit_code = EXIT_OK
+        self.log_manager.flush()
+        self._emit("run_finished", succeeded=succeeded, failed=failed, not_processed=not_processed, interrupted=self.interrupted,
+                   fatal_error=self.fatal_error_info, exit_code=exit_code, log_stats=self.log_manager.get_stats())
+        return exit_code
+
+    def _emit_skipped_files(self, files_info: List):
+        for item in files_info:
+            if item.ocr_engine_status == OCR_STATUS_SKIPPED_SIZE_LIMIT:
+                self._emit("file_skipped", path=item.path, reason=item.status)
+
+    def _process_files(self, input_folder: str, config: Dict[str, Any], profile: Dict[str, Any], api_client_class: type, engine_class: type,
+                       files_to_process_tuples: List[Tuple[str, int]], resume_jobs: Optional[Dict[str, Any]] = None, resumed_from_run_id: Optional[str] = None):
+        """処理エンジンを作成し、呼び出し元のスレッドで files_to_process_tuples を処理する (処理が終わるまで戻らない)。"""
+        api_client = api_client_class(config=config, log_manager=self.log_manager, api_profile_schema=profile)
+        self.engine = engine_class(api_client=api_client, files_to_process_tuples=files_to_process_tuples, input_root_folder=input_folder,
+                                   log_manager=self.log_manager, config=config, api_profile=profile, resume_jobs=resume_jobs)
+        self.engine.original_file_status_update.connect(self._on_status_update)
+        self.engine.file_processed.connect(self._on_file_processed)
+        self.engine.searchable_pdf_processed.connect(self._on_searchable_pdf_processed)
+        self.engine.auto_csv_processed.connect(self._on_auto_csv_processed)
+        self.engine.run_stats_reported.connect(lambda stats: self._emit("run_stats", stats=stats))
+
+        if not JobJournal.begin_run(profile["id"], config.get("api_execution_mode"), input_folder,
+                                    [path for path, _ in files_to_process_tuples], resumed_from=resumed_from_run_id):
+            self.log_manager.warning(f"ジョブジャーナルに記録できないため、異常終了時の再開はできません: {JobJournal.get_disabled_reason()}", context="CLI_JOURNAL", emit_to_ui=False)
+        try:
+            if not self.interrupted:
+                self._run_engine(self.engine)
+        finally:
+            JobJournal.end_run(interrupted=self.interrupted or bool(self.fatal_error_info))
+            self.engine = None
+
+    def _run_engine(self, engine):
+        """エンジンを専用のスレッドで実行し、終了まで停止要求を確認しながら待つ。エンジンで発生した例外はこのスレッドで送出し直す。"""
+        engine_errors: List[BaseException] = []
+
+        def run_engine():
+            try:
+                engine.run()
+            except BaseException as e:
+                engine_errors.append(e)
+
+        engine_thread = threading.Thread(target=run_engine, name="HeadlessOcrEngine", daemon=True)
+        engine_thread.start()
+        while engine_thread.is_alive():
+            engine_thread.join(ENGINE_JOIN_SLICE_SECONDS)
+            self._report_stop_request()
+        if engine_errors:
+            raise engine_errors[0]
+
+    def _run_watch(self, input_folder: str, config: Dict[str, Any], profile: Dict[str, Any], api_client_class: type, engine_class: type) -> int:
+        """--watch: 入力フォルダを監視し、書き込みが終わったファイルを順に処理し続ける (SIGINT / SIGTERM まで)。
+
+        監視スレッド (FolderWatcher) が見つけたファイルは待ち行列に入り、このスレッドが待ち行列にあるファイルを
+        まとめて1回の処理エンジンの実行で処理する。処理中に届いたファイルは次の実行で処理する。
+        届いたファイルの待ち時間は「実行中の1回分 + 自分の1回分」になるため、1回で処理するファイル数は
+        それが検出から処理完了までの目標秒数に収まるよう、直近の実行の1ファイルあたりの秒数から決める (_watch_batch_limit)。
+        開始時に既にあったファイルは後回しの待ち行列に入れ、新しく届いたファイルを先に処理した残りの枠で処理する。
+        """
+        watch_queue: "queue.Queue[Tuple[str, float]]" = queue.Queue()
+        backlog: "deque[Tuple[str, float]]" = deque()
+        watcher = FolderWatcher(input_folder, self.log_manager, config, on_file_ready=lambda path, first_seen: watch_queue.put((path, first_seen)),
+                                poll_interval_seconds=self.args.watch_interval, settle_seconds=self.args.watch_settle)
+        max_files_per_batch, _, _ = FileScanner(self.log_manager, config).get_scan_limits()
+        max_files_per_batch = max(1, int(max_files_per_batch))
+        concurrency = max(1, int(config["options_values_by_profile"][profile["id"]].get("max_concurrent_files", 1)))
+
+        previous_handlers = self._install_signal_handlers()
+        try:
+            started_at = time.time()
+            for path in watcher.start():
+                backlog.append((path, started_at))
+            self._emit("watch_started", profile_id=profile["id"], api_execution_mode=config.get("api_execution_mode"), input=input_folder,
+                       backend=watcher.backend, existing_files=len(backlog), latency_target_seconds=self.args.watch_latency_target,
+                       concurrency=concurrency)
+            batch_no = 0
+            while not self.interrupted and not self.fatal_error_info:
+                batch_limit = self._watch_batch_limit(max_files_per_batch, concurrency)
+                batch = self._take_watch_batch(watch_queue, backlog, batch_limit)
+                if not batch: continue
+                batch_no += 1
+                batch_started = time.monotonic()
+                self._process_watch_batch(batch_no, batch, input_folder, config, profile, api_client_class, engine_class,
+                                          max_files=batch_limit, pending_files=watch_queue.qsize() + len(backlog))
+                self._record_watch_batch_duration(time.monotonic() - batch_started, len(batch))
+            self._report_stop_request()
+        finally:
+            watcher.stop()
+            self._restore_signal_handlers(previous_handlers)
+
+        with self._results_lock:
+            failed = sum(1 for result in self.file_results.values() if not result["success"])
+            succeeded = len(self.file_results) - failed
+        exit_code = EXIT_FAILED if self.fatal_error_info else EXIT_INTERRUPTED if self.interrupted else EXIT_OK
+        self.log_manager.flush()
+        self._emit("watch_finished", succeeded=succeeded, failed=failed, not_processed=watch_queue.qsize() + len(backlog),
+                   interrupted=self.interrupted, fatal_error=self.fatal_error_info, exit_code=exit_code,
+                   latency=self._latency_summary(), watcher=watcher.get_stats(), log_stats=self.log_manager.get_stats())
+        return exit_code
+
+    def _watch_batch_limit(self, max_files_per_batch: int, concurrency: int) -> int:
+        """--watch で1回の処理エンジンの実行で処理するファイル数の上限。
+
+        1回の実行にかかる秒数が目標秒数の半分に収まる数とする (同時処理数を下限、最大ファイル数の設定を上限とする)。
+        処理時間の推定がまだ無い最初の実行は、同時処理数の分だけ処理して推定を得る。
+        """
+        target = self.args.watch_latency_target
+        if not target or target <= 0:
+            return max_files_per_batch
+        if self.watch_seconds_per_file is None:
+            return min(max_files_per_batch, concurrency)
+        return max(1, min(max_files_per_batch, max(concurrency, int(target / 2 / max(self.watch_seconds_per_file, 0.001)))))
+
+    def _take_watch_batch(self, watch_queue: "queue.Queue[Tuple[str, float]]", backlog: "deque[Tuple[str, float]]",
+                          batch_limit: int) -> List[Tuple[str, float]]:
+        """新しく届いたファイルを優先して、batch_limit 件までの1回分のファイルを取り出す。何も無ければ少し待って空のリストを返す。"""
+        batch: List[Tuple[str, float]] = []
+        if not backlog:
+            try:
+                batch.append(watch_queue.get(timeout=WATCH_QUEUE_WAIT_SLICE_SECONDS))
+            except queue.Empty:
+                return batch
+        while len(batch) < batch_limit:
+            try: batch.append(watch_queue.get_nowait())
+            except queue.Empty: break
+        while len(batch) < batch_limit and backlog:
+            batch.append(backlog.popleft())
+        return batch
+
+    def _record_watch_batch_duration(self, elapsed_seconds: float, files: int):
+        if files <= 0: return
+        seconds_per_file = elapsed_seconds / files
+        if self.watch_seconds_per_file is None:
+            self.watch_seconds_per_file = seconds_per_file
+        else:
+            self.watch_seconds_per_file += WATCH_SECONDS_PER_FILE_SMOOTHING * (seconds_per_file - self.watch_seconds_per_file)
+
+    def _process_watch_batch(self, batch_no: int, batch: List[Tuple[str, float]], input_folder: str, config: Dict[str, Any],
+                             profile: Dict[str, Any], api_client_class: type, engine_class: type,
+                             max_files: Optional[int] = None, pending_files: int = 0):
+        with self._results_lock:
+            for path, first_seen in batch:
+                self.arrival_times[path] = first_seen
+                self.file_results.pop(path, None)  # 同じパスに置き直されたファイルは新しいファイルとして数え直す
+        # 前回のスキャン結果を持たない FileScanner で、ファイルのサイズ・ページ数をその時点の内容で取得する
+        files_info = FileScanner(self.log_manager, config).create_initial_file_list([path for path, _ in batch], OCR_STATUS_SKIPPED_SIZE_LIMIT, OCR_STATUS_NOT_PROCESSED)
+        self._emit_skipped_files(files_info)
+        files_to_process_tuples = [(item.path, idx) for idx, item in enumerate(files_info) if item.ocr_engine_status != OCR_STATUS_SKIPPED_SIZE_LIMIT]
+        self._emit("batch_started", batch=batch_no, files=len(files_to_process_tuples), skipped=len(files_info) - len(files_to_process_tuples),
+                   max_files=max_files, pending=pending_files)
+        if files_to_process_tuples:
+            self._process_files(input_folder, config, profile, api_client_class, engine_class, files_to_process_tuples)
+        if profile["id"] == "dx_atypical_v2" and not self.interrupted:
+            # 実行ごとに別のCSVへ出力する (前の実行のCSVを上書きしない)
+            self._export_atypical_csv(config, files_info, input_folder, csv_name_suffix=time.strftime("_%Y%m%d_%H%M%S"))
+        self._emit("batch_finished", batch=batch_no, files=len(files_to_process_tuples), latency=self._latency_summary())
+
+    def _latency_summary(self) -> Dict[str, Any]:
+        """ファイルの検出から処理完了 (file_processed) までの秒数の集計。"""
+        with self._results_lock:
+            ordered = sorted(self.latencies)
+        if not ordered:
+            return {"files": 0}
+        return {"files": len(ordered), "p50_seconds": round(ordered[len(ordered) // 2], 3),
+                "p95_seconds": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3), "max_seconds": round(ordered[-1], 3),
+                "over_target": sum(1 for latency in ordered if self.args.watch_latency_target and latency > self.args.watch_latency_target)}
+
+    def _install_signal_handlers(self) -> Dict[int, Any]:
+        previous = {}
+        for signum in (signal.SIGINT, getattr(signal, "SIGTERM", None)):
+            if signum is None: continue
+            try:
+                previous[signum] = signal.signal(signum, self._on_stop_signal)
+            except (ValueError, OSError):
+                pass
+        return previous
+
+    def _restore_signal_handlers(self, previous: Dict[int, Any]):
+        for signum, handler in previous.items():
+            try: signal.signal(signum, handler)
+            except (ValueError, OSError): pass
+
+    def _on_stop_signal(self, signum, frame):
+        # シグナルハンドラーではロックを取る処理 (ログ・イベントの書き出し) を行わない。停止の通知はメインの待機ループで書き出す
+        if self.interrupted: return
+        self.stop_signal = signum
+        self.interrupted = True
+        engine = self.engine
+        if engine is not None:
+            engine.stop()
+
+    def _report_stop_request(self):
+        """停止要求を受けていれば、1回だけログに記録して stopping イベントを書き出す (メインスレッドから呼ぶ)。"""
+        if not self.interrupted or self._stop_reported: return
+        self._stop_reported = True
+        self.log_manager.warning(f"シグナル {self.stop_signal} を受信したため、処理を中止します。", context="CLI", emit_to_ui=False)
+        self._emit("stopping", signal=self.stop_signal)
+
+    def _mark_failed(self, path: str, error: Any = None):
+        """ファイルを失敗として記録する。致命的なエラーであれば処理全体の停止理由として記録する。"""
+        with self._results_lock:
+            self.file_results.setdefault(path, {"success": True})["success"] = False
+            if isinstance(error, dict) and error.get("code") in FATAL_ERROR_CODES:
+                self.fatal_error_info = error
+
+    def _on_status_update(self, path: str, status_message: str):
+        self._emit("file_status", path=path, status=status_message)
+
+    def _on_file_processed(self, original_idx: int, path: str, ocr_result: Any, ocr_error: Any, json_status: Any, job_id: Any):
+        if ocr_error:
+            self._mark_failed(path, ocr_error)
+        latency_fields = {}
+        with self._results_lock:
+            self.file_results.setdefault(path, {"success": True})
+            arrived_at = self.arrival_times.pop(path, None)
+            latency = time.time() - arrived_at if arrived_at is not None else None
+            if latency is not None:
+                self.latencies.append(latency)
+        if latency is not None:
+            latency_fields["latency_seconds"] = round(latency, 3)
+            target = self.args.watch_latency_target
+            if target and latency > target:
+                self.log_manager.warning(f"ファイル '{os.path.basename(path)}' の検出から処理完了までに {latency:.1f}秒かかりました (目標 {target:.0f}秒)。",
+                                         context="CLI_WATCH_LATENCY", emit_to_ui=False, latency_seconds=latency)
+        self._emit("file_processed", index=original_idx, path=path, success=not ocr_error, error=ocr_error, json_status=json_status, job_id=job_id, **latency_fields)
+
+    def _on_searchable_pdf_processed(self, original_idx: int, path: str, pdf_path: Any, pdf_error: Any):
+        if not isinstance(pdf_error, dict) or pdf_error.get("code") in PDF_STATUS_CODES_NOT_FAILED:
+            if pdf_path:
+                self._emit("searchable_pdf", index=original_idx, path=path, pdf_path=pdf_path)
+            return
+        self._mark_failed(path, pdf_error)
+        self._emit("searchable_pdf", index=original_idx, path=path, pdf_path=pdf_path, error=pdf_error)
+
+    def _on_auto_csv_processed(self, original_idx: int, path: str, status_info: Any):
+        message = status_info.get("message") if isinstance(status_info, dict) else str(status_info)
+        if message and (message.startswith("CSV失敗") or message == "エラー"):
+            self._mark_failed(path)
+        self._emit("auto_csv", index=original_idx, path=path, status=message)
+
+    def _export_atypical_csv(self, config: Dict[str, Any], files_info: List, input_folder: str, csv_name_suffix: str = ""):
+        successful_files = [item for item in files_info if self.file_results.get(item.path, {}).get("success")]
+        model_id = (ConfigManager.get_active_api_options_values(config) or {}).get("model")
+        if not successful_files or not model_id: return
+        results_folder_name = config.get("file_actions", {}).get("results_folder_name", "OCR結果")
+        output_dir = os.path.join(input_folder, results_folder_name)
+        os.makedirs(output_dir, exist_ok=True)
+        output_csv_path = os.path.join(output_dir, f"{os.path.basename(os.path.normpath(input_folder))}{csv_name_suffix}.csv")
+        export_atypical_to_csv(successful_files, output_csv_path, self.log_manager, model_id)
+        self._emit("csv_exported", path=output_csv_path, files=len(successful_files))
+
+
+def run_headless(args, log_manager: LogManager) -> int:
+    """--no-gui 指定時のエントリポイント。終了コードを返す。"""
+    json_out = sys.stdout
+    # JSON Lines 以外の出力 (ログ出力の警告など) が標準出力に混ざらないよう、実行中は標準エラーへ回す
+    sys.stdout = sys.stderr
+    try:
+        runner = HeadlessOcrRunner(args, log_manager, out_stream=json_out)
+        if not args.input or not args.profile:
+            return runner._usage_error("--no-gui では --input と --profile の指定が必要です。", "CLI_MISSING_ARGUMENT")
+        try:
+            return runner.run()
+        except Exception as e:
+            log_manager.error(f"ヘッドレス実行中に予期せぬエラーが発生しました: {e}", context="CLI", error_code="CLI_UNEXPECTED_ERROR", exception_info=e, emit_to_ui=False)
+            runner._emit("error", message=str(e), code="CLI_UNEXPECTED_ERROR")
+            return EXIT_FAILED
+    finally:
+        log_manager.flush()
+        sys.stdout = json_out
@@ -65,7 +65,18 @@ DEFAULT_API_PROFILES: List[Dict[str, Any]] = [
             "merge_split_pdf_parts": {"type": "bool", "default": True, "label": "分割した場合、サーチャブルPDF部品を1つのファイルに結合する (DX Suite)", "tooltip": "「大きなファイルを自動分割する」が有効な場合のみ適用されます。"},
             "polling_interval_seconds": {"type": "int", "default": 3, "min": 1, "max": 60, "label": "ポーリング間隔 (秒, DX Suite):", "tooltip": "非同期APIの結果を取得する際の問い合わせ間隔（秒）です。", "suffix": " 秒"},
             "polling_max_attempts": {"type": "int", "default": 60, "min": 5, "max": 300, "label": "最大ポーリング試行回数 (DX Suite):", "tooltip": "非同期APIの結果取得を試みる最大回数です。", "suffix": " 回"},
-            "delete_job_after_processing": {"type": "bool", "default": 1, "label": "処理後、サーバーからOCRジョブ情報を削除する (DX Suite)", "tooltip": "有効な場合、各ファイルのOCR処理完了後 (成功/失敗問わず)、関連するジョブ情報をDX Suiteサーバーから削除します。"}
+            "max_concurrent_files": {"type": "int", "default": 1, "min": 1, "max": 32, "label": "同時処理ファイル数 (DX Suite):", "tooltip": "同時にアップロード・ポーリングを行うファイル数です。\n1の場合は従来通り1ファイルずつ順番に処理します。", "suffix": " 件"},
+            "max_concurrent_parts": {"type": "int", "default": 4, "min": 1, "max": 16, "label": "分割部品の同時処理数 (DX Suite):", "tooltip": "大きなファイルを分割した場合に、1ファイルの部品を同時に登録・結果待ちする数です。\n結果は部品の順序通りに出力・結合されます。1 にすると部品を1つずつ順に処理します。"},
+            "rate_limit_requests_per_minute": {"type": "int", "default": 300, "min": 0, "max": 6000, "suffix": " 回/分", "label": "APIリクエスト数の上限 (毎分) (DX Suite):", "tooltip": "同じ組織 (ベースURI) へのAPIリクエスト数の上限です。全ワーカー・仕分け処理で共有されます。\nサーバーから 429/503 (リクエスト過多) が返された場合は、自動的に送信ペースを落とし、成功が続くと設定値まで戻します。\n0 にすると制限しません。"},
+            "max_concurrent_jobs": {"type": "int", "default": 32, "min": 0, "max": 1000, "suffix": " 件", "label": "同時に処理中にできるジョブ数 (DX Suite):", "tooltip": "登録してから結果を取得するまでのジョブ (読取ユニット) の同時数の上限です。全ワーカー・仕分け処理で共有されます。\n上限に達した場合は、処理中のジョブが完了するまで次の登録を待ちます。0 にすると制限しません。"},
+            "retry_max_attempts": {"type": "int", "default": 3, "min": 0, "max": 10, "suffix": " 回", "label": "一時的なエラー時の再試行回数 (DX Suite):", "tooltip": "通信エラー・タイムアウト・サーバーエラー (5xx)・リクエスト過多 (429) のとき、待機時間を少しずつ延ばしながら自動で再試行する回数です。\n状態確認・結果取得は常に再試行し、登録・削除はサーバーに届いていないことが確実な接続エラーのみ再試行します (二重登録を防ぐため)。\n0 にすると再試行しません。"},
+            "retry_budget_per_run": {"type": "int", "default": 100, "min": 0, "max": 10000, "suffix": " 回", "label": "1回の実行で再試行できる合計回数 (DX Suite):", "tooltip": "障害時に再試行が積み重なってサーバーの負荷を増やさないよう、1回の実行 (開始から終了まで) での再試行の合計回数を制限します。\n使い切った後のエラーは再試行せずに失敗とします。"},
+            "submission_mode": {"type": "enum", "default": "per_file", "values": [{"display": "ファイルごと (登録→完了待ちを順に実行)", "value": "per_file"}, {"display": "一括 (全件を登録後、まとめてポーリング)", "value": "batch"}], "label": "ジョブ投入方式 (DX Suite):", "tooltip": "「一括」では全ファイルを先に登録し、未完了のジョブをまとめてポーリングします。\n大量ファイルの総処理時間を短縮できます。(一括時は「同時処理ファイル数」は使用されません)"},
+            "adaptive_polling_enabled": {"type": "bool", "default": 1, "label": "ポーリング間隔を自動調整する (適応ポーリング) (DX Suite)", "tooltip": "有効にすると、登録直後は短い間隔で確認し、経過時間や過去の所要時間に応じて間隔を広げます。\nタイムアウトは「ポーリング間隔 × 最大ポーリング試行回数」の合計時間で判定します。\n無効にすると従来通り固定間隔で確認します。"},
+            "prefetch_lookahead_files": {"type": "int", "default": 2, "min": 0, "max": 8, "label": "先読み準備するファイル数 (DX Suite):", "tooltip": "処理中のファイルのアップロード・結果待ちと並行して、後続ファイルのPDF分割・一時コピーを別プロセスで先に行います。\n一時フォルダの使用量を抑えるため、先に準備するファイル数はこの値までに制限されます。\n0 にすると先読みせず、各ファイルの処理直前に準備します。"},
+            "delete_job_after_processing": {"type": "bool", "default": 1, "label": "処理後、サーバーからOCRジョブ情報を削除する (DX Suite)", "tooltip": "有効な場合、各ファイルのOCR処理完了後 (成功/失敗問わず)、関連するジョブ情報をDX Suiteサーバーから削除します。"},
+            "result_cache_enabled": {"type": "bool", "default": 1, "label": "同じ内容のファイルは前回の結果を再利用する (結果キャッシュ) (DX Suite)", "tooltip": "有効にすると、ファイル内容・プロファイル・読取オプションが前回と同じ場合はAPIを呼び出さず、保存済みの結果ファイル (JSON/サーチャブルPDF/CSV) を結果フォルダへ出力します。"},
+            "result_cache_max_mb": {"type": "int", "default": 2048, "min": 0, "max": 99999, "suffix": " MB", "label": "結果キャッシュの最大サイズ (DX Suite):", "tooltip": "保存済みの結果ファイルの合計サイズの上限です。超えた場合は最後に使われた時期が古いものから削除します。0 の場合は保存しません。"}
         }
     },
     {
@@ -124,7 +135,18 @@ DEFAULT_API_PROFILES: List[Dict[str, Any]] = [
             "merge_split_pdf_parts": {"type": "bool", "default": True, "label": "分割した場合、サーチャブルPDF部品を1つのファイルに結合する"},
             "polling_interval_seconds": {"type": "int", "default": 3, "min": 1, "max": 60, "label": "ポーリング間隔 (秒):", "suffix": " 秒"},
             "polling_max_attempts": {"type": "int", "default": 60, "min": 5, "max": 300, "label": "最大ポーリング試行回数:", "suffix": " 回"},
-            "delete_job_after_processing": {"type": "bool", "default": 1, "label": "処理後、サーバーからOCRジョブ情報を削除する (DX Suite)", "tooltip": "有効な場合、各ファイルのOCR処理完了後、関連するジョブ情報をDX Suiteサーバーから削除します。"}
+            "max_concurrent_files": {"type": "int", "default": 1, "min": 1, "max": 32, "label": "同時処理ファイル数:", "tooltip": "同時にアップロード・ポーリングを行うファイル数です。\n1の場合は従来通り1ファイルずつ順番に処理します。", "suffix": " 件"},
+            "max_concurrent_parts": {"type": "int", "default": 4, "min": 1, "max": 16, "label": "分割部品の同時処理数:", "tooltip": "大きなファイルを分割した場合に、1ファイルの部品を同時に登録・結果待ちする数です。\n結果は部品の順序通りに出力・結合されます。1 にすると部品を1つずつ順に処理します。"},
+            "rate_limit_requests_per_minute": {"type": "int", "default": 300, "min": 0, "max": 6000, "suffix": " 回/分", "label": "APIリクエスト数の上限 (毎分):", "tooltip": "同じ組織 (ベースURI) へのAPIリクエスト数の上限です。全ワーカー・仕分け処理で共有されます。\nサーバーから 429/503 (リクエスト過多) が返された場合は、自動的に送信ペースを落とし、成功が続くと設定値まで戻します。\n0 にすると制限しません。"},
+            "max_concurrent_jobs": {"type": "int", "default": 32, "min": 0, "max": 1000, "suffix": " 件", "label": "同時に処理中にできるジョブ数:", "tooltip": "登録してから結果を取得するまでのジョブ (読取ユニット) の同時数の上限です。全ワーカー・仕分け処理で共有されます。\n上限に達した場合は、処理中のジョブが完了するまで次の登録を待ちます。0 にすると制限しません。"},
+            "retry_max_attempts": {"type": "int", "default": 3, "min": 0, "max": 10, "suffix": " 回", "label": "一時的なエラー時の再試行回数:", "tooltip": "通信エラー・タイムアウト・サーバーエラー (5xx)・リクエスト過多 (429) のとき、待機時間を少しずつ延ばしながら自動で再試行する回数です。\n状態確認・結果取得は常に再試行し、登録・削除はサーバーに届いていないことが確実な接続エラーのみ再試行します (二重登録を防ぐため)。\n0 にすると再試行しません。"},
+            "retry_budget_per_run": {"type": "int", "default": 100, "min": 0, "max": 10000, "suffix": " 回", "label": "1回の実行で再試行できる合計回数:", "tooltip": "障害時に再試行が積み重なってサーバーの負荷を増やさないよう、1回の実行 (開始から終了まで) での再試行の合計回数を制限します。\n使い切った後のエラーは再試行せずに失敗とします。"},
+            "submission_mode": {"type": "enum", "default": "per_file", "values": [{"display": "ファイルごと (登録→完了待ちを順に実行)", "value": "per_file"}, {"display": "一括 (全件を登録後、まとめてポーリング)", "value": "batch"}], "label": "ジョブ投入方式:", "tooltip": "「一括」では全ファイルを先に登録し、未完了のジョブをまとめてポーリングします。\n大量ファイルの総処理時間を短縮できます。(一括時は「同時処理ファイル数」は使用されません)"},
+            "adaptive_polling_enabled": {"type": "bool", "default": 1, "label": "ポーリング間隔を自動調整する (適応ポーリング)", "tooltip": "有効にすると、登録直後は短い間隔で確認し、経過時間や過去の所要時間に応じて間隔を広げます。\nタイムアウトは「ポーリング間隔 × 最大ポーリング試行回数」の合計時間で判定します。\n無効にすると従来通り固定間隔で確認します。"},
+            "prefetch_lookahead_files": {"type": "int", "default": 2, "min": 0, "max": 8, "label": "先読み準備するファイル数:", "tooltip": "処理中のファイルのアップロード・結果待ちと並行して、後続ファイルのPDF分割・一時コピーを別プロセスで先に行います。\n一時フォルダの使用量を抑えるため、先に準備するファイル数はこの値までに制限されます。\n0 にすると先読みせず、各ファイルの処理直前に準備します。"},
+            "delete_job_after_processing": {"type": "bool", "default": 1, "label": "処理後、サーバーからOCRジョブ情報を削除する (DX Suite)", "tooltip": "有効な場合、各ファイルのOCR処理完了後、関連するジョブ情報をDX Suiteサーバーから削除します。"},
+            "result_cache_enabled": {"type": "bool", "default": 1, "label": "同じ内容のファイルは前回の結果を再利用する (結果キャッシュ)", "tooltip": "有効にすると、ファイル内容・プロファイル・読取オプションが前回と同じ場合はAPIを呼び出さず、保存済みの結果ファイル (JSON/サーチャブルPDF/CSV) を結果フォルダへ出力します。"},
+            "result_cache_max_mb": {"type": "int", "default": 2048, "min": 0, "max": 99999, "suffix": " MB", "label": "結果キャッシュの最大サイズ:", "tooltip": "保存済みの結果ファイルの合計サイズの上限です。超えた場合は最後に使われた時期が古いものから削除します。0 の場合は保存しません。"}
         }
     },
     {
@@ -154,6 +176,7 @@ DEFAULT_API_PROFILES: List[Dict[str, Any]] = [
                 "placeholder": "例: yyyyyyyy-yyyy-yyyy-yyyy-yyyyyyyyyyyy",
                 "tooltip": "仕分け処理で使用する仕分けルールのID (UUID) を指定します。\n（「仕分け」機能を利用する場合に必須）"
             },
+            "sort_upload_batch_max_mb": {"type": "int", "default": 500, "min": 10, "max": 9999, "suffix": " MB", "label": "仕分け1回あたりの最大送信サイズ:", "tooltip": "仕分け対象ファイルの合計サイズがこの値を超える場合、複数の仕分けユニットに分けて送信します。\n1リクエストあたりの送信量を抑え、途中で失敗した場合の再送量を小さくします。"},
             "unitName": {"type": "string", "default": "", "label": "読取ユニット名 (任意):", "placeholder": "例: 2025年6月分請求書", "tooltip": "DX Suite上で表示される読取ユニットの名前を指定します。"},
             "upload_max_size_mb": {"type": "int", "default": 1000, "min": 1, "max": 9999, "suffix": " MB", "label": "アップロード対象として認識する最大ファイルサイズ:", "tooltip":"OCR対象としてアップロードするファイルサイズの上限値。\nこれを超過するファイルは処理対象外となります。"},
             "split_large_files_enabled": {"type": "bool", "default": False, "label": "大きなファイルを自動分割する (PDFのみ)"},
@@ -163,7 +186,18 @@ DEFAULT_API_PROFILES: List[Dict[str, Any]] = [
             "merge_split_pdf_parts": {"type": "bool", "default": True, "label": "分割した場合、サーチャブルPDF部品を1つのファイルに結合する"},
             "polling_interval_seconds": {"type": "int", "default": 3, "min": 1, "max": 60, "label": "ポーリング間隔 (秒):", "suffix": " 秒"},
             "polling_max_attempts": {"type": "int", "default": 60, "min": 5, "max": 300, "label": "最大ポーリング試行回数:", "suffix": " 回"},
-            "delete_job_after_processing": {"type": "bool", "default": 1, "label": "処理後、サーバーから読取ユニットを削除する (DX Suite)", "tooltip": "有効な場合、各ファイルのOCR処理完了後、関連する読取ユニットをDX Suiteサーバーから削除します。"}
+            "max_concurrent_files": {"type": "int", "default": 1, "min": 1, "max": 32, "label": "同時処理ファイル数:", "tooltip": "同時にアップロード・ポーリングを行うファイル数です。\n1の場合は従来通り1ファイルずつ順番に処理します。", "suffix": " 件"},
+            "max_concurrent_parts": {"type": "int", "default": 4, "min": 1, "max": 16, "label": "分割部品の同時処理数:", "tooltip": "大きなファイルを分割した場合に、1ファイルの部品を同時に登録・結果待ちする数です。\n結果は部品の順序通りに出力・結合されます。1 にすると部品を1つずつ順に処理します。"},
+            "rate_limit_requests_per_minute": {"type": "int", "default": 300, "min": 0, "max": 6000, "suffix": " 回/分", "label": "APIリクエスト数の上限 (毎分):", "tooltip": "同じ組織 (ベースURI) へのAPIリクエスト数の上限です。全ワーカー・仕分け処理で共有されます。\nサーバーから 429/503 (リクエスト過多) が返された場合は、自動的に送信ペースを落とし、成功が続くと設定値まで戻します。\n0 にすると制限しません。"},
+            "max_concurrent_jobs": {"type": "int", "default": 32, "min": 0, "max": 1000, "suffix": " 件", "label": "同時に処理中にできるジョブ数:", "tooltip": "登録してから結果を取得するまでのジョブ (読取ユニット) の同時数の上限です。全ワーカー・仕分け処理で共有されます。\n上限に達した場合は、処理中のジョブが完了するまで次の登録を待ちます。0 にすると制限しません。"},
+            "retry_max_attempts": {"type": "int", "default": 3, "min": 0, "max": 10, "suffix": " 回", "label": "一時的なエラー時の再試行回数:", "tooltip": "通信エラー・タイムアウト・サーバーエラー (5xx)・リクエスト過多 (429) のとき、待機時間を少しずつ延ばしながら自動で再試行する回数です。\n状態確認・結果取得は常に再試行し、登録・削除はサーバーに届いていないことが確実な接続エラーのみ再試行します (二重登録を防ぐため)。\n0 にすると再試行しません。"},
+            "retry_budget_per_run": {"type": "int", "default": 100, "min": 0, "max": 10000, "suffix": " 回", "label": "1回の実行で再試行できる合計回数:", "tooltip": "障害時に再試行が積み重なってサーバーの負荷を増やさないよう、1回の実行 (開始から終了まで) での再試行の合計回数を制限します。\n使い切った後のエラーは再試行せずに失敗とします。"},
+            "submission_mode": {"type": "enum", "default": "per_file", "values": [{"display": "ファイルごと (登録→完了待ちを順に実行)", "value": "per_file"}, {"display": "一括 (全件を登録後、まとめてポーリング)", "value": "batch"}], "label": "ジョブ投入方式:", "tooltip": "「一括」では全ファイルを先に登録し、未完了のジョブをまとめてポーリングします。\n大量ファイルの総処理時間を短縮できます。(一括時は「同時処理ファイル数」は使用されません)"},
+            "adaptive_polling_enabled": {"type": "bool", "default": 1, "label": "ポーリング間隔を自動調整する (適応ポーリング)", "tooltip": "有効にすると、登録直後は短い間隔で確認し、経過時間や過去の所要時間に応じて間隔を広げます。\nタイムアウトは「ポーリング間隔 × 最大ポーリング試行回数」の合計時間で判定します。\n無効にすると従来通り固定間隔で確認します。"},
+            "prefetch_lookahead_files": {"type": "int", "default": 2, "min": 0, "max": 8, "label": "先読み準備するファイル数:", "tooltip": "処理中のファイルのアップロード・結果待ちと並行して、後続ファイルのPDF分割・一時コピーを別プロセスで先に行います。\n一時フォルダの使用量を抑えるため、先に準備するファイル数はこの値までに制限されます。\n0 にすると先読みせず、各ファイルの処理直前に準備します。"},
+            "delete_job_after_processing": {"type": "bool", "default": 1, "label": "処理後、サーバーから読取ユニットを削除する (DX Suite)", "tooltip": "有効な場合、各ファイルのOCR処理完了後、関連する読取ユニットをDX Suiteサーバーから削除します。"},
+            "result_cache_enabled": {"type": "bool", "default": 1, "label": "同じ内容のファイルは前回の結果を再利用する (結果キャッシュ)", "tooltip": "有効にすると、ファイル内容・プロファイル・読取オプションが前回と同じ場合はAPIを呼び出さず、保存済みの結果ファイル (JSON/サーチャブルPDF/CSV) を結果フォルダへ出力します。"},
+            "result_cache_max_mb": {"type": "int", "default": 2048, "min": 0, "max": 99999, "suffix": " MB", "label": "結果キャッシュの最大サイズ:", "tooltip": "保存済みの結果ファイルの合計サイズの上限です。超えた場合は最後に使われた時期が古いものから削除します。0 の場合は保存しません。"}
         }
     }
 ]
@@ -0,0 +1,52 @@
+# engine_signal.py
+
+import threading
+from typing import Callable, List
+
+# このモジュールは Qt を使わない処理エンジン (ocr_engine_*) から使うため、PyQt6 に依存しないこと。
+
+
+class BoundEngineSignal:
+    """インスタンスごとの接続先 (コールバック) の一覧。emit() は呼び出したスレッドで接続先を順に直ちに呼び出す。"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._slots: List[Callable] = []
+
+    def connect(self, slot: Callable):
+        with self._lock:
+            self._slots.append(slot)
+
+    def disconnect(self, slot: Callable = None):
+        with self._lock:
+            if slot is None:
+                self._slots.clear()
+            elif slot in self._slots:
+                self._slots.remove(slot)
+
+    def emit(self, *args):
+        with self._lock:
+            slots = list(self._slots)
+        for slot in slots:
+            slot(*args)
+
+
+class EngineSignal:
+    """pyqtSignal と同じ書き方 (クラス属性で宣言し、インスタンスで connect / emit) ができる、Qt を使わないシグナル。
+
+    Qt のキュー接続のようにスレッドをまたいで配送することはしないため、GUIスレッドへ渡す場合は
+    QThread のラッパー (ocr_worker_base.OcrEngineWorker) で pyqtSignal へ中継する。
+    """
+    def __init__(self, *arg_types):
+        self.arg_types = arg_types
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        bound = instance.__dict__.get(self.name)
+        if bound is None:
+            bound = instance.__dict__.setdefault(self.name, BoundEngineSignal())
+        return bound
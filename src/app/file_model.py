@@ -1,7 +1,7 @@
 # file_model.py
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, List, Dict
 
 @dataclass
 class FileInfo:
@@ -18,3 +18,39 @@ class FileInfo:
     searchable_pdf_status: str = "-"
     page_count: Optional[int] = None
     is_checked: bool = True
+
+
+class FileInfoIndex:
+    """FileInfo のリストに対する、パス・No からリスト上の位置への索引。
+
+    ワーカーからの通知 (パスで届く) や一覧の行 (No で識別) から FileInfo を探す際に、
+    リスト全体を走査しないようにする。リストを置き換えた場合は rebuild() で作り直すこと。
+    同じパス・No が複数ある場合は先頭のものを返す。
+    """
+    def __init__(self, files: Optional[List[FileInfo]] = None):
+        self.rebuild(files if files is not None else [])
+
+    def rebuild(self, files: List[FileInfo]):
+        self._files = files
+        self._index_by_path: Dict[str, int] = {}
+        self._index_by_no: Dict[int, int] = {}
+        for idx, file_info in enumerate(files):
+            self._index_by_path.setdefault(file_info.path, idx)
+            self._index_by_no.setdefault(file_info.no, idx)
+
+    def index_of_path(self, path: str) -> Optional[int]:
+        return self._index_by_path.get(path)
+
+    def index_of_no(self, no: int) -> Optional[int]:
+        return self._index_by_no.get(no)
+
+    def get_by_path(self, path: str) -> Optional[FileInfo]:
+        idx = self._index_by_path.get(path)
+        return self._files[idx] if idx is not None else None
+
+    def get_by_no(self, no: int) -> Optional[FileInfo]:
+        idx = self._index_by_no.get(no)
+        return self._files[idx] if idx is not None else None
+
+    def __len__(self):
+        return len(self._files)
@@ -0,0 +1,168 @@
+# file_prefetcher.py
+
+import os
+import time
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Dict, Any, List, Tuple
+
+from pdf_splitter import prepare_file_parts
+from pdf_metadata import PdfMetadataCache
+
+# 先読みのデフォルト値 (0 = 先読みしない。処理直前にワーカースレッド上で準備する)
+DEFAULT_PREFETCH_LOOKAHEAD_FILES = 2
+
+# プロセスへ渡す分割設定のキー
+SPLIT_SETTING_KEYS = (
+    "split_large_files_enabled", "split_chunk_size_mb", "upload_max_size_mb",
+    "split_by_page_count_enabled", "split_max_pages_per_part",
+)
+
+
+class FilePrefetcher:
+    """後続ファイルの準備 (PDF分割) をプロセスプールで先行実行する。
+
+    現在のファイルのアップロード・ポーリング中に、次のファイルの CPU 負荷の高い PyPDF2 処理を進めておく。
+    準備済みで未取得のファイル数は lookahead 件までに制限し、一時フォルダの使用量が増え続けないようにする。
+    take() はファイル一覧の順に呼び出される前提だが、順不同・一覧外のパスでもその場で準備して返す。
+    """
+    def __init__(self, file_paths: List[str], base_temp_dir: str, options_values: Dict[str, Any], lookahead: Any, log_manager):
+        self.file_paths = list(file_paths)
+        self.base_temp_dir = base_temp_dir
+        self.split_settings = {key: options_values[key] for key in SPLIT_SETTING_KEYS if key in options_values}
+        self.log_manager = log_manager
+        try:
+            self.lookahead = max(0, int(lookahead))
+        except (TypeError, ValueError):
+            self.lookahead = DEFAULT_PREFETCH_LOOKAHEAD_FILES
+
+        self._lock = threading.Lock()
+        self._stats = {"zero_copy_files": 0, "bytes_copy_avoided": 0, "split_files": 0}
+        self._entries: Dict[str, Tuple[Optional[Future], str]] = {}
+        self._taken_paths: set = set()
+        self._next_index = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        if self.lookahead > 0 and len(self.file_paths) > 1:
+            max_workers = max(1, min(self.lookahead, (os.cpu_count() or 2) - 1))
+            try:
+                self._executor = ProcessPoolExecutor(max_workers=max_workers)
+                self.log_manager.info(f"ファイル準備の先読みを開始します (先読み {self.lookahead} 件, プロセス数 {max_workers})。", context="WORKER_PREFETCH",
+                                      lookahead=self.lookahead, max_workers=max_workers)
+            except Exception as e:
+                self.log_manager.warning(f"先読み用プロセスプールを作成できませんでした。処理直前に準備します: {e}", context="WORKER_PREFETCH")
+                self._executor = None
+        with self._lock:
+            self._fill_window()
+
+    def _make_temp_dir(self, original_filepath: str) -> str:
+        # 同名ファイル (別フォルダ) を並行処理しても衝突しないよう、ファイルごとに一意な一時フォルダを作成する
+        return tempfile.mkdtemp(prefix=os.path.splitext(os.path.basename(original_filepath))[0] + "_parts_", dir=self.base_temp_dir)
+
+    def _lookup_metadata(self, original_filepath: str):
+        if os.path.splitext(original_filepath)[1].lower() != ".pdf":
+            return None
+        return PdfMetadataCache.lookup(original_filepath)
+
+    def _submit(self, original_filepath: str) -> Tuple[Optional[Future], str]:
+        temp_dir = self._make_temp_dir(original_filepath)
+        future = None
+        if self._executor is not None:
+            try:
+                future = self._executor.submit(prepare_file_parts, original_filepath, temp_dir, self.split_settings, self._lookup_metadata(original_filepath))
+            except (BrokenProcessPool, RuntimeError) as e:
+                self.log_manager.warning(f"先読み用プロセスプールが利用できません。処理直前に準備します: {e}", context="WORKER_PREFETCH")
+                self._executor = None
+        return future, temp_dir
+
+    def _fill_window(self):
+        """準備済み・準備中で未取得のファイルが lookahead 件になるまで、一覧の先頭から投入する。(ロック内で呼ぶこと)"""
+        if self._executor is None: return
+        while self._next_index < len(self.file_paths) and len(self._entries) < self.lookahead:
+            path = self.file_paths[self._next_index]
+            self._next_index += 1
+            if path not in self._entries and path not in self._taken_paths:
+                self._entries[path] = self._submit(path)
+
+    def take(self, original_filepath: str) -> Tuple[List[str], Optional[Dict[str, Any]], str, List[Optional[int]]]:
+        """ファイルの準備結果を取得する (未完了なら完了を待つ)。
+
+        Returns:
+            tuple: (部品パスのリスト, エラー, ファイル専用の一時フォルダ, 部品ごとのページ数 (不明な場合は None))
+        """
+        with self._lock:
+            self._taken_paths.add(original_filepath)
+            entry = self._entries.pop(original_filepath, None)
+            if entry is None:
+                entry = self._submit(original_filepath)
+            self._fill_window()
+
+        future, temp_dir = entry
+        wait_started = time.monotonic()
+        parts, error, info = None, None, {}
+        if future is not None:
+            try:
+                parts, error, info = future.result()
+            except Exception as e:
+                # プロセスプールの異常終了などは、このスレッドで準備し直す
+                self.log_manager.warning(f"先読みでの準備に失敗したため、再度準備します: {e}", context="WORKER_PREFETCH")
+                future = None
+        if future is None:
+            parts, error, info = prepare_file_parts(original_filepath, temp_dir, self.split_settings, self._lookup_metadata(original_filepath))
+        waited_seconds = time.monotonic() - wait_started
+
+        self._log_prepare_info(original_filepath, parts, error, info, waited_seconds)
+        if info.get("metadata") is not None:
+            # キャッシュに無く準備中に解析した結果は、次回以降 (再処理など) のために登録しておく
+            PdfMetadataCache.store(info["metadata"])
+        if not error:
+            with self._lock:
+                if info.get("zero_copy"):
+                    self._stats["zero_copy_files"] += 1
+                    self._stats["bytes_copy_avoided"] += info.get("size_bytes", 0)
+                elif info.get("split"):
+                    self._stats["split_files"] += 1
+        part_page_counts = list(info.get("part_page_counts") or [])
+        part_page_counts += [None] * (len(parts or []) - len(part_page_counts))
+        return parts, error, temp_dir, part_page_counts
+
+    def discard(self, original_filepath: str):
+        """準備が不要になったファイル (結果キャッシュから出力した場合など) の先読みを取り消し、一時フォルダを削除する。"""
+        with self._lock:
+            self._taken_paths.add(original_filepath)
+            entry = self._entries.pop(original_filepath, None)
+            self._fill_window()
+        if entry is None: return
+        future, temp_dir = entry
+        if future is not None and not future.cancel():
+            # 実行中の準備は、一時フォルダへの書き込みが終わるのを待ってから削除する
+            try: future.result()
+            except Exception: pass
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _log_prepare_info(self, original_filepath: str, parts: List[str], error: Optional[Dict[str, Any]], info: Dict[str, Any], waited_seconds: float):
+        original_basename = os.path.basename(original_filepath)
+        if info.get("check_warning"):
+            self.log_manager.warning(info["check_warning"], context="WORKER_PDF_SPLIT_CHECK")
+        if error:
+            self.log_manager.warning(f"ファイル '{original_basename}' の準備に失敗しました: {error.get('message')}", context="WORKER_PDF_SPLIT", error_code=error.get("code"))
+        elif info.get("split"):
+            size_mb = info.get("size_bytes", 0) / (1024 * 1024)
+            self.log_manager.info(f"PDF '{original_basename}' ({info.get('total_pages')}ページ, {size_mb:.2f}MB) を {len(parts)} 個の部品に分割しました。", context="WORKER_PDF_SPLIT")
+        self.log_manager.debug(f"ファイル準備の待ち時間: {waited_seconds:.2f}秒 ({original_basename})", context="WORKER_PREFETCH", wait_seconds=round(waited_seconds, 3))
+
+    def get_stats(self) -> Dict[str, int]:
+        """ファイル準備の統計 (元ファイルから直接アップロードした件数・省略できたコピー量など) を返す。"""
+        with self._lock:
+            return dict(self._stats)
+
+    def shutdown(self):
+        """未着手の先読みを取り消し、実行中の準備の終了を待ってプロセスプールを閉じる。"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._entries.clear()
+            self._next_index = len(self.file_paths)
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
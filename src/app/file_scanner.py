@@ -1,9 +1,20 @@
 # file_scanner.py
 
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, List
 from log_manager import LogManager
 from file_model import FileInfo
-from PyPDF2 import PdfReader, errors
+from pdf_metadata import PdfMetadataCache, probe_page_count_for_scan
+from page_count_prober import log_pdf_probe_error
+from folder_index import FolderIndex, RESTORED_FILE_INFO_FIELDS
+from app_constants import OCR_STATUS_COMPLETED
+
+SUPPORTED_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg", ".tif", ".tiff"}
+# フォルダの読み取りを並行して行うスレッド数 (NAS などの応答待ちが主のため CPU 数より多くてよい)
+SCAN_MAX_WORKERS = 8
+# scan_folder のコールバックへ渡す件数の目安
+SCAN_BATCH_SIZE = 1000
 
 class FileScanner:
     def __init__(self, log_manager: LogManager, config: dict):
@@ -16,89 +27,171 @@ class FileScanner:
         """
         self.log_manager = log_manager
         self.config = config
+        self._scanned_stats = {} # 直近の scan_folder で取得したファイルのサイズと更新日時 (パス -> (バイト数, ns))
+        self.folder_index: Optional[FolderIndex] = None # 直近の scan_folder の入力フォルダの索引
 
-    def scan_folder(self, input_folder_path: str):
+    def scan_folder(self, input_folder_path: str, on_files_found: Optional[Callable[[List[str]], None]] = None):
         """
         指定された入力フォルダからサポート対象のファイルを再帰的に収集します。
         設定は self.config から取得します。
 
+        フォルダは浅い階層から順に、同じ階層のフォルダをスレッドプールで並行して os.scandir で読み取ります。
+        ファイルサイズは読み取り時の stat 結果を保持し、create_initial_file_list で再利用します。
+        入力フォルダごとに保存した索引 (folder_index.FolderIndex) があれば、更新日時が前回と同じフォルダは読み取りません。
+        最大ファイル数に達した場合は、浅い階層・パス順で先に見つかったファイルを残します。
+
         Args:
             input_folder_path (str): スキャン対象のルートフォルダパス。
+            on_files_found: 指定した場合、見つかったファイルパスを (最大 SCAN_BATCH_SIZE 件ずつ) スキャンの途中で
+                呼び出し元のスレッドへ渡すコールバック。スキャン完了を待たずに一覧へ反映する場合に使う。
 
         Returns:
             tuple: (収集されたファイルパスのリスト, 最大ファイル数到達情報 or None, 深さ制限でスキップされたフォルダのリスト)
         """
-        # (このメソッドは変更なし)
+        self._scanned_stats = {}
+        self.folder_index = None
+        # スキャンごとにキャッシュを作り直す (古いファイル情報を持ち越さない)
+        PdfMetadataCache.clear()
+
         if not input_folder_path or not os.path.isdir(input_folder_path):
             self.log_manager.warning(f"File collection skipped: Input folder invalid or not a directory. Path: '{input_folder_path}'", context="FILE_SCANNER")
             return [], None, []
 
+        max_files, recursion_depth_limit, excluded_folder_names = self.get_scan_limits()
+
+        self.folder_index = FolderIndex.load(input_folder_path)
+        self.log_manager.info(f"FileScanner: Collection started. In='{input_folder_path}', Max={max_files}, DepthLimit={recursion_depth_limit}, Exclude={sorted(excluded_folder_names)}", context="FILE_SCANNER")
+
+        collected_files = []
+        pending_batch = []
+        max_files_reached_info = None
+        depth_limited_folders = set()
+
+        current_level_dirs = [input_folder_path]
+        current_depth = 0
+        executor = ThreadPoolExecutor(max_workers=SCAN_MAX_WORKERS, thread_name_prefix="FileScan")
+        try:
+            while current_level_dirs and max_files_reached_info is None:
+                next_level_dirs = []
+                # map は渡した順に結果を返すため、結果の順序はスレッドの完了順に依存しない
+                for dir_path, (files, sub_dirs, listing) in zip(current_level_dirs, executor.map(lambda d: self._scan_directory(d, excluded_folder_names), current_level_dirs)):
+                    if listing is not None:
+                        self.folder_index.record_dir(dir_path, *listing)
+                    if current_depth >= recursion_depth_limit:
+                        # 深さ制限の階層のフォルダは、配下のフォルダを記録するのみでファイルは収集しない
+                        if sub_dirs:
+                            depth_limited_folders.update(sub_dirs)
+                            self.log_manager.debug(f"FileScanner: Recursion depth limit ({recursion_depth_limit}) reached at '{os.path.normpath(dir_path)}'. Skipping subdirectories: {[os.path.basename(d) for d in sub_dirs]}", context="FILE_SCANNER_DEPTH")
+                        continue
+                    next_level_dirs.extend(sub_dirs)
+
+                    for file_path, file_size, file_mtime_ns in files:
+                        if len(collected_files) >= max_files:
+                            max_files_reached_info = {
+                                "limit": max_files,
+                                "last_scanned_folder": os.path.normpath(dir_path)
+                            }
+                            break
+                        collected_files.append(file_path)
+                        pending_batch.append(file_path)
+                        self._scanned_stats[file_path] = (file_size, file_mtime_ns)
+                    if max_files_reached_info is not None:
+                        break
+
+                    if on_files_found and len(pending_batch) >= SCAN_BATCH_SIZE:
+                        on_files_found(pending_batch); pending_batch = []
+                current_level_dirs = next_level_dirs
+                current_depth += 1
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        if on_files_found and pending_batch:
+            on_files_found(pending_batch)
+
+        unique_sorted_files = sorted(collected_files)
+        self.log_manager.info(f"FileScanner: Collection finished. Found {len(unique_sorted_files)} files.", context="FILE_SCANNER", count=len(unique_sorted_files), **self.folder_index.stats)
+        return unique_sorted_files, max_files_reached_info, sorted(depth_limited_folders)
+
+    def get_scan_limits(self):
+        """設定から (最大ファイル数, 再帰検索の深さ制限, スキャンしないフォルダ名の集合) を返す。"""
         options_cfg = self.config.get("options", {}).get(self.config.get("api_type"), {}) # これは古い構造かもしれません
         file_actions_config = self.config.get("file_actions", {})
 
         max_files = options_cfg.get("max_files_to_process", 100)
         recursion_depth_limit = options_cfg.get("recursion_depth", 5)
-        excluded_folder_names = [name for name in [
+        excluded_folder_names = {name for name in [
             file_actions_config.get("success_folder_name"),
             file_actions_config.get("failure_folder_name"),
             file_actions_config.get("results_folder_name")
-        ] if name and name.strip()]
+        ] if name and name.strip()}
+        return max_files, recursion_depth_limit, excluded_folder_names
 
-        self.log_manager.info(f"FileScanner: Collection started. In='{input_folder_path}', Max={max_files}, DepthLimit={recursion_depth_limit}, Exclude={excluded_folder_names}", context="FILE_SCANNER")
+    def read_directory(self, dir_path: str, excluded_folder_names: set):
+        """1つのフォルダを (索引を使わずに) 読み取り、(対象ファイルの (パス, サイズ, 更新日時) のリスト, 配下のフォルダのリスト,
+        フォルダの更新日時) を返す。読み取れない場合の更新日時は None。フォルダの監視 (folder_watcher) から使う。"""
+        files, sub_dirs, listing = self._scan_directory(dir_path, excluded_folder_names, use_index=False)
+        return files, sub_dirs, (listing[0] if listing else None)
 
-        collected_files = []
-        supported_extensions = {".pdf", ".png", ".jpg", ".jpeg", ".tif", ".tiff"}
-        max_files_reached_info = None
-        depth_limited_folders = set()
+    def _scan_directory(self, dir_path: str, excluded_folder_names: set, use_index: bool = True):
+        """1つのフォルダを読み取り、(対象ファイルの (パス, サイズ, 更新日時) のリスト, 配下のフォルダのリスト, 索引へ記録する内容) を返す。
+        一覧はそれぞれパス順。シンボリックリンクは辿らない。読み取れないフォルダは空として扱う (os.walk と同じ)。
+        更新日時が索引と同じフォルダは読み取らずに索引の一覧を使う (ファイルのサイズ・更新日時は stat で取得し直す)。"""
+        try:
+            dir_mtime_ns = os.stat(dir_path).st_mtime_ns
+        except OSError as e:
+            self.log_manager.debug(f"FileScanner: Failed to read folder '{dir_path}'. Skipped. Error: {e}", context="FILE_SCANNER", emit_to_ui=False)
+            return [], [], None
 
-        for root, dirs, files in os.walk(input_folder_path, topdown=True, followlinks=False):
-            norm_root = os.path.normpath(root)
-            norm_input_root = os.path.normpath(input_folder_path)
-            
-            if norm_root == norm_input_root:
-                current_depth = 0
-            else:
-                relative_path_from_input = os.path.relpath(norm_root, norm_input_root)
-                current_depth = len(relative_path_from_input.split(os.sep))
-
-            if current_depth >= recursion_depth_limit:
-                for d_name in dirs:
-                    depth_limited_folders.add(os.path.join(norm_root, d_name))
-                self.log_manager.debug(f"FileScanner: Recursion depth limit ({recursion_depth_limit}) reached at '{norm_root}'. Skipping subdirectories: {dirs}", context="FILE_SCANNER_DEPTH")
-                dirs[:] = []
-                continue
-
-            dirs_to_remove_from_walk = [d for d in dirs if d in excluded_folder_names]
-            for d_to_remove in dirs_to_remove_from_walk:
-                if d_to_remove in dirs:
-                    dirs.remove(d_to_remove)
-
-            for filename in sorted(files):
-                if len(collected_files) >= max_files:
-                    if max_files_reached_info is None:
-                        max_files_reached_info = {
-                            "limit": max_files,
-                            "last_scanned_folder": norm_root
-                        }
-                    break
-                
-                file_path = os.path.join(root, filename)
-                if os.path.islink(file_path):
-                    continue
-                if os.path.splitext(filename)[1].lower() in supported_extensions:
-                    collected_files.append(file_path)
-            
-            if max_files_reached_info is not None:
-                break
-        
-        unique_sorted_files = sorted(list(set(collected_files)))
-        self.log_manager.info(f"FileScanner: Collection finished. Found {len(unique_sorted_files)} files.", context="FILE_SCANNER", count=len(unique_sorted_files))
-        return unique_sorted_files, max_files_reached_info, list(depth_limited_folders)
+        indexed = self.folder_index.lookup_dir(dir_path, dir_mtime_ns) if self.folder_index and use_index else None
+        if indexed is not None:
+            sub_dir_names, indexed_file_entries = indexed
+            reused = True
+            # フォルダの更新日時は既存ファイルの上書きでは変わらないため、一覧のみを再利用し、サイズ・更新日時は取得し直す
+            # (索引と一致しないファイルは、ページ数・OCR 状態を再利用しない)
+            file_entries = []
+            for name, _, _ in indexed_file_entries:
+                try:
+                    stat_result = os.stat(os.path.join(dir_path, name))
+                    file_entries.append((name, stat_result.st_size, stat_result.st_mtime_ns))
+                except OSError:
+                    pass  # 索引の記録後に削除されたファイル
+        else:
+            sub_dir_names, file_entries = [], []
+            reused = False
+            try:
+                with os.scandir(dir_path) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_symlink():
+                                continue
+                            if entry.is_dir(follow_symlinks=False):
+                                sub_dir_names.append(entry.name)
+                            elif os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTENSIONS and entry.is_file(follow_symlinks=False):
+                                # Windows では scandir の結果に stat が含まれるため、追加のファイルアクセスは発生しない
+                                stat_result = entry.stat(follow_symlinks=False)
+                                file_entries.append((entry.name, stat_result.st_size, stat_result.st_mtime_ns))
+                        except OSError as e:
+                            self.log_manager.debug(f"FileScanner: Failed to read entry '{entry.path}'. Skipped. Error: {e}", context="FILE_SCANNER", emit_to_ui=False)
+            except OSError as e:
+                self.log_manager.debug(f"FileScanner: Failed to read folder '{dir_path}'. Skipped. Error: {e}", context="FILE_SCANNER", emit_to_ui=False)
+                return [], [], None
+            sub_dir_names.sort()
+            file_entries.sort()
+
+        files = [(os.path.join(dir_path, name), size, mtime_ns) for name, size, mtime_ns in file_entries]
+        sub_dirs = [os.path.join(dir_path, name) for name in sub_dir_names if name not in excluded_folder_names]
+        return files, sub_dirs, (dir_mtime_ns, sub_dir_names, file_entries, reused)
 
-    def create_initial_file_list(self, file_paths: list, ocr_status_skipped_size_limit: str, ocr_status_not_processed: str) -> list[FileInfo]:
+    def create_initial_file_list(self, file_paths: list, ocr_status_skipped_size_limit: str, ocr_status_not_processed: str, start_no: int = 1,
+                                 probe_page_counts: bool = True) -> list[FileInfo]:
         """
         収集されたファイルパスのリストから、処理用の初期ファイル情報リストを生成します。
-        PDFファイルの場合はページ数も読み取ります。
+        前回のスキャンから変更されていないファイルは、索引に保存したページ数と最後の OCR 状態を再利用します。
+        No は start_no から順に振ります (scan_folder のコールバックで少しずつ生成する場合に指定)。
+        PDFファイルの場合はページ数も読み取ります (probe_page_counts=False の場合は読み取らず、索引に無いページ数は None のままにします。
+        GUI では一覧を先に表示し、page_count_prober で後から取得します)。
+        読み取ったPDFのメタデータ (ページ数・ページごとのサイズ) は PdfMetadataCache に登録し、
+        OCRワーカーの分割要否判定・分割で再利用します。大きなPDF・解析できないPDFはページ数のみを読み取ります。
         """
         processed_files_info: list[FileInfo] = []
         
@@ -114,29 +207,31 @@ class FileScanner:
         
         upload_max_bytes = upload_max_size_mb * 1024 * 1024
 
+        ocr_context = self._ocr_context()
         initial_json_status_default = "-" if output_format in ["json_only", "both"] else "作成しない(設定)"
         initial_pdf_status_default = "-" if output_format in ["pdf_only", "both"] else "作成しない(設定)"
 
         if file_paths:
             for i, f_path in enumerate(file_paths):
                 try:
-                    f_size = os.path.getsize(f_path)
+                    # scan_folder で取得したサイズがあれば再利用する
+                    scanned_stat = self._scanned_stats.get(f_path)
+                    if scanned_stat is None:
+                        stat_result = os.stat(f_path)
+                        scanned_stat = (stat_result.st_size, stat_result.st_mtime_ns)
+                    f_size, f_mtime_ns = scanned_stat
                     is_skipped_by_size = f_size > upload_max_bytes
                     
                     page_count = None
-                    if os.path.splitext(f_path)[1].lower() == ".pdf":
-                        try:
-                            with open(f_path, 'rb') as f:
-                                reader = PdfReader(f)
-                                page_count = len(reader.pages)
-                        except errors.PdfReadError as e_pdf:
-                            self.log_manager.warning(f"FileScanner: PDFファイル '{os.path.basename(f_path)}' のページ数読み取りに失敗しました (ファイル破損の可能性)。エラー: {e_pdf}", context="FILE_SCANNER_PDF_ERROR")
-                        except Exception as e_generic:
-                            self.log_manager.error(f"FileScanner: PDFファイル '{os.path.basename(f_path)}' の読み取り中に予期せぬエラーが発生しました。エラー: {e_generic}", context="FILE_SCANNER_PDF_ERROR", exc_info=True)
-
+                    indexed_page_count = self.folder_index.lookup_page_count(f_path, f_size, f_mtime_ns) if self.folder_index else None
+                    if indexed_page_count is not None:
+                        # 前回のスキャンから変更されていないPDFは開き直さない
+                        page_count = indexed_page_count
+                    elif probe_page_counts and os.path.splitext(f_path)[1].lower() == ".pdf":
+                        page_count = self._probe_page_count(f_path)
 
                     file_info_item = FileInfo(
-                        no=i + 1,
+                        no=start_no + i,
                         path=f_path,
                         name=os.path.basename(f_path),
                         size=f_size,
@@ -148,6 +243,14 @@ class FileScanner:
                         page_count=page_count,
                         is_checked=not is_skipped_by_size
                     )
+                    if self.folder_index:
+                        previous_state = None if is_skipped_by_size else self.folder_index.lookup_file_state(f_path, f_size, f_mtime_ns, ocr_context)
+                        if previous_state:
+                            # 前回の実行から変更されていないファイルは、最後の OCR 状態 (ジョブIDを含む) を表示する
+                            for field_name in RESTORED_FILE_INFO_FIELDS:
+                                if field_name in previous_state: setattr(file_info_item, field_name, previous_state[field_name])
+                            file_info_item.is_checked = file_info_item.ocr_engine_status != OCR_STATUS_COMPLETED
+                        self.folder_index.record_file(f_path, f_size, f_mtime_ns, page_count)
                     if is_skipped_by_size:
                         self.log_manager.warning(f"FileScanner: File '{file_info_item.name}' ({f_size/(1024*1024):.2f}MB) exceeds upload limit ({upload_max_size_mb}MB). Skipped.", context="FILE_SCANNER_SIZE_LIMIT")
                     processed_files_info.append(file_info_item)
@@ -155,3 +258,31 @@ class FileScanner:
                     self.log_manager.error(f"FileScanner: Failed to get info for file '{f_path}'. Skipped. Error: {e}", context="FILE_SCANNER_ERROR")
         
         return processed_files_info
+
+    def _probe_page_count(self, f_path: str) -> Optional[int]:
+        cached_metadata = PdfMetadataCache.lookup(f_path)
+        if cached_metadata is not None:
+            return cached_metadata.page_count
+        page_count, pdf_metadata, pdf_error = probe_page_count_for_scan(f_path)
+        if pdf_metadata is not None:
+            PdfMetadataCache.store(pdf_metadata)
+        if pdf_error:
+            log_pdf_probe_error(self.log_manager, f_path, pdf_error)
+        return page_count
+
+    def _ocr_context(self) -> dict:
+        """索引の OCR 状態を再利用してよいかの判定に使う、現在のプロファイルID・API実行モード。"""
+        from config_manager import ConfigManager # ローカルインポート
+        active_profile = ConfigManager.get_active_api_profile(self.config)
+        return {"profile_id": active_profile.get("id") if active_profile else None,
+                "api_execution_mode": self.config.get("api_execution_mode", "demo")}
+
+    def save_folder_index(self, files_info: Optional[list] = None):
+        """直近のスキャンの内容 (と一覧の OCR 状態) を入力フォルダの索引として保存し、次回の再スキャンで再利用する。"""
+        if self.folder_index is None:
+            return
+        if files_info:
+            self.folder_index.update_file_states(files_info, self._ocr_context())
+        save_error = self.folder_index.save()
+        if save_error:
+            self.log_manager.warning(f"FileScanner: フォルダの索引を保存できませんでした。次回のスキャンは全て読み取ります。Error: {save_error}", context="FILE_SCANNER_INDEX")
@@ -0,0 +1,154 @@
+# folder_index.py
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+from typing import Optional, Dict, Any, List, Tuple
+
+from appdirs import user_cache_dir
+
+from app_constants import APP_NAME, APP_AUTHOR, OCR_STATUS_COMPLETED, OCR_STATUS_FAILED
+
+INDEX_FORMAT_VERSION = 2          # 保存形式を変えた場合に上げる (古い索引は読み捨てる)
+# 更新日時がこの秒数より新しいフォルダは記録しない (同じ時刻の間に追加されたファイルを見落とさないように)
+RACY_DIR_MTIME_SECONDS = 2.0
+# 前回の状態を復元する OCR 状態 (処理中などの途中の状態は復元しない)
+RESTORABLE_OCR_STATUSES = (OCR_STATUS_COMPLETED, OCR_STATUS_FAILED)
+# 復元する FileInfo の項目
+RESTORED_FILE_INFO_FIELDS = ("status", "ocr_engine_status", "job_id", "ocr_result_summary",
+                             "json_status", "auto_csv_status", "searchable_pdf_status")
+
+
+def default_index_dir() -> str:
+    try:
+        return os.path.join(user_cache_dir(appname=APP_NAME, appauthor=APP_AUTHOR), "folder_index")
+    except Exception:
+        return os.path.join(tempfile.gettempdir(), f"{APP_AUTHOR}_{APP_NAME}_folder_index".replace(" ", "_"))
+
+
+def index_path_for_root(root: str, index_dir: Optional[str] = None) -> str:
+    root_key = os.path.normcase(os.path.abspath(root))
+    return os.path.join(index_dir or default_index_dir(), hashlib.sha1(root_key.encode("utf-8")).hexdigest() + ".json")
+
+
+class FolderIndex:
+    """入力フォルダごとに保存する、前回スキャン時のフォルダの内容とファイルの情報。
+
+    再スキャン時、更新日時が前回と同じフォルダは読み取らずに前回の内容 (対象ファイルの名前、配下のフォルダ名) を使い、
+    サイズ・更新日時が前回と同じファイルはページ数と最後の OCR 状態を再利用する。
+    OCR 状態は処理したときのプロファイルID・API実行モード (ocr_context) と一緒に記録し、両方が一致する場合だけ再利用する。
+    フォルダの更新日時はファイルの追加・削除・名前の変更で変わるが、既存ファイルの上書きでは変わらないため、
+    呼び出し側 (FileScanner) はファイルのサイズ・更新日時を索引からではなく stat で取得して lookup_* に渡すこと。
+
+    1回のスキャンで lookup_* (前回の内容) と record_* (今回の内容) を使い、save() で今回の内容に置き換えて保存する。
+    """
+    def __init__(self, root: str, index_path: str, dirs: Optional[Dict[str, Any]] = None, files: Optional[Dict[str, Any]] = None):
+        self.root = root
+        self.index_path = index_path
+        self._root_prefix = os.path.join(root, "")
+        self._previous_dirs: Dict[str, Any] = dirs or {}      # 相対パス -> [更新日時(ns), [配下のフォルダ名], [[ファイル名, サイズ, 更新日時(ns)], ...]]
+        self._previous_files: Dict[str, Any] = files or {}    # 相対パス -> {"size", "mtime_ns", "page_count", "ocr": {...} or なし, "ocr_context": {...} or なし}
+        self._dirs: Dict[str, Any] = {}
+        self._files: Dict[str, Any] = {}
+        self.stats = {"dirs_reused": 0, "dirs_scanned": 0, "files_reused": 0}
+
+    @classmethod
+    def load(cls, root: str, index_dir: Optional[str] = None) -> "FolderIndex":
+        """保存済みの索引を読み込む。無い・壊れている・形式が古い場合は空の索引を返す。"""
+        index_path = index_path_for_root(root, index_dir)
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                loaded = json.load(f)
+            if isinstance(loaded, dict) and loaded.get("version") == INDEX_FORMAT_VERSION \
+                    and os.path.normcase(loaded.get("root", "")) == os.path.normcase(os.path.abspath(root)):
+                return cls(root, index_path, loaded.get("dirs") or {}, loaded.get("files") or {})
+        except (OSError, ValueError):
+            pass
+        return cls(root, index_path)
+
+    def _relative(self, path: str) -> str:
+        # スキャンで得るパスは root の下に join したものなので、通常は先頭を除くだけでよい (relpath はファイル数分呼ぶと遅い)
+        if path.startswith(self._root_prefix):
+            return path[len(self._root_prefix):]
+        return os.path.relpath(path, self.root)
+
+    # --- フォルダ ---
+    def lookup_dir(self, dir_path: str, mtime_ns: int) -> Optional[Tuple[List[str], List[Tuple[str, int, int]]]]:
+        """更新日時が前回と同じであれば (配下のフォルダ名, [(ファイル名, サイズ, 更新日時), ...]) を返す。"""
+        entry = self._previous_dirs.get(self._relative(dir_path))
+        if not entry or entry[0] != mtime_ns:
+            return None
+        return entry[1], [tuple(item) for item in entry[2]]
+
+    def record_dir(self, dir_path: str, mtime_ns: int, sub_dir_names: List[str], files: List[Tuple[str, int, int]], reused: bool):
+        self.stats["dirs_reused" if reused else "dirs_scanned"] += 1
+        if time.time() - mtime_ns / 1e9 < RACY_DIR_MTIME_SECONDS:
+            return
+        self._dirs[self._relative(dir_path)] = [mtime_ns, list(sub_dir_names), [list(item) for item in files]]
+
+    # --- ファイル ---
+    def _previous_file(self, path: str, size: int, mtime_ns: int) -> Optional[Dict[str, Any]]:
+        entry = self._previous_files.get(self._relative(path))
+        if entry and entry.get("size") == size and entry.get("mtime_ns") == mtime_ns:
+            return entry
+        return None
+
+    def lookup_page_count(self, path: str, size: int, mtime_ns: int) -> Optional[int]:
+        entry = self._previous_file(path, size, mtime_ns)
+        if entry is None or entry.get("page_count") is None:
+            return None
+        self.stats["files_reused"] += 1
+        return entry["page_count"]
+
+    def lookup_file_state(self, path: str, size: int, mtime_ns: int, ocr_context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """前回記録した OCR 状態 (RESTORED_FILE_INFO_FIELDS の値) を返す。
+        ファイルが変更されている場合、別のプロファイル・API実行モードで処理した状態の場合は None。"""
+        entry = self._previous_file(path, size, mtime_ns)
+        if not entry or entry.get("ocr_context") != ocr_context:
+            return None
+        return entry.get("ocr")
+
+    def record_file(self, path: str, size: int, mtime_ns: int, page_count: Optional[int]):
+        entry = {"size": size, "mtime_ns": mtime_ns, "page_count": page_count}
+        previous = self._previous_file(path, size, mtime_ns)
+        if previous and previous.get("ocr"):
+            entry["ocr"] = previous["ocr"]
+            entry["ocr_context"] = previous.get("ocr_context")
+        self._files[self._relative(path)] = entry
+
+    def update_file_states(self, files_info: list, ocr_context: Dict[str, Any]):
+        """一覧の FileInfo から、完了・失敗したファイルの OCR 状態を ocr_context (現在のプロファイルID・API実行モード) と一緒に記録する。
+
+        一覧の状態が記録済みの状態と同じファイルは、処理したときの ocr_context のまま残す (処理後にAPI実行モードを切り替えた場合など)。
+        それ以外の状態のファイルは、同じ ocr_context で記録した状態だけを消す (別のプロファイル・モードの結果は残す)。
+        スキャン後にバックグラウンドで取得したページ数もここで記録する。
+        """
+        for file_info in files_info:
+            entry = self._files.get(self._relative(file_info.path))
+            if entry is None: continue
+            if entry.get("page_count") is None and file_info.page_count is not None:
+                entry["page_count"] = file_info.page_count
+            if file_info.ocr_engine_status in RESTORABLE_OCR_STATUSES:
+                state = {name: getattr(file_info, name) for name in RESTORED_FILE_INFO_FIELDS}
+                if entry.get("ocr") != state:
+                    entry["ocr"] = state
+                    entry["ocr_context"] = dict(ocr_context)
+            elif entry.get("ocr_context") == ocr_context:
+                entry.pop("ocr", None)
+                entry.pop("ocr_context", None)
+
+    def save(self) -> Optional[str]:
+        """今回のスキャンの内容で索引を保存する。失敗した場合はエラー内容を返す。"""
+        payload = {"version": INDEX_FORMAT_VERSION, "root": os.path.abspath(self.root), "saved": time.time(),
+                   "dirs": self._dirs, "files": self._files}
+        temp_path = self.index_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(payload, ensure_ascii=False, separators=(",", ":")))  # dump() は C 実装の高速な変換を使わないため dumps() を使う
+            os.replace(temp_path, self.index_path)
+            return None
+        except OSError as e:
+            return str(e)
@@ -0,0 +1,231 @@
+# folder_watcher.py
+
+import os
+import time
+import threading
+from typing import Optional, Dict, Any, Callable, List, Tuple
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # watchdog が無い環境では、フォルダの更新日時のポーリングのみで監視する
+    Observer = None
+    FileSystemEventHandler = object
+
+from log_manager import LogManager
+from file_scanner import FileScanner
+
+# このモジュールはヘッドレス実行 (cli_runner) から使うため、PyQt6 に依存しないこと。
+
+DEFAULT_WATCH_POLL_INTERVAL_SECONDS = 2.0
+# サイズ・更新日時がこの秒数変わらず、読み取りのために開けるファイルを書き込み完了とみなす
+DEFAULT_WATCH_SETTLE_SECONDS = 3.0
+# ファイルの検出から処理完了までの目標 (1回の処理エンジンの実行で処理するファイル数をこれに収まるよう決める。超えたファイルは警告を記録する)
+DEFAULT_WATCH_LATENCY_TARGET_SECONDS = 300.0
+# ファイルシステムの通知を使う場合も、通知の取りこぼしに備えてこの間隔で全フォルダの更新日時を確認する
+WATCH_FULL_CHECK_INTERVAL_SECONDS = 60.0
+
+FileStat = Tuple[int, int]  # (サイズ, 更新日時(ns))
+
+
+class _DirtyFolderHandler(FileSystemEventHandler):
+    """watchdog の通知を受け、変更のあったフォルダを FolderWatcher へ知らせる。"""
+    def __init__(self, watcher: "FolderWatcher"):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        for path in (getattr(event, "src_path", None), getattr(event, "dest_path", None)):
+            if not path: continue
+            self.watcher.mark_dirty(os.path.dirname(path))
+            if event.is_directory:
+                self.watcher.mark_dirty(path)
+
+
+class FolderWatcher:
+    """入力フォルダ (ホットフォルダ) に追加されたファイルを検出し、書き込みが終わったものを on_file_ready へ渡す。
+
+    監視するフォルダとファイルの読み取りには FileScanner (スキャンと同じ対象拡張子・除外フォルダ・深さ制限) を使う。
+    watchdog がインストールされていればファイルシステムの通知 (Linux では inotify) で変更のあったフォルダのみを読み直し、
+    無ければ一定間隔で各フォルダの更新日時を確認して、変わったフォルダのみを読み直す (ツリー全体は読み直さない)。
+    書き込み途中のファイルを渡さないよう、サイズ・更新日時が settle_seconds の間変わらず、開けるようになるまで待つ。
+
+    on_file_ready(パス, 最初に検出した時刻 (time.time())) は監視スレッドから呼び出される。
+    開始時に既にあったファイルは start() の戻り値で返し、on_file_ready には渡さない。
+    """
+    def __init__(self, root: str, log_manager: LogManager, config: dict, on_file_ready: Callable[[str, float], None],
+                 poll_interval_seconds: float = DEFAULT_WATCH_POLL_INTERVAL_SECONDS, settle_seconds: float = DEFAULT_WATCH_SETTLE_SECONDS):
+        self.root = root
+        self.log_manager = log_manager
+        self.on_file_ready = on_file_ready
+        self.poll_interval_seconds = max(0.1, float(poll_interval_seconds))
+        self.settle_seconds = max(0.0, float(settle_seconds))
+        self.scanner = FileScanner(log_manager, config)
+        _, self.recursion_depth_limit, self.excluded_folder_names = self.scanner.get_scan_limits()
+
+        self._dir_mtimes: Dict[str, Optional[int]] = {}        # 監視中のフォルダ -> 最後に読み取った時の更新日時
+        self._dir_depths: Dict[str, int] = {}
+        self._dir_files: Dict[str, Dict[str, FileStat]] = {}   # フォルダ -> {検出済みのファイル: (サイズ, 更新日時)}
+        self._pending: Dict[str, Dict[str, Any]] = {}          # 書き込み完了待ちのファイル -> {"stat", "first_seen", "stable_since"}
+        self._dirty_lock = threading.Lock()
+        self._dirty_dirs: set = set()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._observer = None
+        self._last_full_check = 0.0
+        self._stats = {"files_ready": 0, "folder_reads": 0}
+
+    @property
+    def backend(self) -> str:
+        return "watchdog" if self._observer is not None else "polling"
+
+    def start(self) -> List[str]:
+        """監視を開始し、開始時に既にあった対象ファイルのパスの一覧 (パス順) を返す。"""
+        if self.recursion_depth_limit > 0:
+            self._add_folder(self.root, 0)
+        existing_files = sorted(path for files in self._dir_files.values() for path in files)
+
+        if Observer is not None:
+            try:
+                observer = Observer()
+                observer.schedule(_DirtyFolderHandler(self), self.root, recursive=True)
+                observer.start()
+                self._observer = observer
+            except Exception as e:
+                self.log_manager.warning(f"フォルダの変更通知を利用できないため、ポーリングで監視します: {e}", context="FOLDER_WATCHER", emit_to_ui=False)
+                self._observer = None
+        self._last_full_check = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="FolderWatcher", daemon=True)
+        self._thread.start()
+        self.log_manager.info(f"フォルダの監視を開始しました ({self.backend}): {self.root} / 監視フォルダ {len(self._dir_mtimes)} 件 / 既存ファイル {len(existing_files)} 件",
+                              context="FOLDER_WATCHER", emit_to_ui=False, backend=self.backend, folders=len(self._dir_mtimes), existing_files=len(existing_files))
+        return existing_files
+
+    def stop(self):
+        self._stop_event.set()
+        if self._observer is not None:
+            try:
+                self._observer.stop()
+                self._observer.join(timeout=5)
+            except Exception:
+                pass
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join(timeout=max(5.0, self.poll_interval_seconds * 2))
+            self._thread = None
+
+    def mark_dirty(self, dir_path: str):
+        with self._dirty_lock:
+            self._dirty_dirs.add(dir_path)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "backend": self.backend, "watched_folders": len(self._dir_mtimes), "pending_files": len(self._pending)}
+
+    # --- 監視スレッド ---
+    def _run(self):
+        while not self._stop_event.wait(self.poll_interval_seconds):
+            try:
+                self._check_folders()
+                self._check_pending_files()
+            except Exception as e:
+                self.log_manager.error(f"フォルダの監視中に予期せぬエラーが発生しました: {e}", context="FOLDER_WATCHER", error_code="FOLDER_WATCHER_ERROR", exception_info=e, emit_to_ui=False)
+
+    def _check_folders(self):
+        with self._dirty_lock:
+            dirty_dirs, self._dirty_dirs = self._dirty_dirs, set()
+        now = time.monotonic()
+        if self._observer is None or now - self._last_full_check >= WATCH_FULL_CHECK_INTERVAL_SECONDS:
+            # 全フォルダの更新日時を確認する (フォルダ数分の stat のみ。変わったフォルダだけを読み直す)
+            self._last_full_check = now
+            dirs_to_check = list(self._dir_mtimes)
+        else:
+            dirs_to_check = [d for d in dirty_dirs if d in self._dir_mtimes]
+        for dir_path in dirs_to_check:
+            if dir_path not in self._dir_mtimes: continue  # 親フォルダの削除で監視対象から外れた
+            try:
+                mtime_ns = os.stat(dir_path).st_mtime_ns
+            except OSError:
+                self._remove_folder(dir_path)
+                continue
+            if dir_path in dirty_dirs or mtime_ns != self._dir_mtimes[dir_path]:
+                self._read_folder(dir_path)
+
+    def _add_folder(self, dir_path: str, depth: int):
+        self._dir_depths[dir_path] = depth
+        self._dir_mtimes[dir_path] = None
+        self._dir_files[dir_path] = {}
+        self._read_folder(dir_path, initial=(not self._thread))
+
+    def _read_folder(self, dir_path: str, initial: bool = False):
+        files, sub_dirs, mtime_ns = self.scanner.read_directory(dir_path, self.excluded_folder_names)
+        self._stats["folder_reads"] += 1
+        if mtime_ns is None:
+            self._remove_folder(dir_path)
+            return
+        self._dir_mtimes[dir_path] = mtime_ns
+
+        known_files = self._dir_files[dir_path]
+        current_files = {path: (size, file_mtime_ns) for path, size, file_mtime_ns in files}
+        for path in [p for p in known_files if p not in current_files]:
+            del known_files[path]   # 削除・移動されたファイル (同じパスに再び置かれた場合は新しいファイルとして扱う)
+        for path in [p for p in self._pending if os.path.dirname(p) == dir_path and p not in current_files]:
+            del self._pending[path]
+        for path, file_stat in current_files.items():
+            if known_files.get(path) == file_stat:
+                continue
+            if initial:
+                known_files[path] = file_stat
+            elif path not in self._pending:
+                known_files.pop(path, None)
+                now = time.monotonic()
+                self._pending[path] = {"stat": file_stat, "first_seen": time.time(), "stable_since": now}
+
+        depth = self._dir_depths[dir_path]
+        for sub_dir in sub_dirs:
+            # 深さ制限の階層のフォルダはスキャンと同様にファイルを収集しないため監視しない
+            if sub_dir not in self._dir_mtimes and depth + 1 < self.recursion_depth_limit:
+                self._add_folder(sub_dir, depth + 1)
+        current_sub_dirs = set(sub_dirs)
+        for watched_dir in [d for d in self._dir_mtimes if os.path.dirname(d) == dir_path and d not in current_sub_dirs]:
+            self._remove_folder(watched_dir)
+
+    def _remove_folder(self, dir_path: str):
+        prefix = os.path.join(dir_path, "")
+        for watched_dir in [d for d in self._dir_mtimes if d == dir_path or d.startswith(prefix)]:
+            del self._dir_mtimes[watched_dir]
+            del self._dir_depths[watched_dir]
+            del self._dir_files[watched_dir]
+        for path in [p for p in self._pending if p.startswith(prefix)]:
+            del self._pending[path]
+
+    def _check_pending_files(self):
+        now = time.monotonic()
+        for path, pending in list(self._pending.items()):
+            try:
+                stat_result = os.stat(path)
+            except OSError:
+                del self._pending[path]
+                continue
+            file_stat = (stat_result.st_size, stat_result.st_mtime_ns)
+            if file_stat != pending["stat"]:
+                pending["stat"] = file_stat
+                pending["stable_since"] = now
+                continue
+            if now - pending["stable_since"] < self.settle_seconds or file_stat[0] == 0 or not self._can_open(path):
+                continue
+            del self._pending[path]
+            dir_files = self._dir_files.get(os.path.dirname(path))
+            if dir_files is not None:
+                dir_files[path] = file_stat
+            self._stats["files_ready"] += 1
+            self.on_file_ready(path, pending["first_seen"])
+
+    @staticmethod
+    def _can_open(path: str) -> bool:
+        # スキャナーのソフトが書き込み中のファイルは (Windows では) 開けないことがある
+        try:
+            with open(path, "rb") as f:
+                f.read(1)
+            return True
+        except OSError:
+            return False
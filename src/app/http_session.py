@@ -0,0 +1,195 @@
+# http_session.py
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from rate_limiter import RateLimiterRegistry
+
+# 接続プール設定のデフォルト値
+DEFAULT_POOL_CONNECTIONS = 10   # キャッシュするホスト別プールの数
+DEFAULT_POOL_MAXSIZE = 4        # ホストあたりの最大接続数
+POOL_MAXSIZE_HEADROOM = 2       # 削除・仕分けなど、ファイル処理以外の呼び出し用の余裕分
+MAX_POOL_MAXSIZE = 64           # 同時処理数をどれだけ増やしても、これ以上の接続は張らない (超過分は空き待ち)
+
+
+class _ConnectionStats:
+    """送信リクエスト数と実際に確立したTCP接続数をホスト別に数える (スレッドセーフ)。"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._requests_by_host: Dict[str, int] = {}
+            self._new_connections_by_host: Dict[str, int] = {}
+
+    def record_request(self, host: str):
+        with self._lock:
+            self._requests_by_host[host] = self._requests_by_host.get(host, 0) + 1
+
+    def record_new_connection(self, host: str):
+        with self._lock:
+            self._new_connections_by_host[host] = self._new_connections_by_host.get(host, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            total_requests = sum(self._requests_by_host.values())
+            total_new_connections = sum(self._new_connections_by_host.values())
+            reused = max(0, total_requests - total_new_connections)
+            return {
+                "requests": total_requests,
+                "new_connections": total_new_connections,
+                "reused_connections": reused,
+                "reuse_ratio": round(reused / total_requests, 3) if total_requests else 0.0,
+                "by_host": {
+                    host: {"requests": count, "new_connections": self._new_connections_by_host.get(host, 0)}
+                    for host, count in self._requests_by_host.items()
+                },
+            }
+
+
+_stats = _ConnectionStats()
+
+# サーバーから返された Retry-After (秒) をスレッドごとに保持する。ポーリング処理が次回待機時間の決定に使用する。
+_retry_after_hint = threading.local()
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class _CountingHTTPConnection(HTTPConnection):
+    def connect(self):
+        _stats.record_new_connection(self.host)
+        return super().connect()
+
+
+class _CountingHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        _stats.record_new_connection(self.host)
+        return super().connect()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class _PooledHTTPAdapter(HTTPAdapter):
+    """新規接続の発生を計測する HTTPAdapter。pool_block=True でホスト別の接続上限を厳守する。
+    送信前に RateLimiterRegistry の送信枠を待つため、全APIクライアント・全ワーカーのリクエストが同じ制限に従う。"""
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _CountingHTTPConnectionPool, "https": _CountingHTTPSConnectionPool}
+
+    def send(self, request, **kwargs):
+        host = urlparse(request.url).hostname or ""
+        _stats.record_request(host)
+        # 組織ごとの送信レート制限 (設定済みのホストのみ)。429/503 を受けたら以降の送信レートを下げる
+        rate_limiter = RateLimiterRegistry.for_host(host)
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        response = super().send(request, **kwargs)
+        retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+        if retry_after is not None:
+            _retry_after_hint.value = retry_after
+        if rate_limiter is not None:
+            rate_limiter.record_response(response.status_code, retry_after)
+        return response
+
+
+class SharedHttpSession:
+    """全APIクライアントで共有する Keep-Alive 付きの requests.Session を管理する。
+
+    セッション自体は1つだけ生成し、プールサイズの変更時はアダプタのみを差し替えるため、
+    クライアントが保持しているセッション参照は常に有効です。
+    """
+    _lock = threading.Lock()
+    _session: Optional[requests.Session] = None
+    _pool_maxsize: int = 0
+
+    @classmethod
+    def _mount_adapters(cls, session: requests.Session, pool_maxsize: int):
+        for prefix in ("https://", "http://"):
+            old_adapter = session.adapters.get(prefix)
+            session.mount(prefix, _PooledHTTPAdapter(pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=pool_maxsize, pool_block=True))
+            if old_adapter is not None:
+                try: old_adapter.close()
+                except Exception: pass
+
+    @classmethod
+    def get(cls) -> requests.Session:
+        with cls._lock:
+            if cls._session is None:
+                cls._session = requests.Session()
+                cls._pool_maxsize = DEFAULT_POOL_MAXSIZE
+                cls._mount_adapters(cls._session, cls._pool_maxsize)
+            return cls._session
+
+    @classmethod
+    def configure_for_concurrency(cls, max_concurrent_files: Any, log_manager=None, max_concurrent_parts: Any = 1) -> requests.Session:
+        """ワーカーの同時処理数 (ファイル数 × 部品数) に合わせてホストあたりの接続上限を設定し、共有セッションを返す。"""
+        try:
+            concurrency = max(1, int(max_concurrent_files)) * max(1, int(max_concurrent_parts))
+        except (TypeError, ValueError):
+            concurrency = 1
+        pool_maxsize = min(MAX_POOL_MAXSIZE, max(DEFAULT_POOL_MAXSIZE, concurrency + POOL_MAXSIZE_HEADROOM))
+
+        session = cls.get()
+        with cls._lock:
+            if pool_maxsize != cls._pool_maxsize:
+                cls._mount_adapters(session, pool_maxsize)
+                cls._pool_maxsize = pool_maxsize
+                if log_manager:
+                    log_manager.debug(f"HTTP接続プールを再設定しました。ホストあたり最大接続数: {pool_maxsize}", context="HTTP_SESSION", pool_maxsize=pool_maxsize)
+        return session
+
+    @classmethod
+    def consume_retry_after(cls) -> Optional[float]:
+        """呼び出しスレッドで最後に受信した Retry-After (秒) を返し、保持値をクリアする。"""
+        value = getattr(_retry_after_hint, "value", None)
+        _retry_after_hint.value = None
+        return value
+
+    @classmethod
+    def get_pool_maxsize(cls) -> int:
+        return cls._pool_maxsize
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        stats = _stats.snapshot()
+        stats["pool_maxsize"] = cls._pool_maxsize
+        return stats
+
+    @classmethod
+    def reset_stats(cls):
+        _stats.reset()
+
+    @classmethod
+    def close(cls):
+        with cls._lock:
+            if cls._session is not None:
+                cls._session.close()
+                cls._session = None
+                cls._pool_maxsize = 0
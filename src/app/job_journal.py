@@ -0,0 +1,225 @@
+# job_journal.py
+
+import os
+import json
+import time
+import uuid
+import threading
+from typing import Optional, Dict, Any, List
+
+from appdirs import user_data_dir
+
+from app_constants import APP_NAME, APP_AUTHOR
+
+JOURNAL_FILE_NAME = "job_journal.jsonl"
+# ジャーナルファイルがこのサイズを超えたら、実行開始時に再開できる実行の状態のみへ詰め直す
+JOURNAL_COMPACT_THRESHOLD_BYTES = 8 * 1024 * 1024
+
+# ジャーナルに記録するイベント
+EVENT_RUN_STARTED = "run_started"
+EVENT_JOB_REGISTERED = "job_registered"
+EVENT_FILE_FINISHED = "file_finished"
+EVENT_RUN_FINISHED = "run_finished"
+
+
+def default_journal_path() -> str:
+    return os.path.join(user_data_dir(appname=APP_NAME, appauthor=APP_AUTHOR), JOURNAL_FILE_NAME)
+
+
+def _new_run_state(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "run_id": record.get("run_id"),
+        "profile_id": record.get("profile_id"),
+        "api_execution_mode": record.get("api_execution_mode"),
+        "input_root": record.get("input_root"),
+        "started": record.get("ts"),
+        "files": list(record.get("files") or []),
+        "completed": [],
+        "jobs": {},          # 元ファイルのパス -> {"part_count": 部品数, "job_ids": {部品番号(文字列): ジョブID}}
+        "finished": False,
+        "superseded": False,
+    }
+
+
+def replay_journal(lines: List[str]) -> Dict[str, Dict[str, Any]]:
+    """ジャーナルの各行を先頭から適用し、実行IDごとの最終状態を返す。
+
+    再開した実行は再開元の状態 (完了済みファイル・登録済みジョブ) を引き継ぎ、再開元は superseded となる。
+    書き込み途中で終了した末尾の行など、読み取れない行は無視する。
+    """
+    runs: Dict[str, Dict[str, Any]] = {}
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(record, dict): continue
+        event = record.get("event")
+        run = runs.get(record.get("run_id"))
+        if event == EVENT_RUN_STARTED:
+            run = _new_run_state(record)
+            parent = runs.get(record.get("resumed_from"))
+            if parent is not None:
+                parent["superseded"] = True
+                run["completed"] = list(parent["completed"])
+                run["jobs"] = {path: {"part_count": job["part_count"], "job_ids": dict(job["job_ids"])} for path, job in parent["jobs"].items()}
+            runs[run["run_id"]] = run
+        elif run is None:
+            continue
+        elif event == EVENT_JOB_REGISTERED:
+            job = run["jobs"].get(record.get("path"))
+            if job is None or job["part_count"] != record.get("part_count"):
+                job = run["jobs"][record.get("path")] = {"part_count": record.get("part_count"), "job_ids": {}}
+            job["job_ids"][str(record.get("part_idx"))] = record.get("job_id")
+        elif event == EVENT_FILE_FINISHED:
+            # 失敗したファイルのジョブは削除済み・期限切れの可能性があるため、再開時は最初から処理する
+            run["jobs"].pop(record.get("path"), None)
+            if record.get("success") and record.get("path") not in run["completed"]:
+                run["completed"].append(record.get("path"))
+        elif event == EVENT_RUN_FINISHED:
+            run["finished"] = True
+    return runs
+
+
+class JobJournal:
+    """OCR実行中のファイルごとの状態遷移と、サーバーに登録したジョブID (fullOcrJobId / receptionId / unitId) を
+    追記専用のJSON Lines ファイルに記録する (プロセス内で共有)。
+
+    アプリケーションの異常終了やPCの再起動で実行が完了しなかった場合、次回起動時にジャーナルを読み直し、
+    登録済みのジョブは再アップロードせずに結果の取得から、完了済みのファイルはスキップして再開できるようにする。
+    1行ごとに fsync するため、書き込み済みの記録は電源断でも失われない。
+    記録の失敗で処理を止めないよう、書き込みエラーは以後の記録を無効にするのみとする。
+    """
+    _lock = threading.Lock()
+    _path: Optional[str] = None
+    _file = None
+    _run_id: Optional[str] = None
+    _disabled_reason: Optional[str] = None
+
+    @classmethod
+    def configure(cls, path: Optional[str] = None):
+        with cls._lock:
+            new_path = path or cls._path or default_journal_path()
+            if new_path != cls._path:
+                cls._close_locked()
+                cls._path = new_path
+                cls._disabled_reason = None
+
+    @classmethod
+    def _close_locked(cls):
+        if cls._file is not None:
+            try: cls._file.close()
+            except OSError: pass
+            cls._file = None
+
+    @classmethod
+    def _append_locked(cls, record: Dict[str, Any]) -> bool:
+        if cls._disabled_reason is not None: return False
+        try:
+            if cls._file is None:
+                os.makedirs(os.path.dirname(cls._path), exist_ok=True)
+                cls._file = open(cls._path, "a", encoding="utf-8")
+                if cls._file.tell() > 0 and not cls._ends_with_newline_locked():
+                    # 前回の書き込み途中で終了した行の後ろに続けて書かないよう、改行で区切る
+                    cls._file.write("\n")
+            cls._file.write(json.dumps({"ts": time.time(), **record}, ensure_ascii=False) + "\n")
+            cls._file.flush()
+            os.fsync(cls._file.fileno())
+            return True
+        except OSError as e:
+            cls._disabled_reason = str(e)
+            cls._close_locked()
+            return False
+
+    @classmethod
+    def _ends_with_newline_locked(cls) -> bool:
+        with open(cls._path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    @classmethod
+    def _read_lines_locked(cls) -> List[str]:
+        try:
+            with open(cls._path, "r", encoding="utf-8", errors="replace") as f:
+                return f.readlines()
+        except OSError:
+            return []
+
+    @classmethod
+    def begin_run(cls, profile_id: Optional[str], api_execution_mode: Optional[str], input_root: str, file_paths: List[str],
+                  resumed_from: Optional[str] = None) -> Optional[str]:
+        """実行の開始を記録し、実行IDを返す。記録できない場合は None。"""
+        cls.configure()
+        with cls._lock:
+            if cls._run_id is None:
+                cls._compact_locked()
+            run_id = uuid.uuid4().hex
+            ok = cls._append_locked({"event": EVENT_RUN_STARTED, "run_id": run_id, "profile_id": profile_id, "api_execution_mode": api_execution_mode, "input_root": os.path.normpath(input_root) if input_root else input_root,
+                                     "files": list(file_paths), "resumed_from": resumed_from})
+            cls._run_id = run_id if ok else None
+            return cls._run_id
+
+    @classmethod
+    def record_job_registered(cls, path: str, part_idx: int, part_count: int, job_id: str):
+        with cls._lock:
+            if cls._run_id is None: return
+            cls._append_locked({"event": EVENT_JOB_REGISTERED, "run_id": cls._run_id, "path": path, "part_idx": part_idx, "part_count": part_count, "job_id": job_id})
+
+    @classmethod
+    def record_file_finished(cls, path: str, success: bool):
+        with cls._lock:
+            if cls._run_id is None: return
+            cls._append_locked({"event": EVENT_FILE_FINISHED, "run_id": cls._run_id, "path": path, "success": bool(success)})
+
+    @classmethod
+    def end_run(cls, interrupted: bool):
+        """実行の終了 (中止・エラー停止を含む) を記録する。終了を記録した実行は再開の対象にしない。"""
+        with cls._lock:
+            if cls._run_id is None: return
+            cls._append_locked({"event": EVENT_RUN_FINISHED, "run_id": cls._run_id, "interrupted": bool(interrupted)})
+            cls._run_id = None
+            cls._close_locked()
+
+    @classmethod
+    def find_interrupted_run(cls, profile_id: Optional[str], api_execution_mode: Optional[str], input_root: str) -> Optional[Dict[str, Any]]:
+        """同じプロファイル・実行モード・入力フォルダで、終了を記録しないまま途絶えた最新の実行の状態を返す。"""
+        cls.configure()
+        normalized_root = os.path.normpath(input_root) if input_root else input_root
+        with cls._lock:
+            runs = replay_journal(cls._read_lines_locked())
+            candidates = [run for run in runs.values()
+                          if not run["finished"] and not run["superseded"] and run["run_id"] != cls._run_id
+                          and run["profile_id"] == profile_id and run["api_execution_mode"] == api_execution_mode and run["input_root"] == normalized_root]
+        return max(candidates, key=lambda run: run["started"] or 0) if candidates else None
+
+    @classmethod
+    def _compact_locked(cls):
+        """大きくなったジャーナルを、再開できる実行の現在の状態のみを記録した内容に置き換える。(実行中でないときにロック内で呼ぶ)"""
+        try:
+            if os.path.getsize(cls._path) <= JOURNAL_COMPACT_THRESHOLD_BYTES: return
+        except OSError:
+            return
+        records = []
+        for run in replay_journal(cls._read_lines_locked()).values():
+            if run["finished"] or run["superseded"]: continue
+            records.append({"ts": run["started"], "event": EVENT_RUN_STARTED, "run_id": run["run_id"], "profile_id": run["profile_id"],
+                            "api_execution_mode": run["api_execution_mode"], "input_root": run["input_root"], "files": run["files"], "resumed_from": None})
+            for path, job in run["jobs"].items():
+                records.extend({"ts": run["started"], "event": EVENT_JOB_REGISTERED, "run_id": run["run_id"], "path": path,
+                                "part_idx": int(part_idx), "part_count": job["part_count"], "job_id": job_id} for part_idx, job_id in job["job_ids"].items())
+            records.extend({"ts": run["started"], "event": EVENT_FILE_FINISHED, "run_id": run["run_id"], "path": path, "success": True} for path in run["completed"])
+        cls._close_locked()
+        temp_path = cls._path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, cls._path)
+        except OSError:
+            pass
+
+    @classmethod
+    def get_disabled_reason(cls) -> Optional[str]:
+        with cls._lock:
+            return cls._disabled_reason
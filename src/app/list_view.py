@@ -1,71 +1,292 @@
 # list_view.py
 
+from typing import Optional
+
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QTableWidget, QTableWidgetItem, QHeaderView,
-    QAbstractItemView, QCheckBox, QHBoxLayout
+    QWidget, QVBoxLayout, QTableView, QHeaderView, QAbstractItemView
 )
-from PyQt6.QtCore import Qt, pyqtSignal, QTimer
-from PyQt6.QtGui import QColor, QPalette
+from PyQt6.QtCore import Qt, pyqtSignal, QTimer, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+from PyQt6.QtGui import QColor, QPalette, QFont
 
 from config_manager import ConfigManager
 from file_model import FileInfo
+from app_constants import OCR_STATUS_SKIPPED_SIZE_LIMIT
+
+# 列の並び
+COLUMN_HEADERS = ["☑", "No", "ファイル名", "ステータス", "OCR結果", "JSON", "CSV", "サーチャブルPDF", "ページ数", "サイズ(MB)"]
+COL_CHECK, COL_NO, COL_NAME, COL_STATUS, COL_OCR_RESULT, COL_JSON, COL_CSV, COL_PDF, COL_PAGE_COUNT, COL_SIZE = range(len(COLUMN_HEADERS))
+
+# 並べ替えに使う値 (No・ページ数・サイズは数値で比較する)
+SORT_KEY_ROLE = Qt.ItemDataRole.UserRole + 1
+
+
+def _is_error_text(text: str, include_interrupted: bool = True) -> bool:
+    return "失敗" in text or "エラー" in text or (include_interrupted and "中断" in text)
+
+
+def _row_snapshot(file_info: FileInfo) -> tuple:
+    """表示に使う値の組。前回の更新時から変わった行だけを再描画するために比較する。"""
+    return (file_info.no, file_info.name, file_info.size, file_info.status, file_info.ocr_engine_status, file_info.ocr_result_summary,
+            file_info.json_status, file_info.auto_csv_status, file_info.searchable_pdf_status, file_info.page_count, file_info.is_checked)
+
+
+class FileListTableModel(QAbstractTableModel):
+    """FileInfo のリストを表示するテーブルモデル。
+
+    行は FileInfo のリストの順 (元のインデックス) で、並べ替えは ListView の QSortFilterProxyModel が行う。
+    update_files() に同じ FileInfo の並びが渡された場合はモデルを作り直さず、表示内容が変わった行についてのみ
+    dataChanged を通知する (処理中に一定間隔で呼ばれても、変わっていない行は再描画しない)。
+    """
+    # チェック状態を変更した行 (元のインデックス) と新しい状態
+    check_state_changed = pyqtSignal(int, bool)
+    # 全選択・全解除など、複数の行のチェック状態をまとめて変更した
+    check_states_changed = pyqtSignal()
+
+    def __init__(self, files_data: list[FileInfo] = None, parent=None):
+        super().__init__(parent)
+        self._files: list[FileInfo] = list(files_data or [])
+        self._snapshots: list[tuple] = [_row_snapshot(f) for f in self._files]
+        self._checkable = True
+        self._error_color = QColor("red")
+        self._check_header_font = QFont()
+        self._check_header_font.setBold(True)
+
+    # --- データの更新 ---
+    def update_files(self, files_data: list[FileInfo], is_running: bool = False) -> int:
+        """表示するファイル一覧を更新し、再描画を通知した行数を返す。"""
+        checkable = not is_running
+        prefix_unchanged = len(files_data) >= len(self._files) and all(new is old for new, old in zip(files_data, self._files))
+        if prefix_unchanged and len(files_data) > len(self._files) and checkable == self._checkable:
+            # 末尾への追加 (スキャン途中の一覧の反映) は、既存行をリセットせずに行を挿入する
+            changed_rows = self._collect_changed_rows()
+            first_new_row = len(self._files)
+            self.beginInsertRows(QModelIndex(), first_new_row, len(files_data) - 1)
+            self._files.extend(files_data[first_new_row:])
+            self._snapshots.extend(_row_snapshot(f) for f in files_data[first_new_row:])
+            self.endInsertRows()
+            self._emit_rows_changed(changed_rows)
+            return len(files_data) - first_new_row + len(changed_rows)
+        if not prefix_unchanged or len(files_data) != len(self._files):
+            self.beginResetModel()
+            self._files = list(files_data)
+            self._snapshots = [_row_snapshot(f) for f in self._files]
+            self._checkable = checkable
+            self.endResetModel()
+            return len(self._files)
+
+        changed_rows = self._collect_changed_rows()
+        self._emit_rows_changed(changed_rows)
+        if checkable != self._checkable:
+            self._checkable = checkable
+            self._emit_column_changed(COL_CHECK)
+        return len(changed_rows)
+
+    def _collect_changed_rows(self) -> list[int]:
+        """前回の通知から表示内容が変わった行を返し、保持している内容を更新する。"""
+        changed_rows = []
+        for row, file_info in enumerate(self._files):
+            snapshot = _row_snapshot(file_info)
+            if snapshot != self._snapshots[row]:
+                self._snapshots[row] = snapshot
+                changed_rows.append(row)
+        return changed_rows
+
+    def set_checkable(self, is_checkable: bool):
+        if is_checkable != self._checkable:
+            self._checkable = is_checkable
+            self._emit_column_changed(COL_CHECK)
+
+    def _emit_rows_changed(self, rows: list[int]):
+        """連続する行をまとめて dataChanged を通知する。"""
+        if not rows: return
+        last_column = self.columnCount() - 1
+        range_start = previous = rows[0]
+        for row in rows[1:] + [None]:
+            if row is not None and row == previous + 1:
+                previous = row
+                continue
+            self.dataChanged.emit(self.index(range_start, 0), self.index(previous, last_column))
+            if row is not None:
+                range_start = previous = row
+
+    def _emit_column_changed(self, column: int):
+        if self._files:
+            self.dataChanged.emit(self.index(0, column), self.index(len(self._files) - 1, column))
+
+    def file_at(self, row: int) -> Optional[FileInfo]:
+        return self._files[row] if 0 <= row < len(self._files) else None
+
+    def files(self) -> list[FileInfo]:
+        return self._files
+
+    def is_row_checkable(self, row: int) -> bool:
+        return self._checkable and self._files[row].ocr_engine_status != OCR_STATUS_SKIPPED_SIZE_LIMIT
+
+    def set_all_checked(self, is_checked: bool) -> bool:
+        """チェックを変更できる全行のチェック状態を変更する。変更した行があれば True。"""
+        changed_rows = []
+        for row, file_info in enumerate(self._files):
+            if self.is_row_checkable(row) and file_info.is_checked != is_checked:
+                file_info.is_checked = is_checked
+                self._snapshots[row] = _row_snapshot(file_info)
+                changed_rows.append(row)
+        if not changed_rows: return False
+        self._emit_column_changed(COL_CHECK)
+        self.check_states_changed.emit()
+        return True
+
+    # --- QAbstractTableModel ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._files)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMN_HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation != Qt.Orientation.Horizontal or not (0 <= section < len(COLUMN_HEADERS)):
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return COLUMN_HEADERS[section]
+        if section == COL_CHECK and role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        if section == COL_CHECK and role == Qt.ItemDataRole.FontRole:
+            return self._check_header_font
+        if section == COL_CHECK and role == Qt.ItemDataRole.ToolTipRole:
+            return "クリックで全選択 / 全解除"
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        if index.column() == COL_CHECK and self.is_row_checkable(index.row()):
+            flags |= Qt.ItemFlag.ItemIsUserCheckable
+        return flags
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or not (0 <= index.row() < len(self._files)):
+            return None
+        file_info = self._files[index.row()]
+        column = index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._display_text(file_info, column)
+        if role == Qt.ItemDataRole.CheckStateRole and column == COL_CHECK:
+            return Qt.CheckState.Checked if file_info.is_checked else Qt.CheckState.Unchecked
+        if role == SORT_KEY_ROLE:
+            if column == COL_NO: return file_info.no
+            if column == COL_PAGE_COUNT: return file_info.page_count if file_info.page_count is not None else -1
+            if column == COL_SIZE: return file_info.size
+            if column == COL_CHECK: return int(file_info.is_checked)
+            return self._display_text(file_info, column)
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            if column in (COL_NO, COL_PAGE_COUNT):
+                return Qt.AlignmentFlag.AlignCenter
+            if column == COL_SIZE:
+                return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+            return None
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return self._error_color if self._is_error_cell(file_info, column) else None
+        if role == Qt.ItemDataRole.ToolTipRole and column == COL_CHECK and file_info.ocr_engine_status == OCR_STATUS_SKIPPED_SIZE_LIMIT:
+            return "サイズ上限のため処理対象外です"
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or index.column() != COL_CHECK or role != Qt.ItemDataRole.CheckStateRole:
+            return False
+        row = index.row()
+        if not self.is_row_checkable(row):
+            return False
+        is_checked = Qt.CheckState(value) == Qt.CheckState.Checked if isinstance(value, int) else value == Qt.CheckState.Checked
+        file_info = self._files[row]
+        if file_info.is_checked == is_checked:
+            return True
+        file_info.is_checked = is_checked
+        self._snapshots[row] = _row_snapshot(file_info)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.CheckStateRole])
+        self.check_state_changed.emit(row, is_checked)
+        return True
+
+    @staticmethod
+    def _display_text(file_info: FileInfo, column: int):
+        if column == COL_NO: return str(file_info.no)
+        if column == COL_NAME: return file_info.name
+        if column == COL_STATUS: return file_info.status
+        if column == COL_OCR_RESULT: return file_info.ocr_result_summary
+        if column == COL_JSON: return file_info.json_status
+        if column == COL_CSV: return file_info.auto_csv_status
+        if column == COL_PDF: return file_info.searchable_pdf_status
+        if column == COL_PAGE_COUNT: return str(file_info.page_count) if file_info.page_count is not None else "-"
+        if column == COL_SIZE: return f"{file_info.size / (1024 * 1024):,.3f} MB"
+        return None
+
+    @staticmethod
+    def _is_error_cell(file_info: FileInfo, column: int) -> bool:
+        if column == COL_STATUS: return _is_error_text(file_info.status)
+        if column == COL_JSON: return _is_error_text(file_info.json_status)
+        if column == COL_CSV: return _is_error_text(file_info.auto_csv_status, include_interrupted=False)
+        if column == COL_PDF:
+            pdf_status = file_info.searchable_pdf_status
+            return (_is_error_text(pdf_status) and "部品PDFは結合されません(設定)" not in pdf_status
+                    and "個の部品PDF出力成功" not in pdf_status)
+        return False
 
 
-class NumericTableWidgetItem(QTableWidgetItem):
-    def __init__(self, text, sort_key_value):
-        super().__init__(text)
-        self.sort_key_value = sort_key_value
-
-    def __lt__(self, other):
-        if isinstance(other, NumericTableWidgetItem):
-            return self.sort_key_value < other.sort_key_value
-        return super().__lt__(other)
-
 class ListView(QWidget):
     item_check_state_changed = pyqtSignal(int, bool)
+    # 全選択・全解除で複数の行のチェック状態が変わった (FileInfo.is_checked は更新済み)
+    all_check_states_changed = pyqtSignal()
 
     def __init__(self, initial_file_list_data: list[FileInfo] = None):
         super().__init__()
         self.config = ConfigManager.load()
         self.file_list_data: list[FileInfo] = initial_file_list_data if initial_file_list_data is not None else []
-        self._suspend_item_changed_signal = False
         self.init_ui()
 
     def init_ui(self):
         layout = QVBoxLayout(self)
-        self.table = QTableWidget()
-        self.table.setColumnCount(10)
-        self.table.setHorizontalHeaderLabels(["☑", "No", "ファイル名", "ステータス", "OCR結果", "JSON", "CSV", "サーチャブルPDF", "ページ数", "サイズ(MB)"])
+        self.model = FileListTableModel(self.file_list_data, self)
+        self.model.check_state_changed.connect(self.item_check_state_changed)
+        self.model.check_states_changed.connect(self.all_check_states_changed)
+        self.proxy_model = QSortFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.model)
+        self.proxy_model.setSortRole(SORT_KEY_ROLE)
+
+        self.table = QTableView()
+        self.table.setModel(self.proxy_model)
         self.table.verticalHeader().setVisible(False)
+        # 行の高さを内容から計算しない (大量の行でもスクロール・更新が重くならないようにする)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
         self.table.setAlternatingRowColors(True)
-        
+        self.table.setWordWrap(False)
+
         current_palette = self.palette()
         base_color = current_palette.color(QPalette.ColorRole.Base).name()
         alternate_base_color = "#f5f5f5"
         highlight_color = current_palette.color(QPalette.ColorRole.Highlight).name()
         highlighted_text_color = current_palette.color(QPalette.ColorRole.HighlightedText).name()
-        
+
         self.table.setStyleSheet(f"""
-            QHeaderView::section {{ 
-                background-color: #f0f0f0; 
-                padding: 4px; 
-                border: 1px solid #d0d0d0; 
+            QHeaderView::section {{
+                background-color: #f0f0f0;
+                padding: 4px;
+                border: 1px solid #d0d0d0;
             }}
-            QTableWidget {{ 
-                gridline-color: #e0e0e0; 
+            QTableView {{
+                gridline-color: #e0e0e0;
                 alternate-background-color: {alternate_base_color}; /* 固定色を適用 */
                 background-color: {base_color};
                 outline: 0;
             }}
-            QTableWidget::item {{ 
-                padding: 3px; 
+            QTableView::item {{
+                padding: 3px;
                 border: 1px solid transparent;
             }}
-            QTableWidget::item:focus {{
+            QTableView::item:focus {{
                 border: 1px solid transparent;
                 outline: 0;
             }}
-            QTableWidget::item:selected {{
+            QTableView::item:selected {{
                 background-color: {highlight_color};
                 color: {highlighted_text_color};
             }}
@@ -75,206 +296,66 @@ class ListView(QWidget):
 
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
-        self.table.setColumnWidth(0, 35)
-        header.setSectionResizeMode(0, QHeaderView.ResizeMode.Fixed)
+        self.table.setColumnWidth(COL_CHECK, 35)
+        header.setSectionResizeMode(COL_CHECK, QHeaderView.ResizeMode.Fixed)
         header.setSectionsClickable(True)
         header.sectionClicked.connect(self.on_header_section_clicked)
-        
-        col0_header_item_text = "☑"
-        actual_header_item_col0 = QTableWidgetItem(col0_header_item_text)
-        font = self.table.horizontalHeader().font()
-        font.setBold(True)
-        actual_header_item_col0.setFont(font)
-        actual_header_item_col0.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.table.setHorizontalHeaderItem(0, actual_header_item_col0)
 
         self.table.setSortingEnabled(True)
-        self.table.horizontalHeader().sortIndicatorChanged.connect(self.handle_sort_indicator_changed)
+        header.sortIndicatorChanged.connect(self.handle_sort_indicator_changed)
 
         self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
-        # itemChanged はもうチェックボックスには使わないが、他のセルで使う可能性を考慮して残す
-        self.table.itemChanged.connect(self.on_item_changed)
 
         layout.addWidget(self.table)
         self.setLayout(layout)
 
-        self.populate_table(self.file_list_data)
         self.restore_column_widths()
         self.apply_sort_order(default_to_skip_col0=True)
 
     def get_sorted_file_info_list(self) -> list[FileInfo]:
-        sorted_list = []
+        """表示中の並び順の FileInfo のリストを返す。"""
         if not (hasattr(self, 'table') and self.table):
             return self.file_list_data
+        sorted_list = []
+        for visual_row_index in range(self.proxy_model.rowCount()):
+            source_row = self.proxy_model.mapToSource(self.proxy_model.index(visual_row_index, COL_NO)).row()
+            file_info = self.model.file_at(source_row)
+            if file_info is not None:
+                sorted_list.append(file_info)
 
-        for visual_row_index in range(self.table.rowCount()):
-            no_item = self.table.item(visual_row_index, 1)
-            if no_item:
-                try:
-                    file_no = int(no_item.text())
-                    found_file_info = next((f for f in self.file_list_data if f.no == file_no), None)
-                    if found_file_info:
-                        sorted_list.append(found_file_info)
-                except (ValueError, StopIteration):
-                    continue
-        
         if len(sorted_list) != len(self.file_list_data):
             return self.file_list_data
-            
+
         return sorted_list
-        
+
+    def get_selected_file_info(self) -> Optional[FileInfo]:
+        """1行だけ選択されている場合、その行の FileInfo を返す。"""
+        selected_rows = self.table.selectionModel().selectedRows()
+        if len(selected_rows) != 1:
+            return None
+        return self.model.file_at(self.proxy_model.mapToSource(selected_rows[0]).row())
+
     def set_checkboxes_enabled(self, is_enabled: bool):
-        for row in range(self.table.rowCount()):
-            cell_widget = self.table.cellWidget(row, 0)
-            if cell_widget:
-                checkbox = cell_widget.findChild(QCheckBox)
-                if checkbox:
-                    no_item = self.table.item(row, 1)
-                    if not no_item: continue
-                    try:
-                        file_no = int(no_item.text())
-                        file_info = next((f for f in self.file_list_data if f.no == file_no), None)
-                        if not file_info: continue
-                        
-                        original_is_disabled_by_logic = (file_info.ocr_engine_status == "対象外(サイズ上限)")
-                        if is_enabled and not original_is_disabled_by_logic:
-                            checkbox.setEnabled(True)
-                        elif not is_enabled:
-                            checkbox.setEnabled(False)
-                    except (ValueError, StopIteration):
-                        continue
+        self.model.set_checkable(is_enabled)
 
     def handle_sort_indicator_changed(self, logical_index, order):
-        if logical_index == 0:
+        if logical_index == COL_CHECK:
             QTimer.singleShot(0, lambda: self.table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder))
 
     def on_header_section_clicked(self, logical_index):
-        if logical_index == 0:
+        if logical_index == COL_CHECK:
             self.toggle_all_checkboxes()
 
     def toggle_all_checkboxes(self):
-        is_currently_all_checked = True
-        found_editable_checkbox = False
-        for row in range(self.table.rowCount()):
-            cell_widget = self.table.cellWidget(row, 0)
-            if cell_widget:
-                checkbox = cell_widget.findChild(QCheckBox)
-                if checkbox and checkbox.isEnabled():
-                    found_editable_checkbox = True
-                    if not checkbox.isChecked():
-                        is_currently_all_checked = False
-                        break
-        
-        if not found_editable_checkbox:
-            return
-
-        new_check_state = not is_currently_all_checked
-        
-        for row in range(self.table.rowCount()):
-            cell_widget = self.table.cellWidget(row, 0)
-            if cell_widget:
-                checkbox = cell_widget.findChild(QCheckBox)
-                if checkbox and checkbox.isEnabled():
-                    checkbox.setChecked(new_check_state)
-
-    def on_checkbox_state_changed(self, file_no: int, state: int):
-        is_checked = (state == Qt.CheckState.Checked.value)
-        
-        target_file_info = next((f for f in self.file_list_data if f.no == file_no), None)
-        if target_file_info:
-            target_file_info.is_checked = is_checked
-            try:
-                original_idx = self.file_list_data.index(target_file_info)
-                self.item_check_state_changed.emit(original_idx, is_checked)
-            except ValueError:
-                pass # リストにない場合は何もしない
-
-    def on_item_changed(self, item: QTableWidgetItem):
-        # このメソッドはもうチェックボックスには使用されませんが、
-        # 将来的に他のセルを編集可能にする可能性を考慮して残しておきます。
-        if self._suspend_item_changed_signal:
+        checkable_rows = [row for row in range(self.model.rowCount()) if self.model.is_row_checkable(row)]
+        if not checkable_rows:
             return
-        # print(f"Item changed: row {item.row()}, col {item.column()}")
+        is_currently_all_checked = all(self.model.file_at(row).is_checked for row in checkable_rows)
+        self.model.set_all_checked(not is_currently_all_checked)
 
     def populate_table(self, files_data: list[FileInfo], is_running: bool = False):
-        self._suspend_item_changed_signal = True
-        self.table.setUpdatesEnabled(False)
-        current_sorting_enabled_state = self.table.isSortingEnabled() 
-        self.table.setSortingEnabled(False) 
-        try:
-            self.file_list_data = files_data
-            self.table.setRowCount(0)
-            self.table.setRowCount(len(self.file_list_data))
-            
-            error_color = QColor("red")
-
-            for idx, file_info in enumerate(self.file_list_data):
-                cell_widget = QWidget()
-                layout = QHBoxLayout(cell_widget)
-                layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-                layout.setContentsMargins(0, 0, 0, 0)
-                
-                checkbox = QCheckBox()
-                checkbox.setChecked(file_info.is_checked)
-                
-                # stateChangedシグナルに、ファイル番号(no)と新しい状態を渡すラムダを接続
-                checkbox.stateChanged.connect(
-                    lambda state, fn=file_info.no: self.on_checkbox_state_changed(fn, state)
-                )
-
-                is_disabled_by_logic = (file_info.ocr_engine_status == "対象外(サイズ上限)")
-                if is_running or is_disabled_by_logic:
-                    checkbox.setEnabled(False)
-                if is_disabled_by_logic:
-                    checkbox.setToolTip("サイズ上限のため処理対象外です")
-
-                layout.addWidget(checkbox)
-                self.table.setCellWidget(idx, 0, cell_widget)
-
-                no_value = file_info.no
-                no_item = NumericTableWidgetItem(str(no_value), no_value)
-                no_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                self.table.setItem(idx, 1, no_item)
-
-                self.table.setItem(idx, 2, QTableWidgetItem(file_info.name))
-                status_item = QTableWidgetItem(file_info.status)
-                if "失敗" in file_info.status or "エラー" in file_info.status or "中断" in file_info.status: status_item.setForeground(error_color)
-                self.table.setItem(idx, 3, status_item)
-                self.table.setItem(idx, 4, QTableWidgetItem(file_info.ocr_result_summary))
-                json_status_item = QTableWidgetItem(file_info.json_status)
-                if "失敗" in file_info.json_status or "エラー" in file_info.json_status or "中断" in file_info.json_status: json_status_item.setForeground(error_color)
-                self.table.setItem(idx, 5, json_status_item)
-
-                auto_csv_status_item = QTableWidgetItem(file_info.auto_csv_status)
-                if "失敗" in file_info.auto_csv_status or "エラー" in file_info.auto_csv_status:
-                    auto_csv_status_item.setForeground(error_color)
-                self.table.setItem(idx, 6, auto_csv_status_item)
-
-                pdf_status_item = QTableWidgetItem(file_info.searchable_pdf_status)
-                if ("失敗" in file_info.searchable_pdf_status or "エラー" in file_info.searchable_pdf_status or "中断" in file_info.searchable_pdf_status) and "部品PDFは結合されません(設定)" not in file_info.searchable_pdf_status and "個の部品PDF出力成功" not in file_info.searchable_pdf_status : 
-                    pdf_status_item.setForeground(error_color)
-                self.table.setItem(idx, 7, pdf_status_item)
-
-                page_count_value = file_info.page_count
-                if page_count_value is not None:
-                    page_count_item = NumericTableWidgetItem(str(page_count_value), page_count_value)
-                    page_count_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                else:
-                    page_count_item = QTableWidgetItem("-")
-                    page_count_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                self.table.setItem(idx, 8, page_count_item)
-                
-                size_bytes = file_info.size
-                size_mb = size_bytes / (1024 * 1024)
-                size_mb_display_text = f"{size_mb:,.3f} MB"
-                size_item = NumericTableWidgetItem(size_mb_display_text, size_bytes)
-                size_item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
-                self.table.setItem(idx, 9, size_item)
-
-        finally:
-            self.table.setSortingEnabled(current_sorting_enabled_state) 
-            self.table.setUpdatesEnabled(True)
-            self._suspend_item_changed_signal = False
+        self.file_list_data = files_data
+        self.model.update_files(files_data, is_running)
 
     def update_files(self, files_data: list[FileInfo], is_running: bool = False):
         self.populate_table(files_data, is_running)
@@ -282,51 +363,42 @@ class ListView(QWidget):
     def restore_column_widths(self):
         default_widths = [35, 50, 280, 100, 270, 100, 100, 120, 60, 100]
         widths = self.config.get("column_widths", default_widths)
-        if len(widths) != self.table.columnCount():
+        if len(widths) != self.model.columnCount():
             widths = default_widths
         for i, width in enumerate(widths):
-            if 0 <= i < self.table.columnCount():
+            if 0 <= i < self.model.columnCount():
                 self.table.setColumnWidth(i, width)
 
     def apply_sort_order(self, default_to_skip_col0=False):
-        if not (hasattr(self, 'table') and self.table and self.table.rowCount() > 0):
+        if not (hasattr(self, 'table') and self.table):
             return
-        
-        default_sort_column = 1
+
+        default_sort_column = COL_NO
         default_sort_order_str = "asc"
         last_sort_config = self.config.get("sort_order", {"column": default_sort_column, "order": default_sort_order_str})
-        
+
         column_to_sort = last_sort_config.get("column", default_sort_column)
-        
-        if default_to_skip_col0 and column_to_sort == 0:
+
+        if default_to_skip_col0 and column_to_sort == COL_CHECK:
             column_to_sort = default_sort_column
 
-        if not (0 <= column_to_sort < self.table.columnCount()):
+        if not (0 <= column_to_sort < self.model.columnCount()):
             column_to_sort = default_sort_column
 
         order_str = last_sort_config.get("order", default_sort_order_str)
         sort_order_qt = Qt.SortOrder.AscendingOrder if order_str == "asc" else Qt.SortOrder.DescendingOrder
-        
-        current_sorting_enabled = self.table.isSortingEnabled()
-        if not current_sorting_enabled:
-            self.table.setSortingEnabled(True)
-        
-        self.table.sortItems(column_to_sort, sort_order_qt)
-        
-        if not current_sorting_enabled:
-            self.table.setSortingEnabled(False)
-
+        self.table.sortByColumn(column_to_sort, sort_order_qt)
 
     def get_column_widths(self):
-        if hasattr(self, 'table') and self.table and self.table.columnCount() > 0:
-            return [self.table.columnWidth(i) for i in range(self.table.columnCount())]
+        if hasattr(self, 'table') and self.table and self.model.columnCount() > 0:
+            return [self.table.columnWidth(i) for i in range(self.model.columnCount())]
         return self.config.get("column_widths", [35, 50, 280, 100, 270, 100, 120, 60, 100])
 
     def get_sort_order(self):
         if hasattr(self, 'table') and self.table and self.table.horizontalHeader().isSortIndicatorShown():
             header = self.table.horizontalHeader()
             current_sort_section = header.sortIndicatorSection()
-            if current_sort_section == 0:
-                return self.config.get("sort_order", {"column": 1, "order": "asc"})
+            if current_sort_section == COL_CHECK:
+                return self.config.get("sort_order", {"column": COL_NO, "order": "asc"})
             return {"column": current_sort_section, "order": "asc" if header.sortIndicatorOrder() == Qt.SortOrder.AscendingOrder else "desc"}
-        return self.config.get("sort_order", {"column": 1, "order": "asc"})
\ No newline at end of file
+        return self.config.get("sort_order", {"column": COL_NO, "order": "asc"})
@@ -1,9 +1,9 @@
 import os
 import json
 import datetime
-from PyQt6.QtCore import QObject, pyqtSignal
 from appdirs import user_log_dir
 from app_constants import APP_NAME, APP_AUTHOR
+from log_writer import AsyncLogWriter, log_file_path_for_date, DEFAULT_FLUSH_TIMEOUT_SECONDS
 
 try:
     LOG_DIR_PATH = user_log_dir(appname=APP_NAME, appauthor=APP_AUTHOR)
@@ -21,12 +21,12 @@ except Exception as e:
 class LogLevel:
     INFO = "INFO"; ERROR = "ERROR"; DEBUG = "DEBUG"; WARNING = "WARNING"
 
-class LogManager(QObject):
-    log_message_signal = pyqtSignal(str, str)
+class LogManager:
+    """JSON Lines 形式のログファイルへの出力 (Qt に依存しない)。
 
+    GUI のログ表示欄へも出力する場合は ui_log_manager.QtLogManager を使う。
+    """
     def __init__(self, log_dir_override=None):
-        super().__init__()
-
         self.initialization_error: Exception | None = None # フォルダ作成失敗時のエラーを保持する
         
         if log_dir_override:
@@ -43,49 +43,62 @@ class LogManager(QObject):
             print(f"警告: ログディレクトリの作成に失敗しました: {self.log_dir}, Error: {e}")
         
         self.current_log_file_path = ""
+        # ファイルへの書き込みは同じフォルダを使う全インスタンスで共有する書き込みスレッドが行う
+        self._writer: AsyncLogWriter | None = None
+        if self.log_dir and not self.initialization_error:
+            self._writer = AsyncLogWriter.for_directory(self.log_dir)
         self._update_log_file_path()
 
     def _update_log_file_path(self):
-        today_str = datetime.datetime.now().strftime('%Y%m%d')
+        # 日付の切り替え (LOG_ROTATE の記録) は書き込みスレッドがエントリーの日付から行う
         if not self.log_dir:
             print("エラー: ログディレクトリが未設定のため、ログファイルパスを更新できません。")
             return self.current_log_file_path
-        new_log_file_path = os.path.join(self.log_dir, f"app_log-{today_str}.jsonl")
-        if self.current_log_file_path != new_log_file_path:
-            old_file = self.current_log_file_path; self.current_log_file_path = new_log_file_path
-            if old_file: self._write_log_entry_internal({"event": "LOG_ROTATE", "message": f"ログファイルを {os.path.basename(self.current_log_file_path)} に切り替え。"}, LogLevel.INFO, "SYSTEM_LOG", emit_to_ui=False)
+        self.current_log_file_path = log_file_path_for_date(self.log_dir, datetime.datetime.now().strftime('%Y%m%d'))
         return self.current_log_file_path
 
     def _write_log_entry_internal(self, log_data_dict, level, context, emit_to_ui=True):
-        timestamp = datetime.datetime.now().isoformat()
-        log_file_path = self._update_log_file_path()
+        now = datetime.datetime.now()
+        timestamp = now.isoformat()
+        ui_time = timestamp.split('T')[1].split('.')[0]
 
-        if not log_file_path or self.initialization_error:
+        if not self.log_dir or self.initialization_error or self._writer is None:
             print(f"警告: ログファイルパスが無効または初期化エラーのため、ログエントリーを書き込めません: Level={level}, Context={context}, Msg={log_data_dict.get('message')}")
             if emit_to_ui:
-                main_message_for_ui = log_data_dict.get('message', json.dumps(log_data_dict, ensure_ascii=False))
-                ui_msg_fmt_for_ui = f"[{timestamp.split('T')[1].split('.')[0]}] [{level}] [{context}] {main_message_for_ui}"
-                self.log_message_signal.emit(level, ui_msg_fmt_for_ui)
+                main_message_for_ui = log_data_dict.get('message', json.dumps(log_data_dict, ensure_ascii=False, default=str))
+                ui_msg_fmt_for_ui = f"[{ui_time}] [{level}] [{context}] {main_message_for_ui}"
+                self._emit_to_ui(level, ui_msg_fmt_for_ui)
             return
 
-        log_entry_for_file = {"timestamp": timestamp, "level": level, "context": context, **log_data_dict}
-        main_message = log_data_dict.get('message', json.dumps(log_data_dict, ensure_ascii=False))
-        ui_message_formatted = f"[{timestamp.split('T')[1].split('.')[0]}] [{level}] [{context}] {main_message}"
+        # 前回までに書き込みスレッドで発生した書き込みエラーを知らせる
+        pending_write_error = self._writer.take_write_error()
+        if pending_write_error and emit_to_ui:
+            self._emit_to_ui(LogLevel.ERROR, f"[{ui_time}] [ERROR] [LOGGING_ERROR] {pending_write_error}")
 
-        file_write_error = None
-        try:
-            with open(log_file_path, 'a', encoding='utf-8') as f:
-                json.dump(log_entry_for_file, f, ensure_ascii=False)
-                f.write("\n")
-        except Exception as e:
-            file_write_error = e
-            error_ui_message_for_file_io = f"[{timestamp.split('T')[1].split('.')[0]}] [ERROR] [LOGGING_ERROR] ログファイル書込エラー: {e} (Path: {log_file_path})"
-            print(error_ui_message_for_file_io)
-            if emit_to_ui:
-                self.log_message_signal.emit(LogLevel.ERROR, error_ui_message_for_file_io)
-
-        if emit_to_ui and not file_write_error:
-            self.log_message_signal.emit(level, ui_message_formatted)
+        # 整形はこのスレッドで行い (後から kwargs の中身が変わっても記録内容が変わらないように)、書き込みは待たない
+        log_entry_for_file = {"timestamp": timestamp, "level": level, "context": context, **log_data_dict}
+        line = json.dumps(log_entry_for_file, ensure_ascii=False, default=str)
+        self._writer.submit(now.strftime('%Y%m%d'), line, wait=(level == LogLevel.ERROR))
+
+        if emit_to_ui:
+            main_message = log_data_dict.get('message', json.dumps(log_data_dict, ensure_ascii=False, default=str))
+            self._emit_to_ui(level, f"[{ui_time}] [{level}] [{context}] {main_message}")
+
+    def flush(self, timeout: float = DEFAULT_FLUSH_TIMEOUT_SECONDS) -> bool:
+        """書き込み待ちのログをファイルへ書き込む (終了時などに呼ぶ)。時間内に終わった場合は True。"""
+        if self._writer is None:
+            return True
+        return self._writer.flush(timeout)
+
+    def get_stats(self) -> dict:
+        """ログ書き込みの件数 (受付・書込済み・破棄・書き込み待ち・書き込みエラー)。"""
+        if self._writer is None:
+            return {}
+        return self._writer.get_stats()
+
+    def _emit_to_ui(self, level, ui_message):
+        """ログ表示欄への出力。GUI を持たないこのクラスでは何もしない。"""
+        pass
 
     def info(self, message, context="APP", emit_to_ui=True, **kwargs):
         self._write_log_entry_internal({"message": message, **kwargs}, LogLevel.INFO, context, emit_to_ui=emit_to_ui)
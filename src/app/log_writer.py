@@ -0,0 +1,224 @@
+# log_writer.py
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import datetime
+import threading
+from typing import Optional, Dict, Any, List, Tuple
+
+# 書き込み待ちにできるログの件数。超えた分は破棄して件数を数える (ログ出力で処理を止めない)
+DEFAULT_LOG_QUEUE_MAX_ENTRIES = 10000
+# まとめて書き込む件数と、最初の1件を受け取ってから書き込むまでの最長時間
+LOG_BATCH_MAX_ENTRIES = 500
+LOG_BATCH_MAX_DELAY_SECONDS = 0.2
+# ERROR のログは、待ち行列が空くまでこの秒数だけ待つ
+ERROR_ENQUEUE_TIMEOUT_SECONDS = 1.0
+DEFAULT_FLUSH_TIMEOUT_SECONDS = 5.0
+
+_STOP = object()
+
+
+def log_file_path_for_date(log_dir: str, date_str: str) -> str:
+    return os.path.join(log_dir, f"app_log-{date_str}.jsonl")
+
+
+class AsyncLogWriter:
+    """ログファイル (日付ごとの JSON Lines) への書き込みを、専用のスレッドでまとめて行う。
+
+    呼び出し側 (ワーカースレッドなど) は整形済みの1行を有限の待ち行列へ入れるだけで、ディスクへの書き込みを待たない。
+    書き込みスレッドはファイルを開いたままにし、一定件数または一定時間ごとにまとめて書き込む。
+    同じフォルダへ書き込むインスタンスはプロセス内で1つ (for_directory) とし、終了時・未処理の例外の発生時に
+    書き込み待ちのログを書き出す。
+    """
+    _registry_lock = threading.Lock()
+    _writers: Dict[str, "AsyncLogWriter"] = {}
+    _hooks_installed = False
+
+    @classmethod
+    def for_directory(cls, log_dir: str) -> "AsyncLogWriter":
+        key = os.path.normcase(os.path.abspath(log_dir))
+        with cls._registry_lock:
+            writer = cls._writers.get(key)
+            if writer is None:
+                writer = cls._writers[key] = cls(log_dir)
+                cls._install_shutdown_hooks_locked()
+            return writer
+
+    @classmethod
+    def flush_all(cls, timeout: float = DEFAULT_FLUSH_TIMEOUT_SECONDS):
+        with cls._registry_lock:
+            writers = list(cls._writers.values())
+        for writer in writers:
+            writer.flush(timeout)
+
+    @classmethod
+    def close_all(cls, timeout: float = DEFAULT_FLUSH_TIMEOUT_SECONDS):
+        with cls._registry_lock:
+            writers = list(cls._writers.values())
+            cls._writers.clear()
+        for writer in writers:
+            writer.close(timeout)
+
+    @classmethod
+    def _install_shutdown_hooks_locked(cls):
+        if cls._hooks_installed: return
+        cls._hooks_installed = True
+        atexit.register(cls.close_all)
+
+        # 未処理の例外で終了する場合 (PyQt6 はスロット内の例外で異常終了する) も、直前までのログを残す
+        previous_excepthook = sys.excepthook
+        def excepthook(exc_type, exc_value, exc_traceback):
+            cls.flush_all(timeout=2.0)
+            previous_excepthook(exc_type, exc_value, exc_traceback)
+        sys.excepthook = excepthook
+
+        previous_threading_excepthook = threading.excepthook
+        def threading_excepthook(args):
+            cls.flush_all(timeout=2.0)
+            previous_threading_excepthook(args)
+        threading.excepthook = threading_excepthook
+
+    def __init__(self, log_dir: str, max_queue_entries: int = DEFAULT_LOG_QUEUE_MAX_ENTRIES):
+        self.log_dir = log_dir
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, int(max_queue_entries)))
+        self._stats_lock = threading.Lock()
+        self._stats = {"enqueued": 0, "written": 0, "dropped": 0, "write_errors": 0, "batches": 0}
+        self._pending_write_error: Optional[str] = None
+        self._closed = False
+        self._file = None
+        self._file_path: Optional[str] = None
+        self._thread = threading.Thread(target=self._run, name="AsyncLogWriter", daemon=True)
+        self._thread.start()
+
+    def submit(self, date_str: str, line: str, wait: bool = False) -> bool:
+        """1行を書き込み待ちにする。待ち行列が一杯で入れられなかった場合は False (破棄した件数に数える)。"""
+        if self._closed:
+            return self._write_directly(date_str, line)
+        try:
+            if wait:
+                self._queue.put((date_str, line), timeout=ERROR_ENQUEUE_TIMEOUT_SECONDS)
+            else:
+                self._queue.put_nowait((date_str, line))
+        except queue.Full:
+            with self._stats_lock:
+                self._stats["dropped"] += 1
+            return False
+        with self._stats_lock:
+            self._stats["enqueued"] += 1
+        return True
+
+    def flush(self, timeout: float = DEFAULT_FLUSH_TIMEOUT_SECONDS) -> bool:
+        """ここまでに受け付けたログを書き込み、ファイルへ反映されるまで待つ。"""
+        if self._closed or not self._thread.is_alive():
+            return True
+        flushed = threading.Event()
+        try:
+            self._queue.put(flushed, timeout=timeout)
+        except queue.Full:
+            return False
+        return flushed.wait(timeout)
+
+    def close(self, timeout: float = DEFAULT_FLUSH_TIMEOUT_SECONDS):
+        if self._closed: return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._closed = True
+
+    def take_write_error(self) -> Optional[str]:
+        """書き込みスレッドで発生した書き込みエラー (前回の取得以降の最新のもの) を返す。"""
+        with self._stats_lock:
+            message, self._pending_write_error = self._pending_write_error, None
+            return message
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {**self._stats, "queued": self._queue.qsize()}
+
+    # --- 書き込みスレッド ---
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch: List[Tuple[str, str]] = []
+            markers = []
+            deadline = time.monotonic() + LOG_BATCH_MAX_DELAY_SECONDS
+            while True:
+                if item is _STOP or isinstance(item, threading.Event):
+                    markers.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= LOG_BATCH_MAX_ENTRIES:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if batch:
+                self._write_batch(batch)
+            for marker in markers:
+                if marker is _STOP:
+                    self._close_file()
+                    return
+                marker.set()
+
+    def _write_batch(self, batch: List[Tuple[str, str]]):
+        # 日付が変わった場合に備え、同じ日付の連続する行ごとに書き込む
+        start = 0
+        while start < len(batch):
+            date_str = batch[start][0]
+            end = start
+            while end < len(batch) and batch[end][0] == date_str:
+                end += 1
+            lines = [line for _, line in batch[start:end]]
+            try:
+                self._open_for_date(date_str)
+                self._file.write("\n".join(lines) + "\n")
+                self._file.flush()
+                with self._stats_lock:
+                    self._stats["written"] += len(lines)
+                    self._stats["batches"] += 1
+            except Exception as e:
+                message = f"ログファイル書込エラー: {e} (Path: {self._file_path})"
+                print(message, file=sys.stderr)
+                self._close_file()
+                with self._stats_lock:
+                    self._stats["write_errors"] += len(lines)
+                    self._pending_write_error = message
+            start = end
+
+    def _open_for_date(self, date_str: str):
+        path = log_file_path_for_date(self.log_dir, date_str)
+        if self._file is not None and self._file_path == path:
+            return
+        rotated_from = self._file_path if self._file is not None else None
+        self._close_file()
+        self._file = open(path, "a", encoding="utf-8")
+        self._file_path = path
+        if rotated_from:
+            rotate_entry = {"timestamp": datetime.datetime.now().isoformat(), "level": "INFO", "context": "SYSTEM_LOG",
+                            "event": "LOG_ROTATE", "message": f"ログファイルを {os.path.basename(path)} に切り替え。"}
+            self._file.write(json.dumps(rotate_entry, ensure_ascii=False) + "\n")
+
+    def _close_file(self):
+        if self._file is not None:
+            try: self._file.close()
+            except OSError: pass
+        self._file = None
+
+    def _write_directly(self, date_str: str, line: str) -> bool:
+        # 終了処理の後 (atexit より後に出力されたログなど) は、その場で追記する
+        try:
+            with open(log_file_path_for_date(self.log_dir, date_str), "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            return True
+        except OSError:
+            return False
@@ -2,19 +2,20 @@
 
 import sys
 import argparse
-
-from PyQt6.QtWidgets import QApplication
+import multiprocessing
 
 from log_manager import LogManager
-from ui_main_window import MainWindow
 from config_manager import DEFAULT_API_PROFILES
+from folder_watcher import DEFAULT_WATCH_POLL_INTERVAL_SECONDS, DEFAULT_WATCH_SETTLE_SECONDS, DEFAULT_WATCH_LATENCY_TARGET_SECONDS
 # === 修正箇所 START ===
 # APP_NAME定数をインポート
 from app_constants import APP_NAME
 # === 修正箇所 END ===
 
 if __name__ == "__main__":
-    
+    # PyInstaller でビルドした実行ファイルから先読み用の子プロセスを起動できるようにする
+    multiprocessing.freeze_support()
+
     log_manager = LogManager()
 
     try:
@@ -65,8 +66,42 @@ if __name__ == "__main__":
         help=api_help_message
     )
 
+    parser.add_argument(
+        "--no-gui",
+        action="store_true",
+        help=(
+            "GUIを起動せずに、--input のフォルダを --profile のプロファイルで処理します。\n"
+            "進捗は1行1イベントのJSON (JSON Lines) で標準出力へ出力します。\n"
+            "終了コード: 0=全ファイル成功, 1=失敗あり・致命的エラー, 2=引数・設定の誤り, 130=中止"
+        )
+    )
+    parser.add_argument("--input", type=str, default=None, help="--no-gui で処理する入力フォルダ")
+    parser.add_argument("--profile", type=str, default=None, help="--no-gui で使用するAPIプロファイルID")
+    parser.add_argument("--concurrency", type=int, default=None, help="--no-gui での同時処理ファイル数 (省略時は設定ファイルの値)")
+    parser.add_argument("--mode", choices=["demo", "live"], default=None, help="--no-gui でのAPI実行モード (省略時は設定ファイルの値)")
+    parser.add_argument("--resume", action="store_true", help="--no-gui で、同じフォルダ・プロファイルの中断された実行があれば続きから再開します")
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help=(
+            "--no-gui で、--input のフォルダを監視し続け、追加されたファイルを書き込み完了後に順次処理します (SIGINT / SIGTERM で終了)。\n"
+            "開始時に既にあるファイルも処理します。watchdog がインストールされていればファイルシステムの変更通知を使います。"
+        )
+    )
+    parser.add_argument("--watch-interval", type=float, default=DEFAULT_WATCH_POLL_INTERVAL_SECONDS, help="--watch でフォルダ・ファイルの状態を確認する間隔 (秒)")
+    parser.add_argument("--watch-settle", type=float, default=DEFAULT_WATCH_SETTLE_SECONDS, help="--watch で、サイズ・更新日時がこの秒数変わらないファイルを書き込み完了とみなす")
+    parser.add_argument("--watch-latency-target", type=float, default=DEFAULT_WATCH_LATENCY_TARGET_SECONDS, help="--watch で、ファイルの検出から処理完了までの目標秒数 (1回にまとめて処理するファイル数をこれに合わせて調整し、超えたファイルは警告を記録します)")
+
     args = parser.parse_args()
 
+    if args.no_gui:
+        # GUI (QtWidgets) を読み込まずに実行する
+        from cli_runner import run_headless
+        sys.exit(run_headless(args, log_manager))
+
+    from PyQt6.QtWidgets import QApplication
+    from ui_main_window import MainWindow
+
     app = QApplication(sys.argv)
     
     window = MainWindow(cli_args=args)
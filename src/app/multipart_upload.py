@@ -0,0 +1,165 @@
+# multipart_upload.py
+
+import os
+import io
+import time
+import uuid
+import threading
+from typing import Optional, Dict, Any, List, Tuple, Callable
+
+# 1回の read() で返す最大バイト数。ファイル数・ファイルサイズによらず、送信中に保持する本文はこのサイズまでに抑えられる
+DEFAULT_UPLOAD_CHUNK_BYTES = 256 * 1024
+# 進捗コールバックの最短呼び出し間隔 (秒)。UIへのシグナルが多くなりすぎないよう間引く
+PROGRESS_CALLBACK_MIN_INTERVAL_SECONDS = 0.25
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def _quote_param(value: str) -> str:
+    # requests (urllib3) と同じく、ファイル名は UTF-8 のまま送り、引用符と改行のみエスケープする
+    return value.translate({10: "%0A", 13: "%0D", 34: "%22"})
+
+
+class StreamingMultipartEncoder:
+    """multipart/form-data の本文をファイルから少しずつ読み出して送信するためのエンコーダ。
+
+    requests の files= 指定は本文全体をメモリ上に組み立てるため、大きなファイルや多数のファイルを
+    1リクエストで送るとファイルサイズ合計分のメモリを消費する。このクラスは requests の data= に渡すと
+    Content-Length を事前に計算したうえで read() 経由のストリーミング送信となり、
+    ファイルは送信する順に1つずつ開いて chunk_size ずつ読み出す。
+
+    Args:
+        fields: フォームの通常項目 [(名前, 値)]
+        files: ファイル項目 [(名前, ファイル名, ファイルパス, Content-Type)]
+        progress_callback: 送信済みバイト数と合計バイト数を受け取るコールバック (送信スレッドで呼ばれる)
+    """
+    def __init__(self, fields: List[Tuple[str, Any]], files: List[Tuple[str, str, str, str]],
+                 chunk_size: int = DEFAULT_UPLOAD_CHUNK_BYTES, progress_callback: Optional[ProgressCallback] = None):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self.chunk_size = max(1, int(chunk_size))
+        self.progress_callback = progress_callback
+
+        # 本文を (バイト列 または ファイルパス) の並びとして組み立てておき、read() で先頭から順に読み出す
+        self._segments: List[Tuple[str, Any, int]] = []
+        for name, value in fields:
+            header = f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'.encode("utf-8")
+            self._add_bytes(header + str(value).encode("utf-8") + b"\r\n")
+        for name, filename, file_path, file_content_type in files:
+            header = (f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{_quote_param(filename)}"\r\n'
+                      f"Content-Type: {file_content_type}\r\n\r\n").encode("utf-8")
+            self._add_bytes(header)
+            self._segments.append(("file", file_path, os.path.getsize(file_path)))
+            self._add_bytes(b"\r\n")
+        self._add_bytes(f"--{self.boundary}--\r\n".encode("utf-8"))
+        self.total_bytes = sum(length for _, _, length in self._segments)
+
+        self._lock = threading.Lock()
+        self._segment_index = 0
+        self._segment_offset = 0
+        self._open_file: Optional[io.BufferedReader] = None
+        self.bytes_sent = 0
+        self._last_progress_time = 0.0
+
+    def _add_bytes(self, data: bytes):
+        self._segments.append(("bytes", data, len(data)))
+
+    def __len__(self) -> int:
+        # requests はこの値を Content-Length として送信する (チャンク転送にはならない)
+        return self.total_bytes
+
+    def read(self, size: int = -1) -> bytes:
+        """最大 size バイト (chunk_size を上限) を返す。終端では b"" を返す。"""
+        with self._lock:
+            if size is None or size < 0 or size > self.chunk_size:
+                size = self.chunk_size
+            output = bytearray()
+            while len(output) < size and self._segment_index < len(self._segments):
+                kind, payload, length = self._segments[self._segment_index]
+                remaining_in_segment = length - self._segment_offset
+                to_read = min(size - len(output), remaining_in_segment)
+                if kind == "bytes":
+                    output += payload[self._segment_offset:self._segment_offset + to_read]
+                else:
+                    if self._open_file is None:
+                        self._open_file = open(payload, "rb")
+                    data = self._open_file.read(to_read)
+                    if len(data) < to_read:
+                        # 送信中にファイルが短くなった場合、Content-Length と本文が食い違うため送信を中止する
+                        raise IOError(f"アップロード中にファイルサイズが変わりました: {payload}")
+                    output += data
+                self._segment_offset += to_read
+                if self._segment_offset >= length:
+                    self._close_open_file()
+                    self._segment_index += 1
+                    self._segment_offset = 0
+            self.bytes_sent += len(output)
+            self._report_progress()
+            return bytes(output)
+
+    def _report_progress(self):
+        if self.progress_callback is None: return
+        now = time.monotonic()
+        finished = self.bytes_sent >= self.total_bytes
+        if not finished and now - self._last_progress_time < PROGRESS_CALLBACK_MIN_INTERVAL_SECONDS: return
+        self._last_progress_time = now
+        try:
+            self.progress_callback(self.bytes_sent, self.total_bytes)
+        except Exception:
+            # 進捗表示の失敗でアップロードを止めない
+            pass
+
+    def _close_open_file(self):
+        if self._open_file is not None:
+            try: self._open_file.close()
+            except Exception: pass
+            self._open_file = None
+
+    def close(self):
+        """途中で送信を中止した場合などに、開いているファイルを閉じる。"""
+        with self._lock:
+            self._close_open_file()
+
+    def rewind(self):
+        """同じ本文を送り直すため、読み出し位置を先頭に戻す。"""
+        with self._lock:
+            self._close_open_file()
+            self._segment_index = 0
+            self._segment_offset = 0
+            self.bytes_sent = 0
+            self._last_progress_time = 0.0
+
+
+def split_paths_by_byte_budget(file_paths: List[str], byte_budget: int) -> List[List[str]]:
+    """ファイルの並び順を保ったまま、1グループの合計サイズが byte_budget を超えないようにグループ分けする。
+    1ファイルで byte_budget を超える場合は、そのファイルだけのグループにする。byte_budget が 0 以下なら分けない。"""
+    if byte_budget <= 0 or not file_paths:
+        return [list(file_paths)] if file_paths else []
+    batches: List[List[str]] = []
+    current_batch: List[str] = []
+    current_bytes = 0
+    for path in file_paths:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        if current_batch and current_bytes + size > byte_budget:
+            batches.append(current_batch)
+            current_batch, current_bytes = [], 0
+        current_batch.append(path)
+        current_bytes += size
+    if current_batch:
+        batches.append(current_batch)
+    return batches
+
+
+def upload_progress_text(bytes_sent: int, total_bytes: int) -> str:
+    """ステータス表示用の「アップロード中 xx% (a/b MB)」を返す。"""
+    percent = int(bytes_sent * 100 / total_bytes) if total_bytes else 100
+    return f"アップロード中 {percent}% ({bytes_sent / (1024 * 1024):.1f}/{total_bytes / (1024 * 1024):.1f}MB)"
+
+
+def build_headers(base_headers: Dict[str, str], encoder: StreamingMultipartEncoder) -> Dict[str, str]:
+    headers = dict(base_headers)
+    headers["Content-Type"] = encoder.content_type
+    return headers
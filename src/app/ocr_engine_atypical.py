@@ -0,0 +1,121 @@
+# ocr_engine_atypical.py
+
+import os
+import json
+import shutil
+from typing import Optional, Dict, Any, List, Tuple
+
+from app_constants import OCR_STATUS_COMPLETED
+from api_client_atypical import OCRApiClientAtypical
+from ocr_engine_base import OcrEngineBase
+from result_cache import ResultCache
+
+
+class OcrEngineAtypical(OcrEngineBase):
+    """DX Suite 非定型 (dx_atypical_v2) のOCR処理エンジン (Qt に依存しない)。
+
+    読取結果のJSONのみを出力する (サーチャブルPDFは作成対象外)。
+    GUI からは QThread のラッパー (ocr_worker_atypical.OcrWorkerAtypical) 経由で、ヘッドレス実行では直接使う。
+    """
+    api_client: OCRApiClientAtypical
+
+    # 結果キャッシュのキーに含める設定 (同じファイルでも値が異なれば出力結果が変わるもの)
+    RESULT_CACHE_OPTION_KEYS = ("base_uri", "model", "classes", "departmentId")
+    RESULT_CACHE_FILE_ACTION_KEYS = ()
+
+    ENGINE_LOG_NAME = "AtypicalOcrWorker"
+    THREAD_NAME_PREFIX = "Atypical"
+    OCR_TIMEOUT_ERROR_CODE = "DX_ATYPICAL_OCR_TIMEOUT"
+
+    def _emit_cached_output_signals(self, original_file_global_idx: int, original_file_path: str,
+                                    restored: List[Tuple[Dict[str, Any], str]], payload: Dict[str, Any]):
+        self.searchable_pdf_processed.emit(original_file_global_idx, original_file_path, None, {"message": "作成対象外", "code": "NOT_APPLICABLE"})
+
+    def _register_part(self, part_path: str, progress_callback=None) -> Tuple[Optional[str], Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """部品をOCR登録する。戻り値: (receptionId, 即時結果 (Demoモードなど), エラー)"""
+        ocr_response, ocr_error = self.api_client.read_document(part_path, progress_callback=progress_callback)
+        if ocr_error:
+            return None, None, ocr_error
+        # Liveモードの応答は {'status': 'registered', ...} という辞書。
+        # Demoモードの応答は {'status': 2, ...} という辞書。
+        # ocr_response.get("status") が文字列であることを確認してから `in` 演算子を使用する。
+        response_status = ocr_response.get("status") if ocr_response else None
+        if ocr_response and isinstance(response_status, str) and "registered" in response_status:
+            reception_id = ocr_response.get("receptionId")
+            if not reception_id:
+                return None, None, {"message": "receptionIdが取得できませんでした。", "code": "POLL_NO_RECEPTIONID"}
+            return reception_id, None, None
+        # Demoモードなど即時応答の場合
+        return (ocr_response.get("receptionId") if ocr_response else None), ocr_response, None
+
+    def _poll_job_once(self, reception_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """読取結果を1回確認する。戻り値: (完了時の結果, エラー)。両方 None の場合は処理中。"""
+        poll_res, poll_err = self.api_client.get_ocr_result(reception_id)
+        if poll_err:
+            return None, poll_err
+        api_status = poll_res.get("status")
+        if api_status == 2:
+            return poll_res, None
+        elif api_status == 3:
+            return None, {"message": "APIがエラーを返しました。", "code": "DX_ATYPICAL_API_ERROR", "detail": poll_res}
+        return None, None
+
+    def _complete_file(self, file_ctx: Dict[str, Any], results_folder_name: str, delete_job_after_processing: bool):
+        """OCR済みの部品からJSONを出力し、結果シグナル送出・ファイル移動・一時フォルダ削除を行う。"""
+        original_file_path = file_ctx["path"]
+        original_file_global_idx = file_ctx["idx"]
+        original_file_parent_dir = os.path.dirname(original_file_path)
+        base_name_for_output_prefix = file_ctx["base_name"]
+        parts_results_temp_dir = file_ctx["parts_results_temp_dir"]
+        part_states = file_ctx["part_states"]
+        is_multi_part = len(part_states) > 1
+
+        final_ocr_error = next((s["error"] for s in part_states if s["error"]), None)
+        all_parts_ok = final_ocr_error is None
+        part_results = []
+
+        for state in part_states:
+            if all_parts_ok and state["result"]:
+                part_results.append({"path": state["path"], "result": state["result"]})
+                # JSONを一時フォルダに保存
+                part_json_path = os.path.join(parts_results_temp_dir, f"{os.path.splitext(os.path.basename(state['path']))[0]}.json")
+                with open(part_json_path, 'w', encoding='utf-8') as f:
+                    json.dump(state["result"], f, ensure_ascii=False, indent=2)
+
+            if delete_job_after_processing and state["job_id"]:
+                self.api_client.delete_job(state["job_id"])
+
+        # 部品ごとの処理終了後
+        json_status_for_ui = "作成しない(設定)"
+        if all_parts_ok:
+            final_ocr_result = part_results[0]['result'] if not is_multi_part else {"status": OCR_STATUS_COMPLETED, "detail": f"{len(part_results)}部品のOCR完了"}
+
+            # 最終的なJSONを出力
+            final_json_dir = os.path.join(original_file_parent_dir, results_folder_name)
+            os.makedirs(final_json_dir, exist_ok=True)
+            cache_artifacts: List[Dict[str, Any]] = []
+            if is_multi_part:
+                for item in os.listdir(parts_results_temp_dir):
+                    if item.endswith(".json"):
+                        shutil.copy2(os.path.join(parts_results_temp_dir, item), self._get_unique_filepath(final_json_dir, item))
+                        cache_artifacts.append({"name": item, "source_path": os.path.join(parts_results_temp_dir, item)})
+                json_status_for_ui = f"{len(part_results)}個の部品JSON成功"
+            else:
+                final_json_path = self._get_unique_filepath(final_json_dir, f"{base_name_for_output_prefix}.json")
+                shutil.copy2(os.path.join(parts_results_temp_dir, f"{os.path.splitext(os.path.basename(part_states[0]['path']))[0]}.json"), final_json_path)
+                cache_artifacts.append({"name": f"{base_name_for_output_prefix}.json", "source_path": final_json_path})
+                json_status_for_ui = "JSON作成成功"
+
+            self.file_processed.emit(original_file_global_idx, original_file_path, final_ocr_result, None, json_status_for_ui, part_states[-1]["job_id"])
+            if file_ctx.get("cache_key"):
+                ResultCache.store(file_ctx["cache_key"], cache_artifacts, {"ocr_result": final_ocr_result, "json_status": json_status_for_ui},
+                                  base_name_for_output_prefix)
+        else:
+            json_status_for_ui = "エラー" if not (self.user_stopped or self.encountered_fatal_error) else "中断"
+            self.file_processed.emit(original_file_global_idx, original_file_path, None, final_ocr_error, json_status_for_ui, None)
+
+        # 非定型はPDFをサポートしない
+        pdf_error = {"message": "作成対象外", "code": "NOT_APPLICABLE"}
+        self.searchable_pdf_processed.emit(original_file_global_idx, original_file_path, None, pdf_error)
+
+        self._finish_file(file_ctx, all_parts_ok)
@@ -0,0 +1,551 @@
+# ocr_engine_base.py
+
+import os
+import abc
+import datetime
+import time
+import shutil
+import threading
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Dict, Any, List, Tuple
+
+from engine_signal import EngineSignal
+from app_constants import OCR_STATUS_PROCESSING, OCR_STATUS_PART_PROCESSING
+from http_session import SharedHttpSession
+from file_prefetcher import FilePrefetcher, DEFAULT_PREFETCH_LOOKAHEAD_FILES
+from polling_scheduler import PollingScheduler, POLL_OUTCOME_TIMEOUT, POLL_OUTCOME_INTERRUPTED
+from multipart_upload import upload_progress_text
+from rate_limiter import RateLimiterRegistry, WAIT_SLICE_SECONDS
+from retry_policy import RetryBudget
+from job_journal import JobJournal
+from result_cache import ResultCache, compute_file_sha256, build_cache_key, SPLIT_OPTION_KEYS, DEFAULT_RESULT_CACHE_ENABLED, DEFAULT_RESULT_CACHE_MAX_MB
+
+# ポーリング設定のデフォルト値
+DEFAULT_POLLING_INTERVAL_SECONDS = 3
+DEFAULT_POLLING_MAX_ATTEMPTS = 60
+# 同時に処理するファイル数のデフォルト値 (1 = 従来通りの逐次処理)
+DEFAULT_MAX_CONCURRENT_FILES = 1
+# 分割した1ファイルの部品を同時に処理する数のデフォルト値
+DEFAULT_MAX_CONCURRENT_PARTS = 4
+# ジョブ投入方式のデフォルト値 ("per_file": ファイルごとに登録→完了待ち, "batch": 全件登録→まとめてポーリング)
+DEFAULT_SUBMISSION_MODE = "per_file"
+
+
+class OcrEngineBase(abc.ABC):
+    """OCR処理エンジン (ocr_engine_*) の共通部分 (Qt に依存しない)。
+
+    run() を呼び出したスレッドで入力ファイルを処理し、進捗と結果を EngineSignal で通知する。
+    ファイルの準備・部品の並行処理・一括登録モード・結果キャッシュ・ジョブ枠の管理はこのクラスで行い、
+    派生クラスでは API ごとの処理 (_register_part / _poll_job_once / _complete_file など) だけを実装する。
+    GUI からは QThread のラッパー (ocr_worker_base.OcrEngineWorker) 経由で、ヘッドレス実行では直接使う。
+    """
+    file_processed = EngineSignal(int, str, object, object, object, object)
+    auto_csv_processed = EngineSignal(int, str, object)
+    searchable_pdf_processed = EngineSignal(int, str, object, object)
+    all_files_processed = EngineSignal()
+    original_file_status_update = EngineSignal(str, str)
+    run_stats_reported = EngineSignal(object)
+
+    # 結果キャッシュのキーに含める設定 (同じファイルでも値が異なれば出力結果が変わるもの)
+    RESULT_CACHE_OPTION_KEYS: Tuple[str, ...] = ()
+    RESULT_CACHE_FILE_ACTION_KEYS: Tuple[str, ...] = ()
+
+    # 派生クラスで指定する値
+    ENGINE_LOG_NAME = "OcrWorker"                  # ログに出すエンジン名
+    THREAD_NAME_PREFIX = "Ocr"                     # ファイル/部品の処理スレッド名の接頭辞
+    OCR_TIMEOUT_ERROR_CODE = "OCR_TIMEOUT"         # 結果取得がタイムアウトした場合のエラーコード
+    PART_STATUS_TEXT = OCR_STATUS_PART_PROCESSING  # 分割した部品を処理中のステータス表示
+
+    def __init__(self, api_client, files_to_process_tuples: List[Tuple[str, int]],
+                input_root_folder: str, log_manager, config: Dict[str, Any],
+                api_profile: Optional[Dict[str, Any]], resume_jobs: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.api_client = api_client
+        self.files_to_process_tuples = files_to_process_tuples
+        self.is_running = True
+        self.user_stopped = False
+        self.input_root_folder = input_root_folder
+        self.log_manager = log_manager
+        self.config = config
+        self.active_api_profile = api_profile
+        # 前回の実行で登録済みのジョブ (元ファイルのパス -> {"part_count", "job_ids"})。再アップロードせずに結果の取得から再開する
+        self.resume_jobs = resume_jobs or {}
+
+        current_profile_id = self.active_api_profile.get("id") if self.active_api_profile else None
+        self.current_api_options_values = self.config.get("options_values_by_profile", {}).get(current_profile_id, {})
+
+        self.file_actions_config = self.config.get("file_actions", {})
+        self.main_temp_dir_for_splits: Optional[str] = None
+        self.result_cache_enabled = False
+        self.log_manager.debug(f"{self.ENGINE_LOG_NAME} initialized for API: {self.active_api_profile.get('name', 'N/A') if self.active_api_profile else 'Unknown'}",
+                                context="WORKER_LIFECYCLE", num_original_files=len(self.files_to_process_tuples))
+        self.encountered_fatal_error = False
+        self.fatal_error_info: Optional[Dict[str, Any]] = None
+        # 並行処理中の出力ファイル名の衝突を防ぐため、採番済みのパスを予約しておく
+        self._unique_path_lock = threading.Lock()
+        self._reserved_output_paths: set = set()
+
+    def _get_unique_filepath(self, target_dir: str, filename: str) -> str:
+        base, ext = os.path.splitext(filename)
+        with self._unique_path_lock:
+            counter = 1
+            new_filepath = os.path.join(target_dir, filename)
+            while os.path.exists(new_filepath) or new_filepath in self._reserved_output_paths:
+                new_filename = f"{base} ({counter}){ext}"
+                new_filepath = os.path.join(target_dir, new_filename)
+                counter += 1
+            self._reserved_output_paths.add(new_filepath)
+        return new_filepath
+
+    def _ensure_main_temp_dir_exists(self) -> Optional[str]:
+        if self.main_temp_dir_for_splits is None:
+            try:
+                app_temp_base = tempfile.gettempdir()
+                worker_temp_dirname = f"OcrClient_SplitWorker_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+                self.main_temp_dir_for_splits = os.path.join(app_temp_base, worker_temp_dirname)
+                os.makedirs(self.main_temp_dir_for_splits, exist_ok=True)
+                self.log_manager.info(f"Main temporary directory for splits created: {self.main_temp_dir_for_splits}", context="WORKER_TEMP_DIR")
+            except Exception as e:
+                self.log_manager.error(f"Failed to create main temporary directory for splits: {e}", context="WORKER_TEMP_DIR_ERROR", exc_info=True)
+                self.main_temp_dir_for_splits = None
+        return self.main_temp_dir_for_splits
+
+    def _cleanup_main_temp_dir(self):
+        if self.main_temp_dir_for_splits and os.path.isdir(self.main_temp_dir_for_splits):
+            try:
+                shutil.rmtree(self.main_temp_dir_for_splits)
+                self.log_manager.info(f"Main temporary directory for splits cleaned up: {self.main_temp_dir_for_splits}", context="WORKER_TEMP_DIR")
+            except Exception as e:
+                self.log_manager.error(f"Failed to clean up main temporary directory {self.main_temp_dir_for_splits}: {e}", context="WORKER_TEMP_DIR_ERROR", exc_info=True)
+        self.main_temp_dir_for_splits = None
+
+    def _new_polling_scheduler(self, job_kind: str) -> PollingScheduler:
+        profile_id, polling_interval, max_polling_attempts, adaptive = self._polling_settings
+        return PollingScheduler(profile_id, polling_interval, max_polling_attempts, adaptive=adaptive, job_kind=job_kind)
+
+    def _create_polling_schedulers(self):
+        """実行開始時にポーリングのスケジューラを作る。OCR結果以外のジョブもポーリングする派生クラスで拡張する。"""
+        self.ocr_polling_scheduler = self._new_polling_scheduler("ocr")
+
+    def run(self):
+        thread_id = threading.get_ident()
+        self.log_manager.debug(f"{self.ENGINE_LOG_NAME} thread started.", context="WORKER_LIFECYCLE", thread_id=thread_id)
+        SharedHttpSession.reset_stats()
+        RateLimiterRegistry.reset_stats()
+        RetryBudget.reset()
+        ResultCache.reset_stats()
+        if not self._ensure_main_temp_dir_exists():
+            self.all_files_processed.emit()
+            return
+
+        results_folder_name = self.file_actions_config.get("results_folder_name", "OCR結果")
+        polling_interval = self.current_api_options_values.get("polling_interval_seconds", DEFAULT_POLLING_INTERVAL_SECONDS)
+        max_polling_attempts = self.current_api_options_values.get("polling_max_attempts", DEFAULT_POLLING_MAX_ATTEMPTS)
+        delete_job_after_processing = self.current_api_options_values.get("delete_job_after_processing", True)
+        adaptive_polling_enabled = self.current_api_options_values.get("adaptive_polling_enabled", 1)
+        profile_id = self.active_api_profile.get("id") if self.active_api_profile else None
+        self._polling_settings = (profile_id, polling_interval, max_polling_attempts, bool(adaptive_polling_enabled))
+        self._create_polling_schedulers()
+        submission_mode = self.current_api_options_values.get("submission_mode", DEFAULT_SUBMISSION_MODE)
+        self.max_concurrent_parts = max(1, int(self.current_api_options_values.get("max_concurrent_parts", DEFAULT_MAX_CONCURRENT_PARTS)))
+        self._configure_result_cache()
+        # 処理中のファイルのアップロード・ポーリングと並行して、後続ファイルの分割/コピーを別プロセスで進める
+        self.file_prefetcher = FilePrefetcher([path for path, _ in self.files_to_process_tuples], self.main_temp_dir_for_splits, self.current_api_options_values,
+                                              self.current_api_options_values.get("prefetch_lookahead_files", DEFAULT_PREFETCH_LOOKAHEAD_FILES), self.log_manager)
+        self._install_retry_stop_check()
+
+        try:
+            if submission_mode == "batch":
+                self.log_manager.info("一括登録モードで処理します (全件登録→まとめてポーリング)。", context="WORKER_SUBMISSION_MODE", num_original_files=len(self.files_to_process_tuples))
+                self._run_batch_submission(results_folder_name, delete_job_after_processing)
+                return
+
+            max_concurrent_files = max(1, int(self.current_api_options_values.get("max_concurrent_files", DEFAULT_MAX_CONCURRENT_FILES)))
+            self.log_manager.info(f"同時処理ファイル数: {max_concurrent_files}", context="WORKER_CONCURRENCY", num_original_files=len(self.files_to_process_tuples))
+
+            with ThreadPoolExecutor(max_workers=max_concurrent_files, thread_name_prefix=f"{self.THREAD_NAME_PREFIX}OcrFile",
+                                    initializer=self._install_retry_stop_check) as executor:
+                future_to_file = {
+                    executor.submit(self._process_single_file, original_file_path, original_file_global_idx,
+                                    results_folder_name, delete_job_after_processing): (original_file_path, original_file_global_idx)
+                    for original_file_path, original_file_global_idx in self.files_to_process_tuples
+                }
+                for future in as_completed(future_to_file):
+                    original_file_path, original_file_global_idx = future_to_file[future]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        self._emit_unexpected_file_error(original_file_path, original_file_global_idx, e)
+        finally:
+            self.api_client.retry_policy.set_stop_check(None)
+            self.file_prefetcher.shutdown()
+            if self.result_cache_enabled: ResultCache.flush()
+            self._cleanup_main_temp_dir()
+            self._log_http_session_stats()
+            self._report_run_stats()
+            self.all_files_processed.emit()
+            self.log_manager.debug(f"{self.ENGINE_LOG_NAME} thread finished.", context="WORKER_LIFECYCLE", thread_id=thread_id)
+
+    def _install_retry_stop_check(self):
+        """このスレッドから送るリクエストの再試行待ちを、停止要求で打ち切るようにする (処理スレッドの開始時に呼ぶ)。"""
+        self.api_client.retry_policy.set_stop_check(lambda: self.is_running)
+
+    def _log_http_session_stats(self):
+        http_stats = SharedHttpSession.get_stats()
+        self.log_manager.info(f"HTTP接続統計: リクエスト {http_stats['requests']} 件 / 新規接続 {http_stats['new_connections']} 件 (再利用率 {http_stats['reuse_ratio']:.0%})",
+                              context="HTTP_SESSION_STATS", **http_stats)
+        for tenant_key, limiter_stats in RateLimiterRegistry.get_stats().items():
+            self.log_manager.info(f"送信レート制限 ({tenant_key}): 待機 {limiter_stats['wait_seconds']:.1f}秒 / 429・503応答 {limiter_stats['throttled_responses']} 件 / ジョブ枠待ち {limiter_stats['job_slot_waits']} 回",
+                                  context="RATE_LIMIT_STATS", **limiter_stats)
+        retry_stats = RetryBudget.get_stats()
+        if retry_stats["retries"] or retry_stats["exhausted"]:
+            self.log_manager.info(f"自動再試行: {retry_stats['retries']} 回 (成功 {retry_stats['recovered']} 件) / 上限超過で再試行しなかったエラー {retry_stats['exhausted']} 件",
+                                  context="RETRY_STATS", **retry_stats)
+
+    def _report_run_stats(self):
+        run_stats = self.file_prefetcher.get_stats()
+        self.log_manager.info(f"一時フォルダへのコピー省略: {run_stats['zero_copy_files']} 件 / {run_stats['bytes_copy_avoided'] / (1024*1024):.2f}MB",
+                              context="WORKER_RUN_STATS", **run_stats)
+        if self.result_cache_enabled:
+            cache_stats = ResultCache.get_stats()
+            self.log_manager.info(f"結果キャッシュ: ヒット {cache_stats['result_cache_hits']} 件 / ミス {cache_stats['result_cache_misses']} 件 / 保存 {cache_stats['result_cache_stores']} 件",
+                                  context="RESULT_CACHE_STATS", **cache_stats)
+            run_stats.update(cache_stats)
+        self.run_stats_reported.emit(run_stats)
+
+    def _configure_result_cache(self):
+        self.result_cache_enabled = bool(self.current_api_options_values.get("result_cache_enabled", DEFAULT_RESULT_CACHE_ENABLED))
+        if not self.result_cache_enabled: return
+        try:
+            ResultCache.configure(self.current_api_options_values.get("result_cache_max_mb", DEFAULT_RESULT_CACHE_MAX_MB))
+        except OSError as e:
+            self.log_manager.warning(f"結果キャッシュのフォルダを準備できないため、キャッシュを使用せずに処理します: {e}", context="RESULT_CACHE")
+            self.result_cache_enabled = False
+
+    def _result_cache_key(self, original_file_path: str) -> str:
+        """ファイル内容のハッシュと、出力結果に影響する設定から結果キャッシュのキーを作る。"""
+        options = {key: self.current_api_options_values.get(key) for key in self.RESULT_CACHE_OPTION_KEYS + SPLIT_OPTION_KEYS}
+        options.update({key: self.file_actions_config.get(key) for key in self.RESULT_CACHE_FILE_ACTION_KEYS})
+        options["api_execution_mode"] = self.config.get("api_execution_mode")
+        profile_id = self.active_api_profile.get("id") if self.active_api_profile else None
+        return build_cache_key(compute_file_sha256(original_file_path), profile_id, options)
+
+    def _try_serve_from_result_cache(self, original_file_path: str, original_file_global_idx: int, results_folder_name: str) -> Tuple[bool, Optional[str]]:
+        """結果キャッシュにあれば、APIを呼び出さずに結果ファイルを出力してシグナルを送出する。戻り値: (出力したか, キャッシュキー)"""
+        if not self.result_cache_enabled: return False, None
+        try:
+            cache_key = self._result_cache_key(original_file_path)
+            cached_entry = ResultCache.lookup(cache_key)
+            if cached_entry is None: return False, cache_key
+            self.file_prefetcher.discard(original_file_path)
+            final_dir = os.path.join(os.path.dirname(original_file_path), results_folder_name)
+            restored = ResultCache.restore_artifacts(cached_entry, final_dir, self._get_unique_filepath,
+                                                      os.path.splitext(os.path.basename(original_file_path))[0])
+        except Exception as e:
+            self.log_manager.warning(f"ファイル '{os.path.basename(original_file_path)}' の結果キャッシュを利用できませんでした。APIで処理します: {e}", context="RESULT_CACHE")
+            return False, None
+
+        payload = cached_entry.get("payload", {})
+        self.log_manager.info(f"ファイル '{os.path.basename(original_file_path)}' は結果キャッシュから出力しました。", context="RESULT_CACHE")
+        self.file_processed.emit(original_file_global_idx, original_file_path, payload.get("ocr_result"), None, payload.get("json_status"), None)
+        JobJournal.record_file_finished(original_file_path, True)
+        self._emit_cached_output_signals(original_file_global_idx, original_file_path, restored, payload)
+        if os.path.exists(original_file_path):
+            self._move_file_if_configured(original_file_path, True)
+        return True, cache_key
+
+    @abc.abstractmethod
+    def _emit_cached_output_signals(self, original_file_global_idx: int, original_file_path: str,
+                                    restored: List[Tuple[Dict[str, Any], str]], payload: Dict[str, Any]):
+        """結果キャッシュから出力したファイルについて、file_processed 以外の結果シグナル (PDF/CSV) を送出する。"""
+
+    def _emit_unexpected_file_error(self, original_file_path: str, original_file_global_idx: int, e: Exception):
+        self.log_manager.error(f"ファイル '{os.path.basename(original_file_path)}' の処理中に予期せぬエラー: {e}", context="WORKER_FILE_UNEXPECTED_ERROR", exc_info=True)
+        unexpected_error = {"message": f"予期せぬエラーが発生しました: {e}", "code": "WORKER_FILE_UNEXPECTED_ERROR", "detail": str(e)}
+        self.file_processed.emit(original_file_global_idx, original_file_path, None, unexpected_error, "エラー", None)
+        self.searchable_pdf_processed.emit(original_file_global_idx, original_file_path, None, unexpected_error)
+
+    def _prepare_file(self, original_file_path: str, original_file_global_idx: int) -> Optional[Dict[str, Any]]:
+        """ファイルを分割(またはコピー)し、部品ごとの処理状態を持つコンテキストを返す。準備失敗時はシグナルを送出して None を返す。"""
+        self.original_file_status_update.emit(original_file_path, f"{OCR_STATUS_PROCESSING} (準備中)")
+        files_to_ocr, prep_error, file_specific_temp_dir, part_page_counts = self.file_prefetcher.take(original_file_path)
+
+        if prep_error or not files_to_ocr:
+            self.file_processed.emit(original_file_global_idx, original_file_path, None, prep_error, "エラー", None)
+            self.searchable_pdf_processed.emit(original_file_global_idx, original_file_path, None, {"message": "ファイル準備エラー", "code": "FILE_PREP_ERROR"})
+            self._try_cleanup_specific_temp_dirs(file_specific_temp_dir, None)
+            return None
+
+        base_name_for_output_prefix = os.path.splitext(os.path.basename(original_file_path))[0]
+        # 分割しないファイルは元の場所から直接アップロードするため、部品パスの親フォルダではなくファイル専用の一時フォルダを使う
+        parts_results_temp_dir = os.path.join(file_specific_temp_dir, base_name_for_output_prefix + "_results_parts")
+        os.makedirs(parts_results_temp_dir, exist_ok=True)
+
+        file_ctx = {
+            "path": original_file_path,
+            "idx": original_file_global_idx,
+            "base_name": base_name_for_output_prefix,
+            "temp_dir": file_specific_temp_dir,
+            "parts_results_temp_dir": parts_results_temp_dir,
+            "part_states": [{"path": part_path, "page_count": page_count, "job_id": None, "result": None, "error": None, "ticket": None}
+                            for part_path, page_count in zip(files_to_ocr, part_page_counts)],
+        }
+        resume_job = self.resume_jobs.get(original_file_path)
+        # 分割結果 (部品数) が前回と異なる場合は、部品とジョブの対応が取れないため最初から処理する
+        if resume_job and resume_job.get("part_count") == len(file_ctx["part_states"]):
+            for part_idx, state in enumerate(file_ctx["part_states"]):
+                resumed_job_id = resume_job.get("job_ids", {}).get(str(part_idx))
+                if resumed_job_id:
+                    state["job_id"], state["resumed"] = resumed_job_id, True
+            self.log_manager.info(f"ファイル '{os.path.basename(original_file_path)}' は前回の実行で登録済みのジョブ ({sum(1 for s in file_ctx['part_states'] if s.get('resumed'))}件) から再開します。",
+                                  context="WORKER_JOB_RESUME")
+        return file_ctx
+
+    def _journal_job_registered(self, file_ctx: Dict[str, Any], part_idx: int):
+        """サーバーでの処理待ちとなったジョブをジャーナルに記録する (中断後の再開用)。"""
+        state = file_ctx["part_states"][part_idx]
+        if state["job_id"] and not state["result"] and not state["error"]:
+            JobJournal.record_job_registered(file_ctx["path"], part_idx, len(file_ctx["part_states"]), state["job_id"])
+
+    def _upload_progress_callback(self, original_file_path: str, status_msg: str):
+        """アップロードの進捗を元ファイルのステータス欄に表示するコールバックを返す。"""
+        return lambda bytes_sent, total_bytes: self.original_file_status_update.emit(original_file_path, f"{status_msg} ({upload_progress_text(bytes_sent, total_bytes)})")
+
+    @abc.abstractmethod
+    def _register_part(self, part_path: str, progress_callback=None) -> Tuple[Optional[str], Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """部品をOCR登録する。戻り値: (ジョブID, 即時結果 (Demoモードなど), エラー)"""
+
+    @abc.abstractmethod
+    def _poll_job_once(self, job_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """ジョブの状態を1回確認する。戻り値: (完了時の結果, エラー)。両方 None の場合は処理中。"""
+
+    def _process_single_file(self, original_file_path: str, original_file_global_idx: int, results_folder_name: str,
+                             delete_job_after_processing: bool):
+        """1ファイル分の 分割→OCR→結果保存→ファイル移動 を行う。複数スレッドから並行して呼び出される。"""
+        if not self.is_running or self.encountered_fatal_error: return
+
+        served_from_cache, cache_key = self._try_serve_from_result_cache(original_file_path, original_file_global_idx, results_folder_name)
+        if served_from_cache: return
+        file_ctx = self._prepare_file(original_file_path, original_file_global_idx)
+        if not file_ctx: return
+        file_ctx["cache_key"] = cache_key
+
+        part_states = file_ctx["part_states"]
+        max_concurrent_parts = min(len(part_states), self.max_concurrent_parts)
+        if max_concurrent_parts <= 1:
+            for part_idx in range(len(part_states)):
+                self._ocr_part(file_ctx, part_idx)
+        else:
+            # 結果は部品の順序通り part_states に格納されるため、後続のJSON出力・PDF結合の順序は変わらない
+            with ThreadPoolExecutor(max_workers=max_concurrent_parts, thread_name_prefix=f"{self.THREAD_NAME_PREFIX}OcrPart",
+                                    initializer=self._install_retry_stop_check) as part_executor:
+                for future in [part_executor.submit(self._ocr_part, file_ctx, part_idx) for part_idx in range(len(part_states))]:
+                    future.result()
+
+        self._complete_file(file_ctx, results_folder_name, delete_job_after_processing)
+
+    def _ocr_part(self, file_ctx: Dict[str, Any], part_idx: int):
+        """部品を1つ登録し、完了までポーリングする。結果は part_states[part_idx] に格納する。
+        同じファイルの他の部品が失敗した場合は、未着手・待機中の部品を打ち切る (エラーは失敗した部品のものを採用する)。"""
+        original_file_path = file_ctx["path"]
+        part_states = file_ctx["part_states"]
+        state = part_states[part_idx]
+        if file_ctx.get("part_failed"): return
+        if not self.is_running or self.encountered_fatal_error:
+            state["error"] = {"message": "処理が中断/停止されました", "code": "USER_INTERRUPT"}
+            return
+
+        status_msg = f"{self.PART_STATUS_TEXT} ({part_idx + 1}/{len(part_states)})" if len(part_states) > 1 else OCR_STATUS_PROCESSING
+        self.original_file_status_update.emit(original_file_path, status_msg)
+
+        # 組織ごとの同時ジョブ数の上限に達している場合は、他のジョブの完了を待ってから登録する
+        if not self.api_client.rate_limiter.acquire_job_slot(lambda: self.is_running and not file_ctx.get("part_failed")):
+            if not file_ctx.get("part_failed"):
+                state["error"] = {"message": "処理が中断/停止されました", "code": "USER_INTERRUPT"}
+                file_ctx["part_failed"] = True
+            return
+        try:
+            if not state.get("resumed"):
+                state["job_id"], state["result"], state["error"] = self._register_part(state["path"], self._upload_progress_callback(original_file_path, status_msg))
+                self._journal_job_registered(file_ctx, part_idx)
+            if state["job_id"] and not state["result"] and not state["error"]:
+                state["result"], state["error"], poll_outcome = self.ocr_polling_scheduler.poll_until_complete(
+                    lambda: self._poll_job_once(state["job_id"]), lambda: self.is_running and not file_ctx.get("part_failed"), page_count=state["page_count"],
+                    on_attempt=lambda ticket: self.original_file_status_update.emit(original_file_path, f"{self.PART_STATUS_TEXT} (テキスト結果待機中 {ticket.attempts}回目, {ticket.elapsed():.0f}秒経過)"))
+                if poll_outcome == POLL_OUTCOME_TIMEOUT:
+                    state["error"] = {"message": "結果取得がタイムアウトしました。", "code": self.OCR_TIMEOUT_ERROR_CODE}
+                elif poll_outcome == POLL_OUTCOME_INTERRUPTED and not (file_ctx.get("part_failed") and self.is_running):
+                    state["error"] = {"message": "処理が中断/停止されました", "code": "USER_INTERRUPT"}
+        except Exception as e:
+            self.log_manager.error(f"部品 '{os.path.basename(state['path'])}' の処理中に予期せぬエラー: {e}", context="WORKER_PART_UNEXPECTED_ERROR", exc_info=True)
+            state["error"] = {"message": f"予期せぬエラーが発生しました: {e}", "code": "WORKER_PART_UNEXPECTED_ERROR", "detail": str(e)}
+        finally:
+            self.api_client.rate_limiter.release_job_slot()
+
+        if state["error"]:
+            file_ctx["part_failed"] = True
+
+    def _run_batch_submission(self, results_folder_name: str, delete_job_after_processing: bool):
+        """一括登録モード: 全ファイルの全部品を先に登録し、未完了ジョブをまとめてポーリングする。
+        全ジョブの完了を待つ時間が「各ジョブ時間の合計」ではなく「最長ジョブ時間」程度になる。
+        同時ジョブ数の上限に達した場合は、登録を止めて未完了ジョブのポーリングを進め、空きができ次第登録を再開する。
+        実行中のジョブがスレッドを占有しないため、多数のジョブを同時に扱う場合もこのモードを使う (非同期版のAPIクライアントは設けていない)。"""
+        pending_jobs: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+
+        # --- フェーズ1: 全ファイルを準備し、全部品を登録 ---
+        for original_file_path, original_file_global_idx in self.files_to_process_tuples:
+            if not self.is_running or self.encountered_fatal_error: break
+            try:
+                served_from_cache, cache_key = self._try_serve_from_result_cache(original_file_path, original_file_global_idx, results_folder_name)
+                if served_from_cache: continue
+                file_ctx = self._prepare_file(original_file_path, original_file_global_idx)
+                if not file_ctx: continue
+                file_ctx["cache_key"] = cache_key
+                self.original_file_status_update.emit(original_file_path, f"{OCR_STATUS_PROCESSING} (一括登録中)")
+
+                file_ctx["pending_count"] = 0
+                file_ctx["registering"] = True
+                for part_idx, state in enumerate(file_ctx["part_states"]):
+                    if not self._wait_for_batch_job_slot(pending_jobs, results_folder_name, delete_job_after_processing):
+                        state["error"] = {"message": "処理が中断/停止されました", "code": "USER_INTERRUPT"}
+                        break
+                    if file_ctx.get("retired"):
+                        # 待機中のポーリングで、登録済みの部品の失敗によりファイルが確定した
+                        self.api_client.rate_limiter.release_job_slot()
+                        break
+                    if not state.get("resumed"):
+                        state["job_id"], state["result"], state["error"] = self._register_part(state["path"], self._upload_progress_callback(original_file_path, f"{OCR_STATUS_PROCESSING} (一括登録中)"))
+                        self._journal_job_registered(file_ctx, part_idx)
+                    if state["job_id"] and not state["result"] and not state["error"]:
+                        state["ticket"] = self.ocr_polling_scheduler.start_job(state["page_count"])
+                        pending_jobs[state["job_id"]] = (file_ctx, state)
+                        file_ctx["pending_count"] += 1
+                    else:
+                        self.api_client.rate_limiter.release_job_slot()
+                    if state["error"]: break
+                file_ctx["registering"] = False
+
+                if not file_ctx.get("retired") and (file_ctx["pending_count"] == 0 or any(s["error"] for s in file_ctx["part_states"])):
+                    self._retire_batch_file(file_ctx, pending_jobs, results_folder_name, delete_job_after_processing)
+            except Exception as e:
+                self._emit_unexpected_file_error(original_file_path, original_file_global_idx, e)
+
+        # --- フェーズ2: 未完了ジョブを各ジョブの次回予定時刻に従ってまとめてポーリングし、完了したファイルから順に確定 ---
+        scheduler = self.ocr_polling_scheduler
+        while pending_jobs and self.is_running:
+            self._poll_pending_jobs_round(pending_jobs, results_folder_name, delete_job_after_processing)
+            if not pending_jobs: break
+            next_due = min(state["ticket"].next_due for _, state in pending_jobs.values())
+            scheduler.sleep(max(0.0, next_due - time.monotonic()), lambda: self.is_running)
+
+        # --- 中断で残ったジョブを持つファイルを失敗として確定 ---
+        leftover_error = {"message": "処理が中断/停止されました", "code": "USER_INTERRUPT"}
+        while pending_jobs:
+            job_id, (file_ctx, state) = next(iter(pending_jobs.items()))
+            state["error"] = dict(leftover_error)
+            try:
+                self._retire_batch_file(file_ctx, pending_jobs, results_folder_name, delete_job_after_processing)
+            except Exception as e:
+                self._emit_unexpected_file_error(file_ctx["path"], file_ctx["idx"], e)
+
+    def _wait_for_batch_job_slot(self, pending_jobs: Dict[str, Any], results_folder_name: str, delete_job_after_processing: bool) -> bool:
+        """一括登録モードで同時ジョブ数の枠を確保する。空きが無い間は未完了ジョブのポーリングを進めて完了を待つ。
+        中断された場合は False を返す。"""
+        rate_limiter = self.api_client.rate_limiter
+        while self.is_running and not self.encountered_fatal_error:
+            if rate_limiter.try_acquire_job_slot(): return True
+            if pending_jobs:
+                self._poll_pending_jobs_round(pending_jobs, results_folder_name, delete_job_after_processing)
+                if rate_limiter.try_acquire_job_slot(): return True
+                next_due = min((state["ticket"].next_due for _, state in pending_jobs.values()), default=time.monotonic())
+                rate_limiter.wait_for_job_slot(max(0.0, next_due - time.monotonic()))
+            else:
+                # 他のワーカー (仕分けなど) のジョブの完了を待つ
+                rate_limiter.wait_for_job_slot(WAIT_SLICE_SECONDS)
+        return False
+
+    def _poll_pending_jobs_round(self, pending_jobs: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]], results_folder_name: str,
+                                 delete_job_after_processing: bool):
+        """一括登録モードで、次回予定時刻を過ぎた未完了ジョブを1回ずつ問い合わせ、完了・失敗したファイルを確定させる。"""
+        scheduler = self.ocr_polling_scheduler
+        now = time.monotonic()
+        for job_id, (file_ctx, state) in list(pending_jobs.items()):
+            if not self.is_running: break
+            if job_id not in pending_jobs or state["ticket"].next_due > now: continue
+
+            ticket = state["ticket"]
+            ticket.attempts += 1
+            state["result"], state["error"] = self._poll_job_once(job_id)
+            if not state["result"] and not state["error"]:
+                if not scheduler.is_expired(ticket):
+                    scheduler.schedule_next(ticket)
+                    self.original_file_status_update.emit(file_ctx["path"], f"{OCR_STATUS_PROCESSING} (一括ポーリング中 残り{len(pending_jobs)}件, {ticket.attempts}回目)")
+                    continue
+                state["error"] = {"message": "結果取得がタイムアウトしました。", "code": self.OCR_TIMEOUT_ERROR_CODE}
+            elif state["result"]:
+                scheduler.record_completion(ticket)
+
+            del pending_jobs[job_id]
+            self.api_client.rate_limiter.release_job_slot()
+            file_ctx["pending_count"] -= 1
+            if (file_ctx["pending_count"] == 0 and not file_ctx.get("registering")) or state["error"]:
+                try:
+                    self._retire_batch_file(file_ctx, pending_jobs, results_folder_name, delete_job_after_processing)
+                except Exception as e:
+                    self._emit_unexpected_file_error(file_ctx["path"], file_ctx["idx"], e)
+
+    def _retire_batch_file(self, file_ctx: Dict[str, Any], pending_jobs: Dict[str, Any], results_folder_name: str,
+                           delete_job_after_processing: bool):
+        """一括登録モードでファイルを確定させる。同じファイルの未完了ジョブはポーリング対象から外し、同時ジョブ数の枠を返す。"""
+        file_ctx["retired"] = True
+        for state in file_ctx["part_states"]:
+            if pending_jobs.pop(state["job_id"], None) is not None:
+                self.api_client.rate_limiter.release_job_slot()
+        self._complete_file(file_ctx, results_folder_name, delete_job_after_processing)
+
+    @abc.abstractmethod
+    def _complete_file(self, file_ctx: Dict[str, Any], results_folder_name: str, delete_job_after_processing: bool):
+        """OCR済みの部品から結果ファイルを出力して結果シグナルを送出し、最後に _finish_file() を呼ぶ。"""
+
+    def _finish_file(self, file_ctx: Dict[str, Any], all_parts_ok: bool):
+        """ファイルの処理完了をジャーナルに記録し、ファイル移動・一時フォルダ削除を行う。"""
+        original_file_path = file_ctx["path"]
+        JobJournal.record_file_finished(original_file_path, all_parts_ok)
+
+        # ファイル移動
+        if os.path.exists(original_file_path):
+            self._move_file_if_configured(original_file_path, all_parts_ok)
+
+        self._try_cleanup_specific_temp_dirs(file_ctx["temp_dir"], file_ctx["parts_results_temp_dir"])
+
+    def stop(self):
+        self.is_running = False
+        self.user_stopped = True
+
+    def _move_file_if_configured(self, file_path, was_successful):
+        dest_subfolder = None
+        if was_successful and self.file_actions_config.get("move_on_success_enabled", False):
+            dest_subfolder = self.file_actions_config.get("success_folder_name")
+        elif not was_successful and self.file_actions_config.get("move_on_failure_enabled", False):
+            dest_subfolder = self.file_actions_config.get("failure_folder_name")
+
+        if dest_subfolder:
+            collision_action = self.file_actions_config.get("collision_action", "rename")
+            parent_dir = os.path.dirname(file_path)
+            dest_dir = os.path.join(parent_dir, dest_subfolder)
+            os.makedirs(dest_dir, exist_ok=True)
+            
+            final_dest_path = os.path.join(dest_dir, os.path.basename(file_path))
+            if os.path.exists(final_dest_path):
+                if collision_action == "rename":
+                    final_dest_path = self._get_unique_filepath(dest_dir, os.path.basename(file_path))
+                elif collision_action == "skip":
+                    return
+            
+            shutil.move(file_path, final_dest_path)
+    
+    def _try_cleanup_specific_temp_dirs(self, source_parts_dir: Optional[str], results_parts_dir: Optional[str]):
+        if source_parts_dir and os.path.isdir(source_parts_dir):
+            shutil.rmtree(source_parts_dir)
+        if results_parts_dir and os.path.isdir(results_parts_dir):
+            shutil.rmtree(results_parts_dir)
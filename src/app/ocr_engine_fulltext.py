@@ -0,0 +1,244 @@
+# ocr_engine_fulltext.py
+
+import os
+import json
+import shutil
+from typing import Optional, Dict, Any, List, Tuple
+
+from PyPDF2 import PdfMerger
+
+from app_constants import OCR_STATUS_PART_PROCESSING, OCR_STATUS_MERGING, OCR_STATUS_COMPLETED
+from api_client_fulltext import OCRApiClientFulltext
+from ocr_engine_base import OcrEngineBase
+from polling_scheduler import POLL_OUTCOME_TIMEOUT
+from result_cache import ResultCache
+
+
+class OcrEngineFulltext(OcrEngineBase):
+    """DX Suite 全文読取 (dx_fulltext_v2) のOCR処理エンジン (Qt に依存しない)。
+
+    OCR結果のJSONに加えてサーチャブルPDFを作成し、分割した部品のPDFは設定に応じて結合する。
+    GUI からは QThread のラッパー (ocr_worker_fulltext.OcrWorkerFulltext) 経由で、ヘッドレス実行では直接使う。
+    """
+    api_client: OCRApiClientFulltext
+
+    # 結果キャッシュのキーに含める設定 (同じファイルでも値が異なれば出力結果が変わるもの)
+    RESULT_CACHE_OPTION_KEYS = ("base_uri", "concatenate", "characterExtraction", "tableExtraction", "highResolutionMode", "merge_split_pdf_parts")
+    RESULT_CACHE_FILE_ACTION_KEYS = ("output_format",)
+
+    ENGINE_LOG_NAME = "FulltextOcrWorker"
+    THREAD_NAME_PREFIX = "Fulltext"
+    OCR_TIMEOUT_ERROR_CODE = "DXSUITE_OCR_TIMEOUT"
+
+    def _create_polling_schedulers(self):
+        super()._create_polling_schedulers()
+        self.spdf_polling_scheduler = self._new_polling_scheduler("searchable_pdf")
+
+    def _merge_searchable_pdfs(self, pdf_part_paths: List[str], final_merged_pdf_path: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        if not pdf_part_paths:
+            return None, {"message": "結合対象のPDF部品がありません。", "code": "MERGE_NO_PARTS"}
+        merger = PdfMerger()
+        try:
+            for part_path in pdf_part_paths:
+                if os.path.exists(part_path):
+                    merger.append(part_path)
+                else:
+                    try: merger.close()
+                    except Exception: pass
+                    return None, {"message": f"結合用のPDF部品が見つかりません: {os.path.basename(part_path)}", "code": "MERGE_PART_NOT_FOUND"}
+            os.makedirs(os.path.dirname(final_merged_pdf_path), exist_ok=True)
+            merger.write(final_merged_pdf_path)
+            return final_merged_pdf_path, None
+        except Exception as e:
+            if os.path.exists(final_merged_pdf_path):
+                try: os.remove(final_merged_pdf_path)
+                except Exception: pass
+            return None, {"message": f"PDF結合エラー: {str(e)}", "code": "MERGE_EXCEPTION", "detail": str(e)}
+        finally:
+            try: merger.close()
+            except Exception: pass
+
+    def _emit_cached_output_signals(self, original_file_global_idx: int, original_file_path: str,
+                                    restored: List[Tuple[Dict[str, Any], str]], payload: Dict[str, Any]):
+        pdf_path_for_signal = next((dest_path for artifact, dest_path in restored if artifact.get("signal_pdf")), None)
+        self.searchable_pdf_processed.emit(original_file_global_idx, original_file_path, pdf_path_for_signal, payload.get("pdf_error"))
+
+    def _register_part(self, part_path: str, progress_callback=None) -> Tuple[Optional[str], Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """部品をOCR登録する。戻り値: (ジョブID, 即時結果 (Demoモードなど), エラー)"""
+        ocr_response, ocr_error = self.api_client.read_document(part_path, progress_callback=progress_callback)
+        if ocr_error:
+            return None, None, ocr_error
+        if ocr_response and "registered" in ocr_response.get("status", ""):
+            job_id = ocr_response.get("job_id")
+            if not job_id:
+                return None, None, {"message": "OCRジョブIDが取得できませんでした。", "code": "DXSUITE_NO_JOB_ID"}
+            return job_id, None, None
+        return None, ocr_response, None
+
+    def _poll_job_once(self, job_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """OCRジョブの状態を1回確認する。戻り値: (完了時の結果, エラー)。両方 None の場合は処理中。"""
+        poll_res, poll_err = self.api_client.get_ocr_result(job_id)
+        if poll_err:
+            return None, poll_err
+        api_status = poll_res.get("status")
+        if api_status == "done":
+            return poll_res, None
+        elif api_status == "error":
+            return None, {"message": "APIがエラーを返しました。", "code": "DXSUITE_OCR_API_ERROR", "detail": poll_res}
+        return None, None
+
+    def _poll_searchable_pdf_once(self, spdf_job_id: str) -> Tuple[Optional[bytes], Optional[Dict[str, Any]]]:
+        """サーチャブルPDFの取得を1回試みる。作成中 (STATUS_INPROGRESS) の場合は (None, None) を返す。"""
+        pdf_content, pdf_poll_error = self.api_client.get_searchable_pdf_content(spdf_job_id)
+        if pdf_poll_error:
+            if "STATUS_INPROGRESS" in pdf_poll_error.get("code", "").upper():
+                return None, None
+            return None, pdf_poll_error
+        # 空応答は完了扱いとし、呼び出し元で「有効な応答なし」として扱う
+        return pdf_content if pdf_content is not None else b"", None
+
+    def _complete_file(self, file_ctx: Dict[str, Any], results_folder_name: str, delete_job_after_processing: bool):
+        """OCR済みの部品からJSON/サーチャブルPDFを出力し、結果シグナル送出・ファイル移動・一時フォルダ削除を行う。"""
+        original_file_path = file_ctx["path"]
+        original_file_global_idx = file_ctx["idx"]
+        original_file_parent_dir = os.path.dirname(original_file_path)
+        base_name_for_output_prefix = file_ctx["base_name"]
+        parts_results_temp_dir = file_ctx["parts_results_temp_dir"]
+        part_states = file_ctx["part_states"]
+        is_multi_part = len(part_states) > 1
+
+        part_ocr_results = []
+        part_pdf_paths = []
+        all_parts_ok = True
+        final_ocr_error = next((s["error"] for s in part_states if s["error"]), None)
+        final_pdf_error = None
+
+        if final_ocr_error:
+            all_parts_ok = False
+            if final_ocr_error.get("code") == "USER_INTERRUPT":
+                final_pdf_error = {"message": "処理が中断/停止されました", "code": "USER_INTERRUPT"}
+            if delete_job_after_processing:
+                for state in part_states:
+                    if state["job_id"]: self.api_client.delete_job(state["job_id"])
+        else:
+            for state in part_states:
+                part_path = state["path"]
+                part_job_id = state["job_id"]
+                part_ocr_result_json = state["result"]
+                part_ocr_results.append({"path": part_path, "result": part_ocr_result_json, "job_id": part_job_id})
+
+                if not self.is_running or self.encountered_fatal_error:
+                    all_parts_ok = False
+                    final_ocr_error = {"message": "処理が中断/停止されました", "code": "USER_INTERRUPT"}
+                    final_pdf_error = {"message": "処理が中断/停止されました", "code": "USER_INTERRUPT"}
+                    break
+
+                # --- JSON保存 ---
+                if self.file_actions_config.get("output_format", "both") in ["json_only", "both"]:
+                    part_json_path = os.path.join(parts_results_temp_dir, f"{os.path.splitext(os.path.basename(part_path))[0]}.json")
+                    with open(part_json_path, 'w', encoding='utf-8') as f:
+                        json.dump(part_ocr_result_json, f, ensure_ascii=False, indent=2)
+
+                # --- サーチャブルPDF作成 ---
+                if self.file_actions_config.get("output_format", "both") in ["pdf_only", "both"]:
+                    pdf_options = {"fullOcrJobId": part_job_id, **self.current_api_options_values}
+                    pdf_response, pdf_error = self.api_client.make_searchable_pdf(part_path, pdf_options)
+
+                    part_pdf_content = None
+                    if pdf_error:
+                        final_pdf_error = pdf_error
+                        all_parts_ok = False
+                    elif isinstance(pdf_response, bytes):
+                        part_pdf_content = pdf_response
+                    elif isinstance(pdf_response, dict) and "searchable_pdf_registered" in pdf_response.get("status", ""):
+                        spdf_job_id = pdf_response.get("job_id")
+                        if not spdf_job_id:
+                            final_pdf_error = {"message": "サーチャブルPDFジョブIDが取得できませんでした。", "code": "DXSUITE_SPDF_NO_JOB_ID"}
+                            all_parts_ok = False
+                        else:
+                            part_pdf_content, pdf_poll_error, poll_outcome = self.spdf_polling_scheduler.poll_until_complete(
+                                lambda: self._poll_searchable_pdf_once(spdf_job_id), lambda: self.is_running, page_count=state["page_count"],
+                                on_attempt=lambda ticket: self.original_file_status_update.emit(original_file_path, f"{OCR_STATUS_PART_PROCESSING} (PDF結果待機中 {ticket.attempts}回目, {ticket.elapsed():.0f}秒経過)"))
+                            if pdf_poll_error:
+                                final_pdf_error = pdf_poll_error
+                                all_parts_ok = False
+                            elif poll_outcome == POLL_OUTCOME_TIMEOUT:
+                                final_pdf_error = {"message": "サーチャブルPDF取得がタイムアウトしました。", "code": "DXSUITE_SPDF_TIMEOUT"}
+                                all_parts_ok = False
+                    else: # Demoモードなど
+                        part_pdf_content = pdf_response
+
+                    if part_pdf_content:
+                        base_name_without_ext = os.path.splitext(os.path.basename(part_path))[0]
+                        part_pdf_path = os.path.join(parts_results_temp_dir, f"{base_name_without_ext}.pdf")
+                        with open(part_pdf_path, 'wb') as f:
+                            f.write(part_pdf_content)
+                        part_pdf_paths.append(part_pdf_path)
+                    elif all_parts_ok:
+                        all_parts_ok = False
+                        final_pdf_error = {"message": "PDF作成で有効な応答がありませんでした", "code": "PDF_NO_VALID_RESPONSE"}
+
+                if delete_job_after_processing and part_job_id:
+                    self.api_client.delete_job(part_job_id)
+
+                if not all_parts_ok: break
+
+        # --- 全部品の処理完了後 ---
+        job_id_for_signal = part_ocr_results[0]['job_id'] if part_ocr_results else next((s["job_id"] for s in part_states if s["job_id"]), None)
+        if all_parts_ok:
+            cache_artifacts: List[Dict[str, Any]] = []
+            final_ocr_result = part_ocr_results[0]['result'] if not is_multi_part else {"status": OCR_STATUS_COMPLETED, "detail": f"{len(part_ocr_results)}部品のOCR完了"}
+
+            json_status_ui = "作成しない(設定)"
+            if self.file_actions_config.get("output_format", "both") in ["json_only", "both"]:
+                final_json_dir = os.path.join(original_file_parent_dir, results_folder_name)
+                os.makedirs(final_json_dir, exist_ok=True)
+                if is_multi_part:
+                    for item in os.listdir(parts_results_temp_dir):
+                        if item.endswith(".json"):
+                            shutil.copy2(os.path.join(parts_results_temp_dir, item), self._get_unique_filepath(final_json_dir, item))
+                            cache_artifacts.append({"name": item, "source_path": os.path.join(parts_results_temp_dir, item)})
+                    json_status_ui = f"{len(part_ocr_results)}個の部品JSON成功"
+                else:
+                    part_json_path = os.path.join(parts_results_temp_dir, f"{os.path.splitext(os.path.basename(part_states[0]['path']))[0]}.json")
+                    shutil.copy2(part_json_path, self._get_unique_filepath(final_json_dir, f"{base_name_for_output_prefix}.json"))
+                    cache_artifacts.append({"name": f"{base_name_for_output_prefix}.json", "source_path": part_json_path})
+                    json_status_ui = "JSON作成成功"
+
+            self.file_processed.emit(original_file_global_idx, original_file_path, final_ocr_result, None, json_status_ui, job_id_for_signal)
+
+            pdf_final_path_for_signal = None
+            if self.file_actions_config.get("output_format", "both") in ["pdf_only", "both"]:
+                merge_pdfs = self.current_api_options_values.get("merge_split_pdf_parts", True)
+                if is_multi_part and merge_pdfs:
+                    self.original_file_status_update.emit(original_file_path, OCR_STATUS_MERGING)
+                    final_pdf_dir = os.path.join(original_file_parent_dir, results_folder_name)
+                    merged_pdf_path = self._get_unique_filepath(final_pdf_dir, f"{base_name_for_output_prefix}.pdf")
+                    pdf_final_path_for_signal, final_pdf_error = self._merge_searchable_pdfs(part_pdf_paths, merged_pdf_path)
+                    if pdf_final_path_for_signal:
+                        cache_artifacts.append({"name": f"{base_name_for_output_prefix}.pdf", "source_path": pdf_final_path_for_signal, "signal_pdf": True})
+                elif part_pdf_paths:
+                    # 単一部品 or マージしない設定
+                    final_pdf_dir = os.path.join(original_file_parent_dir, results_folder_name)
+                    os.makedirs(final_pdf_dir, exist_ok=True)
+                    for pdf_path in part_pdf_paths:
+                        dest_path = self._get_unique_filepath(final_pdf_dir, os.path.basename(pdf_path))
+                        shutil.copy2(pdf_path, dest_path)
+                        if not is_multi_part: pdf_final_path_for_signal = dest_path
+                        cache_artifacts.append({"name": os.path.basename(pdf_path), "source_path": pdf_path, "signal_pdf": not is_multi_part})
+                    if is_multi_part and not merge_pdfs:
+                        final_pdf_error = {"message": f"{len(part_pdf_paths)}個の部品PDF出力成功", "code": "PARTS_COPIED_SUCCESS"}
+            elif self.file_actions_config.get("output_format", "both") == "json_only":
+                final_pdf_error = {"message": "作成しない(設定)", "code": "PDF_NOT_REQUESTED"}
+
+            self.searchable_pdf_processed.emit(original_file_global_idx, original_file_path, pdf_final_path_for_signal, final_pdf_error)
+            # PDFの結合に失敗した場合などは、次回も作成し直すため保存しない
+            if file_ctx.get("cache_key") and (final_pdf_error is None or final_pdf_error.get("code") in ("PARTS_COPIED_SUCCESS", "PDF_NOT_REQUESTED")):
+                ResultCache.store(file_ctx["cache_key"], cache_artifacts, {"ocr_result": final_ocr_result, "json_status": json_status_ui, "pdf_error": final_pdf_error},
+                                  base_name_for_output_prefix)
+
+        else: # if not all_parts_ok
+            self.file_processed.emit(original_file_global_idx, original_file_path, None, final_ocr_error, "エラー", job_id_for_signal)
+            self.searchable_pdf_processed.emit(original_file_global_idx, original_file_path, None, final_pdf_error or {"message": "OCRエラーのためPDF作成スキップ", "code": "PDF_SKIPPED_DUE_TO_OCR_ERROR"})
+
+        self._finish_file(file_ctx, all_parts_ok)
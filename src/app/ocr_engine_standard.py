@@ -0,0 +1,135 @@
+# ocr_engine_standard.py
+
+import os
+import json
+from typing import Optional, Dict, Any, List, Tuple
+
+from app_constants import OCR_STATUS_PROCESSING, OCR_STATUS_COMPLETED
+from api_client_standard import OCRApiClientStandard
+from ocr_engine_base import OcrEngineBase
+from result_cache import ResultCache
+
+
+class OcrEngineStandard(OcrEngineBase):
+    """DX Suite 標準 (dx_standard_v2) のOCR処理エンジン (Qt に依存しない)。
+
+    部品を読取ユニットとして登録し、結果のJSON/CSVを出力する (サーチャブルPDFは対象外)。
+    GUI からは QThread のラッパー (ocr_worker_standard.OcrWorkerStandard) 経由で、ヘッドレス実行では直接使う。
+    """
+    api_client: OCRApiClientStandard
+
+    # 結果キャッシュのキーに含める設定 (同じファイルでも値が異なれば出力結果が変わるもの)
+    RESULT_CACHE_OPTION_KEYS = ("base_uri", "workflowId")
+    RESULT_CACHE_FILE_ACTION_KEYS = ("dx_standard_output_json", "dx_standard_auto_download_csv")
+
+    ENGINE_LOG_NAME = "StandardOcrWorker"
+    THREAD_NAME_PREFIX = "Standard"
+    OCR_TIMEOUT_ERROR_CODE = "DX_STANDARD_OCR_TIMEOUT"
+    PART_STATUS_TEXT = OCR_STATUS_PROCESSING
+
+    def _emit_cached_output_signals(self, original_file_global_idx: int, original_file_path: str,
+                                    restored: List[Tuple[Dict[str, Any], str]], payload: Dict[str, Any]):
+        if payload.get("csv_status"):
+            self.auto_csv_processed.emit(original_file_global_idx, original_file_path, payload["csv_status"])
+        self.searchable_pdf_processed.emit(original_file_global_idx, original_file_path, None, {"message": "対象外", "code": "NOT_APPLICABLE"})
+
+    def _register_part(self, part_path: str, progress_callback=None) -> Tuple[Optional[str], Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """部品を読取ユニットとして登録する。戻り値: (unitId, 即時結果 (Demoモードなど), エラー)"""
+        ocr_response, ocr_error = self.api_client.read_document(part_path, progress_callback=progress_callback)
+        if ocr_error:
+            return None, None, ocr_error
+        if ocr_response and "registered" in ocr_response.get("status", ""):
+            unit_id = ocr_response.get("unitId")
+            if not unit_id:
+                return None, None, {"message": "unitIdが取得できませんでした。", "code": "POLL_NO_UNITID"}
+            return unit_id, None, None
+        # Demoモードなど
+        unit_id = ocr_response.get("unitId") if ocr_response else None
+        return unit_id, {"status": "ocr_completed_and_polled", "unitId": unit_id, "dataProcessingStatus": 400}, None
+
+    def _poll_job_once(self, unit_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """読取ユニットの状態を1回確認する。戻り値: (完了時の状態情報, エラー)。両方 None の場合は処理中。"""
+        poll_res, poll_err = self.api_client.get_status(unit_id)
+        if poll_err:
+            return None, poll_err
+        if poll_res and poll_res[0]:
+            status_code = poll_res[0].get("dataProcessingStatus")
+            if status_code in [400, 300]: # 完了 or 手動操作待ち
+                return {"status": "ocr_completed_and_polled", "unitId": unit_id, "dataProcessingStatus": status_code}, None
+        return None, None
+
+    def _complete_file(self, file_ctx: Dict[str, Any], results_folder_name: str, delete_job_after_processing: bool):
+        """OCR済みの読取ユニットからJSON/CSVを出力し、結果シグナル送出・ファイル移動・一時フォルダ削除を行う。"""
+        original_file_path = file_ctx["path"]
+        original_file_global_idx = file_ctx["idx"]
+        original_file_parent_dir = os.path.dirname(original_file_path)
+        base_name_for_output_prefix = file_ctx["base_name"]
+        part_states = file_ctx["part_states"]
+        is_multi_part = len(part_states) > 1
+
+        output_json = self.file_actions_config.get("dx_standard_output_json", True)
+        output_csv = self.file_actions_config.get("dx_standard_auto_download_csv", True)
+
+        final_ocr_error = next((s["error"] for s in part_states if s["error"]), None)
+        all_parts_ok = final_ocr_error is None
+        unit_id = next((s["job_id"] for s in reversed(part_states) if s["job_id"]), None)
+        json_result_for_signal = None
+        # 結果キャッシュに保存する出力ファイル。手動操作待ち (300) の読取結果は確定していないため保存しない
+        cache_artifacts: List[Dict[str, Any]] = []
+        cacheable = all_parts_ok and not any((s["result"] or {}).get("dataProcessingStatus") == 300 for s in part_states)
+
+        for part_idx, state in enumerate(part_states):
+            if all_parts_ok:
+                if not self.is_running or self.encountered_fatal_error:
+                    all_parts_ok = False
+                    final_ocr_error = {"message": "処理が中断/停止されました", "code": "USER_INTERRUPT"}
+                else:
+                    # --- 後続処理 (JSON/CSV保存) ---
+                    part_unit_id = state["job_id"]
+                    final_dir = os.path.join(original_file_parent_dir, results_folder_name)
+                    os.makedirs(final_dir, exist_ok=True)
+                    unit_name = f"{base_name_for_output_prefix}.part{part_idx+1}" if is_multi_part else base_name_for_output_prefix
+
+                    if output_json:
+                        json_res, json_err = self.api_client.get_result(part_unit_id)
+                        if json_err:
+                            final_ocr_error = json_err
+                            all_parts_ok = False
+                        else:
+                            json_result_for_signal = json_res
+                            json_path = self._get_unique_filepath(final_dir, f"{unit_name}.json")
+                            with open(json_path, 'w', encoding='utf-8') as f:
+                                json.dump(json_res, f, ensure_ascii=False, indent=2)
+                            cache_artifacts.append({"name": f"{unit_name}.json", "source_path": json_path})
+
+                    if output_csv and all_parts_ok:
+                        csv_data, csv_err = self.api_client.download_standard_csv(part_unit_id)
+                        if csv_err:
+                            cacheable = False
+                            self.auto_csv_processed.emit(original_file_global_idx, original_file_path, {"message": f"CSV失敗: {csv_err.get('message')}"})
+                        else:
+                            csv_path = self._get_unique_filepath(final_dir, f"{unit_name}.csv")
+                            with open(csv_path, 'wb') as f: f.write(csv_data)
+                            cache_artifacts.append({"name": f"{unit_name}.csv", "source_path": csv_path})
+                            self.auto_csv_processed.emit(original_file_global_idx, original_file_path, {"message": "CSV成功"})
+
+            if delete_job_after_processing and state["job_id"]:
+                self.api_client.delete_job(state["job_id"])
+
+        # --- 全部品の処理完了後 ---
+        if all_parts_ok:
+            final_ocr_result_for_ui = json_result_for_signal if json_result_for_signal else {"status": OCR_STATUS_COMPLETED, "detail": f"{len(part_states)}部品の処理完了"}
+            json_status_ui = "JSON成功" if output_json else "作成しない(設定)"
+            self.file_processed.emit(original_file_global_idx, original_file_path, final_ocr_result_for_ui, None, json_status_ui, unit_id)
+            if cacheable and file_ctx.get("cache_key"):
+                ResultCache.store(file_ctx["cache_key"], cache_artifacts, {"ocr_result": final_ocr_result_for_ui, "json_status": json_status_ui,
+                                                                           "csv_status": {"message": "CSV成功"} if output_csv else None},
+                                  base_name_for_output_prefix)
+        else:
+            self.file_processed.emit(original_file_global_idx, original_file_path, None, final_ocr_error, "エラー", unit_id)
+            self.auto_csv_processed.emit(original_file_global_idx, original_file_path, {"message": "エラー"})
+
+        # 標準はPDFをサポートしない
+        self.searchable_pdf_processed.emit(original_file_global_idx, original_file_path, None, {"message": "対象外", "code": "NOT_APPLICABLE"})
+
+        self._finish_file(file_ctx, all_parts_ok)
@@ -12,6 +12,7 @@ from ui_dialogs import OcrConfirmationDialog
 from config_manager import ConfigManager
 from file_model import FileInfo
 from csv_exporter import export_atypical_to_csv
+from job_journal import JobJournal
 
 from app_constants import (
     OCR_STATUS_NOT_PROCESSED, OCR_STATUS_PROCESSING, OCR_STATUS_COMPLETED,
@@ -27,6 +28,7 @@ class OcrOrchestrator(QObject):
     file_ocr_processed_signal = pyqtSignal(int, str, object, object, object, object)
     file_auto_csv_processed_signal = pyqtSignal(int, str, object)
     file_searchable_pdf_processed_signal = pyqtSignal(int, str, object, object)
+    ocr_run_stats_signal = pyqtSignal(object)
     
     # 仕分け用シグナル
     sort_process_started_signal = pyqtSignal(str)
@@ -185,7 +187,8 @@ class OcrOrchestrator(QObject):
         summary_lines.append("<br>上記内容で処理を開始します。")
         return "<br>".join(summary_lines)
 
-    def _prepare_and_start_ocr_worker(self, files_to_send_to_worker_tuples: List[tuple], input_folder_path: str):
+    def _prepare_and_start_ocr_worker(self, files_to_send_to_worker_tuples: List[tuple], input_folder_path: str,
+                                      resume_jobs: Optional[Dict[str, Dict[str, Any]]] = None, resumed_from_run_id: Optional[str] = None):
         self.log_manager.info(f"OcrOrchestrator: Instantiating OcrWorker for {len(files_to_send_to_worker_tuples)} files.", context="OCR_ORCH_WORKER_INIT")
         self.fatal_error_occurred_info = None
         
@@ -203,19 +206,27 @@ class OcrOrchestrator(QObject):
             input_root_folder=input_folder_path,
             log_manager=self.log_manager,
             config=self.config, 
-            api_profile=self.active_api_profile 
+            api_profile=self.active_api_profile,
+            resume_jobs=resume_jobs
         )
         self.ocr_worker.original_file_status_update.connect(self.original_file_status_update_signal)
         self.ocr_worker.file_processed.connect(self._handle_worker_file_ocr_processed)
         self.ocr_worker.auto_csv_processed.connect(self.file_auto_csv_processed_signal)
         self.ocr_worker.searchable_pdf_processed.connect(self._handle_worker_searchable_pdf_processed)
+        self.ocr_worker.run_stats_reported.connect(self.ocr_run_stats_signal)
         self.ocr_worker.all_files_processed.connect(self._handle_worker_all_files_processed)
 
+        # 異常終了時に登録済みジョブから再開できるよう、実行の開始をジャーナルに記録する
+        if not JobJournal.begin_run(self.active_api_profile.get("id"), self.config.get("api_execution_mode"), input_folder_path,
+                                    [path for path, _ in files_to_send_to_worker_tuples], resumed_from=resumed_from_run_id):
+            self.log_manager.warning(f"ジョブジャーナルに記録できないため、異常終了時の再開はできません: {JobJournal.get_disabled_reason()}", context="OCR_ORCH_JOURNAL")
+
         try:
             self.ocr_worker.start()
             self.is_ocr_running = True
         except Exception as e_start_worker:
             self.log_manager.error(f"OcrOrchestrator: Failed to start OcrWorker thread: {e_start_worker}", context="OCR_ORCH_WORKER_ERROR", exc_info=True)
+            JobJournal.end_run(interrupted=True)
             self.is_ocr_running = False
             self.ocr_worker = None
             self.ocr_process_finished_signal.emit(True, {"message": f"ワーカー起動失敗: {e_start_worker}", "code": "WORKER_START_FAIL"})
@@ -246,6 +257,7 @@ class OcrOrchestrator(QObject):
         
         final_fatal_error_info = self.fatal_error_occurred_info
         was_interrupted_by_user = self.user_stopped
+        JobJournal.end_run(interrupted=was_interrupted_by_user or bool(final_fatal_error_info))
         
         if self.is_ocr_running:
             self.is_ocr_running = False
@@ -353,6 +365,54 @@ class OcrOrchestrator(QObject):
         self._prepare_and_start_ocr_worker(files_to_resume_tuples, input_folder_path)
         self.request_ui_controls_update_signal.emit()
 
+    def find_interrupted_run(self, input_folder_path: str) -> Optional[Dict[str, Any]]:
+        """前回、アプリケーションの異常終了などで完了しなかった実行 (同じプロファイル・実行モード・入力フォルダ) を返す。"""
+        if not self.active_api_profile or not input_folder_path: return None
+        try:
+            return JobJournal.find_interrupted_run(self.active_api_profile.get("id"), self.config.get("api_execution_mode"), input_folder_path)
+        except Exception as e:
+            self.log_manager.warning(f"ジョブジャーナルの読み込みに失敗しました: {e}", context="OCR_ORCH_JOURNAL")
+            return None
+
+    def confirm_and_resume_interrupted_run(self, processed_files_info: List[FileInfo], input_folder_path: str, interrupted_run: Dict[str, Any], parent_widget_for_dialog):
+        """異常終了した実行を再開する。完了済みのファイルはスキップし、登録済みのジョブは再アップロードせずに結果の取得から再開する。"""
+        if not self.api_client or not self.active_api_profile or self.is_ocr_running: return
+        completed_paths = set(interrupted_run.get("completed", []))
+        remaining_paths = [path for path in interrupted_run.get("files", []) if path not in completed_paths]
+        index_by_path = {item.path: idx for idx, item in enumerate(processed_files_info)}
+        files_to_resume_tuples = [(path, index_by_path[path]) for path in remaining_paths
+                                  if path in index_by_path and processed_files_info[index_by_path[path]].ocr_engine_status != OCR_STATUS_SKIPPED_SIZE_LIMIT]
+        resume_jobs = {path: job for path, job in interrupted_run.get("jobs", {}).items() if path in index_by_path}
+
+        if not files_to_resume_tuples or QMessageBox.question(parent_widget_for_dialog, "中断された処理の再開",
+                                     f"前回のOCR処理が完了しないまま終了しています。\n\n"
+                                     f"完了済み: {len(completed_paths)} 件 (スキップします)\n"
+                                     f"未完了: {len(files_to_resume_tuples)} 件 (うち {len(resume_jobs)} 件は登録済みのジョブの結果取得から再開します)\n\n"
+                                     f"処理を再開しますか？\n(「いいえ」を選ぶと、この中断記録は破棄されます)",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.Yes) == QMessageBox.StandardButton.No:
+            # 再開しない (再開対象が残っていない) 中断記録は、空の再開として終了を記録し、次回以降は確認しない
+            JobJournal.begin_run(self.active_api_profile.get("id"), self.config.get("api_execution_mode"), input_folder_path, [], resumed_from=interrupted_run.get("run_id"))
+            JobJournal.end_run(interrupted=True)
+            return
+
+        self.log_manager.info(f"OcrOrchestrator: Resuming interrupted run {interrupted_run.get('run_id')} for {len(files_to_resume_tuples)} files ({len(resume_jobs)} with registered jobs).", context="OCR_ORCH_FLOW")
+        resume_indices = {idx for _, idx in files_to_resume_tuples}
+        file_actions = self.config.get("file_actions", {}); is_dx_standard = self.active_api_profile.get('id') == 'dx_standard_v2'
+        for idx, item in enumerate(processed_files_info):
+            if item.path in completed_paths:
+                item.is_checked = False; item.status = f"{OCR_STATUS_COMPLETED}(前回の実行)"
+            elif idx in resume_indices:
+                item.is_checked = True; item.ocr_engine_status = OCR_STATUS_PROCESSING; item.status = f"{OCR_STATUS_PROCESSING}(再開)"; item.ocr_result_summary = ""
+                if is_dx_standard:
+                    item.json_status = "処理待ち" if file_actions.get("dx_standard_output_json", False) else "作成しない(設定)"; item.auto_csv_status = "処理待ち" if file_actions.get("dx_standard_auto_download_csv", False) else "作成しない(設定)"; item.searchable_pdf_status = "対象外"
+                else:
+                    output_format_cfg = file_actions.get("output_format", "both"); item.json_status = "処理待ち" if output_format_cfg in ["json_only", "both"] else "作成しない(設定)"; item.searchable_pdf_status = "処理待ち" if output_format_cfg in ["pdf_only", "both"] else "作成しない(設定)"; item.auto_csv_status = "対象外"
+
+        self.user_stopped = False
+        self.ocr_process_started_signal.emit(len(files_to_resume_tuples), processed_files_info)
+        self._prepare_and_start_ocr_worker(files_to_resume_tuples, input_folder_path, resume_jobs=resume_jobs, resumed_from_run_id=interrupted_run.get("run_id"))
+        self.request_ui_controls_update_signal.emit()
+
     def confirm_and_stop_ocr(self, parent_widget_for_dialog):
         self.log_manager.debug("OcrOrchestrator: Confirming process stop...", context="OCR_ORCH_FLOW_STOP")
         worker_to_stop = self.ocr_worker if self.ocr_worker and self.ocr_worker.isRunning() else self.sort_worker
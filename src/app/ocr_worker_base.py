@@ -0,0 +1,37 @@
+# ocr_worker_base.py
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+# エンジンから GUI へ中継するシグナル (OcrEngine* の EngineSignal と同じ名前・引数)
+ENGINE_SIGNAL_NAMES = (
+    "file_processed", "auto_csv_processed", "searchable_pdf_processed",
+    "all_files_processed", "original_file_status_update", "run_stats_reported",
+)
+
+
+class OcrEngineWorker(QThread):
+    """Qt に依存しないOCR処理エンジン (ocr_engine_*) を QThread で実行するラッパー。
+
+    エンジンはこのスレッド上で run() され、EngineSignal の通知を同名の pyqtSignal へ中継する。
+    pyqtSignal の接続先 (Orchestrator / MainWindow) へは、Qt のキュー接続によりGUIスレッドで配送される。
+    """
+    file_processed = pyqtSignal(int, str, object, object, object, object)
+    auto_csv_processed = pyqtSignal(int, str, object)
+    searchable_pdf_processed = pyqtSignal(int, str, object, object)
+    all_files_processed = pyqtSignal()
+    original_file_status_update = pyqtSignal(str, str)
+    run_stats_reported = pyqtSignal(object)
+
+    engine_class = None  # 派生クラスで OcrEngine* を指定する
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.engine = self.engine_class(*args, **kwargs)
+        for signal_name in ENGINE_SIGNAL_NAMES:
+            getattr(self.engine, signal_name).connect(getattr(self, signal_name).emit)
+
+    def run(self):
+        self.engine.run()
+
+    def stop(self):
+        self.engine.stop()
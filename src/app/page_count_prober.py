@@ -0,0 +1,162 @@
+# page_count_prober.py
+
+import os
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Dict, Any, List, Tuple
+
+from pdf_metadata import PdfMetadataCache, probe_page_count_for_scan
+
+# このモジュールはヘッドレス実行からも使えるよう、PyQt6 に依存しないこと。GUI では ui_page_count_prober.QtPageCountProber を使う。
+
+PAGE_COUNT_PROBE_MAX_WORKERS = 4
+# 結果はこの件数またはこの秒数ごとにまとめて通知する (一覧の再描画の回数を抑える)
+PAGE_COUNT_RESULT_BATCH_SIZE = 200
+PAGE_COUNT_RESULT_INTERVAL_SECONDS = 0.3
+
+
+def log_pdf_probe_error(log_manager, file_path: str, pdf_error: Dict[str, Any]):
+    """ページ数を取得できなかったPDFを記録する (破損の可能性がある場合は警告、それ以外はエラー)。"""
+    if pdf_error.get("code") == "PDF_READ_ERROR":
+        log_manager.warning(f"FileScanner: PDFファイル '{os.path.basename(file_path)}' のページ数読み取りに失敗しました (ファイル破損の可能性)。エラー: {pdf_error.get('detail')}", context="FILE_SCANNER_PDF_ERROR")
+    else:
+        log_manager.error(f"FileScanner: PDFファイル '{os.path.basename(file_path)}' の読み取り中に予期せぬエラーが発生しました。エラー: {pdf_error.get('detail')}", context="FILE_SCANNER_PDF_ERROR", error_code=pdf_error.get("code"))
+
+
+class PageCountProber:
+    """一覧に表示するPDFのページ数を、バックグラウンドのプロセスプールで取得する。
+
+    start() はすぐに戻り、結果は取得用のスレッドから _deliver_results(実行ID, [(パス, ページ数 or None), ...], 完了数, 総数) で
+    まとめて通知する (最後の通知は 完了数 == 総数)。取得中に start() を呼ぶと前の取得は取り消す。
+    全体を解析したPDFのメタデータは PdfMetadataCache に登録し、OCR処理時の分割要否の判定で再利用する。
+    プロセスプールを使えない場合は、取得用のスレッドで順に取得する。
+    """
+    def __init__(self, log_manager, max_workers: int = PAGE_COUNT_PROBE_MAX_WORKERS):
+        self.log_manager = log_manager
+        self.max_workers = max(1, min(int(max_workers), (os.cpu_count() or 2) - 1))
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_failed = False
+        self._closed = False
+        self._run_id = 0
+        self._cancel_event: Optional[threading.Event] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _deliver_results(self, run_id: int, results: List[Tuple[str, Optional[int]]], done: int, total: int):
+        """取得結果の通知。GUI を持たないこのクラスでは何もしない。"""
+        pass
+
+    def start(self, file_paths: List[str]) -> int:
+        """file_paths のPDFのページ数の取得を開始し、結果の通知に付ける実行IDを返す。"""
+        self.cancel()
+        with self._lock:
+            self._run_id += 1
+            run_id = self._run_id
+            cancel_event = threading.Event()
+            self._cancel_event = cancel_event
+            self._thread = threading.Thread(target=self._run, args=(run_id, list(file_paths), cancel_event), name="PageCountProber", daemon=True)
+            self._thread.start()
+        self.log_manager.info(f"PDFのページ数をバックグラウンドで取得します ({len(file_paths)}件)。", context="FILE_SCANNER_PAGE_COUNT", emit_to_ui=False, files=len(file_paths))
+        return run_id
+
+    def is_running(self) -> bool:
+        with self._lock:
+            return self._thread is not None and self._thread.is_alive()
+
+    def cancel(self):
+        """取得中であれば取り消す (実行中のPDFの解析は終わるまで待たない)。"""
+        with self._lock:
+            if self._cancel_event is not None:
+                self._cancel_event.set()
+            self._cancel_event = None
+
+    def shutdown(self):
+        """取得を取り消し、プロセスプールを閉じる (アプリケーションの終了時に呼ぶ)。"""
+        self.cancel()
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+            thread, self._thread = self._thread, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if thread is not None:
+            thread.join(timeout=5)
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        with self._lock:
+            if self._executor is None and not self._executor_failed and not self._closed:
+                try:
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                except Exception as e:
+                    self._executor_failed = True
+                    self.log_manager.warning(f"ページ数取得用のプロセスプールを作成できませんでした。1件ずつ取得します: {e}", context="FILE_SCANNER_PAGE_COUNT", emit_to_ui=False)
+            return self._executor
+
+    def _discard_executor(self, error: Exception):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._executor_failed = True
+        self.log_manager.warning(f"ページ数取得用のプロセスプールが利用できません。1件ずつ取得します: {error}", context="FILE_SCANNER_PAGE_COUNT", emit_to_ui=False)
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, run_id: int, file_paths: List[str], cancel_event: threading.Event):
+        total = len(file_paths)
+        done = 0
+        started = time.monotonic()
+        batch: List[Tuple[str, Optional[int]]] = []
+        last_delivery = time.monotonic()
+        in_flight: Dict[Any, str] = {}
+        next_index = 0
+        window = self.max_workers * 4   # 取り消し時に捨てる投入済みの件数を抑える
+
+        while (next_index < total or in_flight) and not cancel_event.is_set():
+            executor = self._get_executor()
+            while executor is not None and next_index < total and len(in_flight) < window:
+                try:
+                    in_flight[executor.submit(probe_page_count_for_scan, file_paths[next_index])] = file_paths[next_index]
+                    next_index += 1
+                except (BrokenProcessPool, RuntimeError) as e:
+                    self._discard_executor(e)
+                    executor = None
+
+            finished: List[Tuple[str, Any]] = []
+            if in_flight:
+                done_futures, _ = wait(list(in_flight), timeout=PAGE_COUNT_RESULT_INTERVAL_SECONDS, return_when=FIRST_COMPLETED)
+                for future in done_futures:
+                    path = in_flight.pop(future)
+                    try:
+                        finished.append((path, future.result()))
+                    except Exception as e:
+                        # プロセスプールの異常終了などは、このスレッドで取得し直す
+                        if isinstance(e, BrokenProcessPool): self._discard_executor(e)
+                        finished.append((path, probe_page_count_for_scan(path)))
+            elif executor is None:
+                path = file_paths[next_index]
+                next_index += 1
+                finished.append((path, probe_page_count_for_scan(path)))
+
+            for path, (page_count, metadata, pdf_error) in finished:
+                if metadata is not None:
+                    PdfMetadataCache.store(metadata)
+                if pdf_error:
+                    log_pdf_probe_error(self.log_manager, path, pdf_error)
+                batch.append((path, page_count))
+                done += 1
+
+            now = time.monotonic()
+            if batch and (len(batch) >= PAGE_COUNT_RESULT_BATCH_SIZE or now - last_delivery >= PAGE_COUNT_RESULT_INTERVAL_SECONDS or done == total) \
+                    and not cancel_event.is_set():
+                self._deliver_results(run_id, batch, done, total)
+                batch = []
+                last_delivery = now
+
+        for future in in_flight:
+            future.cancel()
+        if cancel_event.is_set():
+            self.log_manager.debug(f"PDFのページ数の取得を取り消しました ({done}/{total}件)。", context="FILE_SCANNER_PAGE_COUNT", emit_to_ui=False)
+        else:
+            self.log_manager.info(f"PDFのページ数を取得しました ({total}件, {time.monotonic() - started:.1f}秒)。", context="FILE_SCANNER_PAGE_COUNT", emit_to_ui=False,
+                                  files=total, elapsed_seconds=round(time.monotonic() - started, 3))
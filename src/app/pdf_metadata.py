@@ -0,0 +1,206 @@
+# pdf_metadata.py
+
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, Tuple
+
+from PyPDF2 import PdfReader, errors
+from PyPDF2.generic import ArrayObject, IndirectObject
+
+# フォームXObjectの入れ子をたどる深さの上限 (循環参照対策)
+MAX_XOBJECT_NESTING_DEPTH = 4
+# スキャン時、このサイズを超えるPDFはページ数のみを取得する (ページごとのバイト数は分割時に必要になった場合に解析する)
+SCAN_FULL_PROBE_MAX_BYTES = 32 * 1024 * 1024
+
+# このモジュールは先読み用のプロセスプールからも呼び出されるため、PyQt6 や LogManager に依存しないこと。
+
+
+@dataclass
+class PdfMetadata:
+    """1回の解析で得たPDFのメタデータ。size_bytes / mtime_ns が変わったファイルには使わない。"""
+    path: str
+    size_bytes: int
+    mtime_ns: int
+    page_count: int
+    # ページごとのバイト数 (コンテンツストリーム + 画像などのXObject。複数ページで共有するXObjectは最初のページに計上)
+    page_sizes: List[int] = field(default_factory=list)
+
+
+def _stream_length(obj: Any) -> int:
+    try:
+        obj = obj.get_object()
+        length = obj.get("/Length")
+        if length is not None:
+            return int(length.get_object())
+        data = getattr(obj, "_data", None)
+        return len(data) if data else 0
+    except Exception:
+        return 0
+
+
+def _collect_xobjects(resources: Any, found: Dict[Any, int], depth: int = 0):
+    if resources is None or depth > MAX_XOBJECT_NESTING_DEPTH:
+        return
+    try:
+        xobjects = resources.get_object().get("/XObject")
+        if xobjects is None:
+            return
+        for ref in xobjects.get_object().values():
+            key = ref.idnum if isinstance(ref, IndirectObject) else id(ref)
+            if key in found: continue
+            xobject = ref.get_object()
+            found[key] = _stream_length(xobject)
+            if xobject.get("/Subtype") == "/Form":
+                _collect_xobjects(xobject.get("/Resources"), found, depth + 1)
+    except Exception:
+        pass
+
+
+def page_byte_breakdown(page: Any) -> Tuple[int, Dict[Any, int]]:
+    """ページのコンテンツストリームのバイト数と、参照する XObject (画像・フォーム) ごとのバイト数を返す。
+
+    Returns:
+        tuple: (コンテンツストリームのバイト数, {XObjectの識別キー: バイト数})
+    """
+    content_bytes = 0
+    try:
+        contents = page.get("/Contents")
+        if contents is not None:
+            contents = contents.get_object()
+            if isinstance(contents, ArrayObject):
+                content_bytes = sum(_stream_length(item) for item in contents)
+            else:
+                content_bytes = _stream_length(contents)
+    except Exception:
+        pass
+    xobject_bytes: Dict[Any, int] = {}
+    _collect_xobjects(page.get("/Resources"), xobject_bytes)
+    return content_bytes, xobject_bytes
+
+
+def measure_page_bytes(page: Any, seen_xobjects: set) -> int:
+    """ページのコンテンツストリームと XObject のバイト数を返す。seen_xobjects に含まれる XObject は数えずに追加する。"""
+    content_bytes, xobject_bytes = page_byte_breakdown(page)
+    total = content_bytes
+    for key, size in xobject_bytes.items():
+        if key in seen_xobjects: continue
+        seen_xobjects.add(key)
+        total += size
+    return total
+
+
+def probe_pdf_metadata(file_path: str, reader: Optional[PdfReader] = None) -> Tuple[Optional[PdfMetadata], Optional[Dict[str, Any]]]:
+    """PDFを1回だけ解析し、ページ数とページごとのバイト数を取得する。
+
+    Args:
+        reader: 呼び出し側で開いた PdfReader があれば再利用する (分割処理と解析を共有するため)
+    """
+    try:
+        stat_result = os.stat(file_path)
+        if reader is None:
+            reader = PdfReader(file_path)
+        seen_xobjects: set = set()
+        page_sizes = [measure_page_bytes(page, seen_xobjects) for page in reader.pages]
+        return PdfMetadata(path=file_path, size_bytes=stat_result.st_size, mtime_ns=stat_result.st_mtime_ns,
+                           page_count=len(page_sizes), page_sizes=page_sizes), None
+    except errors.PdfReadError as e:
+        return None, {"message": f"PDFファイル '{os.path.basename(file_path)}' の読み取りに失敗しました (ファイル破損の可能性): {e}", "code": "PDF_READ_ERROR", "detail": str(e)}
+    except Exception as e:
+        return None, {"message": f"PDFファイル '{os.path.basename(file_path)}' の解析中に予期せぬエラー: {e}", "code": "PDF_PROBE_EXCEPTION", "detail": str(e)}
+
+
+def probe_pdf_page_count(file_path: str) -> Tuple[Optional[int], Optional[Dict[str, Any]]]:
+    """ページ数のみを取得する。トレーラー・相互参照表とページツリーの根 (/Root の /Pages の /Count) だけを読み、各ページは解析しない。"""
+    try:
+        # パスではなく開いたファイルを渡すと、PdfReader はファイル全体を読み込まずに必要な位置だけを読む
+        with open(file_path, "rb") as f:
+            reader = PdfReader(f)
+            pages = reader.trailer["/Root"].get_object()["/Pages"].get_object()
+            return int(pages["/Count"].get_object()), None
+    except errors.PdfReadError as e:
+        return None, {"message": f"PDFファイル '{os.path.basename(file_path)}' の読み取りに失敗しました (ファイル破損の可能性): {e}", "code": "PDF_READ_ERROR", "detail": str(e)}
+    except Exception as e:
+        return None, {"message": f"PDFファイル '{os.path.basename(file_path)}' のページ数の取得中に予期せぬエラー: {e}", "code": "PDF_PROBE_EXCEPTION", "detail": str(e)}
+
+
+def probe_page_count_for_scan(file_path: str) -> Tuple[Optional[int], Optional[PdfMetadata], Optional[Dict[str, Any]]]:
+    """スキャン時の一覧表示用にページ数を取得する。
+
+    SCAN_FULL_PROBE_MAX_BYTES 以下のPDFは probe_pdf_metadata で解析し (メタデータは分割要否の判定で再利用できる)、
+    それを超えるPDFや解析に失敗したPDFは probe_pdf_page_count で /Count のみを読む。
+
+    Returns:
+        tuple: (ページ数, メタデータ (全体を解析した場合のみ), エラー)
+    """
+    error = None
+    try:
+        if os.path.getsize(file_path) <= SCAN_FULL_PROBE_MAX_BYTES:
+            metadata, error = probe_pdf_metadata(file_path)
+            if metadata is not None:
+                return metadata.page_count, metadata, None
+    except OSError as e:
+        return None, None, {"message": f"PDFファイル '{os.path.basename(file_path)}' の情報を取得できません: {e}", "code": "PDF_STAT_ERROR", "detail": str(e)}
+    page_count, count_error = probe_pdf_page_count(file_path)
+    if page_count is not None:
+        return page_count, None, None
+    return None, None, error or count_error
+
+
+class PdfMetadataCache:
+    """PDFメタデータのキャッシュ (プロセス内で共有)。パス + サイズ + 更新日時が一致する場合のみ再利用する。
+
+    スキャン時に登録し、ワーカーの分割要否判定・分割・ポーリング間隔の見積もりで再利用することで、
+    同じPDFを何度も解析しないようにする。スキャンのたびに clear() される。
+    """
+    _lock = threading.Lock()
+    _entries: Dict[str, PdfMetadata] = {}
+    _hits = 0
+    _misses = 0
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.normcase(os.path.abspath(file_path))
+
+    @classmethod
+    def lookup(cls, file_path: str) -> Optional[PdfMetadata]:
+        """キャッシュ済みで、ファイルが変更されていない場合のみメタデータを返す。"""
+        with cls._lock:
+            metadata = cls._entries.get(cls._key(file_path))
+        if metadata is not None:
+            try:
+                stat_result = os.stat(file_path)
+                if stat_result.st_size == metadata.size_bytes and stat_result.st_mtime_ns == metadata.mtime_ns:
+                    with cls._lock: cls._hits += 1
+                    return metadata
+            except OSError:
+                pass
+        with cls._lock: cls._misses += 1
+        return None
+
+    @classmethod
+    def store(cls, metadata: PdfMetadata):
+        with cls._lock:
+            cls._entries[cls._key(metadata.path)] = metadata
+
+    @classmethod
+    def get_or_probe(cls, file_path: str) -> Tuple[Optional[PdfMetadata], Optional[Dict[str, Any]]]:
+        metadata = cls.lookup(file_path)
+        if metadata is not None:
+            return metadata, None
+        metadata, error = probe_pdf_metadata(file_path)
+        if metadata is not None:
+            cls.store(metadata)
+        return metadata, error
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, int]:
+        with cls._lock:
+            return {"entries": len(cls._entries), "hits": cls._hits, "misses": cls._misses}
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+            cls._hits = 0
+            cls._misses = 0
@@ -0,0 +1,199 @@
+# pdf_splitter.py
+
+import os
+from typing import Optional, Dict, Any, List, Tuple
+
+from PyPDF2 import PdfReader, PdfWriter
+
+from pdf_metadata import PdfMetadata, probe_pdf_metadata, page_byte_breakdown
+
+# 部品サイズの目安に対する余裕 (PdfWriter が書き出す際の構造オーバーヘッド分)
+PART_SIZE_MARGIN_RATIO = 0.9
+# 部品サイズを均す際の二分探索の回数
+PART_BALANCING_ITERATIONS = 30
+
+# このモジュールは先読み用のプロセスプールからも呼び出されるため、PyQt6 や LogManager に依存しないこと。
+# ログに残したい情報は戻り値の info (dict) で呼び出し元に返す。
+
+
+def get_part_filename(original_basename: str, part_num: int, total_parts_estimate: int, original_ext: str) -> str:
+    base = os.path.splitext(original_basename)[0]
+    num_digits = len(str(total_parts_estimate)) if total_parts_estimate > 0 else 2
+    if num_digits < 2: num_digits = 2
+    if total_parts_estimate >= 1000: num_digits = 4
+    elif total_parts_estimate >= 100: num_digits = 3
+    return f"{base}.split#{str(part_num).zfill(num_digits)}{original_ext}"
+
+
+def _plan_parts(page_breakdowns: List[Tuple[int, Dict[Any, int]]], shared_overhead_per_page: float, threshold_bytes: float,
+                split_by_page_count_enabled: bool, max_pages_per_part: int) -> List[Tuple[int, int, float]]:
+    """先頭から順にページを詰め、部品ごとの (開始ページ, 終了ページ(含まない), 推定バイト数) を返す。
+    同じ部品内で共有される XObject は1回だけ数える。1ページで閾値を超える場合はそのページ単独の部品にする。"""
+    parts: List[Tuple[int, int, float]] = []
+    part_start, part_bytes, xobjects_in_part = 0, 0.0, set()
+    for i, (content_bytes, xobject_bytes) in enumerate(page_breakdowns):
+        added_bytes = content_bytes + shared_overhead_per_page + sum(size for key, size in xobject_bytes.items() if key not in xobjects_in_part)
+        pages_in_part = i - part_start
+        if pages_in_part > 0:
+            must_cut = False
+            if split_by_page_count_enabled and max_pages_per_part > 0 and pages_in_part >= max_pages_per_part:
+                must_cut = True
+            elif threshold_bytes > 0 and part_bytes + added_bytes > threshold_bytes:
+                must_cut = True
+            if must_cut:
+                parts.append((part_start, i, part_bytes))
+                part_start, part_bytes, xobjects_in_part = i, 0.0, set()
+                added_bytes = content_bytes + shared_overhead_per_page + sum(xobject_bytes.values())
+        xobjects_in_part.update(xobject_bytes)
+        part_bytes += added_bytes
+    if part_start < len(page_breakdowns):
+        parts.append((part_start, len(page_breakdowns), part_bytes))
+    return parts
+
+
+def split_pdf_by_size(original_filepath: str, chunk_size_bytes: int, temp_dir_for_parts: str,
+                      split_by_page_count_enabled: bool, max_pages_per_part: int,
+                      reader: Optional[PdfReader] = None, metadata: Optional[PdfMetadata] = None) -> Tuple[List[str], Optional[Dict[str, Any]], Dict[str, Any]]:
+    """PDFをサイズ目安・ページ数上限で分割する。
+
+    各ページの実サイズ (コンテンツストリーム + 画像などのXObject) を測って部品を割り付ける。
+    まずサイズ目安を超えない最少の部品数を求め、その部品数のまま最大の部品ができるだけ小さくなるよう
+    区切り位置を調整するため、末尾だけ極端に小さい部品ができにくい。
+    フォント・相互参照表など、ページに割り当てられない分は全ページに均等に按分する。
+
+    Args:
+        reader: 分割要否の判定で開いた PdfReader があれば再利用する
+        metadata: 取得済みのメタデータ (ページサイズの合計を按分の計算に使う)
+
+    Returns:
+        tuple: (部品パスのリスト, エラー, 分割情報 {"total_pages", "size_bytes", "part_page_counts", "part_estimated_bytes"})
+    """
+    split_files: List[str] = []
+    original_basename = os.path.basename(original_filepath)
+    original_ext = os.path.splitext(original_basename)[1]
+    info: Dict[str, Any] = {"part_page_counts": [], "part_estimated_bytes": []}
+
+    try:
+        if reader is None:
+            reader = PdfReader(original_filepath)
+        total_pages = len(reader.pages)
+        info["total_pages"] = total_pages
+        if total_pages == 0:
+            msg = f"PDF '{original_basename}' にはページがありません。分割できません。"
+            return [], {"message": msg, "code": "PDF_ZERO_PAGES"}, info
+
+        original_size_bytes = os.path.getsize(original_filepath)
+        info["size_bytes"] = original_size_bytes
+
+        page_breakdowns = [page_byte_breakdown(page) for page in reader.pages]
+        if metadata is not None and len(metadata.page_sizes) == total_pages:
+            measured_total_bytes = sum(metadata.page_sizes)
+        else:
+            xobjects_in_document: Dict[Any, int] = {}
+            for _, xobject_bytes in page_breakdowns: xobjects_in_document.update(xobject_bytes)
+            measured_total_bytes = sum(content_bytes for content_bytes, _ in page_breakdowns) + sum(xobjects_in_document.values())
+        shared_overhead_per_page = max(0, original_size_bytes - measured_total_bytes) / total_pages
+
+        target_part_bytes = chunk_size_bytes * PART_SIZE_MARGIN_RATIO
+        parts_plan = _plan_parts(page_breakdowns, shared_overhead_per_page, target_part_bytes, split_by_page_count_enabled, max_pages_per_part)
+        if chunk_size_bytes > 0 and len(parts_plan) > 1:
+            # 部品数を増やさない範囲で閾値を下げ、部品サイズを均す
+            minimum_part_count = len(parts_plan)
+            low = max(max(part[2] for part in _plan_parts(page_breakdowns, shared_overhead_per_page, 0, True, 1)),
+                      sum(part[2] for part in parts_plan) / minimum_part_count)
+            high = target_part_bytes
+            for _ in range(PART_BALANCING_ITERATIONS):
+                if high - low <= 1: break
+                middle = (low + high) / 2
+                if len(_plan_parts(page_breakdowns, shared_overhead_per_page, middle, split_by_page_count_enabled, max_pages_per_part)) <= minimum_part_count:
+                    high = middle
+                else:
+                    low = middle
+            parts_plan = _plan_parts(page_breakdowns, shared_overhead_per_page, high, split_by_page_count_enabled, max_pages_per_part)
+
+        for part_counter, (start_page, end_page, estimated_bytes) in enumerate(parts_plan, start=1):
+            part_writer = PdfWriter()
+            for i in range(start_page, end_page):
+                part_writer.add_page(reader.pages[i])
+            part_filename = get_part_filename(original_basename, part_counter, len(parts_plan), original_ext)
+            part_filepath = os.path.join(temp_dir_for_parts, part_filename)
+            try:
+                with open(part_filepath, "wb") as f_out: part_writer.write(f_out)
+            except IOError as e_io_write:
+                return [], {"message": f"PDF部品 '{part_filename}' の書き出しに失敗: {e_io_write}", "code": "SPLIT_PART_WRITE_ERROR", "detail": str(e_io_write)}, info
+            split_files.append(part_filepath)
+            info["part_page_counts"].append(end_page - start_page)
+            info["part_estimated_bytes"].append(int(estimated_bytes))
+
+    except Exception as e:
+        return [], {"message": f"PDF '{original_basename}' の分割中にエラー発生: {e}", "code": "SPLIT_PDF_EXCEPTION", "detail": str(e)}, info
+
+    return split_files, None, info
+
+
+def prepare_file_parts(original_filepath: str, file_specific_temp_dir: str, split_settings: Dict[str, Any],
+                       metadata: Optional[PdfMetadata] = None) -> Tuple[List[str], Optional[Dict[str, Any]], Dict[str, Any]]:
+    """分割要否を判定し、必要ならPDFを一時フォルダへ分割する。
+
+    分割しない場合は一時フォルダへコピーせず、元ファイルのパスをそのまま部品として返す (ゼロコピー)。
+    呼び出し側は部品パスの親フォルダではなく file_specific_temp_dir を一時フォルダとして扱うこと。
+
+    Args:
+        split_settings: split_large_files_enabled / split_chunk_size_mb / upload_max_size_mb /
+                        split_by_page_count_enabled / split_max_pages_per_part を持つ dict
+        metadata: スキャン時に取得済みのメタデータ (PdfMetadataCache)。無い場合は必要な時だけここで1回解析する
+
+    Returns:
+        tuple: (部品パスのリスト, エラー, 情報 {"split": bool, "zero_copy": bool, "part_page_counts", "total_pages",
+                "size_bytes", "check_warning", "metadata" (ここで新たに解析した場合のみ)})
+    """
+    split_master_enabled = split_settings.get("split_large_files_enabled", False)
+    chunk_size_mb_for_size_split = split_settings.get("split_chunk_size_mb", 10)
+    upload_max_size_mb_threshold = split_settings.get("upload_max_size_mb", 60)
+    page_split_enabled = split_settings.get("split_by_page_count_enabled", False)
+    max_pages_per_part_for_page_split = split_settings.get("split_max_pages_per_part", 100)
+    upload_max_bytes_threshold = upload_max_size_mb_threshold * 1024 * 1024
+
+    original_basename = os.path.basename(original_filepath)
+    ext_lower = os.path.splitext(original_basename)[1].lower()
+    info: Dict[str, Any] = {"split": False}
+    reader: Optional[PdfReader] = None
+
+    should_attempt_split = False
+    if split_master_enabled and ext_lower == ".pdf":
+        try:
+            original_file_size_bytes = os.path.getsize(original_filepath)
+            split_triggered_by_size = original_file_size_bytes > upload_max_bytes_threshold
+            split_triggered_by_pages = False
+            if page_split_enabled:
+                if metadata is None:
+                    # キャッシュが無い場合のみ解析する。開いた reader は分割処理でも再利用する
+                    reader = PdfReader(original_filepath)
+                    metadata, probe_error = probe_pdf_metadata(original_filepath, reader)
+                    if probe_error:
+                        raise ValueError(probe_error["message"])
+                    info["metadata"] = metadata
+                if metadata.page_count > max_pages_per_part_for_page_split:
+                    split_triggered_by_pages = True
+            if split_triggered_by_size or split_triggered_by_pages:
+                should_attempt_split = True
+        except Exception as e:
+            info["check_warning"] = f"PDFファイル '{original_basename}' の分割要否チェック中にエラー: {e}"
+            should_attempt_split = False
+
+    split_part_paths: List[str] = []
+    if should_attempt_split:
+        split_part_paths, error_info, split_info = split_pdf_by_size(original_filepath, chunk_size_mb_for_size_split * 1024 * 1024, file_specific_temp_dir,
+                                                                     page_split_enabled, max_pages_per_part_for_page_split, reader=reader, metadata=metadata)
+        info.update(split_info)
+        if error_info:
+            return [], error_info, info
+        info["split"] = True
+
+    if not split_part_paths:
+        info["zero_copy"] = True
+        info["size_bytes"] = os.path.getsize(original_filepath)
+        info["part_page_counts"] = [metadata.page_count if metadata is not None else (None if ext_lower == ".pdf" else 1)]
+        split_part_paths.append(original_filepath)
+
+    return split_part_paths, None, info
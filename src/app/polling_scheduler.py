@@ -0,0 +1,159 @@
+# polling_scheduler.py
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Tuple, Callable
+
+from http_session import SharedHttpSession
+
+# 適応ポーリングの既定値
+MIN_POLLING_INTERVAL_SECONDS = 1.0      # 登録直後など、最短の問い合わせ間隔
+MAX_POLLING_INTERVAL_SECONDS = 60.0     # 長時間ジョブでも、これ以上は間隔を空けない
+ELAPSED_BACKOFF_RATIO = 0.25            # 経過時間に対する次回待機時間の比率 (60秒経過なら15秒待つ)
+HISTORY_SMOOTHING_FACTOR = 0.3          # ジョブ所要時間の指数移動平均の重み
+SLEEP_SLICE_SECONDS = 0.5               # 停止要求に素早く反応するための分割スリープ単位
+
+# poll_until_complete の結果種別
+POLL_OUTCOME_DONE = "done"
+POLL_OUTCOME_ERROR = "error"
+POLL_OUTCOME_TIMEOUT = "timeout"
+POLL_OUTCOME_INTERRUPTED = "interrupted"
+
+
+class JobDurationHistory:
+    """プロファイル・ジョブ種別・ページ数帯ごとの、ジョブ完了までの所要時間 (指数移動平均) を保持する。"""
+    _lock = threading.Lock()
+    _estimates: Dict[Tuple[str, str, str], float] = {}
+
+    @staticmethod
+    def _page_bucket(page_count: Optional[int]) -> str:
+        if not page_count or page_count <= 0:
+            return "unknown"
+        upper = 2 ** math.ceil(math.log2(page_count)) if page_count > 1 else 1
+        return f"<= {upper}p"
+
+    @classmethod
+    def record(cls, profile_id: str, job_kind: str, page_count: Optional[int], duration_seconds: float):
+        key = (profile_id, job_kind, cls._page_bucket(page_count))
+        with cls._lock:
+            previous = cls._estimates.get(key)
+            if previous is None:
+                cls._estimates[key] = duration_seconds
+            else:
+                cls._estimates[key] = previous + HISTORY_SMOOTHING_FACTOR * (duration_seconds - previous)
+
+    @classmethod
+    def estimate(cls, profile_id: str, job_kind: str, page_count: Optional[int]) -> Optional[float]:
+        with cls._lock:
+            return cls._estimates.get((profile_id, job_kind, cls._page_bucket(page_count)))
+
+    @classmethod
+    def snapshot(cls) -> Dict[str, float]:
+        with cls._lock:
+            return {" / ".join(key): round(value, 2) for key, value in cls._estimates.items()}
+
+
+@dataclass
+class PollTicket:
+    """1ジョブ分のポーリング状態。"""
+    started_at: float
+    page_count: Optional[int] = None
+    attempts: int = 0
+    next_due: float = 0.0
+    last_delay: float = 0.0
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+
+class PollingScheduler:
+    """非同期APIのポーリング間隔を決める共通エンジン。
+
+    - 登録直後は短い間隔で問い合わせ、経過時間に応じて間隔を広げる (指数的バックオフ)
+    - 同じプロファイル/ページ数帯の過去の所要時間から、完了見込みまでは問い合わせを控える
+    - サーバーが Retry-After を返した場合はその値を優先する
+    - タイムアウトは「ポーリング間隔 × 最大試行回数」の合計時間で判定する (従来設定と同じ待ち時間)
+    adaptive=False の場合は従来通り固定間隔・最大試行回数で動作する。
+    """
+    def __init__(self, profile_id: Optional[str], polling_interval_seconds: float, max_attempts: int,
+                 adaptive: bool = True, job_kind: str = "ocr"):
+        self.profile_id = profile_id or "unknown"
+        self.job_kind = job_kind
+        self.base_interval = max(0.1, float(polling_interval_seconds))
+        self.max_attempts = max(1, int(max_attempts))
+        self.adaptive = adaptive
+        self.timeout_seconds = self.base_interval * self.max_attempts
+        self.min_interval = min(MIN_POLLING_INTERVAL_SECONDS, self.base_interval)
+        self.max_interval = min(MAX_POLLING_INTERVAL_SECONDS, max(self.base_interval * 5, 15.0))
+
+    def start_job(self, page_count: Optional[int] = None) -> PollTicket:
+        now = time.monotonic()
+        return PollTicket(started_at=now, page_count=page_count, next_due=now)
+
+    def next_delay(self, ticket: PollTicket, retry_after: Optional[float] = None) -> float:
+        """次回の問い合わせまでの待機秒数を返す。"""
+        if not self.adaptive:
+            delay = self.base_interval
+        else:
+            elapsed = ticket.elapsed()
+            delay = min(self.max_interval, max(self.min_interval, elapsed * ELAPSED_BACKOFF_RATIO))
+            expected = JobDurationHistory.estimate(self.profile_id, self.job_kind, ticket.page_count)
+            if expected is not None and elapsed < expected:
+                # 完了見込みまでは問い合わせを控え、見込み時刻の直後に確認する
+                delay = min(self.max_interval, max(delay, expected - elapsed))
+        if retry_after is not None and retry_after > 0:
+            delay = max(delay, retry_after)
+        remaining = self.timeout_seconds - ticket.elapsed()
+        return max(0.0, min(delay, remaining)) if self.adaptive else delay
+
+    def schedule_next(self, ticket: PollTicket) -> float:
+        """問い合わせ後に呼び出し、次回予定時刻を更新して待機秒数を返す。"""
+        delay = self.next_delay(ticket, SharedHttpSession.consume_retry_after())
+        ticket.last_delay = delay
+        ticket.next_due = time.monotonic() + delay
+        return delay
+
+    def is_expired(self, ticket: PollTicket) -> bool:
+        if not self.adaptive:
+            return ticket.attempts >= self.max_attempts
+        return ticket.elapsed() >= self.timeout_seconds
+
+    def record_completion(self, ticket: PollTicket):
+        JobDurationHistory.record(self.profile_id, self.job_kind, ticket.page_count, ticket.elapsed())
+
+    def sleep(self, seconds: float, is_running: Callable[[], bool]):
+        """停止要求を確認しながら待機する。"""
+        end_time = time.monotonic() + seconds
+        while is_running():
+            remaining = end_time - time.monotonic()
+            if remaining <= 0: break
+            time.sleep(min(SLEEP_SLICE_SECONDS, remaining))
+
+    def poll_until_complete(self, poll_once: Callable[[], Tuple[Optional[Any], Optional[Dict[str, Any]]]],
+                            is_running: Callable[[], bool], page_count: Optional[int] = None,
+                            on_attempt: Optional[Callable[[PollTicket], None]] = None,
+                            ticket: Optional[PollTicket] = None) -> Tuple[Optional[Any], Optional[Dict[str, Any]], str]:
+        """poll_once が (結果, エラー) のどちらかを返すまで問い合わせる。両方 None は処理中を表す。
+
+        Returns:
+            tuple: (結果, エラー, 結果種別 POLL_OUTCOME_*)
+        """
+        ticket = ticket or self.start_job(page_count)
+        while True:
+            if not is_running():
+                return None, None, POLL_OUTCOME_INTERRUPTED
+            ticket.attempts += 1
+            if on_attempt: on_attempt(ticket)
+
+            result, error = poll_once()
+            if error:
+                return None, error, POLL_OUTCOME_ERROR
+            if result is not None:
+                self.record_completion(ticket)
+                return result, None, POLL_OUTCOME_DONE
+            if self.is_expired(ticket):
+                return None, None, POLL_OUTCOME_TIMEOUT
+
+            self.sleep(self.schedule_next(ticket), is_running)
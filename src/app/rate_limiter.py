@@ -0,0 +1,204 @@
+# rate_limiter.py
+
+import time
+import threading
+from typing import Optional, Dict, Any, Callable
+from urllib.parse import urlparse
+
+# 設定値のデフォルト (0 = 制限しない)
+DEFAULT_RATE_LIMIT_REQUESTS_PER_MINUTE = 300
+DEFAULT_MAX_CONCURRENT_JOBS = 32
+
+BURST_SECONDS = 1.0                 # 何秒分のリクエストまで連続送信を許すか (トークンバケットの容量)
+THROTTLE_DECREASE_FACTOR = 0.5      # 429/503 を受けたときに送信レートへ掛ける係数
+MIN_RATE_FACTOR = 0.1               # 設定値に対して、ここまでしか送信レートを下げない
+RECOVERY_SUCCESS_COUNT = 20         # この回数続けて成功したら送信レートを戻し始める
+RECOVERY_STEP = 0.1                 # 1回の回復で設定値に対して戻す割合
+DEFAULT_THROTTLE_PAUSE_SECONDS = 2.0  # Retry-After が無い 429/503 の後、送信を止める秒数
+MAX_THROTTLE_PAUSE_SECONDS = 120.0
+WAIT_SLICE_SECONDS = 0.5            # 停止要求に素早く反応するための分割待機単位
+
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+class TenantRateLimiter:
+    """DX Suite の組織 (テナント) ごとの送信レート制限と同時ジョブ数制限。
+
+    - 送信レート: トークンバケット。毎分のリクエスト数を上限に、BURST_SECONDS 分までの連続送信を許す
+    - 429/503 を受けたら送信レートを下げ (Retry-After があればその間は送信を止め)、成功が続けば設定値まで徐々に戻す
+    - 同時ジョブ数: 登録してから結果取得 (またはエラー) までのジョブ数の上限。全ワーカー・SortWorker で共有する
+    スレッドセーフ。0 を設定した制限は無効 (制限しない)。
+    """
+    def __init__(self, tenant_key: str, requests_per_minute: int = 0, max_concurrent_jobs: int = 0):
+        self.tenant_key = tenant_key
+        self._lock = threading.Lock()
+        self._job_condition = threading.Condition(self._lock)
+        self._rate_factor = 1.0
+        self._tokens = 0.0
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._consecutive_successes = 0
+        self._jobs_in_flight = 0
+        self._stats = {"requests": 0, "throttled_responses": 0, "wait_seconds": 0.0, "job_slot_waits": 0}
+        self.requests_per_minute = 0
+        self.max_concurrent_jobs = 0
+        self.configure(requests_per_minute, max_concurrent_jobs)
+
+    def configure(self, requests_per_minute: Any, max_concurrent_jobs: Any):
+        try: requests_per_minute = max(0, int(requests_per_minute))
+        except (TypeError, ValueError): requests_per_minute = DEFAULT_RATE_LIMIT_REQUESTS_PER_MINUTE
+        try: max_concurrent_jobs = max(0, int(max_concurrent_jobs))
+        except (TypeError, ValueError): max_concurrent_jobs = DEFAULT_MAX_CONCURRENT_JOBS
+        with self._lock:
+            if requests_per_minute != self.requests_per_minute:
+                self.requests_per_minute = requests_per_minute
+                self._tokens = self._capacity()
+                self._last_refill = time.monotonic()
+            self.max_concurrent_jobs = max_concurrent_jobs
+            self._job_condition.notify_all()
+
+    def _rate_per_second(self) -> float:
+        return self.requests_per_minute / 60.0 * self._rate_factor
+
+    def _capacity(self) -> float:
+        return max(1.0, self._rate_per_second() * BURST_SECONDS)
+
+    def reserve(self) -> float:
+        """リクエスト1件分の送信枠を予約し、送信までに待つべき秒数を返す (待機自体は呼び出し側で行う)。"""
+        with self._lock:
+            now = time.monotonic()
+            self._stats["requests"] += 1
+            wait = max(0.0, self._paused_until - now)
+            if self.requests_per_minute > 0:
+                rate = self._rate_per_second()
+                self._tokens = min(self._capacity(), self._tokens + (now - self._last_refill) * rate)
+                self._last_refill = now
+                # 残量がマイナスになる分は「将来の枠」の先取り。その分だけ待てば順番に送信できる
+                self._tokens -= 1.0
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens / rate)
+            self._stats["wait_seconds"] += wait
+            return wait
+
+    def acquire(self, is_running: Optional[Callable[[], bool]] = None) -> bool:
+        """送信枠が空くまで待つ。待機中に is_running() が False になったら False を返す。"""
+        end_time = time.monotonic() + self.reserve()
+        while True:
+            remaining = end_time - time.monotonic()
+            if remaining <= 0: return True
+            if is_running is not None and not is_running(): return False
+            time.sleep(min(WAIT_SLICE_SECONDS, remaining))
+
+    def pause_remaining(self) -> float:
+        """429/503 による送信停止の残り秒数 (停止していなければ 0)。"""
+        with self._lock:
+            return max(0.0, self._paused_until - time.monotonic())
+
+    def record_response(self, status_code: int, retry_after: Optional[float] = None):
+        """レスポンスのステータスから送信レートを調整する。"""
+        with self._lock:
+            if status_code in THROTTLE_STATUS_CODES:
+                self._stats["throttled_responses"] += 1
+                self._consecutive_successes = 0
+                self._rate_factor = max(MIN_RATE_FACTOR, self._rate_factor * THROTTLE_DECREASE_FACTOR)
+                pause = retry_after if retry_after is not None and retry_after > 0 else DEFAULT_THROTTLE_PAUSE_SECONDS
+                self._paused_until = max(self._paused_until, time.monotonic() + min(MAX_THROTTLE_PAUSE_SECONDS, pause))
+                # 先取りしていた枠も取り消し、下げたレートで送り直す
+                self._tokens = min(self._tokens, 0.0)
+            elif status_code < 400 and self._rate_factor < 1.0:
+                self._consecutive_successes += 1
+                if self._consecutive_successes >= RECOVERY_SUCCESS_COUNT:
+                    self._consecutive_successes = 0
+                    self._rate_factor = min(1.0, self._rate_factor + RECOVERY_STEP)
+
+    def try_acquire_job_slot(self) -> bool:
+        with self._lock:
+            if self.max_concurrent_jobs > 0 and self._jobs_in_flight >= self.max_concurrent_jobs:
+                return False
+            self._jobs_in_flight += 1
+            return True
+
+    def acquire_job_slot(self, is_running: Optional[Callable[[], bool]] = None) -> bool:
+        """同時ジョブ数の枠が空くまで待って確保する。待機中に is_running() が False になったら False を返す。"""
+        waited = False
+        with self._job_condition:
+            while self.max_concurrent_jobs > 0 and self._jobs_in_flight >= self.max_concurrent_jobs:
+                if is_running is not None and not is_running():
+                    return False
+                if not waited:
+                    self._stats["job_slot_waits"] += 1
+                    waited = True
+                self._job_condition.wait(WAIT_SLICE_SECONDS)
+            self._jobs_in_flight += 1
+            return True
+
+    def wait_for_job_slot(self, timeout: float):
+        """枠が空くか timeout 秒が経過するまで待つ (枠は確保しない)。"""
+        with self._job_condition:
+            if self.max_concurrent_jobs > 0 and self._jobs_in_flight >= self.max_concurrent_jobs:
+                self._job_condition.wait(max(0.0, timeout))
+
+    def release_job_slot(self):
+        with self._job_condition:
+            self._jobs_in_flight = max(0, self._jobs_in_flight - 1)
+            self._job_condition.notify()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({"requests_per_minute": self.requests_per_minute, "current_rate_factor": round(self._rate_factor, 2),
+                          "max_concurrent_jobs": self.max_concurrent_jobs, "jobs_in_flight": self._jobs_in_flight,
+                          "wait_seconds": round(stats["wait_seconds"], 2)})
+            return stats
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {"requests": 0, "throttled_responses": 0, "wait_seconds": 0.0, "job_slot_waits": 0}
+
+
+class RateLimiterRegistry:
+    """テナント (ベースURIのホスト名) ごとの TenantRateLimiter を管理する (プロセス内で共有)。
+
+    APIクライアントが設定更新時に configure() し、共有HTTPセッションが送信のたびに for_host() で参照する。
+    同じ組織の複数プロファイル (全文読取・非定型・標準) は同じホストのため、制限も共有される。
+    """
+    _lock = threading.Lock()
+    _limiters: Dict[str, TenantRateLimiter] = {}
+
+    @staticmethod
+    def tenant_key_for_url(url: Optional[str]) -> str:
+        try:
+            return (urlparse(url or "").hostname or "").lower()
+        except ValueError:
+            return ""
+
+    @classmethod
+    def configure(cls, base_uri: Optional[str], requests_per_minute: Any, max_concurrent_jobs: Any) -> TenantRateLimiter:
+        tenant_key = cls.tenant_key_for_url(base_uri)
+        with cls._lock:
+            limiter = cls._limiters.get(tenant_key)
+            if limiter is None:
+                limiter = TenantRateLimiter(tenant_key, requests_per_minute, max_concurrent_jobs)
+                cls._limiters[tenant_key] = limiter
+                return limiter
+        limiter.configure(requests_per_minute, max_concurrent_jobs)
+        return limiter
+
+    @classmethod
+    def for_host(cls, host: Optional[str]) -> Optional[TenantRateLimiter]:
+        """設定済みのテナントであればその制限を返す。未設定のホストは制限しない (None)。"""
+        with cls._lock:
+            return cls._limiters.get((host or "").lower())
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Dict[str, Any]]:
+        with cls._lock:
+            limiters = dict(cls._limiters)
+        return {key: limiter.get_stats() for key, limiter in limiters.items()}
+
+    @classmethod
+    def reset_stats(cls):
+        with cls._lock:
+            limiters = list(cls._limiters.values())
+        for limiter in limiters:
+            limiter.reset_stats()
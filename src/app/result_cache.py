@@ -0,0 +1,258 @@
+# result_cache.py
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from typing import Optional, Dict, Any, List, Tuple, Callable
+
+from appdirs import user_cache_dir
+
+from app_constants import APP_NAME, APP_AUTHOR
+
+# 設定値のデフォルト
+DEFAULT_RESULT_CACHE_ENABLED = 1
+DEFAULT_RESULT_CACHE_MAX_MB = 2048
+
+HASH_CHUNK_BYTES = 1024 * 1024
+CACHE_FORMAT_VERSION = 2          # キャッシュの保存形式を変えた場合に上げる (古いエントリはキーが一致しなくなる)
+INDEX_FILE_NAME = "index.json"
+MANIFEST_FILE_NAME = "manifest.json"
+ENTRIES_DIR_NAME = "entries"
+
+# 全プロファイル共通で、出力ファイルの構成が変わる分割設定
+SPLIT_OPTION_KEYS = ("split_large_files_enabled", "split_chunk_size_mb", "upload_max_size_mb",
+                     "split_by_page_count_enabled", "split_max_pages_per_part")
+
+
+def compute_file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_cache_key(file_sha256: str, profile_id: Optional[str], options: Dict[str, Any]) -> str:
+    """ファイル内容のハッシュ・プロファイルID・結果に影響するオプションからキャッシュキーを作る。"""
+    payload = json.dumps({"version": CACHE_FORMAT_VERSION, "sha256": file_sha256, "profile_id": profile_id, "options": options},
+                         sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def default_cache_dir() -> str:
+    try:
+        return os.path.join(user_cache_dir(appname=APP_NAME, appauthor=APP_AUTHOR), "result_cache")
+    except Exception:
+        return os.path.join(tempfile.gettempdir(), f"{APP_AUTHOR}_{APP_NAME}_result_cache".replace(" ", "_"))
+
+
+class ResultCache:
+    """OCR結果ファイル (JSON / サーチャブルPDF / CSV) の永続キャッシュ (プロセス内で共有)。
+
+    同じ内容のファイルを同じプロファイル・同じ読取オプションで再処理する場合 (再スキャン・再開など)、
+    APIを呼び出さずに前回出力した結果ファイルを結果フォルダへ複製する。
+    エントリはファイル内容の SHA-256 をもとにしたキーで識別するため、ファイル名や場所が変わっても再利用できる。
+    結果ファイル名は元ファイルのベース名 (拡張子を除いたファイル名) からの差分 (".json", ".split#02.json" など) で保存し、
+    複製時に処理中のファイルのベース名で組み立て直す。
+    合計サイズが上限を超えたら、最後に使われた時刻が古いエントリから削除する (LRU)。
+    """
+    _lock = threading.Lock()
+    _cache_dir: Optional[str] = None
+    _index: Optional[Dict[str, Dict[str, Any]]] = None   # キー -> {"size_bytes", "last_access", "created"}
+    _index_dirty = False
+    _max_bytes = DEFAULT_RESULT_CACHE_MAX_MB * 1024 * 1024
+    _stats = {"result_cache_hits": 0, "result_cache_misses": 0, "result_cache_stores": 0, "result_cache_evictions": 0}
+
+    @classmethod
+    def configure(cls, max_mb: Any, cache_dir: Optional[str] = None):
+        try: max_bytes = max(0, int(max_mb)) * 1024 * 1024
+        except (TypeError, ValueError): max_bytes = DEFAULT_RESULT_CACHE_MAX_MB * 1024 * 1024
+        with cls._lock:
+            cache_dir = cache_dir or cls._cache_dir or default_cache_dir()
+            if cache_dir != cls._cache_dir:
+                cls._cache_dir = cache_dir
+                cls._index = None
+            cls._max_bytes = max_bytes
+            cls._load_index_locked()
+            cls._evict_locked()
+
+    @classmethod
+    def _entry_dir(cls, key: str) -> str:
+        return os.path.join(cls._cache_dir, ENTRIES_DIR_NAME, key)
+
+    @classmethod
+    def _load_index_locked(cls):
+        if cls._index is not None: return
+        cls._index = {}
+        os.makedirs(os.path.join(cls._cache_dir, ENTRIES_DIR_NAME), exist_ok=True)
+        index_path = os.path.join(cls._cache_dir, INDEX_FILE_NAME)
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                loaded = json.load(f)
+            if isinstance(loaded, dict):
+                cls._index = {key: value for key, value in loaded.items() if isinstance(value, dict)}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError):
+            # 壊れた索引は作り直す (エントリ本体は次回の保存時に上書きされる)
+            cls._index = {}
+            cls._index_dirty = True
+
+    @classmethod
+    def _save_index_locked(cls):
+        if not cls._index_dirty or cls._index is None: return
+        index_path = os.path.join(cls._cache_dir, INDEX_FILE_NAME)
+        temp_path = index_path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(cls._index, f, ensure_ascii=False)
+            os.replace(temp_path, index_path)
+            cls._index_dirty = False
+        except OSError:
+            pass
+
+    @classmethod
+    def _evict_locked(cls) -> List[str]:
+        """合計サイズが上限以下になるまで古いエントリを索引から外し、削除するフォルダの一覧を返す。"""
+        removed: List[str] = []
+        total_bytes = sum(entry.get("size_bytes", 0) for entry in cls._index.values())
+        if total_bytes > cls._max_bytes:
+            for key, entry in sorted(cls._index.items(), key=lambda item: item[1].get("last_access", 0)):
+                if total_bytes <= cls._max_bytes: break
+                total_bytes -= entry.get("size_bytes", 0)
+                del cls._index[key]
+                removed.append(cls._entry_dir(key))
+                cls._stats["result_cache_evictions"] += 1
+            cls._index_dirty = True
+            cls._save_index_locked()
+        for entry_dir in removed:
+            shutil.rmtree(entry_dir, ignore_errors=True)
+        return removed
+
+    @classmethod
+    def lookup(cls, key: str) -> Optional[Dict[str, Any]]:
+        """キャッシュ済みであれば {"artifacts": [{"name_suffix", "path", ...}], "payload": {...}} を返す。"""
+        with cls._lock:
+            if cls._cache_dir is None: return None
+            cls._load_index_locked()
+            entry = cls._index.get(key)
+            if entry is not None:
+                manifest_path = os.path.join(cls._entry_dir(key), MANIFEST_FILE_NAME)
+                try:
+                    with open(manifest_path, "r", encoding="utf-8") as f:
+                        manifest = json.load(f)
+                    for artifact in manifest.get("artifacts", []):
+                        artifact["path"] = os.path.join(cls._entry_dir(key), artifact["stored_name"])
+                        if not os.path.isfile(artifact["path"]):
+                            raise FileNotFoundError(artifact["path"])
+                    entry["last_access"] = time.time()
+                    cls._index_dirty = True
+                    cls._stats["result_cache_hits"] += 1
+                    return manifest
+                except (OSError, ValueError, KeyError):
+                    # エントリが欠けている場合は使わずに削除する
+                    del cls._index[key]
+                    cls._index_dirty = True
+                    shutil.rmtree(cls._entry_dir(key), ignore_errors=True)
+            cls._stats["result_cache_misses"] += 1
+            return None
+
+    @classmethod
+    def store(cls, key: str, artifacts: List[Dict[str, Any]], payload: Dict[str, Any], base_name: str) -> bool:
+        """出力した結果ファイルをキャッシュに保存する。
+
+        Args:
+            artifacts: [{"name": 結果フォルダでのファイル名, "source_path": 出力したファイルのパス, その他の付加情報}]
+            payload: キャッシュから出力する際に、結果シグナルへ渡す内容
+            base_name: 元ファイルのベース名。各結果ファイル名はこれで始まること (差分だけを保存する)
+        """
+        with cls._lock:
+            if cls._cache_dir is None or cls._max_bytes <= 0: return False
+            cache_dir = cls._cache_dir
+        temp_dir = None
+        try:
+            temp_dir = tempfile.mkdtemp(prefix=key[:16] + "_", dir=os.path.join(cache_dir, ENTRIES_DIR_NAME))
+            manifest_artifacts = []
+            size_bytes = 0
+            for artifact_idx, artifact in enumerate(artifacts):
+                if not artifact["name"].startswith(base_name):
+                    raise ValueError(f"結果ファイル名が元ファイルのベース名で始まっていません: {artifact['name']}")
+                stored_name = f"{artifact_idx}{os.path.splitext(artifact['name'])[1]}"
+                shutil.copyfile(artifact["source_path"], os.path.join(temp_dir, stored_name))
+                size_bytes += os.path.getsize(os.path.join(temp_dir, stored_name))
+                manifest_artifacts.append({**{k: v for k, v in artifact.items() if k not in ("source_path", "name")},
+                                           "name_suffix": artifact["name"][len(base_name):], "stored_name": stored_name})
+            with open(os.path.join(temp_dir, MANIFEST_FILE_NAME), "w", encoding="utf-8") as f:
+                json.dump({"artifacts": manifest_artifacts, "payload": payload, "created": time.time()}, f, ensure_ascii=False)
+            size_bytes += os.path.getsize(os.path.join(temp_dir, MANIFEST_FILE_NAME))
+        except (OSError, TypeError, ValueError, KeyError):
+            if temp_dir: shutil.rmtree(temp_dir, ignore_errors=True)
+            return False
+
+        with cls._lock:
+            if size_bytes > cls._max_bytes or cls._cache_dir != cache_dir:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+                return False
+            cls._load_index_locked()
+            entry_dir = cls._entry_dir(key)
+            try:
+                if os.path.isdir(entry_dir):
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                os.replace(temp_dir, entry_dir)
+            except OSError:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+                return False
+            now = time.time()
+            cls._index[key] = {"size_bytes": size_bytes, "last_access": now, "created": now}
+            cls._index_dirty = True
+            cls._stats["result_cache_stores"] += 1
+            cls._save_index_locked()
+            cls._evict_locked()
+        return True
+
+    @classmethod
+    def restore_artifacts(cls, entry: Dict[str, Any], dest_dir: str, unique_path: Callable[[str, str], str],
+                          base_name: str) -> List[Tuple[Dict[str, Any], str]]:
+        """キャッシュ済みの結果ファイルを、base_name (処理中のファイルのベース名) の名前で dest_dir へ複製し、[(artifact, 複製先パス)] を返す。"""
+        os.makedirs(dest_dir, exist_ok=True)
+        restored = []
+        for artifact in entry.get("artifacts", []):
+            dest_path = unique_path(dest_dir, base_name + artifact["name_suffix"])
+            shutil.copyfile(artifact["path"], dest_path)
+            restored.append((artifact, dest_path))
+        return restored
+
+    @classmethod
+    def flush(cls):
+        """最終使用時刻の更新など、未保存の索引を書き出す。"""
+        with cls._lock:
+            if cls._cache_dir is not None:
+                cls._save_index_locked()
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        with cls._lock:
+            stats = dict(cls._stats)
+            if cls._index is not None:
+                stats["result_cache_entries"] = len(cls._index)
+                stats["result_cache_bytes"] = sum(entry.get("size_bytes", 0) for entry in cls._index.values())
+            return stats
+
+    @classmethod
+    def reset_stats(cls):
+        with cls._lock:
+            cls._stats = {"result_cache_hits": 0, "result_cache_misses": 0, "result_cache_stores": 0, "result_cache_evictions": 0}
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            if cls._cache_dir is None: return
+            shutil.rmtree(os.path.join(cls._cache_dir, ENTRIES_DIR_NAME), ignore_errors=True)
+            os.makedirs(os.path.join(cls._cache_dir, ENTRIES_DIR_NAME), exist_ok=True)
+            cls._index = {}
+            cls._index_dirty = True
+            cls._save_index_locked()
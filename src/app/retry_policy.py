@@ -0,0 +1,224 @@
+# retry_policy.py
+
+import time
+import random
+import threading
+from typing import Optional, Dict, Any, Callable
+from urllib.parse import urlparse
+
+import requests
+from urllib3.exceptions import ConnectTimeoutError
+
+from http_session import _parse_retry_after
+from rate_limiter import RateLimiterRegistry
+
+# 設定値のデフォルト
+DEFAULT_RETRY_MAX_ATTEMPTS = 3       # 1リクエストあたりの再試行回数 (初回の送信は含まない)
+DEFAULT_RETRY_BUDGET_PER_RUN = 100   # 1回の実行 (ワーカーの開始から終了まで) で再試行できる合計回数
+RETRY_BASE_DELAY_SECONDS = 1.0
+RETRY_MAX_DELAY_SECONDS = 30.0
+RETRY_SLEEP_SLICE_SECONDS = 0.5      # 再試行の待機中に停止要求を確認する間隔
+
+# 何度送っても結果が変わらないリクエスト (状態確認・結果取得・検索など)。一時的なエラーは常に再試行する
+REQUEST_KIND_READ = "read"
+# 送るたびにサーバーの状態が変わるリクエスト (登録・削除・OCR送信など)。
+# サーバーが処理した可能性がある場合は再試行せず、接続の確立に失敗した (本文を送っていない) 場合と、
+# サーバーが処理せずに断ったことが明らかなレスポンス (rejected_without_processing) の場合のみ再試行する
+REQUEST_KIND_WRITE = "write"
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def failed_before_sending(e: Exception) -> bool:
+    """接続の確立 (名前解決・TCP接続・接続タイムアウト) で失敗し、リクエスト本文がサーバーに届いていないことが確実な例外か。"""
+    if isinstance(e, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(e, requests.exceptions.ConnectionError) and not isinstance(e, requests.exceptions.ReadTimeout):
+        # requests は urllib3 の MaxRetryError (reason に原因) を包んで送出する。NewConnectionError は ConnectTimeoutError の派生
+        reason = getattr(e.args[0], "reason", None) if e.args else None
+        return isinstance(reason, ConnectTimeoutError)
+    return False
+
+
+def rejected_without_processing(status_code: int, retry_after: Optional[float]) -> bool:
+    """サーバーがリクエストを処理せずに断ったことが明らかなレスポンスか (429、Retry-After 付きの 503)。
+    Retry-After の無い 503 は、中継サーバーが返した場合など、処理済みかどうか分からないため含めない。"""
+    return status_code == 429 or (status_code == 503 and retry_after is not None)
+
+
+def throttle_pause_remaining(response: requests.Response) -> Optional[float]:
+    """レスポンスを返したテナントの送信レート制限が、429/503 を受けて送信を止めている残り秒数。制限が無ければ None。"""
+    rate_limiter = RateLimiterRegistry.for_host(urlparse(response.url or "").hostname)
+    return rate_limiter.pause_remaining() if rate_limiter is not None else None
+
+
+def retry_error_code(e: Optional[Exception] = None, status_code: Optional[int] = None) -> str:
+    """再試行のログに残すエラーコード。"""
+    if status_code is not None:
+        return f"HTTP_{status_code}"
+    if isinstance(e, requests.exceptions.ConnectTimeout) or failed_before_sending(e):
+        return "CONNECT_FAILED"
+    if isinstance(e, requests.exceptions.Timeout):
+        return "READ_TIMEOUT"
+    if isinstance(e, requests.exceptions.ConnectionError):
+        return "CONNECTION_ERROR"
+    return type(e).__name__.upper() if e is not None else "UNKNOWN"
+
+
+def backoff_delay(retry_number: int, retry_after: Optional[float] = None) -> float:
+    """再試行までの待機秒数。指数バックオフの上限までの一様乱数 (フルジッター) とし、
+    同時に失敗した多数のリクエストが同じ時刻に再送しないようにする。Retry-After があればそれより短くしない。"""
+    delay = random.uniform(0, min(RETRY_MAX_DELAY_SECONDS, RETRY_BASE_DELAY_SECONDS * (2 ** retry_number)))
+    if retry_after is not None:
+        delay = max(delay, min(RETRY_MAX_DELAY_SECONDS, retry_after))
+    return delay
+
+
+class RetryBudget:
+    """1回の実行で再試行できる合計回数 (プロセス内で共有)。
+
+    障害時に全リクエストが再試行を繰り返して負荷を増やし続けないよう、使い切った後は再試行せずに失敗とする。
+    APIクライアントが設定更新時に configure() し、ワーカーが実行開始時に reset() する。
+    """
+    _lock = threading.Lock()
+    _budget = DEFAULT_RETRY_BUDGET_PER_RUN
+    _stats = {"retries": 0, "exhausted": 0, "recovered": 0}
+    _retries_by_code: Dict[str, int] = {}
+
+    @classmethod
+    def configure(cls, budget: Any):
+        try: budget = max(0, int(budget))
+        except (TypeError, ValueError): budget = DEFAULT_RETRY_BUDGET_PER_RUN
+        with cls._lock:
+            cls._budget = budget
+
+    @classmethod
+    def try_consume(cls, error_code: str) -> bool:
+        with cls._lock:
+            if cls._stats["retries"] >= cls._budget:
+                cls._stats["exhausted"] += 1
+                return False
+            cls._stats["retries"] += 1
+            cls._retries_by_code[error_code] = cls._retries_by_code.get(error_code, 0) + 1
+            return True
+
+    @classmethod
+    def record_recovered(cls):
+        with cls._lock:
+            cls._stats["recovered"] += 1
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        with cls._lock:
+            return {**cls._stats, "budget": cls._budget, "by_error_code": dict(cls._retries_by_code)}
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._stats = {"retries": 0, "exhausted": 0, "recovered": 0}
+            cls._retries_by_code = {}
+
+
+class RetryPolicy:
+    """一時的な通信エラー・5xx・429 の再試行方針。リクエストの種類 (REQUEST_KIND_*) ごとに再試行してよい失敗を判定する。
+
+    429/503 の後は、Retry-After と送信レート制限の送信停止 (TenantRateLimiter) の長い方まで待ってから送り直す。
+
+    再試行しない (または再試行を使い切った) 場合は、最後の例外を送出するか最後のレスポンスを返すため、
+    呼び出し側の raise_for_status() / 例外処理はそのまま使える。
+    再試行までの待機中に停止要求があった場合も、その時点で同じように最後の例外・レスポンスで終了する。
+    """
+    def __init__(self, log_manager, max_attempts: Any = DEFAULT_RETRY_MAX_ATTEMPTS):
+        self.log_manager = log_manager
+        try: self.max_attempts = max(0, int(max_attempts))
+        except (TypeError, ValueError): self.max_attempts = DEFAULT_RETRY_MAX_ATTEMPTS
+        # スレッドごとの停止要求の確認関数 (同じAPIクライアントを仕分けとOCRのワーカーが並行して使うため、スレッドごとに持つ)
+        self._local = threading.local()
+
+    def set_stop_check(self, is_running: Optional[Callable[[], bool]]):
+        """このスレッドから送るリクエストについて、再試行の待機中に is_running() が False になったら再試行を打ち切る。None で解除する。"""
+        self._local.is_running = is_running
+
+    def _sleep_before_retry(self, delay: float, is_running: Optional[Callable[[], bool]]) -> bool:
+        """停止要求を確認しながら待機する。停止要求があった場合は False を返す。"""
+        if is_running is None:
+            time.sleep(delay)
+            return True
+        end_time = time.monotonic() + delay
+        while is_running():
+            remaining = end_time - time.monotonic()
+            if remaining <= 0: return True
+            time.sleep(min(RETRY_SLEEP_SLICE_SECONDS, remaining))
+        return False
+
+    def next_delay(self, retry_number: int, error_code: str, description: Any, context: str, retry_after: Optional[float] = None) -> Optional[float]:
+        """再試行できる失敗について、再試行する場合は待機秒数を返す (再試行回数の消費とログ出力を行う)。再試行しない場合は None。"""
+        if retry_number >= self.max_attempts:
+            if self.max_attempts > 0:
+                self.log_manager.error(f"再試行の上限 ({self.max_attempts}回) に達しました: {description}", context=f"{context}_RETRY",
+                                       error_code=error_code, retries=retry_number)
+            return None
+        if not RetryBudget.try_consume(error_code):
+            self.log_manager.error(f"今回の実行で再試行できる回数を使い切ったため、再試行しません: {description}", context=f"{context}_RETRY",
+                                   error_code="RETRY_BUDGET_EXHAUSTED", cause_error_code=error_code)
+            return None
+        delay = backoff_delay(retry_number, retry_after)
+        self.log_manager.warning(f"一時的なエラーのため {delay:.1f}秒後に再試行します ({retry_number + 1}/{self.max_attempts}): {description}",
+                                 context=f"{context}_RETRY", error_code=error_code, retry=retry_number + 1, delay_seconds=round(delay, 2))
+        return delay
+
+    def record_success(self, retry_number: int, context: str):
+        if retry_number > 0:
+            RetryBudget.record_recovered()
+            self.log_manager.info(f"再試行により成功しました ({retry_number}回目の再試行)。", context=f"{context}_RETRY", retries=retry_number)
+
+    def send(self, send_request: Callable[[], requests.Response], kind: str, context: str,
+             rewind: Optional[Callable[[], None]] = None, is_running: Optional[Callable[[], bool]] = None) -> requests.Response:
+        """send_request() を呼び出し、再試行できる失敗であれば待機してから送り直す。
+
+        Args:
+            kind: REQUEST_KIND_READ / REQUEST_KIND_WRITE
+            rewind: 送り直す前に呼ぶ関数 (ストリーミング送信する本文を先頭に戻すなど)
+            is_running: 再試行の待機中に確認する停止要求 (省略時は set_stop_check() でこのスレッドに設定したもの)
+        """
+        if is_running is None:
+            is_running = getattr(self._local, "is_running", None)
+        retry_number = 0
+        while True:
+            last_error: Optional[Exception] = None
+            try:
+                response = send_request()
+            except requests.exceptions.RequestException as e:
+                retryable = failed_before_sending(e) or (kind == REQUEST_KIND_READ and isinstance(
+                    e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.ChunkedEncodingError)))
+                delay = self.next_delay(retry_number, retry_error_code(e), e, context) if retryable else None
+                if delay is None: raise
+                last_error = e
+            else:
+                retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+                if kind == REQUEST_KIND_READ:
+                    retryable = response.status_code in RETRYABLE_STATUS_CODES
+                else:
+                    retryable = rejected_without_processing(response.status_code, retry_after)
+                if not retryable:
+                    if response.status_code < 400:
+                        self.record_success(retry_number, context)
+                    return response
+                throttle_pause = throttle_pause_remaining(response)
+                if throttle_pause is not None:
+                    retry_after = max(retry_after or 0.0, throttle_pause)
+                delay = self.next_delay(retry_number, retry_error_code(status_code=response.status_code), f"HTTP {response.status_code}", context,
+                                        retry_after=retry_after)
+                if delay is None: return response
+                # 待機中に停止された場合はこのレスポンスを返すため、本文を読み込んでから接続を解放する
+                response.content
+                response.close()
+
+            retry_number += 1
+            if not self._sleep_before_retry(delay, is_running):
+                self.log_manager.info(f"停止要求のため再試行を中止しました ({retry_number}/{self.max_attempts})。", context=f"{context}_RETRY",
+                                      retry=retry_number)
+                if last_error is not None: raise last_error
+                return response
+            if rewind is not None:
+                rewind()
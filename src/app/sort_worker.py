@@ -9,9 +9,17 @@ from typing import Dict, Any, List
 
 from PyQt6.QtCore import QThread, pyqtSignal
 
+from http_session import SharedHttpSession
+from polling_scheduler import PollingScheduler, POLL_OUTCOME_TIMEOUT, POLL_OUTCOME_INTERRUPTED
+from multipart_upload import split_paths_by_byte_budget, upload_progress_text
+from rate_limiter import RateLimiterRegistry
+from retry_policy import RetryBudget
+
 # ポーリング設定のデフォルト値
 DEFAULT_POLLING_INTERVAL_SECONDS = 3
 DEFAULT_POLLING_MAX_ATTEMPTS = 100 # 仕分けは時間がかかる可能性を考慮
+# 仕分けユニット1つあたりに送信するファイルの合計サイズ上限 (MB) のデフォルト値
+DEFAULT_SORT_UPLOAD_BATCH_MAX_MB = 500
 
 class SortWorker(QThread):
     # ステータス更新用のシグナル (例: 「仕分け中...」)
@@ -39,60 +47,78 @@ class SortWorker(QThread):
         """仕分け処理と後続OCRの監視、結果ダウンロードを含むメインロジック"""
         thread_id = threading.get_ident()
         self.log_manager.info(f"SortWorkerスレッド開始。Thread ID: {thread_id}", context="SORT_WORKER_LIFECYCLE")
+        SharedHttpSession.reset_stats()
+        RateLimiterRegistry.reset_stats()
+        RetryBudget.reset()
+        # 仕分けユニットも組織の同時ジョブ数に数え、作成からOCRへの送信まで枠を確保する
+        held_job_slots = 0
+        self.api_client.retry_policy.set_stop_check(lambda: self.is_running)
 
         try:
             # === ステージ1: 仕分け処理 ===
-            self.sort_status_update.emit("仕分けユニット作成中...")
-            add_result, add_error = self.api_client.add_sort_unit(self.file_paths, self.sort_config_id)
-            if add_error:
-                self.sort_finished.emit(False, add_error)
-                return
-
-            sort_unit_id = add_result.get("sortUnitId")
-            if not sort_unit_id:
-                self.sort_finished.emit(False, {"message": "レスポンスにsortUnitIdが含まれていません。", "code": "NO_SORT_UNIT_ID"})
-                return
-            
-            self.log_manager.info(f"仕分けユニット作成成功。sortUnitId: {sort_unit_id}", context="SORT_WORKER_INFO")
-
-            last_status_result = None
-            for attempt in range(DEFAULT_POLLING_MAX_ATTEMPTS):
+            profile_id = self.api_client.active_api_profile_schema.get("id") if self.api_client.active_api_profile_schema else None
+            profile_options = self.config.get("options_values_by_profile", {}).get(profile_id, {})
+            adaptive_polling_enabled = profile_options.get("adaptive_polling_enabled", 1)
+            try:
+                batch_max_bytes = int(profile_options.get("sort_upload_batch_max_mb", DEFAULT_SORT_UPLOAD_BATCH_MAX_MB)) * 1024 * 1024
+            except (TypeError, ValueError):
+                batch_max_bytes = DEFAULT_SORT_UPLOAD_BATCH_MAX_MB * 1024 * 1024
+
+            # 合計サイズが上限を超える場合は複数の仕分けユニットに分けて送信する (ファイルの順序は保つ)
+            sort_batches = split_paths_by_byte_budget(self.file_paths, batch_max_bytes)
+            if len(sort_batches) > 1:
+                self.log_manager.info(f"仕分け対象を {len(sort_batches)} 個の仕分けユニットに分けて送信します (1ユニットあたり最大 {batch_max_bytes // (1024 * 1024)}MB)。",
+                                      context="SORT_WORKER_INFO", batch_count=len(sort_batches))
+
+            # 仕分けの所要時間はファイル数に比例するため、ファイル数を規模の目安として履歴に記録する
+            sort_scheduler = PollingScheduler(profile_id, DEFAULT_POLLING_INTERVAL_SECONDS, DEFAULT_POLLING_MAX_ATTEMPTS, adaptive=bool(adaptive_polling_enabled), job_kind="sort")
+            sort_unit_ids = []
+            pending_sort_units = []  # 作成済みでOCRへ未送信の (sortUnitId, ファイル数, 表示用の番号)。それぞれ枠を1つ確保している
+            for batch_idx, batch_paths in enumerate(sort_batches, start=1):
                 if not self.is_running:
                     self.sort_finished.emit(False, {"message": "処理がユーザーによって中断されました。", "code": "USER_INTERRUPT"})
                     return
-
-                self.sort_status_update.emit(f"仕分け中... (確認 {attempt + 1}/{DEFAULT_POLLING_MAX_ATTEMPTS})")
-                status_result, status_error = self.api_client.get_sort_unit_status(sort_unit_id)
-
-                if status_error:
-                    self.sort_finished.emit(False, status_error)
-                    return
-                
-                last_status_result = status_result
-                status_code = status_result.get("statusCode")
-                status_name = status_result.get("statusName", "")
-                self.log_manager.info(f"仕分けステータス: {status_code} ({status_name})", context="SORT_WORKER_POLL")
-
-                if status_code == 60:
-                    break
-                
-                if status_code in [35, 55]:
-                    error_info = {"message": f"仕分け処理でエラーが発生しました: {status_name}", "code": f"SORT_API_ERROR_{status_code}"}
-                    self.sort_finished.emit(False, error_info)
+                batch_label = f" ({batch_idx}/{len(sort_batches)})" if len(sort_batches) > 1 else ""
+                # 枠が空いていなければ、自分が確保している最も古い仕分けユニットをOCRへ送信して枠を空ける
+                # (ユニット数が同時ジョブ数の上限を超えても、自分の確保した枠を待ち続けないように)
+                while not self.api_client.rate_limiter.try_acquire_job_slot():
+                    if pending_sort_units:
+                        complete_error = self._complete_sort_unit(sort_scheduler, *pending_sort_units.pop(0))
+                        if complete_error:
+                            self.sort_finished.emit(False, complete_error)
+                            return
+                        self.api_client.rate_limiter.release_job_slot()
+                        held_job_slots -= 1
+                    elif self.api_client.rate_limiter.acquire_job_slot(lambda: self.is_running):
+                        break
+                    else:
+                        self.sort_finished.emit(False, {"message": "処理がユーザーによって中断されました。", "code": "USER_INTERRUPT"})
+                        return
+                held_job_slots += 1
+                self.sort_status_update.emit(f"仕分けユニット作成中...{batch_label}")
+                add_result, add_error = self.api_client.add_sort_unit(
+                    batch_paths, self.sort_config_id,
+                    progress_callback=lambda bytes_sent, total_bytes, label=batch_label: self.sort_status_update.emit(f"仕分けユニット作成中...{label} {upload_progress_text(bytes_sent, total_bytes)}"))
+                if add_error:
+                    self.sort_finished.emit(False, add_error)
                     return
 
-                if attempt == DEFAULT_POLLING_MAX_ATTEMPTS - 1:
-                    self.sort_finished.emit(False, {"message": "仕分け処理がタイムアウトしました。", "code": "SORT_TIMEOUT"})
+                sort_unit_id = add_result.get("sortUnitId")
+                if not sort_unit_id:
+                    self.sort_finished.emit(False, {"message": "レスポンスにsortUnitIdが含まれていません。", "code": "NO_SORT_UNIT_ID"})
                     return
-                time.sleep(DEFAULT_POLLING_INTERVAL_SECONDS)
+                self.log_manager.info(f"仕分けユニット作成成功。sortUnitId: {sort_unit_id}{batch_label}", context="SORT_WORKER_INFO")
+                sort_unit_ids.append((sort_unit_id, len(batch_paths)))
+                pending_sort_units.append((sort_unit_id, len(batch_paths), batch_label))
 
             # === ステージ2: 後続OCR処理 ===
-            self.log_manager.info("仕分け処理が正常に完了しました。OCR処理へ送信します...", context="SORT_WORKER_SUCCESS")
-            self.sort_status_update.emit("OCR処理へ送信中...")
-            send_result, send_error = self.api_client.send_sort_result_to_ocr(sort_unit_id)
-            if send_error:
-                self.sort_finished.emit(False, send_error)
-                return
+            while pending_sort_units:
+                complete_error = self._complete_sort_unit(sort_scheduler, *pending_sort_units.pop(0))
+                if complete_error:
+                    self.sort_finished.emit(False, complete_error)
+                    return
+                self.api_client.rate_limiter.release_job_slot()
+                held_job_slots -= 1
             
             self.log_manager.info("OCR処理への送信が正常に完了しました。後続OCR処理の監視を開始します。", context="SORT_WORKER_SUCCESS")
 
@@ -105,12 +131,13 @@ class SortWorker(QThread):
                     dummy_ocr_unit_id = f"demo-ocr-unit-{random.randint(10000, 99999)}-{i+1}"
                     ocr_unit_ids_to_poll.append(dummy_ocr_unit_id)
             else: # Liveモードの場合
-                final_sort_status, _ = self.api_client.get_sort_unit_status(sort_unit_id)
-                if final_sort_status and "statusList" in final_sort_status:
-                    for item in final_sort_status["statusList"]:
-                        unit_id = item.get("readingUnitId")
-                        if unit_id and unit_id != "0":
-                            ocr_unit_ids_to_poll.append(unit_id)
+                for sort_unit_id, _ in sort_unit_ids:
+                    final_sort_status, _ = self.api_client.get_sort_unit_status(sort_unit_id)
+                    if final_sort_status and "statusList" in final_sort_status:
+                        for item in final_sort_status["statusList"]:
+                            unit_id = item.get("readingUnitId")
+                            if unit_id and unit_id != "0":
+                                ocr_unit_ids_to_poll.append(unit_id)
             # === 修正箇所 END ===
 
 
@@ -120,14 +147,21 @@ class SortWorker(QThread):
                 return
 
             all_unit_ids_for_download = list(ocr_unit_ids_to_poll) # ダウンロード用に元のリストをコピー
-            ocr_polling_attempts = 0
+            # 後続OCRは従来通りタイムアウトなしで待機し、各ユニットの次回予定時刻に従って問い合わせる
+            ocr_scheduler = PollingScheduler(profile_id, DEFAULT_POLLING_INTERVAL_SECONDS, DEFAULT_POLLING_MAX_ATTEMPTS, adaptive=bool(adaptive_polling_enabled), job_kind="ocr")
+            ocr_tickets = {unit_id: ocr_scheduler.start_job() for unit_id in ocr_unit_ids_to_poll}
+            ocr_polling_rounds = 0
             while ocr_unit_ids_to_poll and self.is_running:
-                ocr_polling_attempts += 1
-                self.sort_status_update.emit(f"OCR処理中... (残り{len(ocr_unit_ids_to_poll)}件, 確認{ocr_polling_attempts})")
+                ocr_polling_rounds += 1
+                self.sort_status_update.emit(f"OCR処理中... (残り{len(ocr_unit_ids_to_poll)}件, 確認{ocr_polling_rounds})")
                 
                 completed_ids_in_this_loop = []
+                now = time.monotonic()
                 
                 for unit_id in ocr_unit_ids_to_poll:
+                    ticket = ocr_tickets[unit_id]
+                    if ticket.next_due > now: continue
+                    ticket.attempts += 1
                     ocr_status_result, ocr_status_error = self.api_client.get_status(unit_id)
                     if ocr_status_error:
                         self.sort_finished.emit(False, ocr_status_error)
@@ -135,14 +169,18 @@ class SortWorker(QThread):
 
                     if ocr_status_result and ocr_status_result[0].get("dataProcessingStatus") in [400, 600]:
                         self.log_manager.info(f"OCRユニット {unit_id} の処理が完了しました。", context="SORT_WORKER_OCR_POLL")
+                        ocr_scheduler.record_completion(ticket)
                         completed_ids_in_this_loop.append(unit_id)
+                    else:
+                        ocr_scheduler.schedule_next(ticket)
 
                 ocr_unit_ids_to_poll = [uid for uid in ocr_unit_ids_to_poll if uid not in completed_ids_in_this_loop]
 
                 if not ocr_unit_ids_to_poll:
                     break
 
-                time.sleep(DEFAULT_POLLING_INTERVAL_SECONDS)
+                next_due = min(ocr_tickets[uid].next_due for uid in ocr_unit_ids_to_poll)
+                ocr_scheduler.sleep(max(0.0, next_due - time.monotonic()), lambda: self.is_running)
 
             if not self.is_running:
                 self.sort_finished.emit(False, {"message": "処理がユーザーによって中断されました。", "code": "USER_INTERRUPT"})
@@ -230,6 +268,47 @@ class SortWorker(QThread):
         except Exception as e:
             self.log_manager.error(f"SortWorkerで予期せぬエラー: {e}", context="SORT_WORKER_UNEXPECTED_ERROR", exc_info=True)
             self.sort_finished.emit(False, {"message": f"予期せぬエラーが発生しました: {e}", "code": "UNEXPECTED_SORT_WORKER_ERROR"})
+        finally:
+            self.api_client.retry_policy.set_stop_check(None)
+            for _ in range(held_job_slots): self.api_client.rate_limiter.release_job_slot()
+            http_stats = SharedHttpSession.get_stats()
+            self.log_manager.info(f"HTTP接続統計: リクエスト {http_stats['requests']} 件 / 新規接続 {http_stats['new_connections']} 件 (再利用率 {http_stats['reuse_ratio']:.0%})",
+                                  context="HTTP_SESSION_STATS", **http_stats)
+            retry_stats = RetryBudget.get_stats()
+            if retry_stats["retries"] or retry_stats["exhausted"]:
+                self.log_manager.info(f"自動再試行: {retry_stats['retries']} 回 (成功 {retry_stats['recovered']} 件) / 上限超過で再試行しなかったエラー {retry_stats['exhausted']} 件",
+                                      context="RETRY_STATS", **retry_stats)
+
+    def _complete_sort_unit(self, sort_scheduler: PollingScheduler, sort_unit_id: str, batch_file_count: int, batch_label: str):
+        """仕分けユニットの仕分け完了を待ってOCR処理へ送信する。失敗・中断した場合はエラー情報を返す。"""
+        def poll_sort_status_once():
+            status_result, status_error = self.api_client.get_sort_unit_status(sort_unit_id)
+            if status_error:
+                return None, status_error
+            status_code = status_result.get("statusCode")
+            status_name = status_result.get("statusName", "")
+            self.log_manager.info(f"仕分けステータス: {status_code} ({status_name}){batch_label}", context="SORT_WORKER_POLL")
+            if status_code == 60:
+                return status_result, None
+            if status_code in [35, 55]:
+                return None, {"message": f"仕分け処理でエラーが発生しました: {status_name}", "code": f"SORT_API_ERROR_{status_code}"}
+            return None, None
+
+        _, sort_poll_error, sort_poll_outcome = sort_scheduler.poll_until_complete(
+            poll_sort_status_once, lambda: self.is_running, page_count=batch_file_count,
+            on_attempt=lambda ticket: self.sort_status_update.emit(f"仕分け中...{batch_label} (確認 {ticket.attempts}回目, {ticket.elapsed():.0f}秒経過)"))
+
+        if sort_poll_outcome == POLL_OUTCOME_INTERRUPTED:
+            return {"message": "処理がユーザーによって中断されました。", "code": "USER_INTERRUPT"}
+        if sort_poll_error:
+            return sort_poll_error
+        if sort_poll_outcome == POLL_OUTCOME_TIMEOUT:
+            return {"message": "仕分け処理がタイムアウトしました。", "code": "SORT_TIMEOUT"}
+
+        self.log_manager.info(f"仕分け処理が正常に完了しました。OCR処理へ送信します...{batch_label}", context="SORT_WORKER_SUCCESS")
+        self.sort_status_update.emit(f"OCR処理へ送信中...{batch_label}")
+        _, send_error = self.api_client.send_sort_result_to_ocr(sort_unit_id)
+        return send_error
 
     def _get_unique_filepath(self, target_dir: str, filename: str) -> str:
         """ファイル名の衝突を避けるためのヘルパーメソッド"""
@@ -198,6 +198,7 @@ class SummaryView(QWidget):
         self.skipped_by_size_count = 0 
         self.total_scanned_files_count = 0 
         self.start_time = None
+        self.run_stats = {}
         self.log_manager = None 
         self.init_ui()
 
@@ -232,7 +233,9 @@ class SummaryView(QWidget):
         self.info_cards = {
             "start_time": InfoCard("処理開始時刻", "#6c757d"), 
             "elapsed_time": InfoCard("経過時間", "#6c757d"), 
-            "avg_time": InfoCard("平均処理時間/件", "#6c757d")
+            "avg_time": InfoCard("平均処理時間/件", "#6c757d"),
+            "copy_avoided": InfoCard("一時コピー省略量", "#6c757d"),
+            "result_cache": InfoCard("結果キャッシュ", "#6c757d")
         }
         for card in self.info_cards.values():
             info_layout.addWidget(card, 1) 
@@ -248,6 +251,7 @@ class SummaryView(QWidget):
         self.ocr_completed_count = 0 
         self.ocr_error_count = 0
         self.start_time = None
+        self.run_stats = {}
         self.update_display()
 
     def start_processing(self, total_files_to_ocr_count):
@@ -256,6 +260,7 @@ class SummaryView(QWidget):
         self.ocr_completed_count = 0 
         self.ocr_error_count = 0
         self.start_time = datetime.now()
+        self.run_stats = {}
         if self.log_manager:
             self.log_manager.info(f"SummaryView: Processing started for {self.total_files_for_ocr} files.", context="SUMMARY_VIEW")
         self.update_display()
@@ -270,6 +275,13 @@ class SummaryView(QWidget):
             self.ocr_error_count += 1
         self.update_display()
 
+    def update_run_stats(self, run_stats: dict):
+        """ワーカーから通知された実行統計 (一時コピーの省略量など) を表示に反映する。"""
+        self.run_stats = dict(run_stats or {})
+        if self.log_manager:
+            self.log_manager.debug(f"SummaryView run stats updated: {self.run_stats}", context="SUMMARY_VIEW")
+        self.update_display()
+
     def update_summary_counts(self, total_scanned=None, total_ocr_target=None, skipped_size=None):
         if total_scanned is not None:
             self.total_scanned_files_count = total_scanned
@@ -326,4 +338,15 @@ class SummaryView(QWidget):
         else: 
             self.info_cards["start_time"].update_value("-")
             self.info_cards["elapsed_time"].update_value("-")
-            self.info_cards["avg_time"].update_value("-")
\ No newline at end of file
+            self.info_cards["avg_time"].update_value("-")
+
+        if "bytes_copy_avoided" in self.run_stats:
+            avoided_mb = self.run_stats["bytes_copy_avoided"] / (1024 * 1024)
+            self.info_cards["copy_avoided"].update_value(f"{avoided_mb:.1f} MB ({self.run_stats.get('zero_copy_files', 0)}件)")
+        else:
+            self.info_cards["copy_avoided"].update_value("-")
+
+        if "result_cache_hits" in self.run_stats:
+            self.info_cards["result_cache"].update_value(f"ヒット {self.run_stats['result_cache_hits']} / ミス {self.run_stats.get('result_cache_misses', 0)}")
+        else:
+            self.info_cards["result_cache"].update_value("-")
\ No newline at end of file
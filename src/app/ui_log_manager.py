@@ -0,0 +1,73 @@
+# ui_log_manager.py
+
+import threading
+from collections import deque
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from log_manager import LogManager, LogLevel
+from app_constants import UI_LOG_DELIVERY_INTERVAL_MS, UI_LOG_MAX_PENDING_LINES
+
+
+class QtLogManager(QObject, LogManager):
+    """ログファイルへの出力に加えて、ログ表示欄向けのメッセージを log_messages_signal で通知する LogManager。
+
+    表示しないレベルのログはスレッドをまたぐ前に捨て、残りは有限のリングバッファに溜めて、
+    GUIスレッドのタイマーで一定間隔 (UI_LOG_DELIVERY_INTERVAL_MS) ごとに [(level, message), ...] としてまとめて通知する。
+    """
+    log_messages_signal = pyqtSignal(list)
+    _delivery_requested = pyqtSignal()
+
+    def __init__(self, log_dir_override=None):
+        QObject.__init__(self)
+        self._ui_lock = threading.Lock()
+        self._pending_ui_lines = deque(maxlen=UI_LOG_MAX_PENDING_LINES)
+        self._dropped_ui_lines = 0
+        self._delivery_scheduled = False
+        self._ui_levels = frozenset()
+        self.set_ui_level_filter({})
+
+        # タイマーは GUI スレッド (このオブジェクトを作成したスレッド) で動かす。
+        # ワーカースレッドからの配送要求はキュー接続で GUI スレッドへ渡る (配送1回につき高々1回)
+        self._delivery_timer = QTimer(self)
+        self._delivery_timer.setSingleShot(True)
+        self._delivery_timer.setInterval(UI_LOG_DELIVERY_INTERVAL_MS)
+        self._delivery_timer.timeout.connect(self._deliver_pending_lines)
+        self._delivery_requested.connect(self._start_delivery_timer)
+
+        LogManager.__init__(self, log_dir_override)
+
+    def set_ui_level_filter(self, log_settings: dict):
+        """ログ表示欄に出すレベルを設定する (config["log_settings"] の内容)。ERROR は常に表示する。"""
+        levels = {LogLevel.ERROR}
+        if log_settings.get("log_level_info_enabled", True): levels.add(LogLevel.INFO)
+        if log_settings.get("log_level_warning_enabled", True): levels.add(LogLevel.WARNING)
+        if log_settings.get("log_level_debug_enabled", False): levels.add(LogLevel.DEBUG)
+        self._ui_levels = frozenset(levels)
+
+    def _emit_to_ui(self, level, ui_message):
+        if level not in self._ui_levels:
+            return
+        with self._ui_lock:
+            if len(self._pending_ui_lines) == self._pending_ui_lines.maxlen:
+                self._dropped_ui_lines += 1
+            self._pending_ui_lines.append((level, ui_message))
+            if self._delivery_scheduled:
+                return
+            self._delivery_scheduled = True
+        self._delivery_requested.emit()
+
+    def _start_delivery_timer(self):
+        if not self._delivery_timer.isActive():
+            self._delivery_timer.start()
+
+    def _deliver_pending_lines(self):
+        with self._ui_lock:
+            lines = list(self._pending_ui_lines)
+            self._pending_ui_lines.clear()
+            dropped, self._dropped_ui_lines = self._dropped_ui_lines, 0
+            self._delivery_scheduled = False
+        if dropped:
+            lines.insert(0, (LogLevel.WARNING, f"(表示が追いつかないため、{dropped}件のログの表示を省略しました。ログファイルには記録されています。)"))
+        if lines:
+            self.log_messages_signal.emit(lines)
@@ -10,35 +10,38 @@ import tempfile
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QStackedWidget, QToolBar, QVBoxLayout, QWidget,
-    QLabel, QMessageBox, QFileDialog, QTextEdit, QSplitter,
+    QLabel, QMessageBox, QFileDialog, QPlainTextEdit, QSplitter,
     QFormLayout, QPushButton, QHBoxLayout, QFrame, QSizePolicy,
     QDialog, QDialogButtonBox, QComboBox
 )
 from PyQt6.QtGui import QAction, QFontMetrics, QIcon
-from PyQt6.QtCore import Qt, QTimer, QSize
+from PyQt6.QtCore import Qt, QTimer, QSize, QEventLoop
 
 from ui_dialogs import ProfileSelectionDialog, OcrConfirmationDialog, show_about_dialog
 from list_view import ListView
 from summary_view import SummaryView
 from config_manager import ConfigManager, CONFIG_DIR
-from log_manager import LogManager, LogLevel, LOG_DIR_PATH
+from log_manager import LogLevel, LOG_DIR_PATH
+from ui_log_manager import QtLogManager
 from file_scanner import FileScanner
+from ui_page_count_prober import QtPageCountProber
 from ocr_orchestrator import OcrOrchestrator
-from file_model import FileInfo
+from file_model import FileInfo, FileInfoIndex
 from app_constants import (
     APP_NAME, APP_VERSION,
     OCR_STATUS_NOT_PROCESSED, OCR_STATUS_PROCESSING, OCR_STATUS_COMPLETED,
     OCR_STATUS_FAILED, OCR_STATUS_SKIPPED_SIZE_LIMIT, OCR_STATUS_SPLITTING,
     OCR_STATUS_PART_PROCESSING, OCR_STATUS_MERGING,
-    LISTVIEW_UPDATE_INTERVAL_MS
+    LISTVIEW_UPDATE_INTERVAL_MS, UI_LOG_MAX_DISPLAY_LINES
 )
 from option_dialog import OptionDialog
+from http_session import SharedHttpSession
 
 class MainWindow(QMainWindow):
     def __init__(self, cli_args: Optional[argparse.Namespace] = None):
         super().__init__()
         
-        self.log_manager = LogManager()
+        self.log_manager = QtLogManager()
         if self.log_manager.initialization_error:
             error = self.log_manager.initialization_error
             log_dir = self.log_manager.log_dir
@@ -84,6 +87,7 @@ class MainWindow(QMainWindow):
         self.log_manager.info(f"Application initialized. API: {self.active_api_profile.get('name')}, Mode: {self.config.get('api_execution_mode', 'demo').upper()}", context="SYSTEM_LIFECYCLE")
 
         QTimer.singleShot(100, self._log_startup_paths)
+        QTimer.singleShot(300, self._offer_interrupted_run_resume)
 
     def _log_startup_paths(self):
         """
@@ -100,6 +104,14 @@ class MainWindow(QMainWindow):
             self.log_manager.error(f"パス情報のログ出力中にエラーが発生しました: {e}", context="SYSTEM_PATH_ERROR")
         self.log_manager.info("--------------------------", context="SYSTEM_INFO")
 
+    def _offer_interrupted_run_resume(self):
+        """前回のOCR処理が異常終了などで完了していない場合、登録済みジョブからの再開を確認する。"""
+        if not hasattr(self, 'ocr_orchestrator') or self.is_ocr_running or not self.processed_files_info: return
+        interrupted_run = self.ocr_orchestrator.find_interrupted_run(self.input_folder_path)
+        if interrupted_run:
+            self.log_manager.info(f"完了していない前回の実行が見つかりました (完了済み {len(interrupted_run['completed'])} 件 / 登録済みジョブあり {len(interrupted_run['jobs'])} 件)。", context="SYSTEM_INIT")
+            self.ocr_orchestrator.confirm_and_resume_interrupted_run(self.list_view.get_sorted_file_info_list(), self.input_folder_path, interrupted_run, self)
+
     def _handle_api_profile_selection(self):
         available_profiles = self.config.get("api_profiles", [])
         if not available_profiles:
@@ -204,17 +216,24 @@ class MainWindow(QMainWindow):
 
     def _initialize_core_components_based_on_profile(self):
         self.is_ocr_running = False
-        self.processed_files_info: list[FileInfo] = []
+        self.file_info_index = FileInfoIndex()
+        self.processed_files_info = []
 
-        self.log_widget = QTextEdit()
+        self.log_widget = QPlainTextEdit()
         self.log_widget.setReadOnly(True)
-        self.log_manager.log_message_signal.connect(self.append_log_message_to_widget)
+        self.log_widget.setMaximumBlockCount(UI_LOG_MAX_DISPLAY_LINES)
+        self.log_manager.set_ui_level_filter(self.config.get("log_settings", {}))
+        self.log_manager.log_messages_signal.connect(self.append_log_messages_to_widget)
 
         if not self.active_api_profile:
             self.log_manager.critical("アクティブAPIプロファイルが未設定でコンポーネント初期化不可。", context="MAINWIN_LIFECYCLE_CRITICAL")
             return
 
         self.file_scanner = FileScanner(self.log_manager, self.config)
+        # PDFのページ数はスキャン後にバックグラウンドで取得し、届いた分から一覧へ反映する
+        self.page_count_prober = QtPageCountProber(self.log_manager, self)
+        self.page_count_prober.page_counts_ready.connect(self._on_page_counts_ready)
+        self.page_count_run_id = None
         
         self.ocr_orchestrator = OcrOrchestrator(
             log_manager=self.log_manager,
@@ -246,6 +265,7 @@ class MainWindow(QMainWindow):
             self.ocr_orchestrator.file_ocr_processed_signal.connect(self.on_file_ocr_processed)
             self.ocr_orchestrator.file_auto_csv_processed_signal.connect(self.on_file_auto_csv_processed)
             self.ocr_orchestrator.file_searchable_pdf_processed_signal.connect(self.on_file_searchable_pdf_processed)
+            self.ocr_orchestrator.ocr_run_stats_signal.connect(self._handle_ocr_run_stats_from_orchestrator)
 
             self.ocr_orchestrator.sort_process_started_signal.connect(self.on_sort_process_started)
             self.ocr_orchestrator.sort_process_finished_signal.connect(self.on_sort_process_finished)
@@ -253,6 +273,16 @@ class MainWindow(QMainWindow):
             self.ocr_orchestrator.request_ui_controls_update_signal.connect(self.update_ocr_controls)
             self.ocr_orchestrator.request_list_view_update_signal.connect(self._handle_request_list_view_update)
 
+    @property
+    def processed_files_info(self) -> list[FileInfo]:
+        return self._processed_files_info
+
+    @processed_files_info.setter
+    def processed_files_info(self, files: list[FileInfo]):
+        # 一覧を置き換えるたびに、ワーカーからの通知 (パス) で FileInfo を引くための索引を作り直す
+        self._processed_files_info = files
+        self.file_info_index.rebuild(files)
+
     def _handle_request_list_view_update(self, updated_file_list: List[FileInfo]):
         self.log_manager.debug("MainWindow: Received request to update ListView from orchestrator.", context="UI_UPDATE")
         self.processed_files_info = updated_file_list
@@ -301,7 +331,8 @@ class MainWindow(QMainWindow):
         self.summary_view.log_manager = self.log_manager
         self.list_view = ListView(self.processed_files_info)
         self.list_view.item_check_state_changed.connect(self.on_list_item_check_state_changed)
-        self.list_view.table.itemSelectionChanged.connect(self.update_ocr_controls)
+        self.list_view.all_check_states_changed.connect(self.on_list_all_check_states_changed)
+        self.list_view.table.selectionModel().selectionChanged.connect(lambda *_: self.update_ocr_controls())
         self.stack.addWidget(self.summary_view)
         self.stack.addWidget(self.list_view)
         self.splitter.addWidget(self.stack)
@@ -313,7 +344,7 @@ class MainWindow(QMainWindow):
         self.log_header.setStyleSheet("margin-left: 6px; padding-bottom: 0px; font-weight: bold;")
         log_layout_inner.addWidget(self.log_header)
         self.log_widget.setStyleSheet("""
-            QTextEdit { 
+            QPlainTextEdit { 
                 font-family: Consolas, Meiryo, monospace; 
                 font-size: 9pt; 
                 border: 1px solid #D0D0D0; 
@@ -350,6 +381,9 @@ class MainWindow(QMainWindow):
         self.status_total_list_label.setObjectName("StatusBarLabel")
         self.status_selected_files_label = QLabel("選択中: 0")
         self.status_selected_files_label.setObjectName("StatusBarLabel")
+        self.status_page_count_label = QLabel("")
+        self.status_page_count_label.setObjectName("StatusBarLabel")
+        self.status_page_count_label.setVisible(False)
         self.status_success_files_label = QLabel("成功: 0")
         self.status_success_files_label.setObjectName("StatusBarLabel")
         self.status_error_files_label = QLabel("エラー: 0")
@@ -357,6 +391,8 @@ class MainWindow(QMainWindow):
         status_bar_layout.addWidget(self.status_total_list_label)
         status_bar_layout.addSpacing(25)
         status_bar_layout.addWidget(self.status_selected_files_label)
+        status_bar_layout.addSpacing(25)
+        status_bar_layout.addWidget(self.status_page_count_label)
         status_bar_layout.addStretch(1)
         status_bar_layout.addWidget(self.status_success_files_label)
         status_bar_layout.addSpacing(25)
@@ -477,6 +513,9 @@ class MainWindow(QMainWindow):
         if hasattr(self.summary_view, 'start_processing'): self.summary_view.start_processing(num_files_to_process)
         self.update_status_bar(); self.update_ocr_controls()
 
+    def _handle_ocr_run_stats_from_orchestrator(self, run_stats: dict):
+        if hasattr(self, 'summary_view'): self.summary_view.update_run_stats(run_stats)
+
     def _handle_ocr_process_finished_from_orchestrator(self, was_interrupted: bool, fatal_error_info: Optional[dict] = None):
         self.log_manager.info(f"MainWindow: OCR process finished signal received. Interrupted: {was_interrupted}, FatalError: {fatal_error_info}", context="OCR_FLOW_MAIN"); self.is_ocr_running = False; reason = ""
         if fatal_error_info and isinstance(fatal_error_info, dict): reason = fatal_error_info.get("message", "不明な致命的エラー"); self.log_manager.error(f"MainWindow: OCR processing stopped due to a fatal error from worker: {reason}", context="OCR_FLOW_MAIN")
@@ -489,6 +528,7 @@ class MainWindow(QMainWindow):
         self.perform_batch_list_view_update()
         if hasattr(self, 'list_view'): self.list_view.set_checkboxes_enabled(True)
         self.update_ocr_controls()
+        self.file_scanner.save_folder_index(self.processed_files_info)
 
         if not was_interrupted and not fatal_error_info:
             try:
@@ -522,14 +562,28 @@ class MainWindow(QMainWindow):
     def on_list_item_check_state_changed(self, row_index, is_checked):
         if 0 <= row_index < len(self.processed_files_info):
             self.processed_files_info[row_index].is_checked = is_checked; self.log_manager.debug(f"File '{self.processed_files_info[row_index].name}' check state in data model changed to: {is_checked}", context="UI_EVENT"); self.update_all_status_displays(); self.update_ocr_controls()
+
+    def on_list_all_check_states_changed(self):
+        self.log_manager.debug("All check states in data model changed.", context="UI_EVENT"); self.update_all_status_displays(); self.update_ocr_controls()
     
     def perform_initial_scan(self):
         self.log_manager.info(f"スキャン開始: {self.input_folder_path}", context="FILE_SCAN_MAIN"); self.processed_files_info = []; self.list_view.update_files([], self.is_ocr_running) if hasattr(self, 'list_view') else None
-        collected_files_paths, max_files_info, depth_limited_folders = self.file_scanner.scan_folder(self.input_folder_path)
+        self._cancel_page_count_probe()
+        streamed_files_info: list[FileInfo] = []
+        def on_files_found(found_paths):
+            # スキャンの途中でも見つかった分を一覧へ追加して表示する (操作は受け付けず、描画のみ行う)。
+            # PDFのページ数 (前回の索引に無いもの) はここでは読まず、スキャン後にバックグラウンドで取得する
+            streamed_files_info.extend(self.file_scanner.create_initial_file_list(found_paths, OCR_STATUS_SKIPPED_SIZE_LIMIT, OCR_STATUS_NOT_PROCESSED, start_no=len(streamed_files_info) + 1, probe_page_counts=False))
+            if hasattr(self, 'list_view') and self.list_view: self.list_view.update_files(streamed_files_info, self.is_ocr_running)
+            QApplication.processEvents(QEventLoop.ProcessEventsFlag.ExcludeUserInputEvents)
+        collected_files_paths, max_files_info, depth_limited_folders = self.file_scanner.scan_folder(self.input_folder_path, on_files_found=on_files_found)
         if collected_files_paths:
-            self.processed_files_info = self.file_scanner.create_initial_file_list(collected_files_paths, OCR_STATUS_SKIPPED_SIZE_LIMIT, OCR_STATUS_NOT_PROCESSED)
+            # スキャン完了後にパス順へ並べ直し、No を振り直す
+            self.processed_files_info = sorted(streamed_files_info, key=lambda item: item.path)
+            for no, item in enumerate(self.processed_files_info, start=1): item.no = no
             processable_count = sum(1 for item in self.processed_files_info if item.ocr_engine_status != OCR_STATUS_SKIPPED_SIZE_LIMIT); self.log_manager.info(f"MainWindow: Scan completed. {len(self.processed_files_info)} files loaded ({processable_count} processable).", context="FILE_SCAN_MAIN")
         else: self.log_manager.info("MainWindow: Scan completed. No files found or collected.", context="FILE_SCAN_MAIN")
+        self.file_scanner.save_folder_index(self.processed_files_info)
         if hasattr(self, 'list_view') and self.list_view: self.list_view.update_files(self.processed_files_info, self.is_ocr_running)
         if max_files_info or depth_limited_folders:
             warning_messages = []
@@ -537,17 +591,36 @@ class MainWindow(QMainWindow):
             if depth_limited_folders: folders_str = ", ".join([os.path.basename(f) for f in depth_limited_folders[:3]]); folders_str += f" など、計{len(depth_limited_folders)}フォルダ" if len(depth_limited_folders) > 3 else ""; warning_messages.append(f"再帰検索の深さ制限により、サブフォルダ「{folders_str}」以降は検索されていません。")
             QMessageBox.warning(self, "スキャン結果の注意", "\n\n".join(warning_messages))
         if hasattr(self.summary_view, 'reset_summary'): self.summary_view.reset_summary()
-        self.update_all_status_displays(); self.update_ocr_controls()    
+        self.update_all_status_displays(); self.update_ocr_controls()
+        self._start_page_count_probe()
+
+    def _start_page_count_probe(self):
+        pending_paths = [item.path for item in self.processed_files_info if item.page_count is None and os.path.splitext(item.path)[1].lower() == ".pdf"]
+        if not pending_paths: return
+        self.page_count_run_id = self.page_count_prober.start(pending_paths)
+        self.status_page_count_label.setText(f"ページ数取得中: 0/{len(pending_paths)}"); self.status_page_count_label.setVisible(True)
+
+    def _cancel_page_count_probe(self):
+        self.page_count_prober.cancel(); self.page_count_run_id = None
+        self.status_page_count_label.setVisible(False)
+
+    def _on_page_counts_ready(self, run_id, results, done, total):
+        if run_id != self.page_count_run_id: return  # 再スキャン前の取得結果
+        for path, page_count in results:
+            file_info = self.file_info_index.get_by_path(path)
+            if file_info is not None and page_count is not None: file_info.page_count = page_count
+        # 変わった行だけが再描画される
+        if hasattr(self, 'list_view') and self.list_view: self.list_view.update_files(self.processed_files_info, self.is_ocr_running)
+        self.status_page_count_label.setText(f"ページ数取得中: {done}/{total}")
+        if done >= total:
+            self.page_count_run_id = None; self.status_page_count_label.setVisible(False)
+            self.file_scanner.save_folder_index(self.processed_files_info)
 
-    def append_log_message_to_widget(self, level, message):
+    def append_log_messages_to_widget(self, lines):
+        """QtLogManager がまとめて配送したログ [(level, message), ...] を表示欄へ追加する (レベルの絞り込みは配送前に済んでいる)。"""
         if hasattr(self, 'log_widget') and self.log_widget:
-            log_settings = self.config.get("log_settings", {})
-            if level == LogLevel.INFO and not log_settings.get("log_level_info_enabled", True):
-                return
-            if level == LogLevel.WARNING and not log_settings.get("log_level_warning_enabled", True):
-                return
-            if level == LogLevel.DEBUG and not log_settings.get("log_level_debug_enabled", False):
-                return
+            # 保持する行数を超える分は、追加してもすぐに削除されるため追加しない
+            lines = lines[-UI_LOG_MAX_DISPLAY_LINES:]
 
             # ログ追加前に、スクロールバーが一番下にあるか（またはそれに近いか）をチェック
             scrollbar = self.log_widget.verticalScrollBar()
@@ -559,8 +632,9 @@ class MainWindow(QMainWindow):
                 LogLevel.DEBUG: "gray",
                 LogLevel.INFO: "black"
             }
-            color = color_map.get(level, "black")
-            self.log_widget.append(f'<font color="{color}">{message}</font>')
+            for level, message in lines:
+                color = color_map.get(level, "black")
+                self.log_widget.appendHtml(f'<font color="{color}">{message}</font>')
 
             # スクロールバーが一番下にあった場合のみ、自動で一番下までスクロールする
             if is_at_bottom:
@@ -625,7 +699,9 @@ class MainWindow(QMainWindow):
             
             if updated_global_config is not None:
                 if "file_actions" in updated_global_config: self.config["file_actions"] = updated_global_config["file_actions"]
-                if "log_settings" in updated_global_config: self.config["log_settings"] = updated_global_config["log_settings"]
+                if "log_settings" in updated_global_config:
+                    self.config["log_settings"] = updated_global_config["log_settings"]
+                    self.log_manager.set_ui_level_filter(self.config["log_settings"])
             
             ConfigManager.save(self.config)
             self.log_manager.info("Options saved.", context="CONFIG_EVENT")
@@ -729,14 +805,12 @@ class MainWindow(QMainWindow):
             self.log_manager.info("ユーザーによって仕分け処理がキャンセルされました。", context="SORT_FLOW")
             
     def on_download_csv_clicked(self):
-        if not hasattr(self, 'list_view') or not self.list_view.table.selectedItems():
+        if not hasattr(self, 'list_view'):
             return
 
-        selected_row = self.list_view.table.currentRow()
-        if not (0 <= selected_row < len(self.processed_files_info)):
+        file_info = self.list_view.get_selected_file_info()
+        if file_info is None:
             return
-            
-        file_info = self.processed_files_info[selected_row]
 
         if not (file_info.ocr_engine_status == OCR_STATUS_COMPLETED and file_info.job_id):
             QMessageBox.information(self, "ダウンロード不可", "このファイルのCSVはダウンロードできません。\n（処理が完了していないか、ジョブIDがありません）")
@@ -771,7 +845,7 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, "ファイル保存エラー", f"ファイルの書き込みに失敗しました。\n\nエラー: {e}")
 
     def on_original_file_status_update_from_worker(self, original_file_path, status_message):
-        target_file_info = next((item for item in self.processed_files_info if item.path == original_file_path), None)
+        target_file_info = self.file_info_index.get_by_path(original_file_path)
         if target_file_info:
             self.log_manager.debug(f"UI Update for '{target_file_info.name}': {status_message}", context="UI_STATUS_UPDATE"); target_file_info.status = status_message
             if status_message == OCR_STATUS_SPLITTING: target_file_info.ocr_engine_status = OCR_STATUS_SPLITTING
@@ -967,30 +1041,20 @@ class MainWindow(QMainWindow):
         
         can_download_csv = False
         if not running and hasattr(self, 'list_view'):
-            selected_rows = self.list_view.table.selectionModel().selectedRows()
-            if len(selected_rows) == 1:
-                no_item = self.list_view.table.item(selected_rows[0].row(), 1)
-                if no_item:
-                    try:
-                        file_no = int(no_item.text())
-                        file_info = next((f for f in self.processed_files_info if f.no == file_no), None)
-
-                        # === 修正箇所 START ===
-                        # ユニット削除オプションの値を取得
-                        active_options = ConfigManager.get_active_api_options_values(self.config)
-                        delete_job_enabled = active_options.get("delete_job_after_processing", True) if active_options else True
-
-                        if (file_info and
-                            file_info.ocr_engine_status == OCR_STATUS_COMPLETED and
-                            file_info.job_id and
-                            self.active_api_profile and
-                            self.active_api_profile.get('id') == 'dx_standard_v2' and
-                            not delete_job_enabled):  # ユニット削除がOFFの場合のみ有効
-                            can_download_csv = True
-                        # === 修正箇所 END ===
-
-                    except (ValueError, StopIteration):
-                        pass
+            file_info = self.list_view.get_selected_file_info()
+            if file_info:
+                # === 修正箇所 START ===
+                # ユニット削除オプションの値を取得
+                active_options = ConfigManager.get_active_api_options_values(self.config)
+                delete_job_enabled = active_options.get("delete_job_after_processing", True) if active_options else True
+
+                if (file_info.ocr_engine_status == OCR_STATUS_COMPLETED and
+                    file_info.job_id and
+                    self.active_api_profile and
+                    self.active_api_profile.get('id') == 'dx_standard_v2' and
+                    not delete_job_enabled):  # ユニット削除がOFFの場合のみ有効
+                    can_download_csv = True
+                # === 修正箇所 END ===
         
         if hasattr(self, 'download_csv_action'):
             self.download_csv_action.setEnabled(can_download_csv)
@@ -1037,7 +1101,12 @@ class MainWindow(QMainWindow):
         cfg["log_visible"] = getattr(self.log_container, 'isVisible', lambda: True)()
         if hasattr(self.splitter, 'sizes'): cfg["splitter_sizes"] = self.splitter.sizes()
         if hasattr(self.list_view, 'get_column_widths') and hasattr(self.list_view, 'get_sort_order'): cfg["column_widths"] = self.list_view.get_column_widths(); cfg["sort_order"] = self.list_view.get_sort_order()
-        ConfigManager.save(cfg); self.log_manager.info("Settings saved. Exiting application.", context="SYSTEM_LIFECYCLE"); super().closeEvent(event)
+        ConfigManager.save(cfg); self.log_manager.info("Settings saved. Exiting application.", context="SYSTEM_LIFECYCLE")
+        if hasattr(self, 'page_count_prober'): self.page_count_prober.shutdown()
+        if hasattr(self, 'file_scanner'): self.file_scanner.save_folder_index(self.processed_files_info)
+        SharedHttpSession.close()
+        self.log_manager.flush()
+        super().closeEvent(event)
 
     def clear_log_display(self):
         if hasattr(self, 'log_widget'): self.log_widget.clear()
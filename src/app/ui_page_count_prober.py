@@ -0,0 +1,21 @@
+# ui_page_count_prober.py
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from page_count_prober import PageCountProber
+
+
+class QtPageCountProber(QObject, PageCountProber):
+    """PageCountProber の取得結果を page_counts_ready で GUI スレッドへ通知する。
+
+    取得用のスレッドから emit するため、GUI スレッドで作成したこのオブジェクトに接続したスロットはキュー接続で呼ばれる。
+    """
+    # (実行ID, [(パス, ページ数 or None), ...], 完了数, 総数)
+    page_counts_ready = pyqtSignal(int, list, int, int)
+
+    def __init__(self, log_manager, parent=None):
+        QObject.__init__(self, parent)
+        PageCountProber.__init__(self, log_manager)
+
+    def _deliver_results(self, run_id, results, done, total):
+        self.page_counts_ready.emit(run_id, results, done, total)
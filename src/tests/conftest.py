@@ -0,0 +1,7 @@
+# conftest.py
+
+import os
+import sys
+
+# アプリのモジュールはフラットな構成で、パッケージ名を付けずに import している
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
@@ -0,0 +1,88 @@
+# test_folder_index.py
+
+import os
+
+import pytest
+from PyPDF2 import PdfWriter
+
+from app_constants import OCR_STATUS_COMPLETED, OCR_STATUS_NOT_PROCESSED, OCR_STATUS_SKIPPED_SIZE_LIMIT
+from file_scanner import FileScanner
+from folder_index import FolderIndex
+from log_manager import LogManager
+
+PROFILES = [{"id": "dx_fulltext_v2"}, {"id": "dx_atypical_v2"}]
+
+
+def _config(profile_id, api_execution_mode):
+    return {"api_profiles": PROFILES, "current_api_profile_id": profile_id, "api_execution_mode": api_execution_mode,
+            "options_values_by_profile": {profile["id"]: {"upload_max_size_mb": 60} for profile in PROFILES}, "file_actions": {}}
+
+
+@pytest.fixture
+def input_folder(tmp_path):
+    folder = tmp_path / "input"
+    folder.mkdir()
+    writer = PdfWriter()
+    for _ in range(3):
+        writer.add_blank_page(width=200, height=200)
+    with open(folder / "a.pdf", "wb") as f:
+        writer.write(f)
+    return str(folder)
+
+
+def _scan(tmp_path, input_folder, config):
+    """索引を tmp_path に置いて一覧を作る (scan_folder と同様に、一覧を作った後で索引を保存する)。"""
+    scanner = FileScanner(LogManager(log_dir_override=str(tmp_path / "logs")), config)
+    scanner.folder_index = FolderIndex.load(input_folder, index_dir=str(tmp_path / "index"))
+    files_info = scanner.create_initial_file_list([os.path.join(input_folder, "a.pdf")], OCR_STATUS_SKIPPED_SIZE_LIMIT, OCR_STATUS_NOT_PROCESSED)
+    return scanner, files_info
+
+
+def _complete_and_save(scanner, files_info):
+    files_info[0].ocr_engine_status = OCR_STATUS_COMPLETED
+    files_info[0].status = OCR_STATUS_COMPLETED
+    files_info[0].job_id = "job-1"
+    scanner.save_folder_index(files_info)
+
+
+def test_state_restored_for_same_profile_and_mode(tmp_path, input_folder):
+    scanner, files_info = _scan(tmp_path, input_folder, _config("dx_fulltext_v2", "demo"))
+    _complete_and_save(scanner, files_info)
+
+    _, files_info = _scan(tmp_path, input_folder, _config("dx_fulltext_v2", "demo"))
+    assert files_info[0].ocr_engine_status == OCR_STATUS_COMPLETED
+    assert files_info[0].job_id == "job-1"
+    assert files_info[0].is_checked is False
+
+
+@pytest.mark.parametrize("profile_id, api_execution_mode", [("dx_atypical_v2", "demo"), ("dx_fulltext_v2", "live")])
+def test_state_not_restored_for_other_profile_or_mode(tmp_path, input_folder, profile_id, api_execution_mode):
+    scanner, files_info = _scan(tmp_path, input_folder, _config("dx_fulltext_v2", "demo"))
+    _complete_and_save(scanner, files_info)
+
+    scanner, files_info = _scan(tmp_path, input_folder, _config(profile_id, api_execution_mode))
+    assert files_info[0].ocr_engine_status == OCR_STATUS_NOT_PROCESSED
+    assert files_info[0].job_id is None
+    assert files_info[0].is_checked is True
+    # スキャンで得た情報 (ページ数) は再利用する
+    assert files_info[0].page_count == 3
+    assert scanner.folder_index.stats["files_reused"] == 1
+
+    # 別のプロファイル・モードで一覧を保存しても、元のプロファイル・モードの状態は残る
+    scanner.save_folder_index(files_info)
+    _, files_info = _scan(tmp_path, input_folder, _config("dx_fulltext_v2", "demo"))
+    assert files_info[0].ocr_engine_status == OCR_STATUS_COMPLETED
+
+
+def test_mode_switch_after_run_keeps_recorded_context(tmp_path, input_folder):
+    config = _config("dx_fulltext_v2", "demo")
+    scanner, files_info = _scan(tmp_path, input_folder, config)
+    _complete_and_save(scanner, files_info)
+
+    # 処理後にAPI実行モードを切り替えてから保存した場合も、処理したときのモードの状態として残す
+    config["api_execution_mode"] = "live"
+    scanner.save_folder_index(files_info)
+    _, files_info = _scan(tmp_path, input_folder, _config("dx_fulltext_v2", "live"))
+    assert files_info[0].ocr_engine_status == OCR_STATUS_NOT_PROCESSED
+    _, files_info = _scan(tmp_path, input_folder, _config("dx_fulltext_v2", "demo"))
+    assert files_info[0].ocr_engine_status == OCR_STATUS_COMPLETED
@@ -0,0 +1,57 @@
+# test_result_cache.py
+
+import os
+
+import pytest
+
+from result_cache import ResultCache, build_cache_key, compute_file_sha256
+
+
+def _unique_path(dest_dir, name):
+    return os.path.join(dest_dir, name)
+
+
+@pytest.fixture
+def result_cache(tmp_path):
+    ResultCache.configure(64, cache_dir=str(tmp_path / "cache"))
+    yield ResultCache
+    with ResultCache._lock:
+        ResultCache._cache_dir = None
+        ResultCache._index = None
+
+
+def test_restore_uses_current_file_base_name(result_cache, tmp_path):
+    """同じ内容で名前の違うファイルには、そのファイルの名前で結果を出力する。"""
+    first_dir = tmp_path / "first"
+    second_dir = tmp_path / "second" / "sub"
+    first_dir.mkdir()
+    second_dir.mkdir(parents=True)
+    (first_dir / "a.pdf").write_bytes(b"%PDF-same-bytes")
+    (second_dir / "c.pdf").write_bytes(b"%PDF-same-bytes")
+    outputs = {"a.json": b'{"page": 1}', "a.split#02.json": b'{"page": 2}', "a.pdf": b"%PDF-result"}
+    (first_dir / "OCR結果").mkdir()
+    for name, content in outputs.items():
+        (first_dir / "OCR結果" / name).write_bytes(content)
+
+    key = build_cache_key(compute_file_sha256(str(first_dir / "a.pdf")), "fulltext", {})
+    artifacts = [{"name": name, "source_path": str(first_dir / "OCR結果" / name)} for name in outputs]
+    artifacts[-1]["signal_pdf"] = True
+    assert result_cache.store(key, artifacts, {"json_status": "JSON成功"}, "a")
+
+    second_key = build_cache_key(compute_file_sha256(str(second_dir / "c.pdf")), "fulltext", {})
+    entry = result_cache.lookup(second_key)
+    assert entry is not None
+    restored = result_cache.restore_artifacts(entry, str(second_dir / "OCR結果"), _unique_path, "c")
+
+    restored_names = {os.path.basename(path): artifact for artifact, path in restored}
+    assert sorted(restored_names) == ["c.json", "c.pdf", "c.split#02.json"]
+    assert restored_names["c.pdf"].get("signal_pdf") is True
+    for name, content in outputs.items():
+        assert (second_dir / "OCR結果" / ("c" + name[1:])).read_bytes() == content
+
+
+def test_store_rejects_names_without_base_name(result_cache, tmp_path):
+    (tmp_path / "other.json").write_bytes(b"{}")
+    artifacts = [{"name": "other.json", "source_path": str(tmp_path / "other.json")}]
+    assert not result_cache.store("k" * 64, artifacts, {}, "a")
+    assert result_cache.lookup("k" * 64) is None
@@ -0,0 +1,100 @@
+# test_retry_policy.py
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from api_client_fulltext import OCRApiClientFulltext
+from config_manager import DEFAULT_API_PROFILES
+from log_manager import LogManager
+from retry_policy import RetryBudget
+
+
+class _RegisterServer(ThreadingHTTPServer):
+    """登録API (POST) に、用意したレスポンスを順に返すサーバー。受け取った本文を記録する。"""
+    def __init__(self, responses):
+        super().__init__(("127.0.0.1", 0), _RegisterHandler)
+        self.responses = list(responses)
+        self.received_bodies = []
+
+
+class _RegisterHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = b""
+            while True:
+                chunk_size = int(self.rfile.readline().strip(), 16)
+                body += self.rfile.read(chunk_size)
+                self.rfile.readline()
+                if chunk_size == 0: break
+        else:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.received_bodies.append(body)
+        status_code, headers, payload = self.server.responses.pop(0)
+        encoded = json.dumps(payload).encode("utf-8")
+        self.send_response(status_code)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def register_server():
+    servers = []
+
+    def start(responses):
+        server = _RegisterServer(responses)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _live_client(tmp_path, server):
+    profile = next(p for p in DEFAULT_API_PROFILES if p["id"] == "dx_fulltext_v2")
+    config = {"api_execution_mode": "live", "current_api_profile_id": profile["id"], "api_profiles": [profile],
+              "options_values_by_profile": {profile["id"]: {"api_key": "test-key", "base_uri": f"http://127.0.0.1:{server.server_port}/fullocr/v2/",
+                                                            "retry_max_attempts": 3}}}
+    RetryBudget.reset()
+    return OCRApiClientFulltext(config, LogManager(log_dir_override=str(tmp_path / "logs")), profile)
+
+
+def test_register_retried_after_429(tmp_path, register_server):
+    server = register_server([(429, {"Retry-After": "1"}, {"message": "Too Many Requests"}),
+                              (200, {}, {"id": "job-1"})])
+    (tmp_path / "a.png").write_bytes(b"\x89PNG register body")
+
+    result, error = _live_client(tmp_path, server).read_document(str(tmp_path / "a.png"))
+
+    assert error is None
+    assert result["job_id"] == "job-1"
+    assert len(server.received_bodies) == 2
+    # 送り直した本文も先頭から送られている
+    assert server.received_bodies[0] == server.received_bodies[1]
+    assert b"\x89PNG register body" in server.received_bodies[1]
+    assert RetryBudget.get_stats()["recovered"] == 1
+
+
+def test_register_not_retried_after_503_without_retry_after(tmp_path, register_server):
+    server = register_server([(503, {}, {"message": "Service Unavailable"}),
+                              (200, {}, {"id": "job-2"})])
+    (tmp_path / "a.png").write_bytes(b"\x89PNG register body")
+
+    result, error = _live_client(tmp_path, server).read_document(str(tmp_path / "a.png"))
+
+    # 処理されたかどうか分からないため、二重登録を避けて失敗とする
+    assert result is None
+    assert error is not None
+    assert len(server.received_bodies) == 1
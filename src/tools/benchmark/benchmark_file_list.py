@@ -0,0 +1,98 @@
+# benchmark_file_list.py
+#
+# 大量のファイル (既定 50,000件) の一覧に対する操作の所要時間を、従来のリスト走査と
+# 索引 (app/file_model.py の FileInfoIndex) で比較するベンチマーク。
+# PyQt6 がインストールされていれば、一覧のテーブルモデル (app/list_view.py) の更新も計測する。
+#
+# 使い方 (src フォルダで実行):
+#   python tools/benchmark/benchmark_file_list.py [--files 50000] [--updates 5000] [--seed 1]
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "app"))
+from file_model import FileInfo, FileInfoIndex  # noqa: E402
+
+
+def make_file_list(num_files: int) -> list:
+    return [FileInfo(no=i + 1, path=os.path.join("/input", f"folder_{i // 1000:03d}", f"file_{i:06d}.pdf"), name=f"file_{i:06d}.pdf",
+                     size=1024 * (i % 5000 + 1), status="未処理", ocr_engine_status="未処理") for i in range(num_files)]
+
+
+def timed(func, *args) -> float:
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+
+def linear_status_updates(files: list, paths: list):
+    # 従来の MainWindow.on_original_file_status_update_from_worker と同じ探し方
+    for path in paths:
+        target = next((item for item in files if item.path == path), None)
+        target.status = "処理中"
+
+
+def indexed_status_updates(index: FileInfoIndex, paths: list):
+    for path in paths:
+        index.get_by_path(path).status = "処理中"
+
+
+def linear_sorted_list(files: list, visual_nos: list) -> list:
+    # 従来の ListView.get_sorted_file_info_list と同じ探し方 (行ごとに No で走査)
+    return [next((f for f in files if f.no == file_no), None) for file_no in visual_nos]
+
+
+def indexed_sorted_list(index: FileInfoIndex, visual_nos: list) -> list:
+    return [index.get_by_no(file_no) for file_no in visual_nos]
+
+
+def benchmark_table_model(files: list, changed_rows: list):
+    try:
+        from list_view import FileListTableModel
+    except ImportError as e:
+        print(f"テーブルモデル: PyQt6 を読み込めないため計測しません ({e})")
+        return
+    model = FileListTableModel()
+    print(f"{'テーブルモデル: 一覧の設定 (リセット)':<40} {timed(model.update_files, files) * 1000:>10.1f} ms")
+    print(f"{'テーブルモデル: 更新 (変更なし)':<40} {timed(model.update_files, files) * 1000:>10.1f} ms")
+    for row in changed_rows:
+        files[row].status = "OCR成功"
+    print(f"{f'テーブルモデル: 更新 ({len(changed_rows)}行変更)':<40} {timed(model.update_files, files) * 1000:>10.1f} ms")
+    print(f"{'テーブルモデル: 全選択/全解除':<40} {timed(model.set_all_checked, False) * 1000:>10.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="大量ファイルの一覧操作のベンチマーク")
+    parser.add_argument("--files", type=int, default=50000, help="一覧のファイル数")
+    parser.add_argument("--updates", type=int, default=5000, help="状態更新・並び替え取得で探すファイル数 (従来方式は件数に比例して遅くなる)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    files = make_file_list(args.files)
+    sample_paths = [files[rng.randrange(args.files)].path for _ in range(args.updates)]
+    sample_nos = [files[rng.randrange(args.files)].no for _ in range(args.updates)]
+
+    index = FileInfoIndex()
+    print(f"files={args.files} lookups={args.updates}")
+    print(f"{'operation':<40} {'time':>13}")
+    print(f"{'索引の作成 (一覧の置き換え時)':<40} {timed(index.rebuild, files) * 1000:>10.1f} ms")
+    linear = timed(linear_status_updates, files, sample_paths)
+    indexed = timed(indexed_status_updates, index, sample_paths)
+    print(f"{'状態更新: リスト走査':<40} {linear * 1000:>10.1f} ms")
+    print(f"{'状態更新: 索引':<40} {indexed * 1000:>10.1f} ms  (x{linear / max(indexed, 1e-9):,.0f})")
+    linear = timed(linear_sorted_list, files, sample_nos)
+    indexed = timed(indexed_sorted_list, index, sample_nos)
+    print(f"{'No から取得: リスト走査':<40} {linear * 1000:>10.1f} ms")
+    print(f"{'No から取得: 索引':<40} {indexed * 1000:>10.1f} ms  (x{linear / max(indexed, 1e-9):,.0f})")
+    per_lookup = linear / max(args.updates, 1)
+    print(f"参考: 従来方式で全 {args.files} 件を1回ずつ探す場合の推定 {per_lookup * args.files:.1f} 秒")
+
+    benchmark_table_model(files, rng.sample(range(args.files), min(100, args.files)))
+
+
+if __name__ == "__main__":
+    main()
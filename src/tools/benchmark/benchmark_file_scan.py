@@ -0,0 +1,84 @@
+# benchmark_file_scan.py
+#
+# フォルダのスキャン (app/file_scanner.py の FileScanner.scan_folder + create_initial_file_list) の所要時間を計測するベンチマーク。
+# --folder を省略した場合は、一時フォルダにダミーのファイル (PDF 以外の画像拡張子の空ファイル) を作成して計測する。
+# NAS などのネットワークドライブでの効果を見る場合は、--folder にそのフォルダを指定する。
+# 2回目以降の計測は、1回目に保存したフォルダの索引 (app/folder_index.py) を使う再スキャンになる。
+#
+# 使い方 (src フォルダで実行):
+#   python tools/benchmark/benchmark_file_scan.py [--folder PATH] [--dirs 2000] [--files-per-dir 20] [--depth 4] [--repeat 3]
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "app"))
+from log_manager import LogManager  # noqa: E402
+from file_scanner import FileScanner  # noqa: E402
+from app_constants import OCR_STATUS_SKIPPED_SIZE_LIMIT, OCR_STATUS_NOT_PROCESSED  # noqa: E402
+from folder_index import index_path_for_root  # noqa: E402
+
+
+def make_tree(root: str, num_dirs: int, files_per_dir: int, depth: int):
+    # 深さ depth までのフォルダに num_dirs 個のフォルダを分散して作る
+    for d in range(num_dirs):
+        parts = [f"level{level}_{(d >> (2 * level)) % 4}" for level in range(depth - 1)] + [f"dir_{d:05d}"]
+        folder = os.path.join(root, *parts)
+        os.makedirs(folder, exist_ok=True)
+        for i in range(files_per_dir):
+            ext = ".png" if i % 3 else ".jpg"
+            with open(os.path.join(folder, f"scan_{i:04d}{ext}"), "wb") as f:
+                f.write(b"\0" * (i + 1))
+        with open(os.path.join(folder, "readme.txt"), "w") as f:
+            f.write("not a target")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="フォルダスキャンのベンチマーク")
+    parser.add_argument("--folder", help="スキャンするフォルダ (省略時はダミーのフォルダを作成)")
+    parser.add_argument("--dirs", type=int, default=2000)
+    parser.add_argument("--files-per-dir", type=int, default=20)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    temp_root = None
+    folder = args.folder
+    if not folder:
+        temp_root = tempfile.mkdtemp(prefix="scan_bench_")
+        folder = temp_root
+        make_tree(folder, args.dirs, args.files_per_dir, args.depth)
+        # 作成直後のフォルダは索引に記録されないため、更新日時を過去にする
+        past = time.time() - 60
+        for dir_path, _, _ in os.walk(folder):
+            os.utime(dir_path, (past, past))
+
+    log_dir = tempfile.mkdtemp(prefix="scan_bench_log_")
+    try:
+        config = {"api_type": "bench", "options": {"bench": {"max_files_to_process": 10 ** 9, "recursion_depth": args.depth + 1}}}
+        scanner = FileScanner(LogManager(log_dir_override=log_dir), config)
+        print(f"folder={folder}")
+        for run in range(args.repeat):
+            started = time.perf_counter()
+            first_batch_at = []
+            paths, _, _ = scanner.scan_folder(folder, on_files_found=lambda batch: first_batch_at.append(time.perf_counter()) if not first_batch_at else None)
+            scanned = time.perf_counter()
+            files_info = scanner.create_initial_file_list(paths, OCR_STATUS_SKIPPED_SIZE_LIMIT, OCR_STATUS_NOT_PROCESSED)
+            finished = time.perf_counter()
+            scanner.save_folder_index(files_info)
+            first_ms = (first_batch_at[0] - started) * 1000 if first_batch_at else float("nan")
+            print(f"run {run + 1}: files={len(files_info)} scan={(scanned - started) * 1000:.1f} ms (first batch {first_ms:.1f} ms) "
+                  f"file list={(finished - scanned) * 1000:.1f} ms  index={scanner.folder_index.stats}")
+    finally:
+        shutil.rmtree(log_dir, ignore_errors=True)
+        if temp_root:
+            shutil.rmtree(temp_root, ignore_errors=True)
+            try: os.remove(index_path_for_root(temp_root))
+            except OSError: pass
+
+
+if __name__ == "__main__":
+    main()
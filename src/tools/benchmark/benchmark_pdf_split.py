@@ -0,0 +1,130 @@
+# benchmark_pdf_split.py
+#
+# PDF分割の部品サイズの精度を、従来の見積もり (ファイルサイズ ÷ ページ数) と
+# 実測ページサイズによる分割 (app/pdf_splitter.py) で比較するベンチマーク。
+#
+# 使い方 (src フォルダで実行):
+#   python tools/benchmark/benchmark_pdf_split.py [--chunk-mb 10] [--upload-max-mb 12] [--seed 1]
+
+import os
+import sys
+import random
+import shutil
+import argparse
+import tempfile
+import statistics
+
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import DecodedStreamObject, NameObject, DictionaryObject, NumberObject
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "app"))
+from pdf_splitter import split_pdf_by_size, get_part_filename  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def make_scanned_pdf(path: str, page_image_sizes: list):
+    """ページごとに指定サイズの画像XObjectを持つ、スキャンPDF相当のファイルを作成する。"""
+    writer = PdfWriter()
+    for image_size in page_image_sizes:
+        writer.add_blank_page(595, 842)
+        page = writer.pages[-1]
+        image = DecodedStreamObject()
+        image.set_data(os.urandom(image_size))
+        image.update({NameObject("/Type"): NameObject("/XObject"), NameObject("/Subtype"): NameObject("/Image"),
+                      NameObject("/Width"): NumberObject(10), NameObject("/Height"): NumberObject(10),
+                      NameObject("/ColorSpace"): NameObject("/DeviceGray"), NameObject("/BitsPerComponent"): NumberObject(8)})
+        page[NameObject("/Resources")] = DictionaryObject({NameObject("/XObject"): DictionaryObject({NameObject("/Im0"): writer._add_object(image)})})
+        contents = DecodedStreamObject()
+        contents.set_data(b"q 595 0 0 842 0 0 cm /Im0 Do Q")
+        page[NameObject("/Contents")] = writer._add_object(contents)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def split_by_average_page_size(original_filepath: str, chunk_size_bytes: int, temp_dir_for_parts: str) -> list:
+    """従来の分割方式 (平均ページサイズで部品サイズを見積もる) の再現。"""
+    reader = PdfReader(original_filepath)
+    total_pages = len(reader.pages)
+    original_basename = os.path.basename(original_filepath)
+    original_ext = os.path.splitext(original_basename)[1]
+    average_page_size_bytes = os.path.getsize(original_filepath) / total_pages
+    estimated_total_parts = max(1, -(-os.path.getsize(original_filepath) // chunk_size_bytes))
+    split_files, part_counter = [], 1
+    current_writer, current_estimated_size = PdfWriter(), 0
+
+    def write_part(writer):
+        part_filepath = os.path.join(temp_dir_for_parts, get_part_filename(original_basename, part_counter, estimated_total_parts, original_ext))
+        with open(part_filepath, "wb") as f_out: writer.write(f_out)
+        split_files.append(part_filepath)
+
+    for i in range(total_pages):
+        current_writer.add_page(reader.pages[i])
+        current_estimated_size += average_page_size_bytes
+        if i != total_pages - 1 and current_estimated_size >= chunk_size_bytes * 0.9:
+            write_part(current_writer)
+            part_counter += 1
+            current_writer, current_estimated_size = PdfWriter(), 0
+    if len(current_writer.pages) > 0:
+        write_part(current_writer)
+    return split_files
+
+
+def describe_parts(part_paths: list, upload_max_bytes: int) -> dict:
+    sizes = [os.path.getsize(p) for p in part_paths]
+    return {
+        "parts": len(sizes),
+        "mean_mb": statistics.mean(sizes) / MB,
+        "stdev_mb": statistics.pstdev(sizes) / MB,
+        "min_mb": min(sizes) / MB,
+        "max_mb": max(sizes) / MB,
+        "over_limit": sum(1 for size in sizes if size > upload_max_bytes),
+    }
+
+
+def build_scenarios(rng: random.Random) -> dict:
+    return {
+        # 均一なページ (従来方式でも正確に見積もれるケース)
+        "uniform": [300 * 1024] * 120,
+        # カラー/モノクロが混在するスキャン (ページサイズが対数正規分布でばらつく)
+        "mixed_scan": [int(min(6 * MB, rng.lognormvariate(11.5, 1.2))) for _ in range(200)],
+        # 前半は写真などの重いページ、後半は文字だけの軽いページ
+        "heavy_front": [int(1.5 * MB)] * 20 + [30 * 1024] * 180,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF分割方式の比較ベンチマーク")
+    parser.add_argument("--chunk-mb", type=float, default=10, help="分割サイズ目安 (split_chunk_size_mb)")
+    parser.add_argument("--upload-max-mb", type=float, default=12, help="アップロード上限 (これを超える部品を数える)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    chunk_size_bytes = int(args.chunk_mb * MB)
+    upload_max_bytes = int(args.upload_max_mb * MB)
+    work_dir = tempfile.mkdtemp(prefix="pdf_split_bench_")
+    try:
+        print(f"chunk={args.chunk_mb}MB upload_max={args.upload_max_mb}MB")
+        print(f"{'scenario':<12} {'method':<10} {'parts':>5} {'mean MB':>8} {'stdev MB':>8} {'min MB':>7} {'max MB':>7} {'over':>5}")
+        for name, page_sizes in build_scenarios(random.Random(args.seed)).items():
+            pdf_path = os.path.join(work_dir, f"{name}.pdf")
+            make_scanned_pdf(pdf_path, page_sizes)
+
+            average_dir = tempfile.mkdtemp(dir=work_dir)
+            measured_dir = tempfile.mkdtemp(dir=work_dir)
+            results = {"average": split_by_average_page_size(pdf_path, chunk_size_bytes, average_dir)}
+            measured_parts, error, _ = split_pdf_by_size(pdf_path, chunk_size_bytes, measured_dir, False, 0)
+            if error:
+                print(f"{name}: 分割エラー {error}")
+                continue
+            results["measured"] = measured_parts
+
+            for method, part_paths in results.items():
+                d = describe_parts(part_paths, upload_max_bytes)
+                print(f"{name:<12} {method:<10} {d['parts']:>5} {d['mean_mb']:>8.2f} {d['stdev_mb']:>8.2f} {d['min_mb']:>7.2f} {d['max_mb']:>7.2f} {d['over_limit']:>5}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()